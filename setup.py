@@ -1,10 +1,27 @@
 
 
 from distutils.core import setup
+from distutils.command.build_py import build_py
+
+
+class build_py_with_handlers(build_py):
+    """Generates the CPU's instruction handlers before building, so they
+    aren't generated the first time the emulator runs."""
+
+    def run(self):
+        try:
+            from slowboy.codegen import write_handlers
+            write_handlers()
+        except ImportError:
+            # Missing dependencies; the handlers are generated on first use
+            pass
+        build_py.run(self)
+
 
 setup(name='slowboy',
       version='0.0.1',
-      packages=['slowboy'],
+      packages=['slowboy', 'slowboy.render'],
+      cmdclass={'build_py': build_py_with_handlers},
       url='https://github.com/zmarvel/slowboy/',
       author='Zack Marvel',
       author_email='zpmarvel at gmail dot com',
@@ -12,6 +29,9 @@ setup(name='slowboy',
           "PySDL2",
       ],
       extras_require={
+          "framebuffer": [
+              "numpy",
+          ],
           "dev": [
               "Pillow",
               "pytest",
@@ -2,12 +2,20 @@
 import argparse as ap
 import logging
 
-from slowboy.ui import HeadlessUI
+from slowboy.headless import HeadlessUI
 
 parser = ap.ArgumentParser()
 parser.add_argument('romfile', type=str, help='the ROM to load')
 parser.add_argument('-v', '--verbose', action='store_true')
 parser.add_argument('-d', '--debug', action='store_true')
+parser.add_argument('-t', '--translate', action='store_true',
+                    help='compile straight-line runs of code into Python functions')
+parser.add_argument('-w', '--write-through', action='store_true',
+                    help='write every change to the save file to disk immediately')
+parser.add_argument('-r', '--renderer', choices=('null', 'framebuffer'),
+                    default='null',
+                    help='draw nothing (the default), or draw each frame into '
+                    'a NumPy array')
 
 args = parser.parse_args()
 
@@ -17,5 +25,12 @@ if args.verbose:
 if args.debug:
     log_level = logging.DEBUG
 
-ui = HeadlessUI(args.romfile, log_level=log_level)
+renderer = None
+if args.renderer == 'framebuffer':
+    from slowboy.render.framebuffer import FramebufferRenderer
+    renderer = FramebufferRenderer()
+
+ui = HeadlessUI(args.romfile, translate=args.translate,
+                write_through=args.write_through, log_level=log_level,
+                renderer=renderer)
 ui.start()
@@ -0,0 +1,137 @@
+"""Precomputed results and flags of the 8-bit ALU operations.
+
+Each table entry packs an operation's 8-bit result and the Z, N, H and C bits
+of the F register as ``result << 8 | flags``, so an instruction computes both
+with one indexed lookup::
+
+    v = ADD[a << 8 | b]
+    regs[REG_A] = v >> 8
+    regs[REG_FLAGS] = v & 0xff
+
+Every flag byte also has :py:data:PENDING set. F doesn't use that bit, and the
+CPU keeps the last flag byte aside until F is read, so a byte from these
+tables is never 0 and 0 can mean that no flags are pending.
+
+Two-operand tables are indexed by ``carry << 16 | a << 8 | b`` and
+one-operand tables by ``carry << 8 | value``; the carry bit selects adc/sbc
+and rl/rr. The tables are built once, when the module is imported, and are
+shared by every CPU.
+"""
+
+from array import array
+
+
+Z_FLAG = 0x80
+N_FLAG = 0x40
+H_FLAG = 0x20
+C_FLAG = 0x10
+PENDING = 0x01
+
+
+def _add(c, a, b):
+    result = a + b + c
+    flags = PENDING if result & 0xff else Z_FLAG | PENDING
+    if (a & 0x0f) + (b & 0x0f) + c > 0x0f:
+        flags |= H_FLAG
+    if result > 0xff:
+        flags |= C_FLAG
+    return (result & 0xff) << 8 | flags
+
+
+def _sub(c, a, b):
+    result = a - b - c
+    flags = N_FLAG | PENDING if result & 0xff else Z_FLAG | N_FLAG | PENDING
+    if (a & 0x0f) - (b & 0x0f) - c < 0:
+        flags |= H_FLAG
+    if result < 0:
+        flags |= C_FLAG
+    return (result & 0xff) << 8 | flags
+
+
+def _unary(operation):
+    """Returns the table of a one-operand operation, indexed by
+    ``carry << 8 | value``. :py:data:operation returns the result and the
+    carry out."""
+
+    table = array('H', bytes(2 * 0x200))
+    for c in range(2):
+        for value in range(0x100):
+            result, carry = operation(value, c)
+            flags = PENDING if result else Z_FLAG | PENDING
+            if carry:
+                flags |= C_FLAG
+            table[c << 8 | value] = result << 8 | flags
+    return table
+
+
+# add, adc
+ADD = array('H', [_add(c, a, b) for c in range(2) for a in range(0x100)
+                  for b in range(0x100)])
+# sub, sbc, cp
+SUB = array('H', [_sub(c, a, b) for c in range(2) for a in range(0x100)
+                  for b in range(0x100)])
+
+# Flags of and, or and xor by result
+AND_FLAGS = bytes(H_FLAG | PENDING | (0 if v else Z_FLAG) for v in range(0x100))
+OR_FLAGS = bytes(PENDING | (0 if v else Z_FLAG) for v in range(0x100))
+
+# Z, N and H of inc and dec by operand. C is not affected.
+INC_FLAGS = bytes(PENDING | (0 if (v + 1) & 0xff else Z_FLAG) |
+                  (H_FLAG if v & 0x0f == 0x0f else 0) for v in range(0x100))
+DEC_FLAGS = bytes(N_FLAG | PENDING | (0 if (v - 1) & 0xff else Z_FLAG) |
+                  (H_FLAG if v & 0x0f == 0 else 0) for v in range(0x100))
+
+# Rotates and shifts
+RLC = _unary(lambda v, c: (((v << 1) | (v >> 7)) & 0xff, v >> 7))
+RRC = _unary(lambda v, c: ((v >> 1) | ((v & 1) << 7), v & 1))
+RL = _unary(lambda v, c: (((v << 1) | c) & 0xff, v >> 7))
+RR = _unary(lambda v, c: ((v >> 1) | (c << 7), v & 1))
+SLA = _unary(lambda v, c: ((v << 1) & 0xff, v >> 7))
+SRA = _unary(lambda v, c: ((v & 0x80) | (v >> 1), v & 1))
+SRL = _unary(lambda v, c: (v >> 1, v & 1))
+SWAP = _unary(lambda v, c: (((v << 4) | (v >> 4)) & 0xff, 0))
+
+# Masks of bit, set and res by bit number
+BIT_MASKS = tuple(1 << i for i in range(8))
+RES_MASKS = tuple(0xff ^ (1 << i) for i in range(8))
+
+# DAA, from the table in The Game Boy Programming Manual, p. 110. Each row is
+# (N, C, H, high nibble range, low nibble range, value added, C after).
+_DAA_ROWS = (
+    (0, 0, 0, (0x0, 0x9), (0x0, 0x9), 0x00, 0),
+    (0, 0, 0, (0x0, 0x8), (0xa, 0xf), 0x06, 0),
+    (0, 0, 1, (0x0, 0x9), (0x0, 0x3), 0x06, 0),
+    (0, 0, 0, (0xa, 0xf), (0x0, 0x9), 0x60, 1),
+    (0, 0, 0, (0x9, 0xf), (0xa, 0xf), 0x66, 1),
+    (0, 0, 1, (0xa, 0xf), (0x0, 0x3), 0x66, 1),
+    (0, 1, 0, (0x0, 0x2), (0x0, 0x9), 0x60, 1),
+    (0, 1, 0, (0x0, 0x2), (0xa, 0xf), 0x66, 1),
+    (0, 1, 1, (0x0, 0x3), (0x0, 0x3), 0x66, 1),
+    (1, 0, 0, (0x0, 0x9), (0x0, 0x9), 0x00, 0),
+    (1, 0, 1, (0x0, 0x8), (0x6, 0xf), 0xfa, 0),
+    (1, 1, 0, (0x7, 0xf), (0x0, 0x9), 0xa0, 1),
+    (1, 1, 1, (0x6, 0xf), (0x6, 0xf), 0x9a, 1),
+)
+
+
+def _daa():
+    """Returns the DAA table, indexed by ``(F & 0x70) << 4 | A``. N and H
+    are left as they were. Combinations the manual doesn't list are 0."""
+
+    table = array('H', bytes(2 * 0x800))
+    for n, c, h, (hi_min, hi_max), (lo_min, lo_max), add, carry in _DAA_ROWS:
+        for a in range(0x100):
+            if hi_min <= a >> 4 <= hi_max and lo_min <= a & 0x0f <= lo_max:
+                result = (a + add) & 0xff
+                flags = PENDING | (0 if result else Z_FLAG)
+                if n:
+                    flags |= N_FLAG
+                if h:
+                    flags |= H_FLAG
+                if carry:
+                    flags |= C_FLAG
+                table[n << 10 | h << 9 | c << 8 | a] = result << 8 | flags
+    return table
+
+
+DAA = _daa()
@@ -0,0 +1,389 @@
+"""Cartridges and their memory bank controllers (MBCs).
+
+A cartridge owns the ROM image and any cartridge RAM. The MMU maps them into
+the address space page by page: ROM bank 0 at 0x0000-0x3fff, the switchable
+ROM bank at 0x4000-0x7fff and the selected RAM bank at 0xa000-0xbfff. Writes
+to 0x0000-0x7fff go to the cartridge's control registers; afterwards the MMU
+remaps whatever banks are now selected.
+
+Banks are exposed as lists of 256-byte ``memoryview`` slices of the ROM image
+and RAM, built once per bank, so switching banks only swaps references and
+never copies.
+
+Battery-backed RAM can be kept in a memory-mapped save file (see
+:py:meth:`Cartridge.load_save`). Writes to the file's pages go straight to the
+mapping; the cartridge only tracks which 256-byte pages are dirty, and
+:py:meth:`Cartridge.flush` writes those back to disk.
+"""
+
+import logging
+import mmap
+import os
+
+
+ROM_BANK_SIZE = 0x4000
+RAM_BANK_SIZE = 0x2000
+PAGE_SIZE = 0x100
+
+# Cartridge RAM size in bytes, by the RAM size code at 0x149
+RAM_SIZES = {
+    0x00: 0,
+    0x01: 2*1024,
+    0x02: 8*1024,
+    0x03: 32*1024,
+    0x04: 128*1024,
+    0x05: 64*1024,
+}
+
+
+class Cartridge():
+    """Base class for cartridges: the ROM image, cartridge RAM and the
+    selected banks. Subclasses implement the control registers in
+    :py:meth:write."""
+
+    def __init__(self, rom, ram_size=0, logger=None, log_level=logging.WARNING):
+        """
+        :param rom: the ROM image, or None
+        :param ram_size: size of the cartridge RAM in bytes"""
+
+        if logger is None:
+            self.logger = logging.getLogger(__name__)
+        else:
+            self.logger = logger.getChild(__class__.__name__)
+        self.logger.setLevel(log_level)
+
+        self.rom = rom
+        if rom is None:
+            self.rom_banks = 0
+        else:
+            self.rom_banks = max(2, -(-len(rom) // ROM_BANK_SIZE))
+        self.ram = bytearray(ram_size)
+        self.ram_banks = -(-ram_size // RAM_BANK_SIZE)
+
+        # Banks mapped at 0x0000-0x3fff, 0x4000-0x7fff and 0xa000-0xbfff
+        self.rom0_bank = 0
+        self.rom_bank = 1
+        self.ram_bank = 0
+        self.ram_enabled = False
+
+        # True if the header says the RAM is battery-backed
+        self.battery = False
+        # Save file mapping backing the RAM, see load_save. dirty holds the
+        # RAM pages (offset >> 8) written since the last flush.
+        self.save = None
+        self.write_through = False
+        self.dirty = set()
+
+        self._rom_pages = {}
+        self._ram_pages = {}
+
+    def write(self, addr, value):
+        """Write to a control register in 0x0000-0x7fff.
+
+        :param addr: the address written to
+        :param value: the value written
+        :rtype: None"""
+
+        #raise ValueError('cannot write to read-only address {:#04x}'.format(addr))
+        self.logger.warning('cannot write to read-only address %#04x (in ROM)', addr)
+
+    def rom_pages(self, bank):
+        """Returns the 64 pages of ROM bank :py:data:bank. Pages past the end
+        of a short ROM image are None.
+
+        :param bank: a ROM bank number
+        :rtype: list of memoryview or None"""
+
+        try:
+            return self._rom_pages[bank]
+        except KeyError:
+            pass
+        view = memoryview(self.rom)
+        start = bank * ROM_BANK_SIZE
+        pages = []
+        for page_start in range(start, start + ROM_BANK_SIZE, PAGE_SIZE):
+            if page_start + PAGE_SIZE <= len(view):
+                pages.append(view[page_start:page_start+PAGE_SIZE])
+            else:
+                pages.append(None)
+        self._rom_pages[bank] = pages
+        return pages
+
+    def ram_pages(self):
+        """Returns the 32 pages of the selected RAM bank, or None if RAM
+        access currently goes through :py:meth:read_ram and
+        :py:meth:write_ram. Pages past the end of a RAM smaller than a bank
+        are None.
+
+        :rtype: list of memoryview or None"""
+
+        if not self.ram_enabled or self.ram_bank >= self.ram_banks:
+            return None
+        bank = self.ram_bank
+        try:
+            return self._ram_pages[bank]
+        except KeyError:
+            pass
+        view = memoryview(self.ram)
+        start = bank * RAM_BANK_SIZE
+        pages = []
+        for page_start in range(start, start + RAM_BANK_SIZE, PAGE_SIZE):
+            if page_start + PAGE_SIZE <= len(view):
+                pages.append(view[page_start:page_start+PAGE_SIZE])
+            else:
+                pages.append(None)
+        self._ram_pages[bank] = pages
+        return pages
+
+    def ram_write_pages(self):
+        """Returns the pages of the selected RAM bank that writes may go to
+        directly, like :py:meth:ram_pages. With a save file, clean pages are
+        None, so that the first write to a page goes through
+        :py:meth:write_ram and marks it dirty. In write-through mode every
+        write goes through :py:meth:write_ram.
+
+        :rtype: list of memoryview or None"""
+
+        pages = self.ram_pages()
+        if pages is None or self.save is None:
+            return pages
+        if self.write_through:
+            return None
+        first = self.ram_bank * (RAM_BANK_SIZE // PAGE_SIZE)
+        dirty = self.dirty
+        return [page if first + i in dirty else None
+                for i, page in enumerate(pages)]
+
+    def load_save(self, path, write_through=False):
+        """Back the cartridge RAM with the save file at :py:data:path, which
+        is created, or extended with zeros, to the size of the RAM. The RAM
+        is replaced by the file's contents. The file is memory-mapped, so
+        writes are never copied; :py:meth:flush writes the dirty pages to
+        disk.
+
+        :param path: path of the save file
+        :param write_through: if True, flush every write immediately
+        :rtype: bool
+        :returns: False if the cartridge has no RAM to save"""
+
+        size = len(self.ram)
+        if size == 0:
+            return False
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            save = mmap.mmap(fd, size, access=mmap.ACCESS_WRITE)
+        finally:
+            os.close(fd)
+
+        self.flush()
+        self.ram = save
+        self.save = save
+        self.write_through = write_through
+        self.dirty = set()
+        self._ram_pages = {}
+        self.logger.info('loaded %d B of cartridge RAM from %s', size, path)
+        return True
+
+    def flush(self):
+        """Write the pages of the save file dirtied since the last flush to
+        disk.
+
+        :rtype: int
+        :returns: the number of dirty pages"""
+
+        if self.save is None or not self.dirty:
+            return 0
+        count = len(self.dirty)
+        # msync works on whole allocation units
+        granularity = mmap.ALLOCATIONGRANULARITY
+        for start in sorted({page * PAGE_SIZE // granularity * granularity
+                             for page in self.dirty}):
+            self.save.flush(start, min(granularity, len(self.save) - start))
+        self.dirty = set()
+        return count
+
+    def _mark_dirty(self, offset):
+        """Record a write to the save file at :py:data:offset. Returns True
+        if the write dirtied a clean page."""
+
+        page = offset >> 8
+        if self.write_through:
+            self.dirty.add(page)
+            self.flush()
+            return False
+        if page in self.dirty:
+            return False
+        self.dirty.add(page)
+        return True
+
+    def read_rom(self, addr):
+        """Read from 0x0000-0x7fff through the selected banks.
+
+        :param addr: an address in 0x0000-0x7fff
+        :rtype: int"""
+
+        if addr < ROM_BANK_SIZE:
+            return self.rom[self.rom0_bank * ROM_BANK_SIZE + addr]
+        else:
+            return self.rom[self.rom_bank * ROM_BANK_SIZE + addr - ROM_BANK_SIZE]
+
+    def read_ram(self, addr):
+        """Read from 0xa000-0xbfff when the RAM bank is not mapped directly.
+        Disabled or missing RAM reads as 0xff.
+
+        :param addr: an address in 0xa000-0xbfff
+        :rtype: int"""
+
+        offset = self.ram_bank * RAM_BANK_SIZE + addr - 0xa000
+        if self.ram_enabled and offset < len(self.ram):
+            return self.ram[offset]
+        return 0xff
+
+    def write_ram(self, addr, value):
+        """Write to 0xa000-0xbfff when the RAM bank is not mapped directly
+        for writing. Writes to disabled or missing RAM are ignored.
+
+        :param addr: an address in 0xa000-0xbfff
+        :param value: the value written
+        :rtype: bool
+        :returns: True if the write dirtied a clean page of the save file, so
+            that :py:meth:ram_write_pages has changed"""
+
+        offset = self.ram_bank * RAM_BANK_SIZE + addr - 0xa000
+        if self.ram_enabled and offset < len(self.ram):
+            self.ram[offset] = value
+            if self.save is not None:
+                return self._mark_dirty(offset)
+        return False
+
+
+class NoMBC(Cartridge):
+    """A cartridge without an MBC: 32 KB of ROM, and RAM that is always
+    enabled. As before MBC support, at least 8 KB of RAM is mapped even if
+    the header declares none. Writes to ROM are ignored."""
+
+    def __init__(self, rom, ram_size=0, logger=None, log_level=logging.WARNING):
+        super().__init__(rom, max(ram_size, RAM_BANK_SIZE), logger=logger,
+                         log_level=log_level)
+        self.ram_enabled = True
+
+
+class MBC1(Cartridge):
+    """Up to 2 MB of ROM and 32 KB of RAM. The 2-bit register at
+    0x4000-0x5fff selects either the RAM bank or the upper bits of the ROM
+    bank, depending on the banking mode."""
+
+    def __init__(self, rom, ram_size=0, logger=None, log_level=logging.WARNING):
+        super().__init__(rom, ram_size, logger=logger, log_level=log_level)
+        self._bank_lo = 1
+        self._bank_hi = 0
+        self._mode = 0
+
+    def write(self, addr, value):
+        if addr < 0x2000:
+            self.ram_enabled = value & 0x0f == 0x0a
+        elif addr < 0x4000:
+            self._bank_lo = (value & 0x1f) or 1
+        elif addr < 0x6000:
+            self._bank_hi = value & 0x03
+        else:
+            self._mode = value & 0x01
+        self.rom_bank = ((self._bank_hi << 5) | self._bank_lo) % self.rom_banks
+        if self._mode:
+            self.rom0_bank = (self._bank_hi << 5) % self.rom_banks
+            self.ram_bank = self._bank_hi
+        else:
+            self.rom0_bank = 0
+            self.ram_bank = 0
+
+
+class MBC3(Cartridge):
+    """Up to 2 MB of ROM, 32 KB of RAM and a real-time clock. The clock
+    registers are stored but do not count."""
+
+    def __init__(self, rom, ram_size=0, logger=None, log_level=logging.WARNING):
+        super().__init__(rom, ram_size, logger=logger, log_level=log_level)
+        # RTC registers 0x08-0x0c
+        self.rtc = bytearray(5)
+
+    def write(self, addr, value):
+        if addr < 0x2000:
+            self.ram_enabled = value & 0x0f == 0x0a
+        elif addr < 0x4000:
+            self.rom_bank = ((value & 0x7f) or 1) % self.rom_banks
+        elif addr < 0x6000:
+            self.ram_bank = value & 0x0f
+        else:
+            # Latch clock data
+            pass
+
+    def read_ram(self, addr):
+        if self.ram_enabled and 0x08 <= self.ram_bank <= 0x0c:
+            return self.rtc[self.ram_bank - 0x08]
+        return super().read_ram(addr)
+
+    def write_ram(self, addr, value):
+        if self.ram_enabled and 0x08 <= self.ram_bank <= 0x0c:
+            self.rtc[self.ram_bank - 0x08] = value
+            return False
+        return super().write_ram(addr, value)
+
+
+class MBC5(Cartridge):
+    """Up to 8 MB of ROM with a 9-bit bank number, in which bank 0 may be
+    mapped at 0x4000-0x7fff, and up to 128 KB of RAM."""
+
+    def __init__(self, rom, ram_size=0, logger=None, log_level=logging.WARNING):
+        super().__init__(rom, ram_size, logger=logger, log_level=log_level)
+        self._bank = 1
+
+    def write(self, addr, value):
+        if addr < 0x2000:
+            self.ram_enabled = value & 0x0f == 0x0a
+        elif addr < 0x3000:
+            self._bank = (self._bank & 0x100) | value
+        elif addr < 0x4000:
+            self._bank = (self._bank & 0xff) | ((value & 0x01) << 8)
+        elif addr < 0x6000:
+            self.ram_bank = value & 0x0f
+        self.rom_bank = self._bank % self.rom_banks
+
+
+# Cartridge type codes with battery-backed RAM
+BATTERY_TYPES = frozenset([0x03, 0x06, 0x09, 0x0d, 0x0f, 0x10, 0x13, 0x1b,
+                           0x1e])
+
+# Cartridge class by the cartridge type code at 0x147
+CARTRIDGE_TYPES = {
+    0x00: NoMBC,
+    0x01: MBC1, 0x02: MBC1, 0x03: MBC1,
+    0x08: NoMBC, 0x09: NoMBC,
+    0x0f: MBC3, 0x10: MBC3, 0x11: MBC3, 0x12: MBC3, 0x13: MBC3,
+    0x19: MBC5, 0x1a: MBC5, 0x1b: MBC5, 0x1c: MBC5, 0x1d: MBC5, 0x1e: MBC5,
+}
+
+
+def load_cartridge(rom, logger=None, log_level=logging.WARNING):
+    """Returns a cartridge for the ROM image :py:data:rom, with the MBC and
+    RAM size given in its header. ROM images too short to have a header, and
+    unsupported cartridge types, get no MBC.
+
+    :param rom: the ROM image, or None
+    :rtype: Cartridge"""
+
+    if rom is None or len(rom) <= 0x149:
+        return NoMBC(rom, logger=logger, log_level=log_level)
+
+    cart_type = rom[0x147]
+    try:
+        cls = CARTRIDGE_TYPES[cart_type]
+    except KeyError:
+        cls = NoMBC
+        if logger is not None:
+            logger.warning('unsupported cartridge type %#04x', cart_type)
+    ram_size = RAM_SIZES.get(rom[0x149], 0)
+    cartridge = cls(rom, ram_size, logger=logger, log_level=log_level)
+    cartridge.battery = cart_type in BATTERY_TYPES
+    return cartridge
@@ -0,0 +1,648 @@
+"""Generates the CPU's instruction handlers from :py:mod:slowboy.opcodes.
+
+Each instruction gets its own handler function, with its registers, flags and
+branch condition written into the code as constants, so running it looks
+nothing up but the register file and the memory it touches. The handlers are
+written to a module, ``slowboy/_handlers.py``, which is imported like any
+other module and so is only compiled once.
+
+The module starts with a hash of the instruction table and this generator.
+:py:func:load_handlers regenerates it when the hash is stale, so editing
+either of them is enough to rebuild the handlers. Generating them ahead of
+time, e.g. when installing, is::
+
+    python -m slowboy.codegen
+
+If the package directory is read-only, the handlers are compiled in memory
+instead.
+"""
+
+import hashlib
+import importlib
+import importlib.util
+import os
+import sys
+
+from slowboy.opcodes import INSTRUCTIONS, CB_INSTRUCTIONS
+
+
+MODULE_NAME = 'slowboy._handlers'
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                          '_handlers.py')
+HEADER = '# slowboy handlers '
+
+_PREAMBLE = '''\
+"""Instruction handlers, generated by slowboy.codegen from slowboy.opcodes.
+Don't edit this file: it is regenerated whenever either of them changes."""
+
+from slowboy.alu import (ADD, SUB, AND_FLAGS, OR_FLAGS, INC_FLAGS, DEC_FLAGS,
+                         RLC, RRC, RL, RR, SLA, SRA, SRL, SWAP, DAA)
+
+SOURCE_HASH = {!r}
+'''
+
+# Tests of the pending flags, or F if none are pending, by condition
+_CONDITIONS = {
+    'z': '{flags} & 0x80',
+    'nz': 'not {flags} & 0x80',
+    'c': '{flags} & 0x10',
+    'nc': 'not {flags} & 0x10',
+}
+
+_ALU_TABLES = {
+    'add': 'ADD', 'adc': 'ADD', 'sub': 'SUB', 'sbc': 'SUB', 'cp': 'SUB',
+}
+
+_LOGIC_FLAGS = {'and': ('&', 'AND_FLAGS'), 'xor': ('^', 'OR_FLAGS'),
+                'or': ('|', 'OR_FLAGS')}
+
+# Rotates of A share the tables of their CB-prefixed forms
+_SHIFT_TABLES = {
+    'rlca': 'RLC', 'rla': 'RL', 'rrca': 'RRC', 'rra': 'RR',
+    'rlc': 'RLC', 'rl': 'RL', 'rrc': 'RRC', 'rr': 'RR',
+    'sla': 'SLA', 'sra': 'SRA', 'swap': 'SWAP', 'srl': 'SRL',
+}
+
+# Instructions too rare to be worth specializing, by the Z80 method that
+# implements them
+_DELEGATED = {
+    'stop': 'stop', 'halt': 'halt',
+    'ld (a16), sp': 'ld_sptoimm16addr',
+    'ld hl, sp+d8': 'ld_spimm8toregHL',
+    'add sp, d8': 'add_imm8toregSP',
+}
+
+
+# Reads of immediates from outside the page buffers. They are rare, so they
+# don't count as uses of the MMU when choosing whether to keep it in a local.
+_FETCH8 = 'd8 = buf[pc & 0xff] if buf is not None else cpu.mmu.get_addr(pc) & 0xff'
+_FETCH16 = '    d16 = cpu.mmu.read16(pc)'
+
+
+def _slots():
+    # Imported here, since slowboy.z80 imports this module
+    from slowboy.z80 import REG8_SLOTS, REG16_SLOTS, REG_FLAGS
+    return REG8_SLOTS, REG16_SLOTS, REG_FLAGS
+
+
+class _Emitter():
+    """Writes the body of an instruction's handler. Handlers take the CPU as
+    their only argument and refer to its register file as ``regs``."""
+
+    def __init__(self, reg8_slots, reg16_slots, flags_slot):
+        self.reg8_slots = reg8_slots
+        self.reg16_slots = reg16_slots
+        self.flags = 'regs[{}]'.format(flags_slot)
+        self.f = 'regs[{}]'.format(reg8_slots['f'])
+        self.a = self.reg8('a')
+        self.current_flags = '({} or {})'.format(self.flags, self.f)
+
+    def reg8(self, reg8):
+        return 'regs[{}]'.format(self.reg8_slots[reg8])
+
+    def reg16(self, reg16):
+        """Returns an expression for the value of :py:data:reg16."""
+
+        if reg16 == 'sp':
+            return 'cpu._sp'
+        hi, lo = self.reg16_slots[reg16]
+        return '(regs[{}] << 8) | regs[{}]'.format(hi, lo)
+
+    def set_reg16(self, reg16, value):
+        """Returns lines that set :py:data:reg16 to :py:data:value, a name
+        holding a 16-bit value."""
+
+        if reg16 == 'sp':
+            return ['cpu._sp = {}'.format(value)]
+        hi, lo = self.reg16_slots[reg16]
+        return ['regs[{}] = {} >> 8'.format(hi, value),
+                'regs[{}] = {} & 0xff'.format(lo, value)]
+
+    def condition(self, cond):
+        return _CONDITIONS[cond].format(flags=self.current_flags)
+
+    @staticmethod
+    def fetch8(advance=True):
+        """Returns lines that fetch an 8-bit immediate into ``d8``, like
+        :py:meth:slowboy.z80.Z80.fetch. If :py:data:advance is false, PC is
+        left for the caller to set, from ``pc``."""
+
+        lines = ['pc = cpu._pc', 'buf = cpu._fetch_pages[pc >> 8]', _FETCH8]
+        if advance:
+            lines.append('cpu._pc = (pc + 1) & 0xffff')
+        return lines
+
+    @staticmethod
+    def fetch16(advance=True):
+        """Like :py:meth:fetch8, for a 16-bit immediate in ``d16``, like
+        :py:meth:slowboy.z80.Z80.fetch2."""
+
+        lines = [
+            'pc = cpu._pc',
+            'offset = pc & 0xff',
+            'buf = cpu._fetch_pages[pc >> 8]',
+            'if buf is not None and offset != 0xff:',
+            '    d16 = buf[offset] | (buf[offset + 1] << 8)',
+            'else:',
+            _FETCH16,
+        ]
+        if advance:
+            lines.append('cpu._pc = (pc + 2) & 0xffff')
+        return lines
+
+    def operand8(self, operand):
+        """Returns lines that read the 8-bit source :py:data:operand and an
+        expression for its value."""
+
+        if operand == 'd8':
+            return self.fetch8(), 'd8'
+        if operand == '(hl)':
+            return (['y = cpu.mmu.get_addr({})'.format(self.reg16('hl'))],
+                    'y')
+        return [], self.reg8(operand)
+
+    def emit(self, instruction):
+        """Returns the lines of the body of :py:data:instruction's handler.
+
+        :param instruction: an :py:class:slowboy.opcodes.Instruction
+        :rtype: list of str"""
+
+        description = instruction.description
+        mnemonic = instruction.mnemonic
+        if description in _DELEGATED:
+            return ['cpu.{}()'.format(_DELEGATED[description])]
+        if mnemonic in _SHIFT_TABLES:
+            return self.shift(instruction)
+        method = getattr(self, 'emit_' + mnemonic, None)
+        if method is None:
+            raise ValueError('no template for {}'.format(description))
+        self.instruction = instruction
+        return method(*instruction.operands)
+
+    def emit_nop(self):
+        return ['pass']
+
+    def emit_di(self):
+        return ['cpu.interrupt_controller.di()']
+
+    def emit_ei(self):
+        return ['cpu.interrupt_controller.ei()']
+
+    def emit_ld(self, dest, src):
+        hl = self.reg16('hl')
+        if dest in self.reg16_slots or dest == 'sp':
+            if src == 'd16':
+                return self.fetch16() + self.set_reg16(dest, 'd16')
+            # ld sp, hl
+            return ['cpu._sp = {}'.format(hl)]
+        if dest == '(a16)':
+            return self.fetch16() + [
+                'cpu.mmu.set_addr(d16, {})'.format(self.reg8(src))]
+        if src == '(a16)':
+            return self.fetch16() + [
+                '{} = cpu.mmu.get_addr(d16) & 0xff'.format(self.reg8(dest))]
+        if dest.startswith('('):
+            addr = self.reg16(dest[1:-1])
+            if src == 'd8':
+                return self.fetch8() + [
+                    'cpu.mmu.set_addr({}, d8)'.format(addr)]
+            return ['cpu.mmu.set_addr({}, {})'.format(addr, self.reg8(src))]
+        if src.startswith('('):
+            return ['{} = cpu.mmu.get_addr({}) & 0xff'.format(
+                self.reg8(dest), self.reg16(src[1:-1]))]
+        if src == 'd8':
+            return self.fetch8() + ['{} = d8'.format(self.reg8(dest))]
+        return ['{} = {}'.format(self.reg8(dest), self.reg8(src))]
+
+    def _ld_hl_step(self, dest, src, step):
+        """ldi and ldd: a load through HL, which then moves by
+        :py:data:step."""
+
+        lines = ['addr = {}'.format(self.reg16('hl'))]
+        if dest == '(hl)':
+            lines.append('cpu.mmu.set_addr(addr, {})'.format(self.reg8(src)))
+        else:
+            lines.append('{} = cpu.mmu.get_addr(addr) & 0xff'.format(
+                self.reg8(dest)))
+        lines.append('addr = (addr + {:#x}) & 0xffff'.format(step))
+        return lines + self.set_reg16('hl', 'addr')
+
+    def emit_ldi(self, dest, src):
+        return self._ld_hl_step(dest, src, 1)
+
+    def emit_ldd(self, dest, src):
+        return self._ld_hl_step(dest, src, 0xffff)
+
+    def emit_ldh(self, dest, src):
+        a = self.a
+        if dest == '(c)':
+            return ['cpu.mmu.set_addr(0xff00 + {}, {})'.format(
+                self.reg8('c'), a)]
+        if src == '(c)':
+            return ['{} = cpu.mmu.get_addr(0xff00 + {}) & 0xff'.format(
+                a, self.reg8('c'))]
+        if dest == '(d8)':
+            return self.fetch8() + ['cpu.mmu.set_addr(0xff00 + d8, {})'.format(a)]
+        return self.fetch8() + [
+            '{} = cpu.mmu.get_addr(0xff00 + d8) & 0xff'.format(a)]
+
+    def emit_push(self, reg16):
+        lines = []
+        if reg16 == 'af':
+            # F must be up to date before it is read
+            lines += [
+                'pending = {}'.format(self.flags),
+                'if pending:',
+                '    {f} = ({f} & 0x0f) | (pending & 0xf0)'.format(f=self.f),
+                '    {} = 0'.format(self.flags),
+            ]
+        return lines + [
+            'sp = (cpu._sp - 2) & 0xffff',
+            'cpu.mmu.write16(sp, {})'.format(self.reg16(reg16)),
+            'cpu._sp = sp',
+        ]
+
+    def emit_pop(self, reg16):
+        lines = ['sp = cpu._sp', 'value = cpu.mmu.read16(sp)']
+        hi, lo = self.reg16_slots[reg16]
+        lines.append('regs[{}] = (value >> 8) & 0xff'.format(hi))
+        if reg16 != 'af':
+            # Like Z80.set_reg16, leaves F as it is
+            lines.append('regs[{}] = value & 0xff'.format(lo))
+        return lines + ['cpu._sp = (sp + 2) & 0xffff']
+
+    def _arithmetic(self, mnemonic, src):
+        lines, y = self.operand8(src)
+        index = '{} << 8 | {}'.format(self.a, y)
+        if mnemonic in ('adc', 'sbc'):
+            index = '({} & 0x10) << 12 | {}'.format(self.current_flags, index)
+        lookup = '{}[{}]'.format(_ALU_TABLES[mnemonic], index)
+        if mnemonic == 'cp':
+            return lines + ['{} = {} & 0xff'.format(self.flags, lookup)]
+        return lines + [
+            'v = {}'.format(lookup),
+            '{} = v >> 8'.format(self.a),
+            '{} = v & 0xff'.format(self.flags),
+        ]
+
+    def emit_add(self, dest, src):
+        if dest == 'hl':
+            return self.add_hl(src)
+        return self._arithmetic('add', src)
+
+    def emit_adc(self, dest, src):
+        return self._arithmetic('adc', src)
+
+    def emit_sub(self, dest, src):
+        return self._arithmetic('sub', src)
+
+    def emit_sbc(self, dest, src):
+        return self._arithmetic('sbc', src)
+
+    def emit_cp(self, src):
+        return self._arithmetic('cp', src)
+
+    def _logic(self, mnemonic, src):
+        operator, table = _LOGIC_FLAGS[mnemonic]
+        lines, y = self.operand8(src)
+        return lines + [
+            'result = {} {} {}'.format(self.a, operator, y),
+            '{} = result'.format(self.a),
+            '{} = {}[result]'.format(self.flags, table),
+        ]
+
+    def emit_and(self, src):
+        return self._logic('and', src)
+
+    def emit_xor(self, src):
+        return self._logic('xor', src)
+
+    def emit_or(self, src):
+        return self._logic('or', src)
+
+    def _step(self, operand, step, table):
+        """inc and dec of 8-bit and 16-bit operands. C is not affected."""
+
+        if operand == 'sp':
+            return ['cpu._sp = (cpu._sp + {:#x}) & 0xffff'.format(step)]
+        if operand in self.reg16_slots:
+            return (['result = (({}) + {:#x}) & 0xffff'.format(
+                        self.reg16(operand), step)] +
+                    self.set_reg16(operand, 'result'))
+        flags = '{} = ({} & 0x10) | {}[u8]'.format(self.flags,
+                                                   self.current_flags, table)
+        result = '(u8 + {:#x}) & 0xff'.format(step & 0xff)
+        if operand == '(hl)':
+            return [
+                'addr = {}'.format(self.reg16('hl')),
+                'u8 = cpu.mmu.get_addr(addr)',
+                flags,
+                'cpu.mmu.set_addr(addr, {})'.format(result),
+            ]
+        r = self.reg8(operand)
+        return ['u8 = {}'.format(r), '{} = {}'.format(r, result), flags]
+
+    def emit_inc(self, operand):
+        return self._step(operand, 1, 'INC_FLAGS')
+
+    def emit_dec(self, operand):
+        return self._step(operand, 0xffff, 'DEC_FLAGS')
+
+    def add_hl(self, src):
+        h, l = self.reg16_slots['hl']
+        return [
+            'x = {}'.format(self.reg16('hl')),
+            'y = {}'.format('x' if src == 'hl' else self.reg16(src)),
+            'result = x + y',
+            'regs[{}] = (result >> 8) & 0xff'.format(h),
+            'regs[{}] = result & 0xff'.format(l),
+            '{} = (({} & 0x80) |'.format(self.flags, self.current_flags),
+            '    (0x20 if (x & 0xfff) + (y & 0xfff) > 0xfff else 0) |',
+            '    (0x10 if result > 0xffff else 0) | 0x01)',
+        ]
+
+    def shift(self, instruction):
+        """Rotates and shifts, through the tables in :py:mod:slowboy.alu.
+        Only rl and rr read the carry flag."""
+
+        table = _SHIFT_TABLES[instruction.mnemonic]
+        operand = instruction.operands[0] if instruction.operands else 'a'
+        if table in ('RL', 'RR'):
+            index = '({} & 0x10) << 4 | {{}}'.format(self.current_flags)
+        else:
+            index = '{}'
+        if operand == '(hl)':
+            return [
+                'addr = {}'.format(self.reg16('hl')),
+                'v = {}[{}]'.format(table,
+                                    index.format('cpu.mmu.get_addr(addr)')),
+                '{} = v & 0xff'.format(self.flags),
+                'cpu.mmu.set_addr(addr, v >> 8)',
+            ]
+        r = self.reg8(operand)
+        return [
+            'v = {}[{}]'.format(table, index.format(r)),
+            '{} = v >> 8'.format(r),
+            '{} = v & 0xff'.format(self.flags),
+        ]
+
+    def emit_bit(self, bit, operand):
+        mask = 1 << int(bit)
+        lines, value = self.operand8(operand)
+        # Flags are those of and, but C is not affected
+        return lines + ['{} = ({} & 0x10) | AND_FLAGS[{} & {:#04x}]'.format(
+            self.flags, self.current_flags, value, mask)]
+
+    def _update_bit(self, operand, operator, mask):
+        """res and set: applies :py:data:operator with :py:data:mask to
+        the operand."""
+
+        if operand == '(hl)':
+            return [
+                'addr = {}'.format(self.reg16('hl')),
+                'cpu.mmu.set_addr(addr, cpu.mmu.get_addr(addr) {} {:#04x})'.format(
+                    operator, mask),
+            ]
+        return ['{} {}= {:#04x}'.format(self.reg8(operand), operator, mask)]
+
+    def emit_res(self, bit, operand):
+        return self._update_bit(operand, '&', 0xff ^ (1 << int(bit)))
+
+    def emit_set(self, bit, operand):
+        return self._update_bit(operand, '|', 1 << int(bit))
+
+    def emit_daa(self):
+        return [
+            'v = DAA[({} & 0x70) << 4 | {}]'.format(self.current_flags, self.a),
+            'if not v:',
+            "    raise ValueError('unrecognized condition')",
+            '{} = v >> 8'.format(self.a),
+            '{} = v & 0xff'.format(self.flags),
+        ]
+
+    def emit_cpl(self):
+        return ['{} ^= 0xff'.format(self.a),
+                '{} = {} | 0x61'.format(self.flags, self.current_flags)]
+
+    def emit_scf(self):
+        return ['{} = {} | 0x11'.format(self.flags, self.current_flags)]
+
+    def emit_ccf(self):
+        return ['{} = ({} & 0xe0) | 0x01'.format(self.flags,
+                                                 self.current_flags)]
+
+    def _branch(self, cond, taken, not_taken):
+        """Returns lines that run :py:data:taken if the condition
+        :py:data:cond holds and :py:data:not_taken if not. Either way, the
+        cycles of the path taken are stored in ``cpu.cycles`` for the
+        opcode, which :py:meth:slowboy.z80.Z80.go reads after the handler
+        returns, as it does for prefixed instructions."""
+
+        instruction = self.instruction
+        charge = 'cpu.cycles[{:#04x}] = {}'.format
+        return (['if {}:'.format(self.condition(cond))] +
+                ['    ' + line for line in
+                 taken + [charge(instruction.opcode, instruction.cycles)]] +
+                ['else:'] +
+                ['    ' + line for line in
+                 not_taken + [charge(instruction.opcode,
+                                     instruction.cycles_not_taken)]])
+
+    def emit_jr(self, *operands):
+        taken = ['cpu._pc = (pc + 1 + ((d8 ^ 0x80) - 0x80)) & 0xffff']
+        lines = self.fetch8(advance=False)
+        if len(operands) == 1:
+            return lines + taken
+        return lines + self._branch(operands[0], taken, ['cpu._pc = (pc + 1) & 0xffff'])
+
+    def emit_jp(self, *operands):
+        if operands == ('hl',):
+            return ['cpu._pc = {}'.format(self.reg16('hl'))]
+        lines = self.fetch16(advance=False)
+        if len(operands) == 1:
+            return lines + ['cpu._pc = d16']
+        return lines + self._branch(operands[0], ['cpu._pc = d16'],
+                                    ['cpu._pc = (pc + 2) & 0xffff'])
+
+    def _call(self, target):
+        return [
+            'sp = (cpu._sp - 2) & 0xffff',
+            'cpu.mmu.write16(sp, cpu._pc)',
+            'cpu._pc = {}'.format(target),
+            'cpu._sp = sp',
+        ]
+
+    def emit_call(self, *operands):
+        lines = self.fetch16()
+        if len(operands) == 1:
+            return lines + self._call('d16')
+        return lines + self._branch(operands[0], self._call('d16'), [])
+
+    def emit_rst(self, addr):
+        return self._call(addr)
+
+    def _ret(self):
+        return [
+            'sp = cpu._sp',
+            'cpu._pc = cpu.mmu.read16(sp)',
+            'cpu._sp = (sp + 2) & 0xffff',
+        ]
+
+    def emit_ret(self, *operands):
+        if not operands:
+            return self._ret()
+        return self._branch(operands[0], self._ret(), [])
+
+    def emit_reti(self):
+        return self._ret() + ['cpu._in_interrupt = False']
+
+
+def _function(name, docstring, body):
+    """Returns the source of a handler called :py:data:name, with locals
+    for the register file and the MMU if it uses them."""
+
+    prologue = []
+    if any('regs[' in line for line in body):
+        prologue.append('regs = cpu.regs')
+    if sum(line.count('cpu.mmu.') for line in body
+           if line not in (_FETCH8, _FETCH16)) > 1:
+        prologue.append('mmu = cpu.mmu')
+        body = [line.replace('cpu.mmu.', 'mmu.') for line in body]
+    lines = ['def {}(cpu):'.format(name), '    """{}"""'.format(docstring), '']
+    lines += ['    ' + line for line in prologue + body]
+    return '\n'.join(lines) + '\n'
+
+
+def source_hash():
+    """Returns a hash of everything the generated module depends on: the
+    instruction table, this generator and the CPU's register file layout.
+
+    :rtype: str"""
+
+    digest = hashlib.sha256()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for filename in ('opcodes.py', 'codegen.py'):
+        with open(os.path.join(here, filename), 'rb') as f:
+            digest.update(f.read())
+    digest.update(repr(_slots()).encode())
+    return digest.hexdigest()
+
+
+def generate(digest=None):
+    """Returns the source of the handler module.
+
+    :param digest: the source hash to record, or None to compute it
+    :rtype: str"""
+
+    if digest is None:
+        digest = source_hash()
+    emitter = _Emitter(*_slots())
+
+    parts = [HEADER + digest + '\n', _PREAMBLE.format(digest)]
+    for opcode, instruction in sorted(INSTRUCTIONS.items()):
+        parts.append('\n' + _function(
+            'op_{:02x}'.format(opcode),
+            '{:#04x}: {}'.format(opcode, instruction.description),
+            emitter.emit(instruction)))
+    for opcode, instruction in sorted(CB_INSTRUCTIONS.items()):
+        parts.append('\n' + _function(
+            'cb_{:02x}'.format(opcode),
+            'CB {:#04x}: {}'.format(opcode, instruction.description),
+            emitter.emit(instruction)))
+
+    for table, prefix, instructions in (('HANDLERS', 'op', INSTRUCTIONS),
+                                        ('CB_HANDLERS', 'cb', CB_INSTRUCTIONS)):
+        parts.append('\n{} = {{\n'.format(table))
+        parts.extend('    {0:#04x}: {1}_{0:02x},\n'.format(opcode, prefix)
+                     for opcode in sorted(instructions))
+        parts.append('}\n')
+    return '\n'.join(parts)
+
+
+def write_handlers(path=CACHE_PATH, digest=None):
+    """Generates the handler module and writes it to :py:data:path. The
+    file is replaced atomically, so a process importing it never sees it
+    half written.
+
+    :param path: where to write the module
+    :param digest: the source hash to record, or None to compute it
+    :rtype: None
+    :raises OSError"""
+
+    source = generate(digest)
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    try:
+        with open(tmp_path, 'w') as f:
+            f.write(source)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _recorded_hash(path):
+    """Returns the source hash in the header of the module at
+    :py:data:path, or None if there isn't one."""
+
+    try:
+        with open(path) as f:
+            line = f.readline()
+    except OSError:
+        return None
+    if not line.startswith(HEADER):
+        return None
+    return line[len(HEADER):].strip()
+
+
+def _compile(source, path):
+    """Runs the handler module :py:data:source without importing it from a
+    file."""
+
+    module = type(sys)(MODULE_NAME)
+    module.__file__ = path
+    exec(compile(source, path, 'exec'), module.__dict__)
+    return module
+
+
+# Loaded handler modules, by path
+_modules = {}
+
+
+def load_handlers(path=CACHE_PATH):
+    """Returns the generated handler module, regenerating the file at
+    :py:data:path first if it is missing or out of date. The module is
+    loaded once per process.
+
+    :param path: where the module is cached
+    :rtype: module"""
+
+    module = _modules.get(path)
+    if module is not None:
+        return module
+
+    digest = source_hash()
+    if _recorded_hash(path) != digest:
+        try:
+            write_handlers(path, digest)
+        except OSError:
+            module = _compile(generate(digest), path)
+        else:
+            importlib.invalidate_caches()
+
+    if module is None:
+        spec = importlib.util.spec_from_file_location(MODULE_NAME, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        if module.SOURCE_HASH != digest:
+            # The bytecode cache can miss a rewrite within the same second
+            module = _compile(generate(digest), path)
+
+    if path == CACHE_PATH:
+        sys.modules[MODULE_NAME] = module
+    _modules[path] = module
+    return module
+
+
+if __name__ == '__main__':
+    write_handlers()
+    print('wrote', CACHE_PATH)
@@ -76,25 +76,22 @@ class DebugMessageReceiver(MessageHandler):
         elif isinstance(msg, ReadMemoryCommand):
             addr = msg.address
             length = msg.length
-            buf = bytearray(length)
-            for i in range(length):
-                buf[i] = self.cpu.mmu.get_addr(addr+i)
+            buf = self.cpu.mmu.read_block(addr, length)
             self.resp_queue.put_nowait(
                 ReadMemoryResponse(addr, bytes(buf)))
         elif msg.code == DumpTilesCommand.code:
             print('Dumping GPU tiles')
-            # self.cpu.gpu.dump_tileset('tileset.bmp')
-            # self.cpu.gpu.dump_background('background.bmp')
-            # self.cpu.gpu.dump_foreground('foreground.bmp')
+            # self.cpu.gpu.renderer.dump_tileset('tileset.bmp')
+            # self.cpu.gpu.renderer.dump_background('background.bmp')
+            # self.cpu.gpu.renderer.dump_foreground('foreground.bmp')
             # buf = bytearray(0x1800)
             # self.cpu.gpu.dump_tile_memory(buf)
             # self.dump_mem(buf, 0x8000)
             self.cpu.gpu.dump_regs()
         elif msg.code == UpdateTilesCommand.code:
-            for i in range(128):
-                self.cpu.gpu._update_tile(i)
+            self.cpu.gpu.renderer.refresh()
         elif isinstance(msg, SetWatchpointCommand):
-            self.cpu.mmu.add_watchpoint(msg.addr, msg.read, partial(self.hit_watchpoint, msg.addr))
+            self.cpu.mmu.add_watchpoint(msg.addr, msg.read, self.hit_watchpoint)
         else:
             raise UnrecognizedCommandException()
 
@@ -1,13 +1,5 @@
 from typing import List, Iterable, Sequence, ByteString
 
-import sdl2
-from sdl2.ext import Color
-from sdl2 import (
-    SDL_CreateRGBSurfaceWithFormatFrom,
-    SDL_ConvertSurfaceFormat,
-    SDL_FreeSurface,
-    SDL_Error
-)
 
 def ltorgba(c, alpha=0xff):
     return (c << 24) | (c << 16) | (c << 8) | alpha
@@ -19,9 +11,14 @@ def rgbafrom2bit(c, alpha=0xff):
 def lto2bit(c8):
     return c8 // 85
 
-def get_tile_surfaces(tiles, palette, tile_size=(8, 8), format=sdl2.SDL_PIXELFORMAT_RGBA32):
+def get_tile_surfaces(tiles, palette, tile_size=(8, 8)):
     """Surfaces in the returned iterator must be freed.
     """
+    # Only this function needs SDL, so the rest of the module can be used
+    # without it
+    import sdl2
+    from sdl2 import SDL_CreateRGBSurfaceWithFormatFrom, SDL_Error
+
     tile_width, tile_height = tile_size
     rgb_tile = bytearray(tile_width*tile_height*4)
     for tile in tiles:
@@ -68,7 +65,7 @@ def encode_rgb(iterable: Iterable[int], palette: Sequence[int]) \
         raise StopIteration
 
 
-def decode_2bit(iterable: Iterable[int], palette: Sequence[Color]) \
+def decode_2bit(iterable: Iterable[int], palette: Sequence[int]) \
         -> Iterable[int]:
     """For every two bytes consumed from the given iterable, generates 8 decoded
     RGB8 colors based on the palette.
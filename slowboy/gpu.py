@@ -1,17 +1,15 @@
 
+"""The GPU's timing and state: the mode machine, LY and STAT, VRAM and OAM
+and the interrupts. Drawing is left to a renderer from :py:mod:slowboy.render.
+"""
+
 from enum import Enum
 import logging
-from time import time
-import functools as ft
-from struct import unpack
-import ctypes
 
-from slowboy.util import ClockListener, add_s8
-from slowboy.gfx import get_tile_surfaces, ltorgba, decode_2bit, decode_tile
+from slowboy.util import ClockListener, property_hooks
+from slowboy.scheduler import Device
 from slowboy.interrupts import InterruptController, InterruptType
-import sdl2
-from sdl2 import SDL_BlitSurface, SDL_Rect, SDL_Error, SDL_ConvertSurfaceFormat
-from sdl2.ext import Color
+from slowboy.render import NullRenderer
 
 VRAM_START = 0x8000
 OAM_START = 0xfe00
@@ -83,8 +81,14 @@ class Mode(Enum):
     OAM_VRAM_READ = 3
 
 
-class GPU(ClockListener):
-    def __init__(self, logger=None, log_level=logging.INFO, interrupt_controller=None):
+# Length in cycles of each mode, indexed by Mode value. V_BLANK lasts 10 lines
+# and LY is incremented after each one, so its entry is the length of a line.
+MODE_CYCLES = (204, 456, 80, 172)
+
+
+class GPU(ClockListener, Device):
+    def __init__(self, logger=None, log_level=logging.INFO, interrupt_controller=None,
+                 renderer=None):
         if logger is None:
             self.logger = logging.getLogger(__name__)
         else:
@@ -94,38 +98,20 @@ class GPU(ClockListener):
 
         self.interrupt_controller = interrupt_controller
 
+        self.scheduler = None
+        # CPU clock the mode clock was last brought up to date with
+        self._clock = 0
+
         self.vram = bytearray(0xa000 - 0x8000)   # 0x8000-0x9fff
         self.oam = bytearray(0xfea0 - 0xfe00)    # 0xfe00-0xfe9f
-        self._bgsurfaces = []
-        self._fgsurfaces = []
-        self._bgsurface = sdl2.SDL_CreateRGBSurfaceWithFormat(0, BACKGROUND_WIDTH, BACKGROUND_HEIGHT,
-                                                              32, sdl2.SDL_PIXELFORMAT_RGBA32)
-        self._fgsurface = sdl2.SDL_CreateRGBSurfaceWithFormat(0, BACKGROUND_WIDTH, BACKGROUND_HEIGHT,
-                                                              32, sdl2.SDL_PIXELFORMAT_RGBA32)
-        # TODO may require changes for 8x16 sprites
-        self._spritesurface = \
-            sdl2.SDL_CreateRGBSurfaceWithFormat(0,
-                                                TWIDTH*SPRITETAB_SIZE, THEIGHT,
-                                                32, sdl2.SDL_PIXELFORMAT_RGBA32)
-        self._spritetab = [(0, 0, 0, 0) for _ in range(SPRITETAB_SIZE)]
-        self._tileset = sdl2.SDL_CreateRGBSurfaceWithFormat(0, 16*TWIDTH,
-                                                            16*THEIGHT, 32,
-                                                            sdl2.SDL_PIXELFORMAT_RGBA32)
-            # sdl2.SDL_Surface
-        self._fgtileset = None  # sdl2.SDL_Surface
-        self._sprite_tiles = None  # sdl2.SDL_Surface
         self._palette = None
         self._sprite_palette0 = None
         self._sprite_palette1 = None
-        self._sprite_palette = None
-        self._needs_update = False
-        self._needs_draw = False
-        """Bitmap indicating which background tiles have been updated in
-        :py:attr:GPU._tileset but not :py:attr:GPU._bgsurface"""
-        self._stale_bgtiles = 0
-        """Bitmap indicating which foreground tiles have been updated in
-        :py:attr:GPU._fgtileset but not :py:attr:GPU._fgsurface"""
-        self._stale_fgtiles = 0
+
+        # The renderer is told about changes from here on, including the
+        # registers' initial values
+        self.renderer = None
+        self.load_renderer(NullRenderer() if renderer is None else renderer)
 
         self._bgp = 0x00
         self._obp0 = 0x00
@@ -158,16 +144,47 @@ class GPU(ClockListener):
         self.obp1 = self._obp1
 
         self.mode = Mode.OAM_READ
-        self._stat |= 0x03
         self.mode_clock = 0
 
-        self.last_time = time()
-        self.frame_count = 0
-        self.fps = 0
-
     def load_interrupt_controller(self, ic: InterruptController):
         self.interrupt_controller = ic
 
+    def load_renderer(self, renderer):
+        """Draw with :py:data:renderer from now on.
+
+        :param renderer: a :py:class:slowboy.render.Renderer
+        :rtype: None"""
+
+        self.renderer = renderer
+        renderer.attach(self)
+        if self._palette is not None:
+            renderer.refresh()
+
+    def io_hooks(self):
+        """Returns the hooks for the GPU's registers, for
+        :py:meth:slowboy.mmu.MMU.add_io_hooks. Registers that depend on the
+        mode clock sync the GPU first."""
+
+        return {
+            0xff40: property_hooks(self, 'lcdc', self.sync),
+            0xff41: property_hooks(self, 'stat', self.sync),
+            0xff42: property_hooks(self, 'scy'),
+            0xff43: property_hooks(self, 'scx'),
+            0xff44: property_hooks(self, 'ly', self.sync),
+            0xff45: property_hooks(self, 'lyc', self.sync),
+            0xff47: property_hooks(self, 'bgp'),
+            0xff48: property_hooks(self, 'obp0'),
+            0xff49: property_hooks(self, 'obp1'),
+            0xff4a: property_hooks(self, 'wy'),
+            0xff4b: property_hooks(self, 'wx'),
+        }
+
+    def load_scheduler(self, scheduler):
+        self.scheduler = scheduler
+        self._clock = scheduler.now()
+        scheduler.add_device(self)
+        self.schedule()
+
     def load_vram(self, vram):
         assert len(vram) == 0xa000 - 0x8000
         self.vram = bytearray(vram)
@@ -187,7 +204,7 @@ class GPU(ClockListener):
         self._lcdc = value
         #self.logger.debug('set LCDC to %#x', value)
         self.logger.info('set LCDC to %#x', value)
-        self._update_vram('lcdc')
+        self.renderer.register_changed('lcdc')
 
     @property
     def bgp(self):
@@ -207,7 +224,7 @@ class GPU(ClockListener):
         ]
         self.logger.debug('set _palette to [%#x, %#x, %#x, %#x]',
                           self._palette[0], self._palette[1], self._palette[2], self._palette[3])
-        self._update_vram('bgp')
+        self.renderer.register_changed('bgp')
 
     @property
     def obp0(self):
@@ -230,7 +247,7 @@ class GPU(ClockListener):
         self.logger.debug('set _sprite_palette0 to [%#x, %#x, %#x]',
                           self._sprite_palette0[1], self._sprite_palette0[2],
                           self._sprite_palette0[3])
-        self._update_vram('obp0')
+        self.renderer.register_changed('obp0')
 
     @property
     def obp1(self):
@@ -253,7 +270,7 @@ class GPU(ClockListener):
         self.logger.debug('set _sprite_palette0 to [%#x, %#x, %#x]',
                           self._sprite_palette1[1], self._sprite_palette1[2],
                           self._sprite_palette1[3])
-        self._update_vram('obp1')
+        self.renderer.register_changed('obp1')
 
     @property
     def scx(self):
@@ -265,7 +282,7 @@ class GPU(ClockListener):
             return
         value &= 0xff
         self._scx = value
-        self._update_vram('scx')
+        self.renderer.register_changed('scx')
         self.logger.debug('set SCX to %#x', value)
 
     @property
@@ -278,7 +295,7 @@ class GPU(ClockListener):
             return
         value &= 0xff
         self._scy = value
-        self._update_vram('scy')
+        self.renderer.register_changed('scy')
         self.logger.debug('set SCY to %#x', value)
 
     @property
@@ -327,7 +344,7 @@ class GPU(ClockListener):
         if self._wy == value:
             return
         self._wy = value
-        self._update_vram('wy')
+        self.renderer.register_changed('wy')
         self.logger.debug('set WY to %#x', value)
 
     @property
@@ -337,10 +354,10 @@ class GPU(ClockListener):
     @wx.setter
     def wx(self, value):
         value -= 7
-        if self._wy == value:
+        if self._wx == value:
             return
         self._wx = value
-        self._update_vram('wx')
+        self.renderer.register_changed('wx')
         self.logger.debug('set WX to %#x', value)
 
     @property
@@ -402,205 +419,10 @@ class GPU(ClockListener):
         log('0xff4a: WY  : %#04x', self.wy)
         log('0xff4b: WX  : %#04x', self.wx)
 
-    def _update_tilesets(self):
-        """Update all tileset surfaces. Only needs to be called when pallete or
-        tile data (in VRAM) changes.
-        """
-
-        for i in range(TSWIDTH_TILES*TSHEIGHT_TILES):
-            self._update_tile(i)
-
-    def _update_surfaces(self):
-        self._update_bgsurface()
-        self._update_fgsurface()
-        self._update_sprite_surface()
-
-    def _update_bgsurface(self):
-        if self.lcdc & LCDC_BG_TILE_DISPLAY_SELECT_MASK:
-            # 1=9C00-9FFF
-            bgmap_start = 0x9c00 - VRAM_START
-        else:
-            # 0=9800-9BFF
-            bgmap_start = 0x9800 - VRAM_START
-
-        bgmap = self.vram[bgmap_start:bgmap_start+0x400]
-        if self.lcdc & LCDC_BG_WINDOW_DATA_SELECT_MASK == 0:
-            bgmap = bytes(map(ft.partial(add_s8, 128), bgmap))
-
-        bgsurface = self._bgsurface
-        stale_bgtiles = self._stale_bgtiles
-        tile_size = (8, 8)
-        width_tiles = BACKGROUND_WIDTH // TWIDTH
-        height_tiles = BACKGROUND_HEIGHT // THEIGHT
-        for i, tid in enumerate(bgmap):
-            if (stale_bgtiles >> tid) & 1 == 0:
-                continue
-            x = (i % width_tiles) * TWIDTH
-            y = (i // width_tiles) * THEIGHT
-            tx = (tid % TSWIDTH_TILES) * TWIDTH
-            ty = (tid // TSWIDTH_TILES) * THEIGHT
-            src = SDL_Rect(tx, ty, 8, 8)
-            dst = SDL_Rect(x, y, 8, 8)
-            SDL_BlitSurface(self._tileset, src, bgsurface, dst)
-
-        self._stale_bgtiles = 0
-
-    def _update_fgsurface(self):
-
-        if self.lcdc & LCDC_WINDOW_TILE_DISPLAY_SELECT_MASK:
-            # 1=9C00-9FFF
-            fgmap_start = 0x9c00 - VRAM_START
-        else:
-            # 0=9800-9BFF
-            fgmap_start = 0x9800 - VRAM_START
-
-        fgmap = self.vram[fgmap_start:fgmap_start+0x400]
-        if self.lcdc & LCDC_BG_WINDOW_DATA_SELECT_MASK == 0:
-            fgmap = bytes(map(ft.partial(add_s8, 128), fgmap))
-
-        stale_fgtiles = self._stale_fgtiles
-        fgsurface = self._fgsurface
-
-        stale_fgtiles = self._stale_fgtiles
-        tile_size = (8, 8)
-        width_tiles = FOREGROUND_WIDTH // TWIDTH
-        height_tiles = FOREGROUND_HEIGHT // THEIGHT
-        for i, tid in enumerate(fgmap):
-            if (stale_fgtiles >> tid) & 1 == 0:
-                continue
-            x = (i % width_tiles) * TWIDTH
-            y = (i // width_tiles) * THEIGHT
-            tx = (tid % TSWIDTH_TILES) * TWIDTH
-            ty = (tid // TSWIDTH_TILES) * THEIGHT
-            src = SDL_Rect(tx, ty, TWIDTH, THEIGHT)
-            dst = SDL_Rect(x, y, TWIDTH, THEIGHT)
-            SDL_BlitSurface(self._tileset, src, fgsurface, dst)
-
-        self._stale_fgtiles = 0
-
-    def _update_sprite_surface(self):
-        """When the tileset or sprite palette is updated, refresh the decoded
-        sprite surfaces.
-        """
-
-        for i in range(SPRITETAB_SIZE):
-            ent = unpack('BBBB',
-                         self.oam[i*SPRITETAB_ENTRY_SIZE:(i+1)*SPRITETAB_ENTRY_SIZE])
-            self._spritetab[i] = ent
-            ypos, xpos, tileid, attrs = ent
-            x = i * TWIDTH
-            y = 0
-            tx = (tileid % TSWIDTH_TILES) * TWIDTH
-            ty = (tileid // TSWIDTH_TILES) * THEIGHT
-            src = SDL_Rect(tx, ty, TWIDTH, THEIGHT)
-            dst = SDL_Rect(x, y, TWIDTH, THEIGHT)
-            SDL_BlitSurface(self._tileset, src, self._spritesurface, dst)
-
-    def draw(self, surface):
-        """Returns True if surface was updated and False otherwise."""
-        if self._needs_draw:
-            self._needs_draw = False
-        else:
-            return False
-
-        self.frame_count += 1
-        if self.frame_count >= 20:
-            t = time()
-            diff = t - self.last_time
-            self.fps = self.frame_count / diff
-            self.last_time = t
-            self.frame_count %= 20
-            self.logger.info('{} fps'.format(self.fps))
-
-        if self.lcdc & LCDC_DISPLAY_ENABLE_MASK == 0:
-            dst = SDL_Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
-            color = sdl2.SDL_MapRGB(surface.format, 0xff, 0xff, 0xff)
-            if sdl2.SDL_FillRect(surface, dst, color) < 0:
-                raise sdl2.SDL_Error()
-            return True
-
-        if self._needs_update:
-            #self._update_tilesets()
-            #self._update_surfaces()
-            self._needs_update = False
-
-        # draw background
-        #started = time()
-        if self.lcdc & LCDC_BG_DISPLAY_MASK:
-            src = SDL_Rect(self.scx, self.scy, SCREEN_WIDTH, SCREEN_HEIGHT)
-            dst = SDL_Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
-            if SDL_BlitSurface(self._bgsurface, src, surface, dst) < 0:
-                raise sdl2.SDL_Error()
-            #if self.scx + SCREEN_WIDTH > BACKGROUND_WIDTH:
-            #    src = SDL_Rect(0, self.scy, self.scx + SCREEN_WIDTH - BACKGROUND_WIDTH, SCREEN_HEIGHT)
-            #    dst = SDL_Rect(
-        else:
-            dst = SDL_Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
-            color = sdl2.SDL_MapRGB(surface.format, 0xff, 0xff, 0xff)
-            if sdl2.SDL_FillRect(surface, dst, color) < 0:
-                raise sdl2.SDL_Error()
-        #print('Took {} to draw background'.format(time() - started))
-
-        # draw foreground
-        #started = time()
-        if self.lcdc & LCDC_WINDOW_DISPLAY_ENABLE_MASK:
-           #converted = sdl2.SDL_ConvertSurfaceFormat(self._fgsurface,
-           #                                          surface.format.contents.format,
-           #                                          0)
-           wx = self.wx
-           wy = self.wy
-           w = SCREEN_WIDTH - wx
-           h = SCREEN_HEIGHT - wy
-           src = SDL_Rect(0, 0, w, h)
-           dst = SDL_Rect(wx, wy, w, h)
-           if SDL_BlitSurface(self._fgsurface, src, surface, dst) < 0:
-               raise sdl2.SDL_Error()
-           #sdl2.SDL_FreeSurface(converted)
-        #print('Took {} to draw foreground'.format(time() - started))
-
-        # draw sprites
-        #started = time()
-        if self.lcdc & LCDC_SPRITE_DISPLAY_ENABLE_MASK:
-            #converted = sdl2.SDL_ConvertSurfaceFormat(self._spritesurface,
-            #                                          surface.format.contents.format,
-            #                                          0)
-            drew = 0
-            for i, ent in enumerate(self._spritetab):
-                ypos, xpos, tileid, attrs = ent
-                # offscreen
-                if ypos == 0 or ypos >= 160 or xpos == 0 or xpos >= 168:
-                    continue
-                drew += 1
-                sx = i * TWIDTH
-                sy = 0
-                src = SDL_Rect(sx, sy, TWIDTH, THEIGHT)
-                dx = xpos - 8
-                dy = ypos - 16
-                dst = SDL_Rect(dx, dy, TWIDTH, THEIGHT)
-                if SDL_BlitSurface(self._spritesurface, src, surface, dst) < 0:
-                    raise SDL_Error()
-            #sdl2.SDL_FreeSurface(converted)
-        #print('Took {} to draw {} sprites'.format(time() - started, drew))
-
-        return True
-
     def dump_tile_memory(self, buf):
         for i in range(0x1800):
             buf[i] = self.get_vram(i)
 
-    def dump_tileset(self, filename):
-        print(type(self._tileset))
-        if sdl2.SDL_SaveBMP(self._tileset, bytes(filename, encoding='utf-8')) < 0:
-            raise SDL_Error()
-
-    def dump_background(self, filename):
-        if sdl2.SDL_SaveBMP(self._bgsurface, bytes(filename, encoding='utf-8')) < 0:
-            raise SDL_Error()
-
-    def dump_foreground(self, filename):
-        if sdl2.SDL_SaveBMP(self._fgsurface, bytes(filename, encoding='utf-8')) < 0:
-            raise SDL_Error()
-
     def dump_regs(self, write=print):
         regs = [
             ('BGP', self.bgp),
@@ -621,173 +443,82 @@ class GPU(ClockListener):
             write('{}={:02x}'.format(name, reg))
 
 
-    def present(self):
-        pass
-        #self.renderer.present()
-
     def notify(self, clock, cycles):
-        self.mode_clock += cycles
+        mode_clock = self.mode_clock + cycles
+        duration = MODE_CYCLES[self._mode.value]
 
-        if self.mode == Mode.OAM_READ:
-            if self.mode_clock >= 80:
+        while mode_clock >= duration:
+            mode_clock -= duration
+            mode = self._mode
+            if mode == Mode.OAM_READ:
                 self.mode = Mode.OAM_VRAM_READ # 3
-                self.mode_clock %= 80
-        elif self.mode == Mode.OAM_VRAM_READ:
-            if self.mode_clock >= 172:
+            elif mode == Mode.OAM_VRAM_READ:
+                # The end of mode 3, when the line has been sent to the LCD
+                self.renderer.scanline(self._ly)
                 self.mode = Mode.H_BLANK # 0
-                self.mode_clock %= 172
-        elif self.mode == Mode.H_BLANK:
-            if self.mode_clock >= 204:
+            elif mode == Mode.H_BLANK:
                 if self.ly == 143:
                     self.mode = Mode.V_BLANK # 1
+                    # The frame is complete
+                    self.renderer.vblank()
                 else:
                     self.mode = Mode.OAM_READ # 2
                 self.ly += 1
-                self.mode_clock %= 204
-        elif self.mode == Mode.V_BLANK:
-            if self.mode_clock % 204 == 0:
-                self.ly += 1
-            if self.mode_clock >= 4560:
-                self._needs_draw = True
+            elif self.ly == 153:
+                # End of V_BLANK
                 self.mode = Mode.OAM_READ # 2
-                self.mode_clock %= 4560
                 self.ly = 0
+            else:
+                self.ly += 1
+            duration = MODE_CYCLES[self._mode.value]
+
+        self.mode_clock = mode_clock
+
+    def sync(self, clock=None):
+        """Advance the mode clock to :py:data:clock, performing any mode
+        transitions and LY increments on the way, and schedule the next
+        one."""
+
+        if self.scheduler is None:
+            return
+        if clock is None:
+            clock = self.scheduler.now()
+        self.notify(clock, clock - self._clock)
+        self._clock = clock
+        self.schedule()
+
+    def schedule(self):
+        """Tell the scheduler when the next mode transition or LY increment
+        happens."""
+
+        remaining = MODE_CYCLES[self._mode.value] - self.mode_clock
+        self.scheduler.schedule(self, self._clock + remaining)
+
+    def cycles_to_vblank(self):
+        """Returns the number of cycles from the current mode clock until the
+        GPU next enters V_BLANK. If it is in V_BLANK now, that is the start of
+        the next frame's V_BLANK.
+
+        :rtype: int"""
+
+        mode = self._mode
+        if mode == Mode.V_BLANK:
+            return (154 - self.ly) * 456 - self.mode_clock + 144 * 456
+        # Cycles into the current line
+        if mode == Mode.OAM_READ:
+            line_clock = self.mode_clock
+        elif mode == Mode.OAM_VRAM_READ:
+            line_clock = MODE_CYCLES[Mode.OAM_READ.value] + self.mode_clock
         else:
-            raise ValueError('Invalid GPU mode')
+            line_clock = 456 - MODE_CYCLES[Mode.H_BLANK.value] + self.mode_clock
+        return (144 - self.ly) * 456 - line_clock
 
     def get_vram(self, addr):
         return self.vram[addr]
 
     def set_vram(self, addr, value):
         self.vram[addr] = value
-        #self.logger.debug('set VRAM %#06x=%#06x', VRAM_START+addr, value)
-        self._update_vram(addr, value)
-
-    def _update_tile(self, tileid):
-        """Update tile :py:obj:`i` in :py:attr:`GPU._bgtiles`.
-        """
-        if (self.lcdc & LCDC_WINDOW_DISPLAY_ENABLE_MASK == 0) and \
-           (self.lcdc & LCDC_BG_DISPLAY_MASK == 0) and \
-           (self.lcdc & LCDC_WINDOW_DISPLAY_ENABLE_MASK == 0):
-            return
-
-        # TODO changeme
-        #assert 0 <= tileid < 0x100
-        # Skip invalid tiles--this means vram got updated for an unselected
-        # tileset.
-        if tileid < 0 or tileid >= 0x100:
-            return
-
-        tile_idx = tileid * 16
-        encoded_tile = self.vram[tile_idx:tile_idx+16]
-        # Decode the tile from 2-bit color to RGBA
-        decoded_tile = decode_tile(encoded_tile, self._palette)
-        #decoded_tile = GBTileset(encoded_tile, (8, 8), (8, 8)).to_rgb(self._palette).data
-        rgba_data = bytearray(len(decoded_tile)*4)
-        for i, b in enumerate(decoded_tile):
-            c = ltorgba(b)
-            rgba_data[4*i+0] = (c >> 24) & 0xff
-            rgba_data[4*i+1] = (c >> 16) & 0xff
-            rgba_data[4*i+2] = (c >> 8) & 0xff
-            rgba_data[4*i+3] = c & 0xff
-        tile_surface = sdl2.SDL_CreateRGBSurfaceWithFormatFrom(
-            bytes(rgba_data),
-            TWIDTH, THEIGHT,
-            32, TWIDTH*4,
-            sdl2.SDL_PIXELFORMAT_RGBA32)
-        if not tile_surface:
-            print(sdl2.SDL_GetError())
-            raise Exception
-        x = (tileid % TSWIDTH_TILES) * TWIDTH
-        y = (tileid // TSWIDTH_TILES) * THEIGHT
-        #print(x, y)
-        dst = SDL_Rect(x, y, TWIDTH, THEIGHT)
-        if sdl2.SDL_BlitSurface(tile_surface, None, self._tileset, dst) < 0:
-            print(sdl2.SDL_GetError())
-            raise Exception
-
-        sdl2.SDL_FreeSurface(tile_surface)
-
-        self._stale_bgtiles |= (1 << tileid)
-        self._stale_fgtiles |= (1 << tileid)
-
-    def _update_vram(self, addr, value=None):
-        """Update internal dataset (decoded tiles, etc).
-
-        If BG display is disabled (lcdc), :py:attr:`GPU._update_tile` will do
-        nothing. When BG display is enabled, all background tile surfaces will
-        be decoded.
-
-        If FG display is disabled, :py:attr:`GPU._update_fgtile` will also do
-        nothing. When FG/window display is enabled, all foreground tile surfaces
-        will be decoded.
-
-        Same with sprite display.
-        """
-
-        if isinstance(addr, str):
-            # Register
-            if addr == 'lcdc':
-                self._update_tilesets()
-                self._update_surfaces()
-                self._update_sprite_surface()
-            elif addr == 'bgp':
-                self._update_tilesets()
-                self._update_bgsurface()
-                self._update_fgsurface()
-            elif addr == 'obp0':
-                self._update_sprite_surface()
-            elif addr == 'obp1':
-                self._update_sprite_surface()
-            elif addr == 'scx' or addr == 'scy':
-                pass
-            elif addr == 'wx' or addr == 'wy':
-                pass
-        elif isinstance(addr, int) and self.lcdc & LCDC_DISPLAY_ENABLE_MASK \
-                    and (self.lcdc & LCDC_WINDOW_DISPLAY_ENABLE_MASK or self.lcdc & LCDC_BG_DISPLAY_MASK):
-            # VRAM
-            addr += VRAM_START
-            # Tilemap data
-            if 0x9800 <= addr < 0xa000:
-                if self.lcdc & LCDC_BG_TILE_DISPLAY_SELECT_MASK == 0:
-                    # 0x9800-9bff
-                    tile = addr - 0x9800
-                else:
-                    # 0x9c00-0x9fff
-                    tile = addr - 0x9c00
-                if self.lcdc & LCDC_WINDOW_TILE_DISPLAY_SELECT_MASK == 0:
-                    # 0x9800-9bff
-                    tile = addr - 0x9800
-                else:
-                    # 0x9c00-0x9fff
-                    tile = addr - 0x9c00
-                #self._update_tile(tile)
-                self._update_surfaces()
-            # Tile data
-            elif 0x8000 <= addr < 0x9800:
-                if self.lcdc & LCDC_BG_WINDOW_DATA_SELECT_MASK == 0:
-                    # 0x8800-0x97ff
-                    tile = (addr - 0x8800) // 16
-                else:
-                    # 0x8000-0x8fff
-                    tile = (addr - 0x8000) // 16
-                #self._update_tilesets()
-                #print(self.lcdc & LCDC_BG_WINDOW_DATA_SELECT_MASK, hex(addr), tile, value)
-                self._update_tile(tile)
-
-
-        # what is this for? TODO
-        #self.vram[addr] = val
-        #hi, lo = self.vram[addr], self.vram[addr+1]
-        #offset = (addr // 2) * 8
-        #for i in range(8):
-        #    self.vram[offset+i] = (((hi >> i) & 1) << 1) | ((lo >> i) & 1)
-        #if self.enabled:
-            #print('update vram', addr)
-        self._needs_update = True
-            #self._update_tilesets()
-            #self._update_surfaces()
-            #self._update_bgsurface()
+        self.renderer.vram_changed(addr, value)
 
     def get_oam(self, addr):
         return self.oam[addr]
@@ -797,7 +528,19 @@ class GPU(ClockListener):
         self.oam[addr] = value
         self.logger.debug('set OAM %#06x=%#06x', OAM_START+addr, value)
         if old != value:
-            self._update_sprite_surface()
+            self.renderer.oam_changed()
+
+    def set_oam_block(self, data):
+        """Copy :py:data:data into OAM in one go, as an OAM DMA transfer
+        does.
+
+        :param data: 0xa0 bytes of sprite attributes
+        :rtype: None"""
+
+        oam = self.oam
+        if oam[:0xa0] != data:
+            oam[:0xa0] = data
+            self.renderer.oam_changed()
 
     @property
     def enabled(self):
@@ -0,0 +1,30 @@
+import logging
+import os
+
+from slowboy.mmu import MMU
+from slowboy.gpu import GPU
+from slowboy.rom import open_rom
+from slowboy.z80 import Z80
+
+
+def save_path(romfile):
+    """Returns the path of the save file for the ROM file
+    :py:data:romfile."""
+
+    return os.path.splitext(romfile)[0] + '.sav'
+
+
+class HeadlessUI():
+    """Runs a ROM without a window. Nothing here imports SDL; frames are
+    drawn by :py:data:renderer, which draws nothing by default."""
+
+    def __init__(self, romfile, translate=False, write_through=False,
+                 log_level=logging.WARNING, renderer=None):
+        mmu = MMU(open_rom(romfile))
+        if mmu.cartridge.battery:
+            mmu.load_save(save_path(romfile), write_through=write_through)
+        self.cpu = Z80(mmu=mmu, gpu=GPU(renderer=renderer), translate=translate,
+                       log_level=log_level)
+
+    def start(self):
+        self.cpu.go()
@@ -0,0 +1,247 @@
+"""Idle-loop detection for the Z80 core.
+
+Games often wait for the GPU by polling a device register in a tight loop::
+
+    wait: ldh a, (0x44)
+          cp 0x90
+          jr nz, wait
+
+Until the next device event, every iteration of a loop like this reads the
+same values and leaves the CPU in the same state, so running it is wasted
+work. The CPU reports every taken backward branch to an
+:py:class:IdleLoopDetector. When two consecutive iterations of a loop that only
+reads device registers and makes no writes leave the registers unchanged, the
+detector skips whole iterations of the loop up to the next scheduled device
+event. Because only whole iterations are skipped and none of them could have
+observed a change, the result is the same as running the loop.
+"""
+
+from collections import namedtuple
+import logging
+
+from slowboy.opcodes import INSTRUCTIONS
+from slowboy.scheduler import NEVER
+from slowboy.translator import instruction_length
+
+
+# Registers whose values only change at scheduled device events: IF, STAT
+# and LY. DIV and TIMA count without an event (the timer only schedules TIMA
+# overflows), and the joypad register is changed by the UI.
+DEVICE_REGISTERS = frozenset([0xff0f, 0xff41, 0xff44])
+
+# Instructions that only read and write CPU registers (other than SP)
+REGISTER_OPCODES = frozenset(
+    [0x00, 0x07, 0x0f, 0x17, 0x1f, 0x2f, 0x37, 0x3f,
+     0x03, 0x0b, 0x13, 0x1b, 0x23, 0x2b,
+     0xc6, 0xce, 0xd6, 0xde, 0xe6, 0xee, 0xf6, 0xfe] +
+    # inc r, dec r, ld r, d8
+    [op | r << 3 for op in (0x04, 0x05, 0x06) for r in range(8) if r != 6] +
+    # ld r, r
+    [0x40 | dst << 3 | src for dst in range(8) for src in range(8)
+     if dst != 6 and src != 6] +
+    # 8-bit ALU on a register
+    [0x80 | op << 3 | src for op in range(8) for src in range(8) if src != 6])
+
+# jr and jp, mapped to whether they are unconditional
+JR_OPCODES = {0x18: True, 0x20: False, 0x28: False, 0x30: False, 0x38: False}
+JP_OPCODES = {0xc3: True, 0xc2: False, 0xca: False, 0xd2: False, 0xda: False}
+
+# Longest loop body, in instructions, that is considered
+MAX_LOOP_LENGTH = 16
+
+
+# A loop starting at head and closed by the branch at address branch. cycles
+# is the length of one iteration that runs the body straight through, not
+# taking any of the exits.
+Loop = namedtuple('Loop', ['head', 'branch', 'cycles'])
+
+
+class IdleLoopDetector():
+    """Finds idle loops in the code run by a :py:class:slowboy.z80.Z80 and
+    fast-forwards the CPU clock through them.
+
+    :py:attr:skipped_cycles and :py:attr:skips report how much emulated time
+    was skipped, and in how many jumps."""
+
+    def __init__(self, cpu, logger=None, log_level=logging.WARNING):
+        if logger is None:
+            self.logger = logging.getLogger(__name__)
+        else:
+            self.logger = logger.getChild(__class__.__name__)
+        self.logger.setLevel(log_level)
+
+        self.cpu = cpu
+        # Loops found in ROM, keyed like translated blocks. Code in RAM can
+        # change, so it is analyzed every time.
+        self.loops = {}
+
+        # Loop head and branch of the last backward branch, and the loop
+        # found there once the same branch has been taken twice in a row, or
+        # False if it does not close an idle loop
+        self._head = None
+        self._op_pc = None
+        self._loop = None
+        # Registers, SP and clock at the last iteration of that loop. The
+        # registers are compared as they are, pending flags included: an
+        # idle loop computes the same flags every iteration.
+        self._regs = bytearray(len(cpu.regs))
+        self._sp = None
+        self._clock = 0
+
+        self.skipped_cycles = 0
+        self.skips = 0
+
+    def loop_key(self, head):
+        """Returns the cache key for a loop starting at :py:data:head, or
+        None if loops at that address are not cached.
+
+        :param head: address of the first instruction of the loop
+        :rtype: int or None"""
+
+        if head < 0x4000:
+            return (self.cpu.mmu.rom0_bank << 16) | head
+        elif head < 0x8000:
+            return (self.cpu.mmu.rom_bank << 16) | head
+        else:
+            return None
+
+    def lookup(self, head):
+        """Returns the idle loop starting at :py:data:head, or None if the
+        code there is not an idle loop.
+
+        :param head: address of the first instruction of the loop
+        :rtype: Loop or None"""
+
+        key = self.loop_key(head)
+        if key is None:
+            return self.analyze(head)
+        try:
+            return self.loops[key]
+        except KeyError:
+            loop = self.analyze(head)
+            self.loops[key] = loop
+            return loop
+
+    def analyze(self, head):
+        """Decodes the code starting at :py:data:head up to the first branch
+        back to :py:data:head. Returns the loop if every instruction on the
+        way only touches CPU registers, reads a device register or branches,
+        otherwise None. Conditional branches elsewhere are exits from the
+        loop.
+
+        :param head: address of the first instruction of the loop
+        :rtype: Loop or None"""
+
+        cpu = self.cpu
+        get_addr = cpu.mmu.get_addr
+        # The handlers of conditional branches change cpu.cycles as they run
+        op_cycles = cpu.opcode_tables().cycles
+        addr = head
+        cycles = 0
+        for _ in range(MAX_LOOP_LENGTH):
+            opcode = get_addr(addr)
+            length = instruction_length(opcode)
+            if opcode == 0xcb:
+                cb_opcode = get_addr(addr + 1)
+                if cb_opcode & 0x07 == 6:
+                    # (hl) operand
+                    return None
+                cycles += cpu.cb_cycles[cb_opcode]
+            elif opcode in REGISTER_OPCODES:
+                cycles += op_cycles[opcode]
+            elif opcode == 0xf0:
+                if 0xff00 | get_addr(addr + 1) not in DEVICE_REGISTERS:
+                    return None
+                cycles += op_cycles[opcode]
+            elif opcode == 0xfa:
+                src = get_addr(addr + 1) | get_addr(addr + 2) << 8
+                if src not in DEVICE_REGISTERS:
+                    return None
+                cycles += op_cycles[opcode]
+            elif opcode in JR_OPCODES or opcode in JP_OPCODES:
+                if opcode in JR_OPCODES:
+                    offset = get_addr(addr + 1)
+                    if offset & 0x80:
+                        offset -= 0x100
+                    target = (addr + length + offset) & 0xffff
+                    unconditional = JR_OPCODES[opcode]
+                else:
+                    target = get_addr(addr + 1) | get_addr(addr + 2) << 8
+                    unconditional = JP_OPCODES[opcode]
+                if target == head:
+                    return Loop(head, addr, cycles + op_cycles[opcode])
+                elif unconditional:
+                    return None
+                # An exit, not taken while the loop runs
+                cycles += INSTRUCTIONS[opcode].cycles_not_taken
+            else:
+                return None
+            addr += length
+        return None
+
+    def branch(self, op_pc):
+        """Called by the CPU after a taken backward branch. Branches are
+        only decoded once the same one is taken twice in a row, and the
+        registers only compared once it closes an idle loop. If the branch
+        closed a second identical iteration of the loop, advance the
+        clock by as many whole iterations as fit before the next scheduled
+        device event. Clock listeners are notified once with the skipped
+        cycles.
+
+        :param op_pc: address of the instruction or block that branched
+        :rtype: int
+        :returns: the number of cycles skipped"""
+
+        cpu = self.cpu
+        head = cpu._pc
+        if head != self._head or op_pc != self._op_pc:
+            # A different branch: wait until it is taken again before looking
+            # any closer
+            self._head = head
+            self._op_pc = op_pc
+            self._loop = None
+            self._sp = None
+            return 0
+
+        loop = self._loop
+        if loop is None:
+            loop = self.lookup(head)
+            if loop is None or not head <= op_pc <= loop.branch:
+                loop = False
+            self._loop = loop
+        if not loop:
+            return 0
+
+        regs = cpu.regs
+        clock = cpu.clock
+        if self._sp != cpu._sp or self._regs != regs:
+            self._regs[:] = regs
+            self._sp = cpu._sp
+            self._clock = clock
+            return 0
+
+        iteration = clock - self._clock
+        self._clock = clock
+        # Anything else run since the last iteration, an interrupt handler
+        # for example, shows up in the cycle count
+        if loop.cycles != iteration:
+            # Code in RAM may have changed too
+            self._loop = None
+            return 0
+
+        deadline = cpu.scheduler.next_deadline
+        if deadline == NEVER:
+            return 0
+        skipped = (deadline - clock) // iteration * iteration
+        if skipped <= 0:
+            return 0
+
+        cpu.clock += skipped
+        self._clock = cpu.clock
+        self.skipped_cycles += skipped
+        self.skips += 1
+        self.logger.debug('skipped %d cycles in idle loop at %#06x',
+                          skipped, head)
+        for listener in cpu.clock_listeners:
+            listener.notify(cpu.clock, skipped)
+        return skipped
@@ -5,6 +5,8 @@ from enum import Enum
 from typing import Sequence
 import logging
 
+from slowboy.util import property_hooks
+
 
 IF_VBLANK_OFFSET = 0
 IF_VBLANK_MASK = (1 << IF_VBLANK_OFFSET)
@@ -67,6 +69,13 @@ class InterruptController(InterruptListener):
         self.logger.debug('set IE to %#x', value)
         self._ie = value
 
+    def io_hooks(self):
+        """Returns the hook for IF, for
+        :py:meth:slowboy.mmu.MMU.add_io_hooks. IE is outside the IO register
+        range and is handled by the MMU."""
+
+        return {0xff0f: property_hooks(self, 'if_')}
+
     def ei(self):
         self.enabled = True
 
@@ -77,6 +86,12 @@ class InterruptController(InterruptListener):
     def has_interrupt(self) -> bool:
         return self.enabled and (self.if_ & 0x1f) != 0
 
+    @property
+    def pending(self) -> bool:
+        """Whether any interrupt is requested, regardless of IME. This is
+        what wakes the CPU from HALT."""
+        return (self.if_ & 0x1f) != 0
+
     def get_interrupts(self) -> Sequence[InterruptType]:
         for i in range(5):
             if self.if_ & (1 << i):
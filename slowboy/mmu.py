@@ -1,16 +1,26 @@
 
 import logging
 
+from slowboy.cartridge import load_cartridge
+from slowboy.rom import open_rom
+from slowboy.scheduler import Device, NEVER
 from slowboy.gpu import GPU, VRAM_START, OAM_START
 from slowboy.interrupts import InterruptController, InterruptType
 from slowboy.timer import Timer
+from slowboy.util import property_hooks
+from slowboy.watchpoints import Watchpoint, WatchpointIndex
 
 
 JOYP_SELECT_BUTTON_MASK = 0x20
 JOYP_SELECT_DIRECTION_MASK = 0x10
 
 
-class MMU():
+# Cycles between a write dirtying the save file and the dirty pages being
+# flushed, about one second
+SAVE_FLUSH_INTERVAL = 4194304
+
+
+class MMU(Device):
     def __init__(self, rom: bytes=None, gpu: GPU=None, timer: Timer=None,
                  interrupt_controller: InterruptController=None,
                  logger=None, log_level=logging.WARNING):
@@ -21,17 +31,37 @@ class MMU():
         self.logger.propagate = True
         self.logger.setLevel(log_level)
 
-        self.rom = rom
+        self.cartridge = load_cartridge(rom, logger=self.logger,
+                                        log_level=log_level)
         if rom is not None:
             self.log_rominfo()
-        self.gpu = gpu
-        self.timer = timer
-        self.interrupt_controller = interrupt_controller
-        self.cartridge_ram = bytearray(8*1024)
+        # ROM banks mapped at 0x0000-0x3fff and 0x4000-0x7fff
+        self.rom0_bank = 0
+        self.rom_bank = 1
+
+        # IO registers 0xff00-0xff7f. A register with a read or write hook is
+        # handled by the hook; the rest are plain storage.
+        self.io = bytearray(0x80)
+        self._io_read_hooks = [None] * 0x80
+        self._io_write_hooks = [None] * 0x80
+        self.add_io_hooks({
+            0xff00: property_hooks(self, 'joyp'),
+            0xff46: property_hooks(self, 'dma'),
+        })
+
+        self.gpu = None
+        self.timer = None
+        self.interrupt_controller = None
+        self.scheduler = None
+        if gpu is not None:
+            self.load_gpu(gpu)
+        if timer is not None:
+            self.load_timer(timer)
+        if interrupt_controller is not None:
+            self.load_interrupt_controller(interrupt_controller)
         self.wram = bytearray(4*1024 + 4*1024)
         self.sprite_table = bytearray(160)
         self.hram = bytearray(127)
-        self._sound_mem = bytearray(0x40)
 
         self._joyp = 0
         self._buttons = {
@@ -47,17 +77,41 @@ class MMU():
 
         self._dma = 0
 
-        # Read watchpoints. Mapping of address to callback.
-        self._watchpoints_r = {}
-        self._watchpoints_w = {}
+        # One byte per 256-byte page, nonzero if the page holds code that the
+        # translator has compiled. Writes to a marked page are reported to the
+        # translator so it can drop the affected blocks.
+        self.code_pages = bytearray(0x100)
+        self.translator = None
+
+        # Pages whose reads or writes go through _read_watched or
+        # _write_watched, mapped to the page's own [buffer, handler]
+        self._watched_reads = {}
+        self._watched_writes = {}
+        self._watchpoints = WatchpointIndex()
+
+        self._init_pages()
+
+    @property
+    def rom(self):
+        return self.cartridge.rom
+
+    @rom.setter
+    def rom(self, romdata):
+        self.cartridge.flush()
+        self.cartridge = load_cartridge(romdata, logger=self.logger,
+                                        log_level=self.logger.level)
+        self._map_cartridge()
+
+    @property
+    def cartridge_ram(self):
+        return self.cartridge.ram
 
     def load_rom(self, romdata):
         self.rom = romdata
         self.log_rominfo()
 
     def load_rom_from_file(self, romfile):
-        with open(romfile, 'rb') as f:
-            self.load_rom(f.read())
+        self.load_rom(open_rom(romfile))
 
     def log_rominfo(self):
         log = self.logger.info
@@ -118,216 +172,552 @@ class MMU():
     def unload_rom(self):
         self.rom = None
 
+    def load_save(self, savefile, write_through=False):
+        """Back battery-buffered cartridge RAM with the save file
+        :py:data:savefile. See :py:meth:slowboy.cartridge.Cartridge.load_save.
+
+        :param savefile: path of the save file
+        :param write_through: if True, flush every write immediately
+        :rtype: bool"""
+
+        loaded = self.cartridge.load_save(savefile, write_through)
+        self._map_cartridge()
+        return loaded
+
+    def flush_save(self):
+        """Write the dirty pages of the save file to disk. Writes to those
+        pages go through :py:meth:_write_cartridge_ram again until they are
+        dirtied.
+
+        :rtype: None"""
+
+        if self.cartridge.flush():
+            self._map_cartridge_ram()
+
+    def load_scheduler(self, scheduler):
+        self.scheduler = scheduler
+        scheduler.add_device(self)
+
+    def sync(self, clock=None):
+        """Flush the save file. The MMU is only scheduled when a write
+        has dirtied it."""
+
+        self.flush_save()
+
     def load_gpu(self, gpu: GPU):
         self.gpu = gpu
+        self.add_io_hooks(gpu.io_hooks())
 
     def unload_gpu(self):
+        self.remove_io_hooks(self.gpu.io_hooks())
         self.gpu = None
 
     def load_timer(self, timer: Timer):
         self.timer = timer
+        self.add_io_hooks(timer.io_hooks())
 
     def unload_timer(self):
+        self.remove_io_hooks(self.timer.io_hooks())
         self.timer = None
 
     def load_interrupt_controller(self, interrupt_controller: InterruptController):
         self.interrupt_controller = interrupt_controller
+        self.add_io_hooks(interrupt_controller.io_hooks())
 
-    def add_watchpoint(self, addr, read, cb):
-        self._watchpoints_w[addr] = cb
-        if read:
-            self._watchpoints_r[addr] = lambda value: cb(value, read=False)
+    def add_io_hooks(self, hooks):
+        """Hand IO registers over to a device.
 
-    def get_addr(self, addr):
-        if addr < 0:
-            # invalid
-            raise ValueError('invalid address {:#04x}'.format(addr))
-        elif addr < 0x4000:
-            # ROM Bank 0 (16 KB)
-            val = self.rom[addr]
-        elif addr < 0x8000:
-            # ROM Bank 1+ (16 KB)
-            val = self.rom[addr]
-        elif addr < 0xa000:
-            # VRAM (8 KB)
-            val = self.gpu.get_vram(addr - VRAM_START)
-        elif addr < 0xc000:
-            # cartridge RAM (8 KB)
-            val = self.cartridge_ram[addr - 0xa000]
-        elif addr < 0xd000:
-            # WRAM 0 (4 KB)
-            val = self.wram[addr - 0xc000]
-        elif addr < 0xe000:
-            # WRAM 1 (4 KB)
-            val = self.wram[addr - 0xc000]
-        elif addr < 0xfe00:
-            # echo RAM 0xc000–ddff
-            val = self.get_addr(addr - 0x2000)
-        elif addr < 0xfea0:
-            # sprite table (OAM)
-            val = self.gpu.get_oam(addr - OAM_START)
-        elif addr < 0xff00:
-            # invalid
-            self.logger.debug('read from invalid address %#04x', addr)
-            val = 0
-            #raise ValueError('invalid address {}'.format(addr))
-        elif addr < 0xff80:
-            # IO
-            if addr == 0xff00:
-                # print(f'Read joypad {self.joyp:x}')
-                val = self.joyp
-            elif addr == 0xff01 or addr == 0xff02:
-                raise NotImplementedError('Serial transfer registers')
-            elif addr == 0xff04:
-                val = self.timer.div
-            elif addr == 0xff05:
-                val = self.timer.tima
-            elif addr == 0xff06:
-                val = self.timer.tma
-            elif addr == 0xff07:
-                val = self.timer.tac
-            elif addr == 0xff0f:
-                # IF
-                val = self.interrupt_controller.if_
-            elif addr == 0xff10:
-                raise NotImplementedError('IF register')
-            elif addr < 0xff40:
-                raise NotImplementedError('sound registers')
-            elif addr == 0xff40:
-                val = self.gpu.lcdc
-            elif addr == 0xff41:
-                val = self.gpu.stat
-            elif addr == 0xff42:
-                val = self.gpu.scy
-            elif addr == 0xff43:
-                val = self.gpu.scx
-            elif addr == 0xff44:
-                val = self.gpu.ly
-            elif addr == 0xff45:
-                val = self.gpu.lyc
-            elif addr == 0xff46:
-                val = self.dma
-            elif addr == 0xff47:
-                val = self.gpu.bgp
-            elif addr == 0xff48:
-                val = self.gpu.obp0
-            elif addr == 0xff49:
-                val = self.gpu.obp1
-            elif addr == 0xff4a:
-                val = self.gpu.wy
-            elif addr == 0xff4b:
-                val = self.gpu.wx
-            else:
-                raise NotImplementedError('memory-mapped IO addr {}'.format(hex(addr)))
-        elif addr < 0xffff:
-            # HRAM
-            val = self.hram[addr - 0xff80]
-        elif addr == 0xffff:
-            # interrupt enable register
-            # bit 0: v-blank interrupt
-            # bit 1: LCD STAT interrupt
-            # bit 2: timer interrupt
-            # bit 3: serial interrupt
-            # bit 4: joypad interrupt
-            if self.interrupt_controller is not None:
-                val = self.interrupt_controller.ie
-            else:
-                self.logger.warning('read from interrupt controller when there is not one loaded')
-                val = 0
-        else:
-            raise ValueError('invalid address {:#04x}'.format(addr))
+        :param hooks: mapping of register address (0xff00-0xff7f) to a
+            (read, write) pair. read() returns the register's value and
+            write(value) sets it; either may be None, in which case that
+            access uses plain storage in :py:attr:io.
+        :rtype: None"""
+
+        for addr, (read, write) in hooks.items():
+            self._io_read_hooks[addr - 0xff00] = read
+            self._io_write_hooks[addr - 0xff00] = write
+
+    def remove_io_hooks(self, addrs):
+        """Make the IO registers at :py:data:addrs plain storage again.
+
+        :param addrs: iterable of register addresses (0xff00-0xff7f)
+        :rtype: None"""
+
+        for addr in addrs:
+            self._io_read_hooks[addr - 0xff00] = None
+            self._io_write_hooks[addr - 0xff00] = None
+
+    def load_translator(self, translator):
+        self.clear_code_pages()
+        self.translator = translator
+
+    def unload_translator(self):
+        self.clear_code_pages()
+        self.translator = None
+
+    @property
+    def read_pages(self):
+        """The page table for reads: for each page (address >> 8), the
+        buffer reads from it index, or None if they go through
+        :py:meth:get_addr's handlers. The list is updated in place when banks
+        are switched or pages are watched, so it can be kept and indexed
+        directly on hot paths."""
 
-        if addr in self._watchpoints_r:
-            self._watchpoints_r[addr](val)
+        return self._read_pages
 
+    @property
+    def watchpoints(self):
+        return list(self._watchpoints)
+
+    def add_watchpoint(self, addr, read, cb, end=None):
+        """Call :py:data:cb with the address, the value and whether it was a
+        read after every write to :py:data:addr, and after every read if
+        :py:data:read is True. Only the pages the watchpoint covers are
+        routed through the watching handlers; accesses elsewhere are as fast
+        as without watchpoints.
+
+        :param addr: the address to watch
+        :param read: if True, watch reads as well as writes
+        :param cb: the callback, called as ``cb(addr, value, read)``
+        :param end: if not None, watch every address from :py:data:addr
+            through :py:data:end
+        :rtype: Watchpoint
+        :returns: the watchpoint, for :py:meth:remove_watchpoint"""
+
+        if end is None:
+            end = addr
+        if not 0 <= addr <= end <= 0xffff:
+            raise ValueError('invalid watchpoint range {:#06x}-{:#06x}'
+                             .format(addr, end))
+        watchpoint = Watchpoint(addr, end, read, True, cb)
+        self._watchpoints.add(watchpoint)
+        for page in range(addr >> 8, (end >> 8) + 1):
+            if read:
+                self._watch_page(self._watched_reads, self._read_pages,
+                                 self._read_handlers, page, self._read_watched)
+            self._watch_page(self._watched_writes, self._write_pages,
+                             self._write_handlers, page, self._write_watched)
+        return watchpoint
+
+    def remove_watchpoint(self, watchpoint):
+        """Remove a watchpoint added with :py:meth:add_watchpoint. Pages no
+        longer covered by any watchpoint get their buffers and handlers back.
+
+        :param watchpoint: the watchpoint to remove
+        :rtype: None"""
+
+        self._watchpoints.remove(watchpoint)
+        for page in range(watchpoint.start >> 8, (watchpoint.end >> 8) + 1):
+            remaining = self._watchpoints.overlapping(page << 8, page << 8 | 0xff)
+            if not any(wp.read for wp in remaining):
+                self._unwatch_page(self._watched_reads, self._read_pages,
+                                   self._read_handlers, page)
+            if not any(wp.write for wp in remaining):
+                self._unwatch_page(self._watched_writes, self._write_pages,
+                                   self._write_handlers, page)
+
+    @staticmethod
+    def _watch_page(watched, pages, handlers, page, handler):
+        if page in watched:
+            return
+        watched[page] = [pages[page], handlers[page]]
+        pages[page] = None
+        handlers[page] = handler
+
+    @staticmethod
+    def _unwatch_page(watched, pages, handlers, page):
+        if page not in watched:
+            return
+        pages[page], handlers[page] = watched.pop(page)
+
+    def _read_watched(self, addr):
+        """Read from a page covered by a read watchpoint."""
+
+        buf, handler = self._watched_reads[addr >> 8]
+        if buf is not None:
+            val = buf[addr & 0xff]
+        else:
+            val = handler(addr)
+        for watchpoint in self._watchpoints.find(addr):
+            if watchpoint.read:
+                watchpoint.callback(addr, val, True)
         return val
 
+    def _write_watched(self, addr, value):
+        """Write to a page covered by a write watchpoint."""
+
+        buf, handler = self._watched_writes[addr >> 8]
+        if buf is not None:
+            buf[addr & 0xff] = value
+        else:
+            handler(addr, value)
+        for watchpoint in self._watchpoints.find(addr):
+            if watchpoint.write:
+                watchpoint.callback(addr, value, False)
+
+    def get_addr(self, addr):
+        page = addr >> 8
+        buf = self._read_pages[page]
+        if buf is not None:
+            return buf[addr & 0xff]
+        return self._read_handlers[page](addr)
+
     def set_addr(self, addr, value):
         value = value & 0xff
 
-        #if addr in self.watchpoints:
-        #    self.watchpoints[addr](addr, value)
-
-        if addr < 0:
+        page = addr >> 8
+        buf = self._write_pages[page]
+        if buf is not None:
+            buf[addr & 0xff] = value
+        else:
+            self._write_handlers[page](addr, value)
+
+    def read16(self, addr):
+        """Read the little-endian word at :py:data:addr. If both bytes are in
+        the same page buffer, the page is only looked up once. The address
+        wraps around after 0xffff.
+
+        :param addr: address of the low byte
+        :rtype: int"""
+
+        offset = addr & 0xff
+        if offset != 0xff:
+            buf = self._read_pages[addr >> 8]
+            if buf is not None:
+                return buf[offset] | (buf[offset + 1] << 8)
+        return self.get_addr(addr) | (self.get_addr((addr + 1) & 0xffff) << 8)
+
+    def write16(self, addr, value):
+        """Write :py:data:value as a little-endian word at :py:data:addr,
+        like :py:meth:read16.
+
+        :param addr: address of the low byte
+        :param value: the 16-bit value
+        :rtype: None"""
+
+        offset = addr & 0xff
+        if offset != 0xff:
+            buf = self._write_pages[addr >> 8]
+            if buf is not None:
+                buf[offset] = value & 0xff
+                buf[offset + 1] = (value >> 8) & 0xff
+                return
+        self.set_addr(addr, value)
+        self.set_addr((addr + 1) & 0xffff, value >> 8)
+
+    def read_block(self, addr, n):
+        """Read :py:data:n bytes starting at :py:data:addr. If they are in
+        one page buffer, returns a read-only view of the buffer, which
+        reflects later writes. Otherwise returns a copy, taken a page at a
+        time where pages have buffers.
+
+        :param addr: the first address
+        :param n: the number of bytes
+        :rtype: memoryview or bytearray"""
+
+        if n <= 0:
+            return bytearray()
+        if not 0 <= addr <= addr + n - 1 <= 0xffff:
+            raise ValueError('invalid block {:#06x}+{:#x}'.format(addr, n))
+        offset = addr & 0xff
+        buf = self._read_pages[addr >> 8]
+        if buf is not None and offset + n <= 0x100:
+            return buf[offset:offset+n].toreadonly()
+
+        block = bytearray(n)
+        pos = 0
+        while pos < n:
+            offset = (addr + pos) & 0xff
+            count = min(0x100 - offset, n - pos)
+            buf = self._read_pages[(addr + pos) >> 8]
+            if buf is not None:
+                block[pos:pos+count] = buf[offset:offset+count]
+            else:
+                get_addr = self.get_addr
+                for i in range(pos, pos + count):
+                    block[i] = get_addr(addr + i)
+            pos += count
+        return block
+
+    def write_block(self, addr, data):
+        """Write the bytes in :py:data:data starting at :py:data:addr. Pages
+        with buffers are copied into in one slice assignment each; the rest
+        are written byte by byte through their handlers.
+
+        :param addr: the first address
+        :param data: a bytes-like object
+        :rtype: None"""
+
+        data = memoryview(data).cast('B')
+        n = len(data)
+        if n == 0:
+            return
+        if not 0 <= addr <= addr + n - 1 <= 0xffff:
+            raise ValueError('invalid block {:#06x}+{:#x}'.format(addr, n))
+        pos = 0
+        while pos < n:
+            offset = (addr + pos) & 0xff
+            count = min(0x100 - offset, n - pos)
+            buf = self._write_pages[(addr + pos) >> 8]
+            if buf is not None:
+                buf[offset:offset+count] = data[pos:pos+count]
+            else:
+                set_addr = self.set_addr
+                for i in range(pos, pos + count):
+                    set_addr(addr + i, data[i])
+            pos += count
+
+    def _init_pages(self):
+        """Build the page table. Each 256-byte page of the address space
+        either has a buffer, which plain reads and writes index directly, or a
+        handler, which is called with the full address (and the value, for
+        writes). Echo RAM shares the buffers of the WRAM it mirrors.
+
+        The tables have 0x200 entries. The upper half catches addresses past
+        0xffff and negative addresses, which index the tables from the end."""
+
+        self._read_pages = [None] * 0x200
+        self._write_pages = [None] * 0x200
+        self._read_handlers = ([self._read_rom] * 0x80 +
+                               [self._read_vram] * 0x20 +
+                               [self._read_cartridge_ram] * 0x20 +
+                               [self._read_invalid] * 0x140)
+        self._write_handlers = ([self._write_rom] * 0x80 +
+                                [self._write_vram] * 0x20 +
+                                [self._write_cartridge_ram] * 0x20 +
+                                [self._write_invalid] * 0x140)
+        self._map_cartridge()
+        wram_pages = self._map_buffer(0xc0, self.wram)
+        # echo RAM 0xe000-0xfdff
+        self._map_pages(0xe0, wram_pages[:0x1e])
+        self._read_handlers[0xfe] = self._read_oam
+        self._write_handlers[0xfe] = self._write_oam
+        self._read_handlers[0xff] = self._read_io
+        self._write_handlers[0xff] = self._write_io
+
+    def _map_buffer(self, first_page, buf, writable=True):
+        """Map :py:data:buf, page by page, starting at page
+        :py:data:first_page.
+
+        :param first_page: the first page (address >> 8) to map
+        :param buf: the buffer to map. Its length is a multiple of 0x100.
+        :param writable: if False, only reads are mapped
+        :returns: the views of the pages mapped
+        :rtype: list of memoryview"""
+
+        view = memoryview(buf)
+        pages = [view[start:start+0x100] for start in range(0, len(view), 0x100)]
+        self._map_pages(first_page, pages, writable)
+        return pages
+
+    def _map_pages(self, first_page, pages, writable=True):
+        """Like :py:meth:_map_buffer, for a list of page views. Pages holding
+        translated code are only mapped for reading.
+
+        :param first_page: the first page (address >> 8) to map
+        :param pages: the views of the pages to map
+        :param writable: if False, only reads are mapped
+        :rtype: None"""
+
+        self._map_read_pages(first_page, pages)
+        if not writable:
+            return
+        code_pages = self.code_pages
+        if not any(code_pages[first_page:first_page+len(pages)]):
+            self._map_write_pages(first_page, pages)
+            return
+        for i, page_view in enumerate(pages):
+            if not code_pages[first_page + i]:
+                self._map_write_pages(first_page + i, [page_view])
+
+    def _map_read_pages(self, first_page, bufs):
+        """Map :py:data:bufs, a list of page buffers or None, for reading
+        at consecutive pages from :py:data:first_page. Every change to the
+        page table after :py:meth:_init_pages goes through this method,
+        :py:meth:_map_write_pages or :py:meth:_set_write_handler, so that
+        watched pages stay watched."""
+
+        self._read_pages[first_page:first_page+len(bufs)] = bufs
+        if self._watched_reads:
+            self._rewatch(self._watched_reads, self._read_pages,
+                          first_page, len(bufs))
+
+    def _map_write_pages(self, first_page, bufs):
+        """Like :py:meth:_map_read_pages, for writing."""
+
+        self._write_pages[first_page:first_page+len(bufs)] = bufs
+        if self._watched_writes:
+            self._rewatch(self._watched_writes, self._write_pages,
+                          first_page, len(bufs))
+
+    def _set_write_handler(self, page, handler):
+        entry = self._watched_writes.get(page)
+        if entry is None:
+            self._write_handlers[page] = handler
+        else:
+            entry[1] = handler
+
+    @staticmethod
+    def _rewatch(watched, pages, first_page, count):
+        """Move buffers just mapped at watched pages out of the page table
+        and into :py:data:watched."""
+
+        for page, entry in watched.items():
+            if first_page <= page < first_page + count:
+                entry[0] = pages[page]
+                pages[page] = None
+
+    def _own_read_page(self, page):
+        """Returns the buffer mapped for reading at :py:data:page, whether
+        or not the page is watched."""
+
+        entry = self._watched_reads.get(page)
+        if entry is None:
+            return self._read_pages[page]
+        return entry[0]
+
+    def _map_cartridge(self):
+        """Map the cartridge's selected ROM and RAM banks. Pages the
+        cartridge has no buffer for (past the end of a short ROM, or RAM that
+        is disabled) are left to the handlers."""
+
+        cartridge = self.cartridge
+        if cartridge.rom is None:
+            self._map_read_pages(0x00, [None] * 0x80)
+        else:
+            self._map_read_pages(0x00, cartridge.rom_pages(cartridge.rom0_bank))
+            self._map_read_pages(0x40, cartridge.rom_pages(cartridge.rom_bank))
+        self.rom0_bank = cartridge.rom0_bank
+        self.rom_bank = cartridge.rom_bank
+        self._map_cartridge_ram()
+
+    def _map_cartridge_ram(self):
+        cartridge = self.cartridge
+        read_pages = cartridge.ram_pages()
+        write_pages = cartridge.ram_write_pages()
+        self._map_read_pages(0xa0, read_pages or [None] * 0x20)
+        self._map_write_pages(0xa0, write_pages or [None] * 0x20)
+
+    def mark_code_page(self, page):
+        """Route writes to :py:data:page, and to its echo, through
+        :py:meth:_write_code so the translator sees them. Writes to HRAM
+        always go through :py:meth:_write_io, which checks
+        :py:attr:code_pages itself.
+
+        :param page: a WRAM or HRAM page (address >> 8)
+        :rtype: None"""
+
+        self.code_pages[page] = 1
+        if page == 0xff:
+            return
+        for alias in self._aliases(page):
+            self._map_write_pages(alias, [None])
+            self._set_write_handler(alias, self._write_code)
+
+    def unmark_code_page(self, page):
+        """Undo :py:meth:mark_code_page.
+
+        :param page: a WRAM or HRAM page (address >> 8)
+        :rtype: None"""
+
+        self.code_pages[page] = 0
+        if page == 0xff:
+            return
+        for alias in self._aliases(page):
+            self._map_write_pages(alias, [self._own_read_page(alias)])
+
+    def clear_code_pages(self):
+        """Unmark every page marked with :py:meth:mark_code_page."""
+
+        for page, marked in enumerate(self.code_pages):
+            if marked:
+                self.unmark_code_page(page)
+
+    @staticmethod
+    def _aliases(page):
+        """Returns the pages that address the same memory as
+        :py:data:page."""
+
+        if 0xc0 <= page < 0xde:
+            return (page, page + 0x20)
+        return (page,)
+
+    def _read_invalid(self, addr):
+        raise ValueError('invalid address {:#04x}'.format(addr))
+
+    def _write_invalid(self, addr, value):
+        raise ValueError('invalid address {:#04x}'.format(addr))
+
+    def _read_rom(self, addr):
+        return self.cartridge.read_rom(addr)
+
+    def _write_rom(self, addr, value):
+        # MBC control registers. Games switch banks often, and often to the
+        # bank that is already mapped, so only the windows whose bank
+        # changed are mapped again.
+        cartridge = self.cartridge
+        ram = (cartridge.ram_bank, cartridge.ram_enabled)
+        cartridge.write(addr, value)
+        if cartridge.rom is not None:
+            if cartridge.rom0_bank != self.rom0_bank:
+                self._map_read_pages(0x00, cartridge.rom_pages(cartridge.rom0_bank))
+                self.rom0_bank = cartridge.rom0_bank
+            if cartridge.rom_bank != self.rom_bank:
+                self._map_read_pages(0x40, cartridge.rom_pages(cartridge.rom_bank))
+                self.rom_bank = cartridge.rom_bank
+        if (cartridge.ram_bank, cartridge.ram_enabled) != ram:
+            self._map_cartridge_ram()
+
+    def _read_cartridge_ram(self, addr):
+        return self.cartridge.read_ram(addr)
+
+    def _write_cartridge_ram(self, addr, value):
+        if self.cartridge.write_ram(addr, value):
+            # First write to a clean page of the save file: map it, and
+            # flush it later
+            self._map_cartridge_ram()
+            scheduler = self.scheduler
+            if scheduler is not None and scheduler.deadline(self) == NEVER:
+                scheduler.schedule(self, scheduler.now() + SAVE_FLUSH_INTERVAL)
+
+    def _read_vram(self, addr):
+        return self.gpu.get_vram(addr - VRAM_START)
+
+    def _write_vram(self, addr, value):
+        self.gpu.set_vram(addr - VRAM_START, value)
+
+    def _read_oam(self, addr):
+        if addr < 0xfea0:
+            return self.gpu.get_oam(addr - OAM_START)
+        else:
             # invalid
-            raise ValueError('invalid address {:#04x}'.format(addr))
-        elif addr < 0x8000:
-            # ROM 0x0000-0x8000
-            #raise ValueError('cannot write to read-only address {:#04x}'.format(addr))
-            self.logger.warning('cannot write to read-only address %#04x (in ROM)', addr)
-        elif addr < 0xa000:
-            # VRAM (8 KB) 0x8000-0xa000
-            self.gpu.set_vram(addr - VRAM_START, value)
-        elif addr < 0xc000:
-            # cartridge RAM (8 KB) 0xa000-0xc000
-            self.cartridge_ram[addr - 0xa000] = value
-        elif addr < 0xd000:
-            # WRAM 0 (4 KB) 0xc000-0xd000
-            self.wram[addr - 0xc000] = value
-        elif addr < 0xe000:
-            # WRAM 1 (4 KB) 0xd000-0xe000
-            self.wram[addr - 0xc000] = value
-        elif addr < 0xfe00:
-            # echo RAM 0xc000–ddff
-            self.set_addr(addr - 0x2000, value)
-        elif addr < 0xfea0:
-            # sprite table (OAM) 0xfe00-fe9
+            self.logger.debug('read from invalid address %#04x', addr)
+            return 0
+            #raise ValueError('invalid address {}'.format(addr))
+
+    def _write_oam(self, addr, value):
+        if addr < 0xfea0:
             self.gpu.set_oam(addr - OAM_START, value)
-        elif addr < 0xff00:
+        else:
             # invalid
             self.logger.debug('write to invalid address %#04x', addr)
-        elif addr < 0xff80:
-            # IO 0xff00-0xff7f
-            if addr == 0xff00:
-                # print(f'Write joypad {value:x}')
-                self.joyp = value
-            elif addr == 0xff01 | addr == 0xff02:
-                raise NotImplementedError('Serial transfer registers')
-            elif addr == 0xff04:
-                self.timer.div = value
-            elif addr == 0xff05:
-                self.timer.tima = value
-            elif addr == 0xff06:
-                self.timer.tma = value
-            elif addr == 0xff07:
-                self.timer.tac = value
-            elif addr == 0xff0f:
-                # IF
-                self.interrupt_controller.if_ = value
-            elif addr < 0xff40:
-                self._sound_mem[addr-0xff10] = value
-                # TODO
-                # self.logger.warn('not implemented: sound registers %#04x, %#04x', addr, value)
-            elif addr == 0xff40:
-                self.gpu.lcdc = value
-            elif addr == 0xff41:
-                self.gpu.stat = value
-            elif addr == 0xff42:
-                self.gpu.scy = value
-            elif addr == 0xff43:
-                self.gpu.scx = value
-            elif addr == 0xff44:
-                self.gpu.ly = value
-            elif addr == 0xff45:
-                self.gpu.lyc = value
-            elif addr == 0xff46:
-                self.dma = value
-            elif addr == 0xff47:
-                self.gpu.bgp = value
-            elif addr == 0xff48:
-                self.gpu.obp0 = value
-            elif addr == 0xff49:
-                self.gpu.obp1 = value
-            elif addr == 0xff4a:
-                self.gpu.wy = value
-            elif addr == 0xff4b:
-                self.gpu.wx = value
-            else:
-                self.logger.warning('not implemented: memory-mapped IO addr %#06x', addr)
-        elif addr < 0xffff:
-            # HRAM 0xff80-0xfffe
-            self.hram[addr - 0xff80] = value
-        elif addr == 0xffff:
+
+    def _write_code(self, addr, value):
+        """Write to a WRAM page holding translated code."""
+
+        if addr >= 0xe000:
+            # echo RAM
+            addr -= 0x2000
+        self.wram[addr - 0xc000] = value
+        self.translator.invalidate_addr(addr)
+
+    def _read_io(self, addr):
+        """Read from 0xff00-0xffff: IO registers, HRAM and IE."""
+
+        if addr >= 0xff80:
+            if addr < 0xffff:
+                # HRAM
+                return self.hram[addr - 0xff80]
             # interrupt enable register
             # bit 0: v-blank interrupt
             # bit 1: LCD STAT interrupt
@@ -335,14 +725,37 @@ class MMU():
             # bit 3: serial interrupt
             # bit 4: joypad interrupt
             if self.interrupt_controller is not None:
+                return self.interrupt_controller.ie
+            else:
+                self.logger.warning('read from interrupt controller when there is not one loaded')
+                return 0
+
+        read = self._io_read_hooks[addr - 0xff00]
+        if read is not None:
+            return read()
+        return self.io[addr - 0xff00]
+
+    def _write_io(self, addr, value):
+        """Write to 0xff00-0xffff: IO registers, HRAM and IE."""
+
+        if addr >= 0xff80:
+            if addr < 0xffff:
+                # HRAM 0xff80-0xfffe
+                self.hram[addr - 0xff80] = value
+                if self.code_pages[0xff]:
+                    self.translator.invalidate_addr(addr)
+            # interrupt enable register
+            elif self.interrupt_controller is not None:
                 self.interrupt_controller.ie = value
             else:
                 self.logger.warning('write to interrupt controller when there is not one loaded')
-        else:
-            raise ValueError('invalid address {:#04x}'.format(hex(addr)))
+            return
 
-        if addr in self._watchpoints_w:
-            self._watchpoints_w[addr](value)
+        write = self._io_write_hooks[addr - 0xff00]
+        if write is not None:
+            write(value)
+        else:
+            self.io[addr - 0xff00] = value
 
     @property
     def joyp(self):
@@ -392,5 +805,5 @@ class MMU():
     def dma(self, value):
         value = value & 0xff
         self._dma = value
-        for i in range(0xa0):
-            self.gpu.set_oam(i, self.get_addr(value*0x100+i))
+        # A view of the source page's buffer, if it has one
+        self.gpu.set_oam_block(self.read_block(value << 8, 0xa0))
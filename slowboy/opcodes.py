@@ -0,0 +1,248 @@
+"""The SM83 instruction set, as data.
+
+:py:data:INSTRUCTIONS lists every instruction the CPU implements, by opcode,
+and :py:data:CB_INSTRUCTIONS the instructions prefixed by 0xcb, by their
+second byte. :py:mod:slowboy.codegen generates the CPU's instruction handlers
+from these tables.
+
+Operands are written as in assembly: d8 and d16 are immediates, r8 a signed
+immediate offset, a16 an immediate address, and parentheses mean the value
+at an address. Conditional branches list the condition as their first
+operand.
+
+Cycles are the cycles the CPU charges for an instruction. For conditional
+branches, ``cycles`` are the cycles of the taken branch and
+``cycles_not_taken`` those of the branch not taken.
+
+Flags describe the effect on Z, N, H and C, in that order: the flag's letter
+if the instruction computes it, 0 or 1 if it is reset or set, and - if it is
+not affected. They describe the instructions as this CPU implements them,
+which differs from the hardware for rlca, rla, rrca and rra (which compute
+Z), scf and ccf (which only set and reset C), daa (which leaves H) and
+pop af (which leaves F).
+"""
+
+from collections import namedtuple
+
+
+class Instruction(namedtuple('Instruction', ['opcode', 'mnemonic', 'operands',
+                                             'cycles', 'cycles_not_taken',
+                                             'flags'])):
+    __slots__ = ()
+
+    @property
+    def description(self):
+        """The instruction as written in assembly."""
+
+        if self.operands:
+            return '{} {}'.format(self.mnemonic, ', '.join(self.operands))
+        return self.mnemonic
+
+
+def _instruction(opcode, text, cycles, flags='----', cycles_not_taken=None):
+    """Returns the :py:class:Instruction for :py:data:opcode, written as
+    :py:data:text in assembly."""
+
+    mnemonic, _, operands = text.partition(' ')
+    operands = tuple(op.strip() for op in operands.split(',')) if operands else ()
+    return Instruction(opcode, mnemonic, operands, cycles, cycles_not_taken,
+                       flags)
+
+
+# Operands encoded by the low three bits of an opcode
+_R8 = ('b', 'c', 'd', 'e', 'h', 'l', '(hl)', 'a')
+
+# mnemonic, operand prefix and flags of the ALU instructions 0x80-0xbf
+_ALU = (
+    ('add', 'a, ', 'Z0HC'),
+    ('adc', 'a, ', 'Z0HC'),
+    ('sub', 'a, ', 'Z1HC'),
+    ('sbc', 'a, ', 'Z1HC'),
+    ('and', '', 'Z010'),
+    ('xor', '', 'Z000'),
+    ('or', '', 'Z000'),
+    ('cp', '', 'Z1HC'),
+)
+
+# mnemonic and flags of the CB-prefixed rotates and shifts 0x00-0x3f
+_SHIFTS = (
+    ('rlc', 'Z00C'),
+    ('rrc', 'Z00C'),
+    ('rl', 'Z00C'),
+    ('rr', 'Z00C'),
+    ('sla', 'Z00C'),
+    ('sra', 'Z00C'),
+    ('swap', 'Z000'),
+    ('srl', 'Z00C'),
+)
+
+_INSTRUCTIONS = [
+    _instruction(0x00, 'nop', 4),
+    _instruction(0x10, 'stop', 4),
+    _instruction(0x76, 'halt', 4),
+    _instruction(0xf3, 'di', 4),
+    _instruction(0xfb, 'ei', 4),
+
+    # 8-bit loads
+    _instruction(0x02, 'ld (bc), a', 8),
+    _instruction(0x12, 'ld (de), a', 8),
+    _instruction(0x22, 'ldi (hl), a', 8),
+    _instruction(0x32, 'ldd (hl), a', 8),
+    _instruction(0x0a, 'ld a, (bc)', 8),
+    _instruction(0x1a, 'ld a, (de)', 8),
+    _instruction(0x2a, 'ldi a, (hl)', 8),
+    _instruction(0x3a, 'ldd a, (hl)', 8),
+    _instruction(0x06, 'ld b, d8', 8),
+    _instruction(0x0e, 'ld c, d8', 8),
+    _instruction(0x16, 'ld d, d8', 8),
+    _instruction(0x1e, 'ld e, d8', 8),
+    _instruction(0x26, 'ld h, d8', 8),
+    _instruction(0x2e, 'ld l, d8', 8),
+    _instruction(0x36, 'ld (hl), d8', 12),
+    _instruction(0x3e, 'ld a, d8', 8),
+    _instruction(0xe0, 'ldh (d8), a', 12),
+    _instruction(0xf0, 'ldh a, (d8)', 12),
+    _instruction(0xe2, 'ldh (c), a', 8),
+    _instruction(0xf2, 'ldh a, (c)', 8),
+    _instruction(0xea, 'ld (a16), a', 16),
+    _instruction(0xfa, 'ld a, (a16)', 16),
+
+    # 16-bit loads
+    _instruction(0x01, 'ld bc, d16', 12),
+    _instruction(0x11, 'ld de, d16', 12),
+    _instruction(0x21, 'ld hl, d16', 12),
+    _instruction(0x31, 'ld sp, d16', 12),
+    _instruction(0x08, 'ld (a16), sp', 8),
+    _instruction(0xf8, 'ld hl, sp+d8', 12, '00HC'),
+    _instruction(0xf9, 'ld sp, hl', 8),
+    _instruction(0xc1, 'pop bc', 16),
+    _instruction(0xd1, 'pop de', 16),
+    _instruction(0xe1, 'pop hl', 16),
+    _instruction(0xf1, 'pop af', 16),
+    _instruction(0xc5, 'push bc', 16),
+    _instruction(0xd5, 'push de', 16),
+    _instruction(0xe5, 'push hl', 16),
+    _instruction(0xf5, 'push af', 16),
+
+    # 8-bit arithmetic with immediates
+    _instruction(0xc6, 'add a, d8', 8, 'Z0HC'),
+    _instruction(0xce, 'adc a, d8', 8, 'Z0HC'),
+    _instruction(0xd6, 'sub a, d8', 8, 'Z1HC'),
+    _instruction(0xde, 'sbc a, d8', 8, 'Z1HC'),
+    _instruction(0xe6, 'and d8', 8, 'Z010'),
+    _instruction(0xee, 'xor d8', 8, 'Z000'),
+    _instruction(0xf6, 'or d8', 8, 'Z000'),
+    _instruction(0xfe, 'cp d8', 8, 'Z1HC'),
+
+    # Increments and decrements
+    _instruction(0x04, 'inc b', 4, 'Z0H-'),
+    _instruction(0x0c, 'inc c', 4, 'Z0H-'),
+    _instruction(0x14, 'inc d', 4, 'Z0H-'),
+    _instruction(0x1c, 'inc e', 4, 'Z0H-'),
+    _instruction(0x24, 'inc h', 4, 'Z0H-'),
+    _instruction(0x2c, 'inc l', 4, 'Z0H-'),
+    _instruction(0x34, 'inc (hl)', 12, 'Z0H-'),
+    _instruction(0x3c, 'inc a', 4, 'Z0H-'),
+    _instruction(0x05, 'dec b', 4, 'Z1H-'),
+    _instruction(0x0d, 'dec c', 4, 'Z1H-'),
+    _instruction(0x15, 'dec d', 4, 'Z1H-'),
+    _instruction(0x1d, 'dec e', 4, 'Z1H-'),
+    _instruction(0x25, 'dec h', 4, 'Z1H-'),
+    _instruction(0x2d, 'dec l', 4, 'Z1H-'),
+    _instruction(0x35, 'dec (hl)', 12, 'Z1H-'),
+    _instruction(0x3d, 'dec a', 4, 'Z1H-'),
+    _instruction(0x03, 'inc bc', 8),
+    _instruction(0x13, 'inc de', 8),
+    _instruction(0x23, 'inc hl', 8),
+    _instruction(0x33, 'inc sp', 8),
+    _instruction(0x0b, 'dec bc', 8),
+    _instruction(0x1b, 'dec de', 8),
+    _instruction(0x2b, 'dec hl', 8),
+    _instruction(0x3b, 'dec sp', 8),
+
+    # 16-bit arithmetic
+    _instruction(0x09, 'add hl, bc', 8, '-0HC'),
+    _instruction(0x19, 'add hl, de', 8, '-0HC'),
+    _instruction(0x29, 'add hl, hl', 8, '-0HC'),
+    _instruction(0x39, 'add hl, sp', 8, '-0HC'),
+    _instruction(0xe8, 'add sp, d8', 16, '00HC'),
+
+    # Rotates of A and miscellaneous arithmetic
+    _instruction(0x07, 'rlca', 4, 'Z00C'),
+    _instruction(0x17, 'rla', 4, 'Z00C'),
+    _instruction(0x0f, 'rrca', 4, 'Z00C'),
+    _instruction(0x1f, 'rra', 4, 'Z00C'),
+    _instruction(0x27, 'daa', 4, 'Z--C'),
+    _instruction(0x2f, 'cpl', 4, '-11-'),
+    _instruction(0x37, 'scf', 4, '---1'),
+    _instruction(0x3f, 'ccf', 4, '---0'),
+
+    # Jumps
+    _instruction(0x18, 'jr r8', 12),
+    _instruction(0x20, 'jr nz, r8', 12, cycles_not_taken=8),
+    _instruction(0x28, 'jr z, r8', 12, cycles_not_taken=8),
+    _instruction(0x30, 'jr nc, r8', 12, cycles_not_taken=8),
+    _instruction(0x38, 'jr c, r8', 12, cycles_not_taken=8),
+    _instruction(0xc3, 'jp a16', 16),
+    _instruction(0xc2, 'jp nz, a16', 16, cycles_not_taken=12),
+    _instruction(0xca, 'jp z, a16', 16, cycles_not_taken=12),
+    _instruction(0xd2, 'jp nc, a16', 16, cycles_not_taken=12),
+    _instruction(0xda, 'jp c, a16', 16, cycles_not_taken=12),
+    _instruction(0xe9, 'jp hl', 4),
+
+    # Calls and returns
+    _instruction(0xcd, 'call a16', 24),
+    _instruction(0xc4, 'call nz, a16', 24, cycles_not_taken=12),
+    _instruction(0xcc, 'call z, a16', 24, cycles_not_taken=12),
+    _instruction(0xd4, 'call nc, a16', 24, cycles_not_taken=12),
+    _instruction(0xdc, 'call c, a16', 24, cycles_not_taken=12),
+    _instruction(0xc9, 'ret', 20),
+    _instruction(0xc0, 'ret nz', 20, cycles_not_taken=8),
+    _instruction(0xc8, 'ret z', 20, cycles_not_taken=8),
+    _instruction(0xd0, 'ret nc', 20, cycles_not_taken=8),
+    _instruction(0xd8, 'ret c', 20, cycles_not_taken=8),
+    _instruction(0xd9, 'reti', 20),
+    _instruction(0xc7, 'rst 0x00', 4),
+    _instruction(0xcf, 'rst 0x08', 4),
+    _instruction(0xd7, 'rst 0x10', 4),
+    _instruction(0xdf, 'rst 0x18', 4),
+    _instruction(0xe7, 'rst 0x20', 4),
+    _instruction(0xef, 'rst 0x28', 4),
+    _instruction(0xf7, 'rst 0x30', 4),
+    _instruction(0xff, 'rst 0x38', 4),
+]
+
+# ld r8, r8 and ld r8, (hl); 0x76 would be ld (hl), (hl) but is halt
+_INSTRUCTIONS += [
+    _instruction(0x40 | dest << 3 | src,
+                 'ld {}, {}'.format(_R8[dest], _R8[src]),
+                 8 if 6 in (dest, src) else 4)
+    for dest in range(8) for src in range(8) if (dest, src) != (6, 6)
+]
+
+# 8-bit arithmetic with registers and (hl)
+_INSTRUCTIONS += [
+    _instruction(0x80 | op << 3 | src,
+                 '{} {}{}'.format(mnemonic, prefix, _R8[src]),
+                 8 if src == 6 else 4, flags)
+    for op, (mnemonic, prefix, flags) in enumerate(_ALU) for src in range(8)
+]
+
+# 0xcb is the prefix of CB_INSTRUCTIONS
+INSTRUCTIONS = {instruction.opcode: instruction
+                for instruction in sorted(_INSTRUCTIONS)}
+
+CB_INSTRUCTIONS = {}
+for _op, (_mnemonic, _flags) in enumerate(_SHIFTS):
+    for _src in range(8):
+        CB_INSTRUCTIONS[_op << 3 | _src] = _instruction(
+            _op << 3 | _src, '{} {}'.format(_mnemonic, _R8[_src]),
+            16 if _src == 6 else 8, _flags)
+for _op, (_mnemonic, _flags) in enumerate((('bit', 'Z01-'), ('res', '----'),
+                                            ('set', '----')), 1):
+    for _bit in range(8):
+        for _src in range(8):
+            _opcode = _op << 6 | _bit << 3 | _src
+            CB_INSTRUCTIONS[_opcode] = _instruction(
+                _opcode, '{} {}, {}'.format(_mnemonic, _bit, _R8[_src]),
+                16 if _src == 6 else 8, _flags)
@@ -0,0 +1,85 @@
+"""Renderers turn the GPU's VRAM, OAM and registers into pixels.
+
+The GPU in :py:mod:slowboy.gpu only keeps time and state: the mode machine,
+LY and STAT, VRAM and OAM and the interrupts. It tells its renderer when
+something that affects the picture changes, and when a frame is complete, by
+calling the methods of :py:class:Renderer. Renderers read everything else from
+the GPU they are attached to.
+
+The renderers are:
+
+- :py:class:NullRenderer, which draws nothing, for runs that only need the
+  CPU and timing;
+- :py:class:slowboy.render.framebuffer.FramebufferRenderer, which draws each
+  line into a NumPy array;
+- :py:class:slowboy.render.sdl.SDLRenderer, which draws onto SDL surfaces.
+
+The last two live in their own modules, so NumPy and SDL are only imported by
+the programs that use them.
+"""
+
+
+class Renderer():
+    """Base class of the renderers. Every hook does nothing, so a renderer
+    only overrides the ones it needs."""
+
+    def __init__(self):
+        self.gpu = None
+
+    def attach(self, gpu):
+        """Called by :py:data:gpu when the renderer is given to it, before it
+        sets its registers.
+
+        :param gpu: the :py:class:slowboy.gpu.GPU to draw
+        :rtype: None"""
+
+        self.gpu = gpu
+
+    def register_changed(self, name):
+        """A register that affects the picture has changed.
+
+        :param name: name of the GPU property, e.g. ``'lcdc'`` or ``'bgp'``
+        :rtype: None"""
+
+    def vram_changed(self, addr, value):
+        """A byte of VRAM has been written.
+
+        :param addr: offset into VRAM
+        :param value: the byte written
+        :rtype: None"""
+
+    def oam_changed(self):
+        """OAM has been written with different data.
+
+        :rtype: None"""
+
+    def scanline(self, ly):
+        """The GPU has finished mode 3 of line :py:data:ly, so the line can be
+        drawn from the registers as they are now.
+
+        :param ly: the line, 0-143
+        :rtype: None"""
+
+    def vblank(self):
+        """The GPU has entered V_BLANK, so the frame is complete.
+
+        :rtype: None"""
+
+    def refresh(self):
+        """Decode everything again from the GPU's current state.
+
+        :rtype: None"""
+
+    def draw(self, surface):
+        """Copy the last complete frame onto :py:data:surface, if the renderer
+        can draw onto it.
+
+        :returns: True if :py:data:surface was updated and False otherwise
+        :rtype: bool"""
+
+        return False
+
+
+class NullRenderer(Renderer):
+    """Draws nothing. This is the GPU's default renderer, for headless runs
+    where only the CPU and timing matter."""
@@ -0,0 +1,230 @@
+import numpy as np
+
+from slowboy.gpu import (
+    colorto8bit,
+    LCDC_DISPLAY_ENABLE_MASK,
+    LCDC_WINDOW_TILE_DISPLAY_SELECT_MASK,
+    LCDC_WINDOW_DISPLAY_ENABLE_MASK,
+    LCDC_BG_WINDOW_DATA_SELECT_MASK,
+    LCDC_BG_TILE_DISPLAY_SELECT_MASK,
+    LCDC_SPRITE_SIZE_OFFSET,
+    LCDC_SPRITE_DISPLAY_ENABLE_MASK,
+    LCDC_BG_DISPLAY_MASK,
+    TWIDTH,
+    THEIGHT,
+    SCREEN_WIDTH,
+    SCREEN_HEIGHT,
+    SPRITETAB_SIZE,
+    SPRITETAB_ENTRY_SIZE,
+)
+from slowboy.render import Renderer
+
+
+# Tile data is 0x8000-0x97ff: 384 tiles of 16 bytes
+TILE_DATA_SIZE = 0x1800
+TILE_COUNT = TILE_DATA_SIZE // 16
+# Tile maps, relative to VRAM
+TILEMAP0_START = 0x1800
+TILEMAP1_START = 0x1c00
+TILEMAP_WIDTH = 32
+
+SPRITE_PRIORITY_MASK = 0x80
+SPRITE_Y_FLIP_MASK = 0x40
+SPRITE_X_FLIP_MASK = 0x20
+SPRITE_PALETTE_MASK = 0x10
+# Sprites the GPU draws on a line at most
+SPRITES_PER_LINE = 10
+
+# Color indices in the framebuffer are the color number plus the offset of
+# the palette it's drawn with
+BGP_OFFSET = 0
+OBP0_OFFSET = 4
+OBP1_OFFSET = 8
+PALETTE_SIZE = 12
+
+# Shades of the colors 0-3 by palette register value
+PALETTE_LUT = np.array([[colorto8bit((value >> (2 * c)) & 0x3) for c in range(4)]
+                        for value in range(0x100)], np.uint8)
+WHITE_LINE = np.full(PALETTE_SIZE, 0xff, np.uint8)
+
+
+def decode_tiles(vram):
+    """Decodes all the tiles in VRAM at once.
+
+    :param vram: the GPU's VRAM, starting at 0x8000
+    :returns: the color numbers of the tiles, an array of shape (384, 8, 8)
+    :rtype: numpy.ndarray"""
+
+    data = np.frombuffer(vram, np.uint8, TILE_DATA_SIZE).reshape(TILE_COUNT, THEIGHT, 2)
+    # The first byte of each row holds the low bits of its 8 pixels and the
+    # second byte the high bits, leftmost pixel first
+    bits = np.unpackbits(data, axis=2)
+    return bits[..., :TWIDTH] | (bits[..., TWIDTH:] << 1)
+
+
+class FramebufferRenderer(Renderer):
+    """Draws the screen one line at a time, at the end of the line's mode 3,
+    so changes to the scroll registers, palettes, VRAM and OAM in the middle
+    of a frame show up as they do on the LCD.
+
+    Each line is drawn into :py:attr:indexed, 144 rows of 160 color indices:
+    0-3 are background and window colors, 4-7 are colors of sprites using
+    OBP0 and 8-11 of sprites using OBP1. The shades of those 12 colors on
+    each line are kept in :py:attr:palettes. At V_BLANK, both are combined
+    into :py:attr:frame, 144 rows of 160 8-bit shades, where 0xff is white.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.indexed = np.zeros((SCREEN_HEIGHT, SCREEN_WIDTH), np.uint8)
+        self.palettes = np.full((SCREEN_HEIGHT, PALETTE_SIZE), 0xff, np.uint8)
+        self.frame = np.full((SCREEN_HEIGHT, SCREEN_WIDTH), 0xff, np.uint8)
+        # Number of frames drawn
+        self.frames = 0
+        self._tiles = None
+        self._stale_tiles = True
+        # Line of the window drawn next. It only advances on lines where the
+        # window is shown.
+        self._window_line = 0
+        self._columns = np.arange(SCREEN_WIDTH)
+        # Sprites drawn on each line, see _update_sprites. None when OAM has
+        # changed since.
+        self._sprite_lines = None
+        self._sprite_height = 8
+
+    def vram_changed(self, addr, value):
+        if addr < TILE_DATA_SIZE:
+            self._stale_tiles = True
+
+    def oam_changed(self):
+        self._sprite_lines = None
+
+    def refresh(self):
+        self._stale_tiles = True
+        self._sprite_lines = None
+
+    def _tile_row(self, tiles, map_start, y):
+        """Returns the color numbers of line :py:data:y of the 256x256
+        background or window whose tile map starts at :py:data:map_start."""
+
+        gpu = self.gpu
+        tile_ids = np.frombuffer(gpu.vram, np.uint8, TILEMAP_WIDTH,
+                                 map_start + (y // THEIGHT) * TILEMAP_WIDTH)
+        if gpu.lcdc & LCDC_BG_WINDOW_DATA_SELECT_MASK:
+            # 0x8000-0x8fff, tile numbers 0-255
+            tile_ids = tile_ids.astype(np.intp)
+        else:
+            # 0x8800-0x97ff, tile numbers -128-127 from 0x9000
+            tile_ids = 0x100 + tile_ids.view(np.int8).astype(np.intp)
+        return tiles[tile_ids, y % THEIGHT].ravel()
+
+    def scanline(self, ly):
+        gpu = self.gpu
+        lcdc = gpu.lcdc
+        line = self.indexed[ly]
+
+        if lcdc & LCDC_DISPLAY_ENABLE_MASK == 0:
+            line[:] = 0
+            self.palettes[ly] = WHITE_LINE
+            return
+
+        if self._stale_tiles:
+            self._tiles = decode_tiles(gpu.vram)
+            self._stale_tiles = False
+        tiles = self._tiles
+
+        palettes = self.palettes[ly]
+        palettes[OBP0_OFFSET:OBP0_OFFSET+4] = PALETTE_LUT[gpu.obp0]
+        palettes[OBP1_OFFSET:OBP1_OFFSET+4] = PALETTE_LUT[gpu.obp1]
+
+        if lcdc & LCDC_BG_DISPLAY_MASK:
+            palettes[BGP_OFFSET:BGP_OFFSET+4] = PALETTE_LUT[gpu.bgp]
+            map_start = TILEMAP1_START if lcdc & LCDC_BG_TILE_DISPLAY_SELECT_MASK \
+                else TILEMAP0_START
+            row = self._tile_row(tiles, map_start, (gpu.scy + ly) & 0xff)
+            line[:] = row[(gpu.scx + self._columns) & 0xff]
+
+            wx = gpu.wx
+            if lcdc & LCDC_WINDOW_DISPLAY_ENABLE_MASK and gpu.wy <= ly \
+                    and wx < SCREEN_WIDTH:
+                map_start = TILEMAP1_START if lcdc & LCDC_WINDOW_TILE_DISPLAY_SELECT_MASK \
+                    else TILEMAP0_START
+                row = self._tile_row(tiles, map_start, self._window_line)
+                x = max(wx, 0)
+                line[x:] = row[x - wx:SCREEN_WIDTH - wx]
+                self._window_line += 1
+        else:
+            # The background and window are white, and sprites are drawn over
+            # them as over color 0
+            palettes[BGP_OFFSET:BGP_OFFSET+4] = 0xff
+            line[:] = 0
+
+        if lcdc & LCDC_SPRITE_DISPLAY_ENABLE_MASK:
+            self._draw_sprites(tiles, ly, line)
+
+    def _update_sprites(self, height):
+        """Works out from OAM which sprites are drawn on each line, and in
+        what order, so a line only has to gather their pixels."""
+
+        oam = np.frombuffer(self.gpu.oam, np.uint8,
+                            SPRITETAB_SIZE * SPRITETAB_ENTRY_SIZE).reshape(
+                                SPRITETAB_SIZE, SPRITETAB_ENTRY_SIZE).astype(np.intp)
+        ys = oam[:, 0] - 16
+        xs = oam[:, 1] - 8
+        attrs = oam[:, 3]
+        self._sprite_ys = ys
+        self._sprite_tiles = oam[:, 2] & 0xfe if height == 16 else oam[:, 2]
+        self._sprite_y_flip = (attrs & SPRITE_Y_FLIP_MASK) != 0
+        self._sprite_x_flip = ((attrs & SPRITE_X_FLIP_MASK) != 0)[:, None]
+        self._sprite_behind = ((attrs & SPRITE_PRIORITY_MASK) != 0)[:, None]
+        self._sprite_offsets = np.where(attrs & SPRITE_PALETTE_MASK, OBP1_OFFSET,
+                                        OBP0_OFFSET).astype(np.uint8)[:, None]
+        columns = xs[:, None] + np.arange(TWIDTH)
+        self._sprite_onscreen = (columns >= 0) & (columns < SCREEN_WIDTH)
+        self._sprite_columns = columns.clip(0, SCREEN_WIDTH - 1)
+
+        # The first 10 sprites in OAM on each line, whether they are on the
+        # screen horizontally or not
+        lines = np.arange(SCREEN_HEIGHT)[:, None]
+        on_line = (lines >= ys) & (lines < ys + height)
+        on_line &= on_line.cumsum(axis=1) <= SPRITES_PER_LINE
+        # Sprites further left, then earlier in OAM, are drawn over others, so
+        # they come last
+        order = np.lexsort((-np.arange(SPRITETAB_SIZE), -xs))
+        self._sprite_lines = [order[on_line[ly, order]] for ly in range(SCREEN_HEIGHT)]
+        self._sprite_height = height
+
+    def _draw_sprites(self, tiles, ly, line):
+        """Draws the sprites on line :py:data:ly over the background and
+        window colors in :py:data:line."""
+
+        height = 16 if self.gpu.lcdc & (1 << LCDC_SPRITE_SIZE_OFFSET) else 8
+        if self._sprite_lines is None or self._sprite_height != height:
+            self._update_sprites(height)
+        sprites = self._sprite_lines[ly]
+        if not len(sprites):
+            return
+
+        # Gather the row of each sprite
+        rows = ly - self._sprite_ys[sprites]
+        rows = np.where(self._sprite_y_flip[sprites], height - 1 - rows, rows)
+        pixels = tiles[self._sprite_tiles[sprites] + rows // THEIGHT, rows % THEIGHT]
+        pixels = np.where(self._sprite_x_flip[sprites], pixels[:, ::-1], pixels)
+
+        columns = self._sprite_columns[sprites]
+        # Color 0 is transparent, and sprites behind the background are only
+        # drawn over its color 0
+        visible = (pixels != 0) & self._sprite_onscreen[sprites] & \
+            (~self._sprite_behind[sprites] | (line[columns] == 0))
+        colors = pixels + self._sprite_offsets[sprites]
+
+        # Where sprites overlap, the last one is drawn
+        columns = columns[visible][::-1]
+        colors = colors[visible][::-1]
+        columns, first = np.unique(columns, return_index=True)
+        line[columns] = colors[first]
+
+    def vblank(self):
+        self.frames += 1
+        self._window_line = 0
+        self.frame[:] = np.take_along_axis(self.palettes, self.indexed, axis=1)
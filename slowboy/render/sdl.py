@@ -0,0 +1,376 @@
+import logging
+from time import time
+import functools as ft
+from struct import unpack
+
+import sdl2
+from sdl2 import SDL_BlitSurface, SDL_Rect, SDL_Error
+
+from slowboy.gfx import ltorgba, decode_tile
+from slowboy.gpu import (
+    VRAM_START,
+    LCDC_DISPLAY_ENABLE_MASK,
+    LCDC_WINDOW_TILE_DISPLAY_SELECT_MASK,
+    LCDC_WINDOW_DISPLAY_ENABLE_MASK,
+    LCDC_BG_WINDOW_DATA_SELECT_MASK,
+    LCDC_BG_TILE_DISPLAY_SELECT_MASK,
+    LCDC_SPRITE_DISPLAY_ENABLE_MASK,
+    LCDC_BG_DISPLAY_MASK,
+    TWIDTH,
+    THEIGHT,
+    TSWIDTH_TILES,
+    TSHEIGHT_TILES,
+    SCREEN_WIDTH,
+    SCREEN_HEIGHT,
+    BACKGROUND_WIDTH,
+    BACKGROUND_HEIGHT,
+    FOREGROUND_WIDTH,
+    SPRITETAB_SIZE,
+    SPRITETAB_ENTRY_SIZE,
+)
+from slowboy.render import Renderer
+from slowboy.util import add_s8
+
+
+class SDLRenderer(Renderer):
+    """Keeps the tiles, background, window and sprites decoded on SDL
+    surfaces and blits them onto the window surface once per frame."""
+
+    def __init__(self, logger=None, log_level=None):
+        super().__init__()
+        if logger is None:
+            self.logger = logging.getLogger(__name__)
+        else:
+            self.logger = logger.getChild(__class__.__name__)
+        if log_level is not None:
+            self.logger.setLevel(log_level)
+
+        # SDL surfaces holding the decoded tiles, background, window and
+        # sprites. They are only needed to draw, so they are created by the
+        # first draw, see _init_surfaces. Until then, changes to VRAM and the
+        # registers aren't decoded.
+        self._bgsurface = None
+        self._fgsurface = None
+        self._spritesurface = None
+        self._spritetab = [(0, 0, 0, 0) for _ in range(SPRITETAB_SIZE)]
+        self._tileset = None
+        self._needs_update = False
+        self._needs_draw = False
+        # Set when OAM changes, so the sprite table is refreshed once before
+        # the next draw rather than on every write
+        self._stale_sprites = False
+        """Bitmap indicating which background tiles have been updated in
+        :py:attr:SDLRenderer._tileset but not :py:attr:SDLRenderer._bgsurface"""
+        self._stale_bgtiles = 0
+        """Bitmap indicating which foreground tiles have been updated in
+        :py:attr:SDLRenderer._tileset but not :py:attr:SDLRenderer._fgsurface"""
+        self._stale_fgtiles = 0
+
+        self.last_time = time()
+        self.frame_count = 0
+        self.fps = 0
+
+    def _init_surfaces(self):
+        """Creates the SDL surfaces and decodes the current tiles, background,
+        window and sprites into them, if that hasn't been done yet."""
+
+        if self._tileset is not None:
+            return
+
+        def create_surface(width, height):
+            return sdl2.SDL_CreateRGBSurfaceWithFormat(0, width, height, 32,
+                                                       sdl2.SDL_PIXELFORMAT_RGBA32)
+
+        self._bgsurface = create_surface(BACKGROUND_WIDTH, BACKGROUND_HEIGHT)
+        self._fgsurface = create_surface(BACKGROUND_WIDTH, BACKGROUND_HEIGHT)
+        # TODO may require changes for 8x16 sprites
+        self._spritesurface = create_surface(TWIDTH*SPRITETAB_SIZE, THEIGHT)
+        self._tileset = create_surface(16*TWIDTH, 16*THEIGHT)
+        self._update_tilesets()
+        self._update_bgsurface()
+        self._update_fgsurface()
+        # Refreshed by the next draw
+        self._stale_sprites = True
+
+    def refresh(self):
+        if self._tileset is not None:
+            self._update_tilesets()
+            self._update_surfaces()
+
+    def _update_tilesets(self):
+        """Update all tileset surfaces. Only needs to be called when pallete or
+        tile data (in VRAM) changes.
+        """
+
+        for i in range(TSWIDTH_TILES*TSHEIGHT_TILES):
+            self._update_tile(i)
+
+    def _update_surfaces(self):
+        self._update_bgsurface()
+        self._update_fgsurface()
+        self._update_sprite_surface()
+
+    def _update_bgsurface(self):
+        gpu = self.gpu
+        if gpu.lcdc & LCDC_BG_TILE_DISPLAY_SELECT_MASK:
+            # 1=9C00-9FFF
+            bgmap_start = 0x9c00 - VRAM_START
+        else:
+            # 0=9800-9BFF
+            bgmap_start = 0x9800 - VRAM_START
+
+        bgmap = gpu.vram[bgmap_start:bgmap_start+0x400]
+        if gpu.lcdc & LCDC_BG_WINDOW_DATA_SELECT_MASK == 0:
+            bgmap = bytes(map(ft.partial(add_s8, 128), bgmap))
+
+        bgsurface = self._bgsurface
+        stale_bgtiles = self._stale_bgtiles
+        width_tiles = BACKGROUND_WIDTH // TWIDTH
+        for i, tid in enumerate(bgmap):
+            if (stale_bgtiles >> tid) & 1 == 0:
+                continue
+            x = (i % width_tiles) * TWIDTH
+            y = (i // width_tiles) * THEIGHT
+            tx = (tid % TSWIDTH_TILES) * TWIDTH
+            ty = (tid // TSWIDTH_TILES) * THEIGHT
+            src = SDL_Rect(tx, ty, 8, 8)
+            dst = SDL_Rect(x, y, 8, 8)
+            SDL_BlitSurface(self._tileset, src, bgsurface, dst)
+
+        self._stale_bgtiles = 0
+
+    def _update_fgsurface(self):
+        gpu = self.gpu
+        if gpu.lcdc & LCDC_WINDOW_TILE_DISPLAY_SELECT_MASK:
+            # 1=9C00-9FFF
+            fgmap_start = 0x9c00 - VRAM_START
+        else:
+            # 0=9800-9BFF
+            fgmap_start = 0x9800 - VRAM_START
+
+        fgmap = gpu.vram[fgmap_start:fgmap_start+0x400]
+        if gpu.lcdc & LCDC_BG_WINDOW_DATA_SELECT_MASK == 0:
+            fgmap = bytes(map(ft.partial(add_s8, 128), fgmap))
+
+        fgsurface = self._fgsurface
+        stale_fgtiles = self._stale_fgtiles
+        width_tiles = FOREGROUND_WIDTH // TWIDTH
+        for i, tid in enumerate(fgmap):
+            if (stale_fgtiles >> tid) & 1 == 0:
+                continue
+            x = (i % width_tiles) * TWIDTH
+            y = (i // width_tiles) * THEIGHT
+            tx = (tid % TSWIDTH_TILES) * TWIDTH
+            ty = (tid // TSWIDTH_TILES) * THEIGHT
+            src = SDL_Rect(tx, ty, TWIDTH, THEIGHT)
+            dst = SDL_Rect(x, y, TWIDTH, THEIGHT)
+            SDL_BlitSurface(self._tileset, src, fgsurface, dst)
+
+        self._stale_fgtiles = 0
+
+    def _update_sprite_surface(self):
+        """When the tileset or sprite palette is updated, refresh the decoded
+        sprite surfaces.
+        """
+
+        self._init_surfaces()
+
+        oam = self.gpu.oam
+        for i in range(SPRITETAB_SIZE):
+            ent = unpack('BBBB',
+                         oam[i*SPRITETAB_ENTRY_SIZE:(i+1)*SPRITETAB_ENTRY_SIZE])
+            self._spritetab[i] = ent
+            ypos, xpos, tileid, attrs = ent
+            x = i * TWIDTH
+            y = 0
+            tx = (tileid % TSWIDTH_TILES) * TWIDTH
+            ty = (tileid // TSWIDTH_TILES) * THEIGHT
+            src = SDL_Rect(tx, ty, TWIDTH, THEIGHT)
+            dst = SDL_Rect(x, y, TWIDTH, THEIGHT)
+            SDL_BlitSurface(self._tileset, src, self._spritesurface, dst)
+        self._stale_sprites = False
+
+    def vblank(self):
+        self._needs_draw = True
+
+    def draw(self, surface):
+        """Returns True if surface was updated and False otherwise."""
+        if self._needs_draw:
+            self._init_surfaces()
+            self._needs_draw = False
+        else:
+            return False
+
+        self.frame_count += 1
+        if self.frame_count >= 20:
+            t = time()
+            diff = t - self.last_time
+            self.fps = self.frame_count / diff
+            self.last_time = t
+            self.frame_count %= 20
+            self.logger.info('{} fps'.format(self.fps))
+
+        gpu = self.gpu
+        if gpu.lcdc & LCDC_DISPLAY_ENABLE_MASK == 0:
+            dst = SDL_Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+            color = sdl2.SDL_MapRGB(surface.format, 0xff, 0xff, 0xff)
+            if sdl2.SDL_FillRect(surface, dst, color) < 0:
+                raise sdl2.SDL_Error()
+            return True
+
+        if self._needs_update:
+            self._needs_update = False
+
+        # draw background
+        if gpu.lcdc & LCDC_BG_DISPLAY_MASK:
+            src = SDL_Rect(gpu.scx, gpu.scy, SCREEN_WIDTH, SCREEN_HEIGHT)
+            dst = SDL_Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+            if SDL_BlitSurface(self._bgsurface, src, surface, dst) < 0:
+                raise sdl2.SDL_Error()
+        else:
+            dst = SDL_Rect(0, 0, SCREEN_WIDTH, SCREEN_HEIGHT)
+            color = sdl2.SDL_MapRGB(surface.format, 0xff, 0xff, 0xff)
+            if sdl2.SDL_FillRect(surface, dst, color) < 0:
+                raise sdl2.SDL_Error()
+
+        # draw foreground
+        if gpu.lcdc & LCDC_WINDOW_DISPLAY_ENABLE_MASK:
+            wx = gpu.wx
+            wy = gpu.wy
+            w = SCREEN_WIDTH - wx
+            h = SCREEN_HEIGHT - wy
+            src = SDL_Rect(0, 0, w, h)
+            dst = SDL_Rect(wx, wy, w, h)
+            if SDL_BlitSurface(self._fgsurface, src, surface, dst) < 0:
+                raise sdl2.SDL_Error()
+
+        # draw sprites
+        if gpu.lcdc & LCDC_SPRITE_DISPLAY_ENABLE_MASK:
+            if self._stale_sprites:
+                self._update_sprite_surface()
+            for i, ent in enumerate(self._spritetab):
+                ypos, xpos, tileid, attrs = ent
+                # offscreen
+                if ypos == 0 or ypos >= 160 or xpos == 0 or xpos >= 168:
+                    continue
+                sx = i * TWIDTH
+                sy = 0
+                src = SDL_Rect(sx, sy, TWIDTH, THEIGHT)
+                dx = xpos - 8
+                dy = ypos - 16
+                dst = SDL_Rect(dx, dy, TWIDTH, THEIGHT)
+                if SDL_BlitSurface(self._spritesurface, src, surface, dst) < 0:
+                    raise SDL_Error()
+
+        return True
+
+    def dump_tileset(self, filename):
+        self._init_surfaces()
+        if sdl2.SDL_SaveBMP(self._tileset, bytes(filename, encoding='utf-8')) < 0:
+            raise SDL_Error()
+
+    def dump_background(self, filename):
+        self._init_surfaces()
+        if sdl2.SDL_SaveBMP(self._bgsurface, bytes(filename, encoding='utf-8')) < 0:
+            raise SDL_Error()
+
+    def dump_foreground(self, filename):
+        self._init_surfaces()
+        if sdl2.SDL_SaveBMP(self._fgsurface, bytes(filename, encoding='utf-8')) < 0:
+            raise SDL_Error()
+
+    def _update_tile(self, tileid):
+        """Update tile :py:obj:`i` in :py:attr:`SDLRenderer._tileset`.
+        """
+        self._init_surfaces()
+        lcdc = self.gpu.lcdc
+        if (lcdc & LCDC_WINDOW_DISPLAY_ENABLE_MASK == 0) and \
+           (lcdc & LCDC_BG_DISPLAY_MASK == 0):
+            return
+
+        # Skip invalid tiles--this means vram got updated for an unselected
+        # tileset.
+        if tileid < 0 or tileid >= 0x100:
+            return
+
+        tile_idx = tileid * 16
+        encoded_tile = self.gpu.vram[tile_idx:tile_idx+16]
+        # Decode the tile from 2-bit color to RGBA
+        decoded_tile = decode_tile(encoded_tile, self.gpu._palette)
+        rgba_data = bytearray(len(decoded_tile)*4)
+        for i, b in enumerate(decoded_tile):
+            c = ltorgba(b)
+            rgba_data[4*i+0] = (c >> 24) & 0xff
+            rgba_data[4*i+1] = (c >> 16) & 0xff
+            rgba_data[4*i+2] = (c >> 8) & 0xff
+            rgba_data[4*i+3] = c & 0xff
+        tile_surface = sdl2.SDL_CreateRGBSurfaceWithFormatFrom(
+            bytes(rgba_data),
+            TWIDTH, THEIGHT,
+            32, TWIDTH*4,
+            sdl2.SDL_PIXELFORMAT_RGBA32)
+        if not tile_surface:
+            raise SDL_Error()
+        x = (tileid % TSWIDTH_TILES) * TWIDTH
+        y = (tileid // TSWIDTH_TILES) * THEIGHT
+        dst = SDL_Rect(x, y, TWIDTH, THEIGHT)
+        if sdl2.SDL_BlitSurface(tile_surface, None, self._tileset, dst) < 0:
+            sdl2.SDL_FreeSurface(tile_surface)
+            raise SDL_Error()
+
+        sdl2.SDL_FreeSurface(tile_surface)
+
+        self._stale_bgtiles |= (1 << tileid)
+        self._stale_fgtiles |= (1 << tileid)
+
+    def register_changed(self, name):
+        """If BG display is disabled (lcdc), :py:attr:`SDLRenderer._update_tile`
+        will do nothing. When BG display is enabled, all background tile
+        surfaces will be decoded.
+
+        Same with sprite display.
+
+        Nothing is decoded before the surfaces are created, since they are
+        decoded from scratch then.
+        """
+
+        if self._tileset is None:
+            self._needs_update = True
+            return
+
+        if name == 'lcdc':
+            self._update_tilesets()
+            self._update_surfaces()
+        elif name == 'bgp':
+            self._update_tilesets()
+            self._update_bgsurface()
+            self._update_fgsurface()
+        elif name == 'obp0' or name == 'obp1':
+            self._update_sprite_surface()
+        self._needs_update = True
+
+    def vram_changed(self, addr, value):
+        if self._tileset is None:
+            self._needs_update = True
+            return
+
+        lcdc = self.gpu.lcdc
+        if lcdc & LCDC_DISPLAY_ENABLE_MASK \
+                and (lcdc & LCDC_WINDOW_DISPLAY_ENABLE_MASK or lcdc & LCDC_BG_DISPLAY_MASK):
+            addr += VRAM_START
+            # Tilemap data
+            if 0x9800 <= addr < 0xa000:
+                self._update_surfaces()
+            # Tile data
+            elif 0x8000 <= addr < 0x9800:
+                if lcdc & LCDC_BG_WINDOW_DATA_SELECT_MASK == 0:
+                    # 0x8800-0x97ff
+                    tile = (addr - 0x8800) // 16
+                else:
+                    # 0x8000-0x8fff
+                    tile = (addr - 0x8000) // 16
+                self._update_tile(tile)
+        self._needs_update = True
+
+    def oam_changed(self):
+        self._stale_sprites = True
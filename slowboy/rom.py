@@ -0,0 +1,102 @@
+"""Loading ROM images without copying them.
+
+ROM files are memory-mapped read-only and handed out as read-only
+``memoryview`` objects. Every emulator in a process that opens the same file
+gets a view of the same mapping, so the image is in memory once no matter how
+many instances run it, and pages that are never read are never loaded.
+
+Processes can share an image through :py:mod:`multiprocessing.shared_memory`:
+the parent copies it into a shared memory block once with
+:py:func:`share_rom`, and workers map that block with :py:func:`attach_rom`.
+"""
+
+import mmap
+import os
+import weakref
+
+
+# Mappings of ROM files, keyed by path, size and modification time. A mapping
+# stays open as long as some view of it is alive.
+_mappings = weakref.WeakValueDictionary()
+
+# Shared memory blocks attached to by this process, by name
+_attached = {}
+
+
+def open_rom(path):
+    """Returns a read-only view of the ROM file at :py:data:path. Files
+    already opened by this process, and not modified since, share one
+    mapping.
+
+    :param path: path of the ROM file
+    :rtype: memoryview"""
+
+    path = os.path.realpath(path)
+    stat = os.stat(path)
+    if stat.st_size == 0:
+        # Empty files can't be mapped
+        return memoryview(b'')
+    key = (path, stat.st_size, stat.st_mtime_ns)
+    mapping = _mappings.get(key)
+    if mapping is None:
+        with open(path, 'rb') as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        _mappings[key] = mapping
+    return memoryview(mapping)
+
+
+def share_rom(rom, name=None):
+    """Copies the ROM image :py:data:rom into a new shared memory block that
+    other processes can map with :py:func:`attach_rom`. The caller owns the
+    block: it must call ``close()`` and ``unlink()`` on it when the workers are
+    done.
+
+    :param rom: the ROM image
+    :param name: name for the block, or None to generate one
+    :rtype: multiprocessing.shared_memory.SharedMemory"""
+
+    from multiprocessing.shared_memory import SharedMemory
+
+    shm = SharedMemory(name=name, create=True, size=max(len(rom), 1))
+    shm.buf[:len(rom)] = rom
+    return shm
+
+
+def attach_rom(name, size=None):
+    """Returns a read-only view of the ROM image in the shared memory block
+    :py:data:name, created with :py:func:`share_rom`. The block is attached
+    once per process and stays attached until :py:func:`detach_rom`.
+
+    :param name: name of the shared memory block
+    :param size: size of the ROM image. Some platforms round the block up to
+        a whole number of pages, so pass the image size to drop the padding.
+    :rtype: memoryview"""
+
+    from multiprocessing.shared_memory import SharedMemory
+
+    shm = _attached.get(name)
+    if shm is None:
+        try:
+            # Don't let this process's resource tracker unlink a block it
+            # doesn't own when it exits
+            shm = SharedMemory(name=name, track=False)
+        except TypeError:
+            shm = SharedMemory(name=name)
+        _attached[name] = shm
+    view = shm.buf.toreadonly()
+    if size is not None:
+        view = view[:size]
+    return view
+
+
+def detach_rom(name):
+    """Detaches this process from the shared memory block :py:data:name. All
+    views returned by :py:func:`attach_rom` for it, and the emulators using
+    them, must have been released, or ``BufferError`` is raised.
+
+    :param name: name of the shared memory block
+    :rtype: None"""
+
+    shm = _attached.pop(name, None)
+    if shm is not None:
+        shm.close()
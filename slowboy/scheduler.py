@@ -0,0 +1,111 @@
+"""Event scheduler for the devices clocked by the CPU.
+
+Instead of notifying every device after every instruction, each device tells
+the scheduler the absolute clock value of its next event (a GPU mode
+transition, a TIMA increment, ...). The CPU runs until the earliest of these
+deadlines, then the scheduler brings the devices that are due up to date.
+Devices that have state which is not covered by events (the DIV register, for
+example) are synced when the CPU accesses their registers.
+"""
+
+import abc
+import heapq
+import itertools
+
+
+# Deadline of a device with no pending event
+NEVER = float('inf')
+
+
+class Device(metaclass=abc.ABCMeta):
+    @abc.abstractmethod
+    def sync(self, clock: int=None):
+        """Bring the device up to date with the CPU clock, then schedule its
+        next event.
+
+        :param clock: The current value of the CPU clock. If None, the
+            device asks its scheduler."""
+        pass
+
+
+class Scheduler():
+    """A min-heap of device deadlines.
+
+    Each device has at most one pending event. Rescheduling a device leaves
+    its old heap entry in place; stale entries are skipped when they reach the
+    top of the heap."""
+
+    def __init__(self, now=None):
+        """
+        :param now: function returning the current value of the CPU clock"""
+
+        self.now = now if now is not None else lambda: 0
+        self.next_deadline = NEVER
+        self._heap = []
+        self._deadlines = {}
+        self._seq = itertools.count()
+
+    @property
+    def devices(self):
+        return list(self._deadlines)
+
+    def add_device(self, device: Device):
+        """Start scheduling :py:data:device. The device has no pending event
+        until it calls :py:meth:schedule.
+
+        :param device: the device to add
+        :rtype: None"""
+
+        if device not in self._deadlines:
+            self._deadlines[device] = NEVER
+
+    def schedule(self, device: Device, deadline):
+        """Set the next event of :py:data:device to :py:data:deadline,
+        replacing any event that was already scheduled.
+
+        :param device: a device previously added with :py:meth:add_device
+        :param deadline: absolute clock value, or :py:data:NEVER
+        :rtype: None"""
+
+        self._deadlines[device] = deadline
+        if deadline != NEVER:
+            heapq.heappush(self._heap, (deadline, next(self._seq), device))
+        self._update_next_deadline()
+
+    def deadline(self, device: Device):
+        """Returns the deadline of the next event of :py:data:device."""
+
+        return self._deadlines[device]
+
+    def run(self, clock):
+        """Sync every device whose next event is due at :py:data:clock.
+
+        :param clock: the current value of the CPU clock
+        :rtype: None"""
+
+        heap = self._heap
+        deadlines = self._deadlines
+        while heap and heap[0][0] <= clock:
+            deadline, _, device = heapq.heappop(heap)
+            if deadlines[device] != deadline:
+                # Rescheduled since this entry was pushed
+                continue
+            deadlines[device] = NEVER
+            device.sync(clock)
+        self._update_next_deadline()
+
+    def sync(self, clock):
+        """Sync every device, whether or not it has an event due.
+
+        :param clock: the current value of the CPU clock
+        :rtype: None"""
+
+        for device in self.devices:
+            device.sync(clock)
+
+    def _update_next_deadline(self):
+        heap = self._heap
+        deadlines = self._deadlines
+        while heap and deadlines[heap[0][2]] != heap[0][0]:
+            heapq.heappop(heap)
+        self.next_deadline = heap[0][0] if heap else NEVER
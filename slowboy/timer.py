@@ -1,11 +1,12 @@
 
 import logging
 
-from slowboy.util import ClockListener
+from slowboy.util import ClockListener, property_hooks
 from slowboy.interrupts import InterruptType, InterruptListener
+from slowboy.scheduler import Device, NEVER
 
 
-class Timer(ClockListener):
+class Timer(ClockListener, Device):
     def __init__(self, logger=None, log_level=logging.WARNING):
         if logger is None:
             self.logger = logging.getLogger(__name__)
@@ -14,6 +15,10 @@ class Timer(ClockListener):
         self.logger.propagate = True
         self.logger.setLevel(log_level)
 
+        self.scheduler = None
+        # CPU clock the counters were last brought up to date with
+        self._clock = 0
+
         self._div = 0
         self.div = 0
         self._tima = 0
@@ -34,19 +39,68 @@ class Timer(ClockListener):
         for listener in self.interrupt_listeners:
             listener.notify_interrupt(InterruptType.timer)
 
+    def io_hooks(self):
+        """Returns the hooks for the timer's registers, for
+        :py:meth:slowboy.mmu.MMU.add_io_hooks. The counters are brought up
+        to date before they are accessed. Writes to TAC bring them up to date
+        themselves, before the period changes."""
+
+        return {
+            0xff04: property_hooks(self, 'div', self.sync),
+            0xff05: property_hooks(self, 'tima', self.sync),
+            0xff06: property_hooks(self, 'tma'),
+            0xff07: property_hooks(self, 'tac'),
+        }
+
+    def load_scheduler(self, scheduler):
+        self.scheduler = scheduler
+        self._clock = scheduler.now()
+        scheduler.add_device(self)
+        self.schedule()
+
     def notify(self, clock, cycles):
+        self._div_cycles += cycles
+        if self._div_cycles >= 488:
+            self.div += self._div_cycles // 488
+            self._div_cycles %= 488
+
         if self.tac & 0x4 == 0:
             return
 
         self._cycles += cycles
-        if self._cycles >= self._period:
-            self.tima += 1
-            self._cycles %= self._period
+        if self._cycles < self._period:
+            return
+        tima = self._tima + self._cycles // self._period
+        self._cycles %= self._period
+        if tima > 0xff:
+            # TIMA overflowed and was reloaded from TMA, then counted on from
+            # there, maybe overflowing again. The interrupt is requested once
+            # either way.
+            tima = self._tma + (tima - 0x100) % (0x100 - self._tma)
+            self.notify_interrupt_listeners()
+        self._tima = tima
 
-        self._div_cycles += cycles
-        if self._div_cycles >= 488:
-            self.div += 1
-            self._div_cycles %= 488
+    def sync(self, clock=None):
+        """Advance the counters to :py:data:clock and schedule the next TIMA
+        overflow. DIV and TIMA are only brought up to date here, so they must
+        be synced before they are read."""
+
+        if self.scheduler is None:
+            return
+        if clock is None:
+            clock = self.scheduler.now()
+        self.notify(clock, clock - self._clock)
+        self._clock = clock
+        self.schedule()
+
+    def schedule(self):
+        """Tell the scheduler when TIMA will next overflow."""
+
+        if self.tac & 0x4 == 0:
+            deadline = NEVER
+        else:
+            deadline = self._clock + (0x100 - self._tima) * self._period - self._cycles
+        self.scheduler.schedule(self, deadline)
 
     @property
     def div(self):
@@ -62,11 +116,10 @@ class Timer(ClockListener):
 
     @tima.setter
     def tima(self, value):
-        tmp = self._tima
         self._tima = value & 0xff
 
-        if self._tima > tmp:
-            self.notify_interrupt_listeners()
+        if self.scheduler is not None:
+            self.schedule()
 
     @property
     def tma(self):
@@ -82,6 +135,10 @@ class Timer(ClockListener):
 
     @tac.setter
     def tac(self, value):
+        # Count the cycles so far at the old rate
+        if self.scheduler is not None:
+            self.sync()
+
         self._tac = value & 0x7
 
         clock_select = value & 0x3
@@ -93,3 +150,6 @@ class Timer(ClockListener):
             self._period = 8000000 // 65536
         elif clock_select == 3:
             self._period = 8000000 // 16384
+
+        if self.scheduler is not None:
+            self.schedule()
@@ -0,0 +1,574 @@
+"""Basic-block translator for the Z80 core.
+
+The translator decodes a straight-line run of instructions starting at some PC
+(a *basic block*), emits Python source that performs the whole run, and
+compiles it once into a function. Blocks are cached by address and ROM bank,
+so hot loops pay for decoding and dispatch only the first time through.
+
+Common instructions (loads, 8-bit increments and decrements, logic ops,
+compares, relative and absolute jumps) are emitted inline. Everything else is
+emitted as a direct call to the interpreter's handler for that opcode, which
+still saves the fetch and the dispatch.
+
+A block is called with a budget of cycles, up to the next device event. It
+stops before the first instruction that would start at or after the budget
+runs out, as the interpreter would stop to run the devices there, so device
+events and the interrupts they request are seen at the same instruction
+either way.
+
+Code in ROM, WRAM and HRAM is translated. Instructions that access IO
+registers directly or change the CPU's run or interrupt state are always left
+to the interpreter; a block ends just before one of them. Instructions that
+access memory through a register are checked as they run: if the address is
+at or above 0xff00, the block stops before the instruction, so it runs with
+the clock up to date, or, if it is the first instruction of the block, right
+after it, so an interrupt it requests is taken.
+
+Games copy routines into RAM and run them there (the OAM DMA routine in HRAM
+is the classic case), and may later overwrite them. When a block in RAM is
+compiled, the pages it covers are marked in :py:attr:slowboy.mmu.MMU.code_pages,
+and a write to a marked page drops every block containing the written
+address. A block in RAM may overwrite its own code, so it stops after any
+store that dropped a block, and the instructions after the store are decoded
+again.
+"""
+
+import linecache
+import logging
+
+from slowboy.util import Op
+from slowboy.opcodes import INSTRUCTIONS
+from slowboy.scheduler import NEVER
+from slowboy.alu import SUB, AND_FLAGS, OR_FLAGS, INC_FLAGS, DEC_FLAGS
+
+
+# Register encoded by the r8 field of an opcode. Index 6 is (hl).
+R8 = ('b', 'c', 'd', 'e', 'h', 'l', None, 'a')
+
+IMM8_OPCODES = frozenset([
+    0x06, 0x0e, 0x16, 0x1e, 0x26, 0x2e, 0x36, 0x3e,
+    0x18, 0x20, 0x28, 0x30, 0x38,
+    0xc6, 0xce, 0xd6, 0xde, 0xe6, 0xee, 0xf6, 0xfe,
+    0xe0, 0xf0, 0xe8, 0xf8,
+])
+
+IMM16_OPCODES = frozenset([
+    0x01, 0x11, 0x21, 0x31, 0x08,
+    0xc2, 0xc3, 0xca, 0xd2, 0xda,
+    0xc4, 0xcc, 0xcd, 0xd4, 0xdc,
+    0xea, 0xfa,
+])
+
+# Instructions that may change PC. A block always ends with one of these if it
+# contains one.
+BRANCH_OPCODES = frozenset([
+    0x18, 0x20, 0x28, 0x30, 0x38,
+    0xc2, 0xc3, 0xca, 0xd2, 0xda, 0xe9,
+    0xc4, 0xcc, 0xcd, 0xd4, 0xdc,
+    0xc0, 0xc8, 0xc9, 0xd0, 0xd8, 0xd9,
+    0xc7, 0xcf, 0xd7, 0xdf, 0xe7, 0xef, 0xf7, 0xff,
+])
+
+# Instructions that are never translated: stop, halt, di, ei, reti and the
+# ldh family, which address IO registers directly.
+INTERPRETED_OPCODES = frozenset([
+    0x10, 0x76, 0xf3, 0xfb, 0xd9,
+    0xe0, 0xf0, 0xe2, 0xf2,
+])
+
+# Instructions that write memory, other than calls and rst, which end a block
+# anyway. cb-prefixed instructions on (hl) other than bit also write.
+STORE_OPCODES = frozenset([
+    0x02, 0x12, 0x22, 0x32, 0x34, 0x35, 0x36,
+    0x70, 0x71, 0x72, 0x73, 0x74, 0x75, 0x77,
+    0x08, 0xea, 0xc5, 0xd5, 0xe5, 0xf5,
+])
+
+# Absolute loads and stores at or above this address are IO-sensitive.
+IO_START = 0xff00
+
+MAX_BLOCK_LENGTH = 32
+
+# (start, end) of the regions code is translated in. A block never crosses the
+# end of its region.
+REGIONS = (
+    (0x0000, 0x4000),  # ROM bank 0
+    (0x4000, 0x8000),  # switchable ROM bank
+    (0xc000, 0xe000),  # WRAM
+    (0xff80, 0xffff),  # HRAM
+)
+
+# Flag tables that translated code looks up
+ALU_TABLES = {
+    'SUB': SUB,
+    'AND_FLAGS': AND_FLAGS,
+    'OR_FLAGS': OR_FLAGS,
+    'INC_FLAGS': INC_FLAGS,
+    'DEC_FLAGS': DEC_FLAGS,
+}
+
+# Branch conditions for jr/jp/call/ret cc, as an expression on the flags that is true
+# when the branch is taken. {flags} is the pending flags or F, see
+# Z80._sync_flags.
+CONDITIONS = {
+    0: 'not {flags} & 0x80',
+    1: '{flags} & 0x80',
+    2: 'not {flags} & 0x10',
+    3: '{flags} & 0x10',
+}
+
+
+def instruction_length(opcode):
+    """Returns the length in bytes of the instruction starting with
+    :py:data:opcode, including its operands.
+
+    :param opcode: the first byte of the instruction
+    :rtype: int"""
+
+    if opcode == 0xcb or opcode in IMM8_OPCODES:
+        return 2
+    elif opcode in IMM16_OPCODES:
+        return 3
+    else:
+        return 1
+
+
+class BlockTranslator():
+    """Translates and caches basic blocks for a :py:class:slowboy.z80.Z80.
+
+    Blocks are :py:class:slowboy.util.Op tuples: calling the function runs the
+    whole block and leaves PC at the next instruction to execute, and the
+    cycle count is the sum of the cycle counts of its instructions. The
+    function takes an optional budget of cycles, and stops before any
+    instruction after the first that would start once it is spent. If the
+    block stops early because of the budget or at an IO access, or ends with
+    a conditional branch that is not taken, the function returns the cycles
+    and the number of instructions it ran instead of None."""
+
+    def __init__(self, cpu, logger=None, log_level=logging.WARNING):
+        if logger is None:
+            self.logger = logging.getLogger(__name__)
+        else:
+            self.logger = logger.getChild(__class__.__name__)
+        self.logger.setLevel(log_level)
+
+        self.cpu = cpu
+        self.blocks = {}
+        # Set when a write drops a block. Blocks in RAM check it after each
+        # store and stop if it is set, since the block dropped may be the one
+        # running. A write from the interpreter may leave it set, which only
+        # stops the next block to check it early.
+        self.modified = False
+        # For each marked RAM page, the (start, end) address ranges of the
+        # blocks that overlap it.
+        self.page_blocks = {}
+        cpu.mmu.load_translator(self)
+
+    @staticmethod
+    def region_end(pc):
+        """Returns the end of the region containing :py:data:pc, or None if
+        code at that address is not translated.
+
+        :param pc: address of the first instruction
+        :rtype: int or None"""
+
+        for start, end in REGIONS:
+            if start <= pc < end:
+                return end
+        return None
+
+    def block_key(self, pc):
+        """Returns the cache key for a block starting at :py:data:pc, or None
+        if code at that address is not translated.
+
+        :param pc: address of the first instruction
+        :rtype: int or None"""
+
+        if pc < 0x4000:
+            return (self.cpu.mmu.rom0_bank << 16) | pc
+        elif pc < 0x8000:
+            return (self.cpu.mmu.rom_bank << 16) | pc
+        elif self.region_end(pc) is not None:
+            return pc
+        else:
+            return None
+
+    def lookup(self, pc):
+        """Returns the block starting at :py:data:pc, translating it first if
+        needed, or None if the instruction at :py:data:pc must be
+        interpreted.
+
+        :param pc: address of the first instruction
+        :rtype: Op or None"""
+
+        key = self.block_key(pc)
+        if key is None:
+            return None
+        try:
+            return self.blocks[key]
+        except KeyError:
+            block = self.translate(pc)
+            self.blocks[key] = block
+            return block
+
+    def invalidate(self):
+        """Drops every cached block."""
+
+        self.blocks.clear()
+        self.page_blocks.clear()
+        self.cpu.mmu.clear_code_pages()
+
+    def invalidate_addr(self, addr):
+        """Drops the cached blocks in RAM that contain :py:data:addr. Called by
+        the MMU on writes to a page marked in
+        :py:attr:slowboy.mmu.MMU.code_pages.
+
+        :param addr: the address written to
+        :rtype: None"""
+
+        for start, end in list(self.page_blocks.get(addr >> 8, ())):
+            if start <= addr < end:
+                self._unmark(start, end)
+                # Blocks in RAM are keyed by their start address
+                self.blocks.pop(start, None)
+                self.modified = True
+
+    def _mark(self, start, end):
+        mmu = self.cpu.mmu
+        for page in range(start >> 8, ((end - 1) >> 8) + 1):
+            self.page_blocks.setdefault(page, []).append((start, end))
+            if not mmu.code_pages[page]:
+                mmu.mark_code_page(page)
+
+    def _unmark(self, start, end):
+        mmu = self.cpu.mmu
+        for page in range(start >> 8, ((end - 1) >> 8) + 1):
+            ranges = self.page_blocks[page]
+            ranges.remove((start, end))
+            if not ranges:
+                del self.page_blocks[page]
+                mmu.unmark_code_page(page)
+
+    def translate(self, pc):
+        """Decodes the block starting at :py:data:pc and compiles it.
+
+        :param pc: address of the first instruction
+        :rtype: Op or None"""
+
+        cpu = self.cpu
+        get_addr = cpu.mmu.get_addr
+        limit = self.region_end(pc)
+        # The handlers of conditional branches change cpu.cycles as they run
+        op_cycles_table = cpu.opcode_tables().cycles
+
+        body = []
+        handlers = []
+        cycles = 0
+        count = 0
+        addr = pc
+        branch = False
+
+        while count < MAX_BLOCK_LENGTH and not branch:
+            opcode = get_addr(addr)
+            length = instruction_length(opcode)
+            if addr + length > limit:
+                break
+            operands = [get_addr(addr + i) for i in range(1, length)]
+
+            if opcode == 0xcb:
+                cb_opcode = operands[0]
+                if cb_opcode not in cpu.cb_opcode_map:
+                    break
+                lines = ['h{}()'.format(len(handlers))]
+                handlers.append(cpu.cb_handlers[cb_opcode])
+                op_cycles = cpu.cb_cycles[cb_opcode]
+            else:
+                if (opcode not in cpu.opcode_map or
+                        self.is_interpreted(opcode, operands)):
+                    break
+                lines = self._emit(opcode, addr, operands)
+                if lines is None:
+                    # No specialized source: call the handler
+                    lines = []
+                    if length > 1 or opcode in BRANCH_OPCODES:
+                        lines.append('cpu._pc = {:#06x}'.format(addr + 1))
+                    lines.append('h{}()'.format(len(handlers)))
+                    handlers.append(cpu.handlers[opcode])
+                op_cycles = op_cycles_table[opcode]
+                branch = opcode in BRANCH_OPCODES
+
+                not_taken = INSTRUCTIONS[opcode].cycles_not_taken
+                if not_taken is not None:
+                    # A conditional branch that falls through takes fewer
+                    # cycles. The branch leaves the flags alone.
+                    cond = CONDITIONS[(opcode >> 3) & 3].format(
+                        flags='(regs[{}] or regs[{}])'.format(
+                            cpu.flags_slot, cpu.reg8_slot('f')))
+                    lines = lines + ['if not ({}):'.format(cond),
+                                     '    return ({}, {})'.format(
+                                         cycles + not_taken, count + 1)]
+
+            address = self.indirect_address(opcode, operands)
+            if address is not None:
+                io = 'm >= {:#06x}'.format(IO_START)
+                if count == 0:
+                    lines = (['m = ' + address] + lines +
+                             ['if {}:'.format(io),
+                              '    cpu._pc = {:#06x}'.format(addr + length),
+                              '    return ({}, 1)'.format(op_cycles)])
+                else:
+                    lines = (['m = ' + address,
+                              'if {}:'.format(io),
+                              '    cpu._pc = {:#06x}'.format(addr),
+                              '    return ({}, {})'.format(cycles, count)] +
+                             lines)
+
+            if pc >= 0x8000 and self.is_store(opcode, operands):
+                # The store may have overwritten the rest of the block
+                lines = lines + ['if translator.modified:',
+                                 '    translator.modified = False',
+                                 '    cpu._pc = {:#06x}'.format(addr + length),
+                                 '    return ({}, {})'.format(
+                                     cycles + op_cycles, count + 1)]
+
+            body.append('# {:#06x}'.format(addr))
+            if count > 0:
+                # The interpreter would run the devices before this
+                # instruction
+                body.extend(['if budget <= {}:'.format(cycles),
+                             '    cpu._pc = {:#06x}'.format(addr),
+                             '    return ({}, {})'.format(cycles, count)])
+            body.extend(lines)
+            cycles += op_cycles
+            count += 1
+            addr += length
+
+        if pc >= 0x8000:
+            # Watch the block's code for writes, or just the first byte if
+            # there is no block, so the address is looked at again if the
+            # code changes.
+            self._mark(pc, max(addr, pc + 1))
+
+        if count == 0:
+            return None
+
+        if not branch:
+            body.append('cpu._pc = {:#06x}'.format(addr))
+
+        name = '<block {:#06x}>'.format(pc)
+        params = ', '.join(['cpu', 'translator', 'regs', 'get_addr', 'set_addr'] +
+                           ['h{}'.format(i) for i in range(len(handlers))])
+        source = 'def make({}):\n    def block(budget=NEVER):\n{}\n    return block\n'.format(
+            params, '\n'.join('        ' + line for line in body))
+        namespace = dict(ALU_TABLES, NEVER=NEVER)
+        exec(compile(source, name, 'exec'), namespace)
+        linecache.cache[name] = (len(source), None, source.splitlines(True), name)
+        function = namespace['make'](cpu, self, cpu.regs, cpu.mmu.get_addr,
+                                     cpu.mmu.set_addr, *handlers)
+
+        self.logger.debug('translated %d instructions at %#06x-%#06x',
+                          count, pc, addr)
+        return Op(function, cycles,
+                  'block {:#06x}-{:#06x} ({} instructions)'.format(pc, addr, count),
+                  count)
+
+    @staticmethod
+    def is_interpreted(opcode, operands):
+        """Returns True if the instruction must be left to the interpreter.
+
+        :param opcode: the first byte of the instruction
+        :param operands: the bytes following the opcode
+        :rtype: bool"""
+
+        if opcode in INTERPRETED_OPCODES:
+            return True
+        elif opcode in (0xea, 0xfa):
+            # ld (a16), a; ld a, (a16) with an IO register address
+            return (operands[1] << 8) | operands[0] >= IO_START
+        return False
+
+    @staticmethod
+    def is_store(opcode, operands):
+        """Returns True if the instruction writes memory and doesn't end the
+        block.
+
+        :param opcode: the first byte of the instruction
+        :param operands: the bytes following the opcode
+        :rtype: bool"""
+
+        if opcode == 0xcb:
+            return operands[0] & 0x07 == 6 and not 0x40 <= operands[0] < 0x80
+        return opcode in STORE_OPCODES
+
+    def indirect_address(self, opcode, operands):
+        """Returns an expression for the address the instruction reads or
+        writes through a register pair, or None if it doesn't.
+
+        :param opcode: the first byte of the instruction
+        :param operands: the bytes following the opcode
+        :rtype: str or None"""
+
+        if opcode == 0xcb:
+            pair = 'hl' if operands[0] & 0x07 == 6 else None
+        elif opcode in (0x02, 0x0a):
+            pair = 'bc'
+        elif opcode in (0x12, 0x1a):
+            pair = 'de'
+        elif opcode in (0x22, 0x2a, 0x32, 0x3a, 0x34, 0x35, 0x36):
+            pair = 'hl'
+        elif 0x40 <= opcode < 0x80 and opcode != 0x76:
+            pair = 'hl' if opcode & 0x07 == 6 or opcode & 0x38 == 0x30 else None
+        elif 0x80 <= opcode < 0xc0:
+            pair = 'hl' if opcode & 0x07 == 6 else None
+        else:
+            pair = None
+        if pair is None:
+            return None
+        hi, lo = self.cpu.reg16_slots(pair)
+        return '((regs[{}] << 8) | regs[{}])'.format(hi, lo)
+
+    def _emit(self, opcode, addr, operands):
+        """Returns the lines of source for one instruction, or None if the
+        instruction should be executed by calling its handler.
+
+        :param opcode: the first byte of the instruction
+        :param addr: address of the instruction
+        :param operands: the bytes following the opcode
+        :rtype: [str] or None"""
+
+        cpu = self.cpu
+        slot = cpu.reg8_slot
+        a = slot('a')
+        f = slot('f')
+        p = cpu.flags_slot
+        flags = '(regs[{}] or regs[{}])'.format(p, f)
+        hl = '((regs[{}] << 8) | regs[{}])'.format(slot('h'), slot('l'))
+        next_addr = addr + 1 + len(operands)
+
+        if opcode == 0x00:
+            # nop
+            return []
+
+        elif 0x40 <= opcode < 0x80:
+            # ld r8, r8
+            dest = R8[(opcode >> 3) & 7]
+            src = R8[opcode & 7]
+            if src is None:
+                return ['regs[{}] = get_addr({}) & 0xff'.format(slot(dest), hl)]
+            elif dest is None:
+                return ['set_addr({}, regs[{}])'.format(hl, slot(src))]
+            else:
+                return ['regs[{}] = regs[{}]'.format(slot(dest), slot(src))]
+
+        elif opcode & 0xc7 == 0x06:
+            # ld r8, d8
+            dest = R8[(opcode >> 3) & 7]
+            if dest is None:
+                return ['set_addr({}, {:#04x})'.format(hl, operands[0])]
+            else:
+                return ['regs[{}] = {:#04x}'.format(slot(dest), operands[0])]
+
+        elif opcode in (0x01, 0x11, 0x21):
+            # ld r16, d16
+            hi, lo = cpu.reg16_slots(('bc', 'de', 'hl')[opcode >> 4])
+            return ['regs[{}] = {:#04x}'.format(hi, operands[1]),
+                    'regs[{}] = {:#04x}'.format(lo, operands[0])]
+
+        elif opcode == 0x31:
+            # ld sp, d16
+            return ['cpu._sp = {:#06x}'.format((operands[1] << 8) | operands[0])]
+
+        elif opcode in (0x02, 0x12):
+            # ld (bc), a; ld (de), a
+            hi, lo = cpu.reg16_slots(('bc', 'de')[opcode >> 4])
+            return ['set_addr((regs[{}] << 8) | regs[{}], regs[{}])'.format(hi, lo, a)]
+
+        elif opcode in (0x0a, 0x1a):
+            # ld a, (bc); ld a, (de)
+            hi, lo = cpu.reg16_slots(('bc', 'de')[opcode >> 4])
+            return ['regs[{}] = get_addr((regs[{}] << 8) | regs[{}]) & 0xff'.format(a, hi, lo)]
+
+        elif opcode in (0x22, 0x32, 0x2a, 0x3a):
+            # ldi/ldd (hl), a; ldi/ldd a, (hl)
+            step = '1' if opcode & 0xf0 == 0x20 else '0xffff'
+            if opcode & 0x0f == 0x02:
+                access = 'set_addr(addr, regs[{}])'.format(a)
+            else:
+                access = 'regs[{}] = get_addr(addr) & 0xff'.format(a)
+            return ['addr = {}'.format(hl),
+                    access,
+                    'addr = (addr + {}) & 0xffff'.format(step),
+                    'regs[{}] = addr >> 8'.format(slot('h')),
+                    'regs[{}] = addr & 0xff'.format(slot('l'))]
+
+        elif opcode in (0xea, 0xfa):
+            # ld (a16), a; ld a, (a16)
+            imm16 = (operands[1] << 8) | operands[0]
+            if opcode == 0xea:
+                return ['set_addr({:#06x}, regs[{}])'.format(imm16, a)]
+            else:
+                return ['regs[{}] = get_addr({:#06x}) & 0xff'.format(a, imm16)]
+
+        elif opcode & 0xc7 == 0x04 and opcode != 0x34:
+            # inc r8
+            r = slot(R8[(opcode >> 3) & 7])
+            return ['v = regs[{}]'.format(r),
+                    'regs[{}] = (v + 1) & 0xff'.format(r),
+                    'regs[{p}] = ((regs[{p}] or regs[{f}]) & 0x10) | INC_FLAGS[v]'.format(p=p, f=f)]
+
+        elif opcode & 0xc7 == 0x05 and opcode != 0x35:
+            # dec r8
+            r = slot(R8[(opcode >> 3) & 7])
+            return ['v = regs[{}]'.format(r),
+                    'regs[{}] = (v + 0xff) & 0xff'.format(r),
+                    'regs[{p}] = ((regs[{p}] or regs[{f}]) & 0x10) | DEC_FLAGS[v]'.format(p=p, f=f)]
+
+        elif opcode in (0x03, 0x13, 0x23, 0x0b, 0x1b, 0x2b):
+            # inc r16; dec r16
+            hi, lo = cpu.reg16_slots(('bc', 'de', 'hl')[opcode >> 4])
+            step = '1' if opcode & 0x0f == 0x03 else '0xffff'
+            return ['v = (((regs[{}] << 8) | regs[{}]) + {}) & 0xffff'.format(hi, lo, step),
+                    'regs[{}] = v >> 8'.format(hi),
+                    'regs[{}] = v & 0xff'.format(lo)]
+
+        elif opcode in (0x33, 0x3b):
+            # inc sp; dec sp
+            step = '1' if opcode == 0x33 else '0xffff'
+            return ['cpu._sp = (cpu._sp + {}) & 0xffff'.format(step)]
+
+        elif 0xa0 <= opcode < 0xc0 or opcode in (0xe6, 0xee, 0xf6, 0xfe):
+            # and, xor, or, cp
+            if opcode >= 0xc0:
+                operand = '{:#04x}'.format(operands[0])
+                kind = (opcode >> 3) & 3
+            else:
+                src = R8[opcode & 7]
+                operand = 'get_addr({})'.format(hl) if src is None else 'regs[{}]'.format(slot(src))
+                kind = (opcode >> 3) & 3
+            if kind == 3:
+                # cp
+                return ['regs[{}] = SUB[regs[{}] << 8 | {}] & 0xff'.format(p, a, operand)]
+            op = ('&', '^', '|')[kind]
+            table = 'AND_FLAGS' if op == '&' else 'OR_FLAGS'
+            return ['v = regs[{}] {} {}'.format(a, op, operand),
+                    'regs[{}] = v'.format(a),
+                    'regs[{}] = {}[v]'.format(p, table)]
+
+        elif opcode == 0x18 or opcode in (0x20, 0x28, 0x30, 0x38):
+            # jr [cc], r8
+            offset = operands[0] - 0x100 if operands[0] > 127 else operands[0]
+            target = (next_addr + offset) & 0xffff
+            return self._emit_jump(opcode, target, next_addr, flags)
+
+        elif opcode in (0xc3, 0xc2, 0xca, 0xd2, 0xda):
+            # jp [cc], a16
+            target = (operands[1] << 8) | operands[0]
+            return self._emit_jump(opcode, target, next_addr, flags)
+
+        return None
+
+    def _emit_jump(self, opcode, target, next_addr, flags):
+        if opcode in (0x18, 0xc3):
+            return ['cpu._pc = {:#06x}'.format(target)]
+        cond = CONDITIONS[(opcode >> 3) & 3].format(flags=flags)
+        return ['cpu._pc = {:#06x} if {} else {:#06x}'.format(target, cond, next_addr)]
@@ -1,4 +1,3 @@
-
 import logging
 import sdl2
 import sdl2.ext
@@ -6,25 +5,16 @@ import argparse as ap
 import threading
 from collections import deque
 
-from slowboy.mmu import MMU
 from slowboy.z80 import Z80, State
-from slowboy.gpu import SCREEN_WIDTH, SCREEN_HEIGHT, VRAM_START, OAM_START, BACKGROUND_SIZE
+from slowboy.gpu import GPU, SCREEN_WIDTH, SCREEN_HEIGHT, VRAM_START, OAM_START, BACKGROUND_SIZE
+from slowboy.headless import HeadlessUI, save_path
+from slowboy.render.sdl import SDLRenderer
+from slowboy.rom import open_rom
 from slowboy.util import hexdump, print_lines
 
 from slowboy.debug.debug_thread import DebugThread
 
 
-class HeadlessUI():
-    def __init__(self, romfile, log_level=logging.WARNING):
-        with open(romfile, 'rb') as f:
-            rom = f.read()
-        mmu = MMU(rom)
-        self.cpu = Z80(mmu=mmu, log_level=log_level)
-
-    def start(self):
-        self.cpu.go()
-
-
 regs = ('a', 'f', 'b', 'c', 'd', 'e', 'h', 'l')
 
 font_map = ["!\"%'YZ+,-.X=_?0 ",
@@ -57,13 +47,13 @@ class SDLUI():
         self.logger = logging.getLogger(__name__)
         self.logger.setLevel(log_level)
 
-        rom = bytearray(0x8000)
-        with open(romfile, 'rb') as f:
-            rom_read = f.read()
-            print('Read {} B from ROM file'.format(len(rom_read)))
-            rom[0:len(rom_read)] = rom_read
-        self.cpu = Z80(rom=rom, debug=debug, debug_address=debug_address,
-                       log_level=log_level)
+        rom = open_rom(romfile)
+        print('Read {} B from ROM file'.format(len(rom)))
+        self.renderer = SDLRenderer(logger=self.logger)
+        self.cpu = Z80(rom=rom, gpu=GPU(renderer=self.renderer), debug=debug,
+                       debug_address=debug_address, log_level=log_level)
+        if self.cpu.mmu.cartridge.battery:
+            self.cpu.mmu.load_save(save_path(romfile))
 
         self.window = sdl2.ext.Window('slowboy', (SCREEN_WIDTH, SCREEN_HEIGHT))
         self.window.show()
@@ -95,7 +85,7 @@ class SDLUI():
         self.emulator_thread.start()
 
     def step(self):
-        if self.cpu.gpu.draw(self.surface):
+        if self.renderer.draw(self.surface):
             self.window.refresh()
 
 def command(ui, state):
@@ -155,13 +145,21 @@ def command(ui, state):
     elif command == 'watch':
         if line[1] == 'list':
             for wp in ui.cpu.mmu.watchpoints:
-                print(hex(wp))
+                print('{:#06x}-{:#06x}'.format(wp.start, wp.end))
         else:
             addr = int(line[1], 16)
-            def hit_watchpoint(addr, value):
+            end = int(line[2], 16) if len(line) > 2 else None
+            def hit_watchpoint(addr, value, read):
                 state['step'] = True
                 print('hit watchpoint at {:#04x}'.format(addr))
-            ui.cpu.mmu.watchpoints[addr] = hit_watchpoint
+            ui.cpu.mmu.add_watchpoint(addr, False, hit_watchpoint, end=end)
+    elif command == 'trace':
+        if line[1] == 'on':
+            ui.cpu.start_pc_trace()
+        elif line[1] == 'off':
+            ui.cpu.stop_pc_trace()
+        else:
+            ui.cpu.dump_pc_trace(log=ui.logger.info)
     elif command == 'rominfo':
         ui.cpu.mmu.log_rominfo()
     elif command == 'debug':
@@ -2,7 +2,37 @@
 import abc
 from collections import namedtuple
 
-Op = namedtuple('Op', ['function', 'cycles', 'description'])
+# instructions is the number of instructions the function runs
+Op = namedtuple('Op', ['function', 'cycles', 'description', 'instructions'],
+                defaults=[1])
+
+def property_hooks(obj, name, sync=None):
+    """Returns a (read, write) pair of IO register hooks that get and set
+    the property :py:data:name of :py:data:obj. See
+    :py:meth:slowboy.mmu.MMU.add_io_hooks.
+
+    :param obj: the device owning the register
+    :param name: the name of the property backing the register
+    :param sync: if given, called before every read and write
+    :rtype: (None → int, int → None)"""
+
+    prop = getattr(type(obj), name)
+    fget = prop.fget
+    fset = prop.fset
+    if sync is None:
+        def read():
+            return fget(obj)
+        def write(value):
+            fset(obj, value)
+    else:
+        def read():
+            sync()
+            return fget(obj)
+        def write(value):
+            sync()
+            fset(obj, value)
+    return read, write
+
 
 class ClockListener(metaclass=abc.ABCMeta):
     @abc.abstractmethod
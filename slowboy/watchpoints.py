@@ -0,0 +1,90 @@
+"""Memory watchpoints.
+
+Watchpoints cost nothing while they are not set. The MMU routes the pages a
+watchpoint covers through watching handlers in its page table, and only
+those handlers look watchpoints up, in a :py:class:WatchpointIndex.
+"""
+
+from bisect import bisect_right
+from collections import namedtuple
+
+
+# Watch start through end, inclusive. callback is called with the address, the
+# value read or written and whether it was a read.
+Watchpoint = namedtuple('Watchpoint',
+                        ['start', 'end', 'read', 'write', 'callback'])
+
+
+class WatchpointIndex():
+    """An interval index of watchpoints, sorted by start address. Finding
+    the watchpoints that overlap a range is a binary search for the last
+    watchpoint starting in the range, then a scan back that stops once
+    watchpoints start too early to reach the range, given the longest
+    watchpoint."""
+
+    def __init__(self):
+        self._starts = []
+        self._watchpoints = []
+        self._max_length = 0
+
+    def __len__(self):
+        return len(self._watchpoints)
+
+    def __iter__(self):
+        return iter(list(self._watchpoints))
+
+    def add(self, watchpoint: Watchpoint):
+        """
+        :param watchpoint: the watchpoint to add
+        :rtype: None"""
+
+        i = bisect_right(self._starts, watchpoint.start)
+        self._starts.insert(i, watchpoint.start)
+        self._watchpoints.insert(i, watchpoint)
+        self._max_length = max(self._max_length,
+                               watchpoint.end - watchpoint.start + 1)
+
+    def remove(self, watchpoint: Watchpoint):
+        """
+        :param watchpoint: a watchpoint previously added
+        :rtype: None"""
+
+        for i, other in enumerate(self._watchpoints):
+            if other is watchpoint:
+                del self._starts[i]
+                del self._watchpoints[i]
+                break
+        else:
+            raise ValueError('no such watchpoint: {}'.format(watchpoint))
+        self._max_length = max((wp.end - wp.start + 1 for wp in self._watchpoints),
+                               default=0)
+
+    def overlapping(self, first, last):
+        """Returns the watchpoints that cover any address from
+        :py:data:first through :py:data:last.
+
+        :param first: first address of the range
+        :param last: last address of the range, inclusive
+        :rtype: list of Watchpoint"""
+
+        starts = self._starts
+        watchpoints = self._watchpoints
+        lowest = first - self._max_length
+        found = []
+        i = bisect_right(starts, last)
+        while i > 0:
+            i -= 1
+            if starts[i] <= lowest:
+                break
+            watchpoint = watchpoints[i]
+            if watchpoint.end >= first:
+                found.append(watchpoint)
+        return found
+
+    def find(self, addr):
+        """Returns the watchpoints that cover :py:data:addr.
+
+        :param addr: an address
+        :rtype: list of Watchpoint"""
+
+        return self.overlapping(addr, addr)
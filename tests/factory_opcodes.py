@@ -0,0 +1,1758 @@
+"""Reference opcode maps, built from handler factory methods like those the
+CPU used before its handlers were generated by :py:mod:slowboy.codegen. The
+generated handlers are tested against them."""
+
+from slowboy.alu import (ADD, SUB, AND_FLAGS, OR_FLAGS, INC_FLAGS, DEC_FLAGS,
+                         RLC, RRC, RL, RR, SLA, SRA, SRL, SWAP, DAA,
+                         BIT_MASKS, RES_MASKS)
+from slowboy.opcodes import INSTRUCTIONS
+from slowboy.util import Op, add_s16
+from slowboy.z80 import (Z80, REG_C, REG_H, REG_L, REG_A, REG_F, REG_FLAGS,
+                         Z_FLAG_MASK, C_FLAG_MASK)
+
+
+class FactoryZ80(Z80):
+    """A :py:class:slowboy.z80.Z80 with methods that return a closure for
+    each instruction, given its operands, or run the instruction
+    themselves."""
+
+    def nop(self):
+        """0x00"""
+
+        pass
+
+    def _reg16_accessors(self, reg16):
+        """Returns a (get, set) pair of functions for :py:data:reg16, bound to
+        its register file slots. Like :py:meth:set_reg16, the setter for AF
+        leaves F untouched.
+
+        :param reg16: one of BC, DE, HL, AF, SP
+        :raises KeyError
+        :rtype: (None → int, int → None)"""
+
+        regs = self.regs
+        reg16 = reg16.lower()
+        if reg16 == 'sp':
+            def get():
+                return self._sp
+
+            def set(value):
+                self._sp = value & 0xffff
+        elif reg16 == 'af':
+            def get():
+                self._sync_flags()
+                return (regs[REG_A] << 8) | regs[REG_F]
+
+            def set(value):
+                regs[REG_A] = (value >> 8) & 0xff
+        else:
+            hi, lo = self.reg16_slots(reg16)
+
+            def get():
+                return (regs[hi] << 8) | regs[lo]
+
+            def set(value):
+                regs[hi] = (value >> 8) & 0xff
+                regs[lo] = value & 0xff
+        return get, set
+
+    def ld_imm8toreg8(self, reg8):
+        """Returns a function to load an 8-bit immediate into :py:data:reg8.
+
+        :param reg8: single byte register
+        :rtype: integer → None """
+
+        r = self.reg8_slot(reg8)
+        regs = self.regs
+
+        def ld():
+            regs[r] = self.fetch() & 0xff
+        return ld
+
+    def ld_reg8toreg8(self, src_reg8, dest_reg8):
+        """Returns a function to load :py:data:src_reg8 into :py:data:dest_reg8.
+
+        :param src_reg8: single byte source register
+        :param dest_reg8: single byte destination register
+        :rtype: None → None """
+
+        src = self.reg8_slot(src_reg8)
+        dest = self.reg8_slot(dest_reg8)
+        regs = self.regs
+
+        def ld():
+            regs[dest] = regs[src]
+        return ld
+
+    def ld_imm16toreg16(self, reg16):
+        """Returns a function to load a 16-bit immediate into :py:data:reg16.
+
+        :param reg16: two-byte register
+        :rtype: integer → None """
+
+        if reg16.lower() in ('sp', 'af'):
+            _, set_reg16 = self._reg16_accessors(reg16)
+
+            def ld():
+                set_reg16(self.fetch2())
+        else:
+            hi, lo = self.reg16_slots(reg16)
+            regs = self.regs
+
+            def ld():
+                regs[lo] = self.fetch() & 0xff
+                regs[hi] = self.fetch() & 0xff
+        return ld
+
+    def ld_reg8toreg16addr(self, reg8, reg16):
+        """Returns a function to load an 8-bit register value into an address
+        given by a 16-bit double register.
+
+        :param reg8: single byte source register
+        :param reg16: two-byte register containing destination address
+        :rtype: None → None"""
+
+        r = self.reg8_slot(reg8)
+        hi, lo = self.reg16_slots(reg16)
+        regs = self.regs
+
+        def ld():
+            self.mmu.set_addr((regs[hi] << 8) | regs[lo], regs[r])
+        return ld
+
+    def ld_reg8toreg16addr_inc(self, reg8, reg16):
+        """Returns a function to load an 8-bit register value into an address
+        given by a 16-bit double register, then increment the address in the
+        dregister.
+
+        :param reg8: single byte source register
+        :param reg16: two-byte register containing destination address
+        :rtype: None → None"""
+
+        r = self.reg8_slot(reg8)
+        hi, lo = self.reg16_slots(reg16)
+        regs = self.regs
+
+        def ld():
+            addr = (regs[hi] << 8) | regs[lo]
+            self.mmu.set_addr(addr, regs[r])
+            addr = (addr + 1) & 0xffff
+            regs[hi] = addr >> 8
+            regs[lo] = addr & 0xff
+        return ld
+
+    def ld_reg8toreg16addr_dec(self, reg8, reg16):
+        """Returns a function to load an 8-bit register value into an address
+        given by a 16-bit double register, then decrement the address in the
+        dregister.
+
+        :param reg8: single byte source register
+        :param reg16: two-byte register containing destination address
+        :rtype: None → None"""
+
+        r = self.reg8_slot(reg8)
+        hi, lo = self.reg16_slots(reg16)
+        regs = self.regs
+
+        def ld():
+            addr = (regs[hi] << 8) | regs[lo]
+            self.mmu.set_addr(addr, regs[r])
+            addr = (addr + 0xffff) & 0xffff
+            regs[hi] = addr >> 8
+            regs[lo] = addr & 0xff
+        return ld
+
+    def ld_reg8toimm16addr(self, reg8):
+        """Returns a function to load an 8-bit register value into an address
+        given by a 16-bit immediate.
+
+        :param reg8: single byte source register
+        :rtype: integer → None"""
+
+        r = self.reg8_slot(reg8)
+        regs = self.regs
+
+        def ld():
+            imm16 = self.fetch2()
+            self.mmu.set_addr(imm16, regs[r])
+        return ld
+
+    def ld_reg16addrtoreg8(self, reg16, reg8, inc=False, dec=False):
+        """Returns a function to load the value at an address given by a 16-bit
+        double register into an 8-bit register.
+
+        :param reg16: 16-bit double register containing the source address
+        :param reg8: 8-bit destination register
+        :param inc: increment the value in reg16 after the ld operation
+        :param dec: decrement the value in reg16 after the ld operation
+        :rtype: None → None"""
+
+        if inc and dec:
+            raise ValueError('only one of inc and dec may be true')
+
+        r = self.reg8_slot(reg8)
+        hi, lo = self.reg16_slots(reg16)
+        regs = self.regs
+
+        if inc:
+            def ld():
+                u16 = (regs[hi] << 8) | regs[lo]
+                regs[r] = self.mmu.get_addr(u16) & 0xff
+                u16 = (u16 + 1) & 0xffff
+                regs[hi] = u16 >> 8
+                regs[lo] = u16 & 0xff
+        elif dec:
+            def ld():
+                u16 = (regs[hi] << 8) | regs[lo]
+                regs[r] = self.mmu.get_addr(u16) & 0xff
+                u16 = (u16 + 0xffff) & 0xffff
+                regs[hi] = u16 >> 8
+                regs[lo] = u16 & 0xff
+        else:
+            def ld():
+                regs[r] = self.mmu.get_addr((regs[hi] << 8) | regs[lo]) & 0xff
+        return ld
+
+    def ld_reg16toreg16(self, src_reg16, dest_reg16):
+        get_src, _ = self._reg16_accessors(src_reg16)
+        _, set_dest = self._reg16_accessors(dest_reg16)
+
+        def ld():
+            set_dest(get_src())
+        return ld
+
+    def ld_imm16addrtoreg8(self, reg8):
+        """Returns a function to load the value at an address given by a 16-bit
+        immediate into an 8-bit register.
+
+        :param reg8: the single-byte destination register
+        :rtype: integer → None"""
+
+        r = self.reg8_slot(reg8)
+        regs = self.regs
+
+        def ld():
+            imm16 = self.fetch2()
+            regs[r] = self.mmu.get_addr(imm16) & 0xff
+        return ld
+
+    def ld_sptoreg16addr(self, reg16):
+        """Returns a function that loads the stack pointer into the 16-bit
+        register :py:data:reg16.
+
+        :param reg16: the destination double register
+        :rtype: None → None"""
+
+        get_reg16, _ = self._reg16_accessors(reg16)
+
+        def ld():
+            addr = get_reg16()
+
+            self.mmu.set_addr(addr, self.sp >> 8)
+            self.mmu.set_addr(addr + 1, self.sp & 0xff)
+        return ld
+
+    def ld_imm8toaddrHL(self):
+        """0x36"""
+
+        imm8 = self.fetch()
+        regs = self.regs
+        self.mmu.set_addr((regs[REG_H] << 8) | regs[REG_L], imm8)
+
+    def ldh_regAtoaddr8(self):
+        """0xe0 -- load regA to 0xff00+addr8
+        """
+        addr8 = self.fetch()
+        self.mmu.set_addr(0xff00+addr8, self.regs[REG_A])
+
+    def ldh_addr8toregA(self):
+        """0xf0 -- load (0xff00+addr8) into regA
+        """
+        addr8 = self.fetch()
+        self.regs[REG_A] = self.mmu.get_addr(0xff00+addr8) & 0xff
+
+    def ldh_regAtoaddrC(self):
+        """0xe2 -- load regA to (0xff00+regC)
+        """
+        regs = self.regs
+        self.mmu.set_addr(0xff00+regs[REG_C], regs[REG_A])
+
+    def ldh_addrCtoregA(self):
+        """0xf2 -- load (0xff00+regC) to regA
+        """
+        regs = self.regs
+        regs[REG_A] = self.mmu.get_addr(0xff00+regs[REG_C]) & 0xff
+
+    def inc_reg8(self, reg8):
+        """Returns a function that increments :py:data:reg8.
+
+        :param reg8: the 8-bit register to increment
+        :rtype: None → None"""
+
+        r = self.reg8_slot(reg8)
+        regs = self.regs
+
+        def inc():
+            u8 = regs[r]
+            regs[r] = (u8 + 1) & 0xff
+            regs[REG_FLAGS] = ((regs[REG_FLAGS] or regs[REG_F]) & C_FLAG_MASK) | INC_FLAGS[u8]
+        return inc
+
+    def inc_reg16(self, reg16):
+        """Returns a function that increments :py:data:reg16.
+
+        :param reg16: the double register to increment
+        :rtype: None → None"""
+
+        if reg16.lower() in ('sp', 'af'):
+            get_reg16, set_reg16 = self._reg16_accessors(reg16)
+
+            def inc():
+                set_reg16(get_reg16() + 1)
+        else:
+            hi, lo = self.reg16_slots(reg16)
+            regs = self.regs
+
+            def inc():
+                result = (((regs[hi] << 8) | regs[lo]) + 1) & 0xffff
+                regs[hi] = result >> 8
+                regs[lo] = result & 0xff
+        return inc
+
+    def dec_reg8(self, reg8):
+        """Returns a function that decrements :py:data:reg8.
+
+        :param reg8: the 8-bit register to decrement
+        :rtype: None → None"""
+
+        r = self.reg8_slot(reg8)
+        regs = self.regs
+
+        def dec():
+            u8 = regs[r]
+            regs[r] = (u8 + 0xff) & 0xff
+            regs[REG_FLAGS] = ((regs[REG_FLAGS] or regs[REG_F]) & C_FLAG_MASK) | DEC_FLAGS[u8]
+        return dec
+
+    def dec_reg16(self, reg16):
+        """Returns a function that decrements :py:data:reg16.
+
+        :param reg16: the double register to decrement
+        :rtype: None → None"""
+
+        if reg16.lower() in ('sp', 'af'):
+            get_reg16, set_reg16 = self._reg16_accessors(reg16)
+
+            def dec():
+                set_reg16(get_reg16() + 0xffff)
+        else:
+            hi, lo = self.reg16_slots(reg16)
+            regs = self.regs
+
+            def dec():
+                result = (((regs[hi] << 8) | regs[lo]) + 0xffff) & 0xffff
+                regs[hi] = result >> 8
+                regs[lo] = result & 0xff
+        return dec
+
+    def inc_addrHL(self):
+        """Increments the value at the address in HL."""
+
+        regs = self.regs
+        addr16 = (regs[REG_H] << 8) | regs[REG_L]
+        u8 = self.mmu.get_addr(addr16)
+        regs[REG_FLAGS] = ((regs[REG_FLAGS] or regs[REG_F]) & C_FLAG_MASK) | INC_FLAGS[u8]
+        self.mmu.set_addr(addr16, (u8 + 1) & 0xff)
+
+    def dec_addrHL(self):
+        """Decrements the value at the address in HL."""
+
+        regs = self.regs
+        addr16 = (regs[REG_H] << 8) | regs[REG_L]
+        u8 = self.mmu.get_addr(addr16)
+        regs[REG_FLAGS] = ((regs[REG_FLAGS] or regs[REG_F]) & C_FLAG_MASK) | DEC_FLAGS[u8]
+        self.mmu.set_addr(addr16, (u8 + 0xff) & 0xff)
+
+    def add_reg16toregHL(self, reg16):
+        """Returns a function that adds :py:data:reg16 to the double register
+        HL.
+
+        :param reg16: source double register
+        :rtype: None → None"""
+
+        get_reg16, _ = self._reg16_accessors(reg16)
+        regs = self.regs
+
+        def add():
+            x = (regs[REG_H] << 8) | regs[REG_L]
+            y = get_reg16()
+            result = x + y
+            regs[REG_H] = (result >> 8) & 0xff
+            regs[REG_L] = result & 0xff
+
+            if ((x & 0xfff) + (y & 0xfff)) > 0xfff:
+                self.set_halfcarry_flag()
+            else:
+                self.reset_halfcarry_flag()
+
+            self.reset_sub_flag()
+
+            if result > 0xffff:
+                self.set_carry_flag()
+            else:
+                self.reset_carry_flag()
+        return add
+
+    def add_reg8toreg8(self, src_reg8, dest_reg8, carry=False):
+        """Returns a function that adds the given two 8-bit registers.
+        dest_reg8 = dest_reg8 + src_reg8
+
+        :param src_reg8: source single-byte register
+        :param dest_reg8: destination single-byte register
+        :param carry: src_reg8 + dest_reg8 + 1
+        :rtype: None → None"""
+
+        src = self.reg8_slot(src_reg8)
+        dest = self.reg8_slot(dest_reg8)
+        regs = self.regs
+
+        if carry:
+            def add():
+                f = regs[REG_FLAGS] or regs[REG_F]
+                v = ADD[(f & C_FLAG_MASK) << 12 | regs[dest] << 8 | regs[src]]
+                regs[dest] = v >> 8
+                regs[REG_FLAGS] = v & 0xff
+        else:
+            def add():
+                v = ADD[regs[dest] << 8 | regs[src]]
+                regs[dest] = v >> 8
+                regs[REG_FLAGS] = v & 0xff
+        return add
+
+    def add_imm8toreg8(self, reg8, carry=False):
+        """Returns a function that adds the given two 8-bit registers.
+        reg8 = reg8 + imm8
+
+        :param reg8: destination single-byte register
+        :param carry: reg8 + imm8 + 1
+        :rtype: int → None"""
+
+        r = self.reg8_slot(reg8)
+        regs = self.regs
+        c_shift = 12 if carry else 16
+
+        def add():
+            imm8 = self.fetch()
+            f = regs[REG_FLAGS] or regs[REG_F]
+            v = ADD[(f & C_FLAG_MASK) << c_shift & 0x10000 | regs[r] << 8 | imm8]
+            regs[r] = v >> 8
+            regs[REG_FLAGS] = v & 0xff
+        return add
+
+    def add_reg16addrtoreg8(self, reg16, reg8, carry=False):
+        """Returns a function that adds (reg16) to reg8 and stores the result
+        in reg8.
+
+        :param reg16: source address of operand 1
+        :param reg8: dest register, operand 2
+        :param carry: (reg16) + reg8 + 1
+        :rtype: None → None"""
+
+        hi, lo = self.reg16_slots(reg16)
+        r = self.reg8_slot(reg8)
+        regs = self.regs
+        c_shift = 12 if carry else 16
+
+        def add():
+            src_u8 = self.mmu.get_addr((regs[hi] << 8) | regs[lo])
+            f = regs[REG_FLAGS] or regs[REG_F]
+            v = ADD[(f & C_FLAG_MASK) << c_shift & 0x10000 | regs[r] << 8 | src_u8]
+            regs[r] = v >> 8
+            regs[REG_FLAGS] = v & 0xff
+        return add
+
+    def sub_reg8fromreg8(self, src_reg8, dest_reg8, carry=False):
+        """Returns a function that subtracts src_reg8 from dest_reg8.
+
+        :param src_reg8: The source single-byte register
+        :param dest_reg8: The destination single-byte register
+        :param carry: Set the carry flag?
+        :rtype: None → None"""
+
+        src = self.reg8_slot(src_reg8)
+        dest = self.reg8_slot(dest_reg8)
+        regs = self.regs
+
+        if carry:
+            def sub():
+                f = regs[REG_FLAGS] or regs[REG_F]
+                v = SUB[(f & C_FLAG_MASK) << 12 | regs[dest] << 8 | regs[src]]
+                regs[dest] = v >> 8
+                regs[REG_FLAGS] = v & 0xff
+        else:
+            def sub():
+                v = SUB[regs[dest] << 8 | regs[src]]
+                regs[dest] = v >> 8
+                regs[REG_FLAGS] = v & 0xff
+        return sub
+
+    def sub_imm8fromreg8(self, reg8, carry=False):
+        """Returns a function that subtracts an 8-bit immediate value from the
+        given :py:data:reg8.
+
+        :param reg8: The destination single register.
+        :param carry: Set the carry flag?
+        :rtype: int → None"""
+
+        r = self.reg8_slot(reg8)
+        regs = self.regs
+        c_shift = 12 if carry else 16
+
+        def sub():
+            imm8 = self.fetch()
+            f = regs[REG_FLAGS] or regs[REG_F]
+            v = SUB[(f & C_FLAG_MASK) << c_shift & 0x10000 | regs[r] << 8 | imm8]
+            regs[r] = v >> 8
+            regs[REG_FLAGS] = v & 0xff
+        return sub
+
+    def sub_imm16addrfromreg8(self, reg8, carry=False):
+        """Returns a function that subtracts the value at the address given by
+        :py:data:reg16 from :py:data:reg8.
+
+        :param reg8: The single destination register.
+        :param carry: Set the carry flag?
+        :rtype: None → None"""
+
+        r = self.reg8_slot(reg8)
+        regs = self.regs
+        c_shift = 12 if carry else 16
+
+        def sub():
+            imm16 = self.fetch2()
+            y = self.mmu.get_addr(imm16)
+            f = regs[REG_FLAGS] or regs[REG_F]
+            v = SUB[(f & C_FLAG_MASK) << c_shift & 0x10000 | regs[r] << 8 | y]
+            regs[r] = v >> 8
+            regs[REG_FLAGS] = v & 0xff
+        return sub
+
+    def sub_reg16addrfromreg8(self, reg16: str, reg8: str, carry: bool=False):
+        """Returns a function that subtracts the value at the address given by
+        :py:data:reg16 from :py:data:reg8.
+
+        reg8 = reg8 - (reg16)
+
+        :param reg16: The double register containing the source address of
+                      operand 1
+        :param reg8: Destination register, operand 2.
+        :param carry: reg8 - (reg16) - 1
+        :rtype: None → None"""
+
+        hi, lo = self.reg16_slots(reg16)
+        r = self.reg8_slot(reg8)
+        regs = self.regs
+        c_shift = 12 if carry else 16
+
+        def sub():
+            y = self.mmu.get_addr((regs[hi] << 8) | regs[lo])
+            f = regs[REG_FLAGS] or regs[REG_F]
+            v = SUB[(f & C_FLAG_MASK) << c_shift & 0x10000 | regs[r] << 8 | y]
+            regs[r] = v >> 8
+            regs[REG_FLAGS] = v & 0xff
+        return sub
+
+    def and_reg8(self, reg8):
+        """Returns a function that performs a bitwise AND with the accumulator
+        register A.
+
+        :param reg8: a single register
+        :rtype: None → None"""
+
+        r = self.reg8_slot(reg8)
+        regs = self.regs
+
+        def band():
+            result = regs[REG_A] & regs[r]
+            regs[REG_A] = result
+            regs[REG_FLAGS] = AND_FLAGS[result]
+        return band
+
+    def and_imm8(self):
+        """Returns a function that performs a bitwise AND with its 8-bit
+        immediate argument and the accumulator register A.
+
+        :rtype: int → None"""
+
+        regs = self.regs
+
+        def band():
+            imm8 = self.fetch()
+            result = regs[REG_A] & imm8
+            regs[REG_A] = result
+            regs[REG_FLAGS] = AND_FLAGS[result]
+        return band
+
+    def and_reg16addr(self, reg16):
+        """Returns a function that performs a bitwise AND with the 8-bit value
+        at the address in the given double register and the accumulator
+        register.
+
+        :param reg16: double register to AND with A.
+        :rtype: None → None"""
+
+        hi, lo = self.reg16_slots(reg16)
+        regs = self.regs
+
+        def band():
+            result = regs[REG_A] & self.mmu.get_addr((regs[hi] << 8) | regs[lo])
+            regs[REG_A] = result
+            regs[REG_FLAGS] = AND_FLAGS[result]
+        return band
+
+    def or_reg8(self, reg8):
+        """Returns a function that stores the result of bitwise OR between
+        :py:data:reg8 and A in the accumulator register A.
+
+        :param reg8: single operand register
+        :rtype: None → None"""
+
+        r = self.reg8_slot(reg8)
+        regs = self.regs
+
+        def bor():
+            result = regs[REG_A] | regs[r]
+            regs[REG_A] = result
+            regs[REG_FLAGS] = OR_FLAGS[result]
+        return bor
+
+    def or_imm8(self):
+        """Returns a function that performs a bitwise OR between its single
+        8-bit immediate parameter and A, then stores the result in A.
+
+        :rtype: int → None"""
+
+        regs = self.regs
+
+        def bor():
+            imm8 = self.fetch()
+            result = regs[REG_A] | imm8
+            regs[REG_A] = result
+            regs[REG_FLAGS] = OR_FLAGS[result]
+        return bor
+
+    def or_imm16addr(self):
+        """Returns a function that performs a bitwise OR between the value at
+        the address given by the function's single 16-bit immediate parameter
+        and A, then stores the result in A.
+
+        :rtype: int → None"""
+
+        regs = self.regs
+
+        def bor():
+            imm16 = self.fetch2()
+            result = regs[REG_A] | self.mmu.get_addr(imm16)
+            regs[REG_A] = result
+            regs[REG_FLAGS] = OR_FLAGS[result]
+        return bor
+
+    def or_reg16addr(self, reg16):
+        """Returns a function that performs a bitwise OR between the value at
+        the address given by the function's single 16-bit immediate parameter
+        and A, then stores the result in A.
+
+        :rtype: None → None"""
+
+        hi, lo = self.reg16_slots(reg16)
+        regs = self.regs
+
+        def bor():
+            result = regs[REG_A] | self.mmu.get_addr((regs[hi] << 8) | regs[lo])
+            regs[REG_A] = result
+            regs[REG_FLAGS] = OR_FLAGS[result]
+        return bor
+
+    def xor_reg8(self, reg8):
+        """Returns a function that performs a bitwise XOR between :py:data:reg8
+        and A and stores the result in A.
+
+        :param reg8: the single register operand
+        :rtype: None → None"""
+
+        r = self.reg8_slot(reg8)
+        regs = self.regs
+
+        def bxor():
+            result = regs[REG_A] ^ regs[r]
+            regs[REG_A] = result
+            regs[REG_FLAGS] = OR_FLAGS[result]
+        return bxor
+
+    def xor_imm8(self):
+        """Returns a function that performs a bitwise XOR between its 8-bit
+        immediate parameter and A and stores the result in A.
+
+        :rtype: int → None"""
+
+        regs = self.regs
+
+        def bxor():
+            imm8 = self.fetch()
+            result = regs[REG_A] ^ imm8
+            regs[REG_A] = result
+            regs[REG_FLAGS] = OR_FLAGS[result]
+        return bxor
+
+    def xor_reg16addr(self, reg16):
+        """Returns a function that performs a bitwise XOR between the value at
+        the address in :py:data:reg16 and A, then stores the result in A.
+
+        :param reg16: address of the operand
+        :rtype: None → None"""
+
+        hi, lo = self.reg16_slots(reg16)
+        regs = self.regs
+
+        def bxor():
+            result = regs[REG_A] ^ self.mmu.get_addr((regs[hi] << 8) | regs[lo])
+            regs[REG_A] = result
+            regs[REG_FLAGS] = OR_FLAGS[result]
+        return bxor
+
+    def cp_reg8toreg8(self, reg8_1, reg8_2):
+        """Returns a function that compares :py:data:reg8_1 and :py:data:reg8_2
+        then sets the appropriate flags.
+
+        Compare regA to regB means calculate regA - regB and
+            * set Z if regA == regB
+            * set NZ (reset Z) if regA != regB
+            * set C if regA < regB
+            * set NC (reset C) if regA >= regB
+
+        :rtype: None → None"""
+
+        r1 = self.reg8_slot(reg8_1)
+        r2 = self.reg8_slot(reg8_2)
+        regs = self.regs
+
+        def cp():
+            regs[REG_FLAGS] = SUB[regs[r1] << 8 | regs[r2]] & 0xff
+        return cp
+
+    def cp_regAtoregHLaddr(self):
+        """Compares register A to the address in double register HL, then
+        sets the appropriate flags as specified in :py:method:cp_reg8toreg8.
+
+        :param reg8: single register
+        :param reg16: double register holding an address"""
+
+        regs = self.regs
+        u8 = self.mmu.get_addr((regs[REG_H] << 8) | regs[REG_L])
+        regs[REG_FLAGS] = SUB[regs[REG_A] << 8 | u8] & 0xff
+
+    def cp_imm8toregA(self):
+        """Compares 8-bit immediate to value in register A, then sets appropriate flags.
+
+        :rtype: None"""
+
+        imm8 = self.fetch()
+        regs = self.regs
+        regs[REG_FLAGS] = SUB[regs[REG_A] << 8 | imm8] & 0xff
+
+    def _shift_reg8(self, table, reg8):
+        """Returns a function that replaces :py:data:reg8 with its entry in
+        the rotate or shift table :py:data:table, indexed by the carry flag
+        and the register.
+
+        :param table: one of the tables in :py:mod:slowboy.alu
+        :param reg8: the operand register
+        :rtype: None → None"""
+
+        r = self.reg8_slot(reg8)
+        regs = self.regs
+
+        def shift():
+            f = regs[REG_FLAGS] or regs[REG_F]
+            v = table[(f & C_FLAG_MASK) << 4 | regs[r]]
+            regs[r] = v >> 8
+            regs[REG_FLAGS] = v & 0xff
+        return shift
+
+    def _shift_regHLaddr(self, table):
+        """Like :py:meth:_shift_reg8, for the value at the address in HL."""
+
+        regs = self.regs
+        addr = (regs[REG_H] << 8) | regs[REG_L]
+        f = regs[REG_FLAGS] or regs[REG_F]
+        v = table[(f & C_FLAG_MASK) << 4 | self.mmu.get_addr(addr)]
+        regs[REG_FLAGS] = v & 0xff
+        self.mmu.set_addr(addr, v >> 8)
+
+    def rl_reg8(self, reg8):
+        """Returns a function that shift :py:data:reg8 left 1, places the old
+        bit 7 in the carry flag, and places old carry flag in bit 0.
+
+        :param reg8: the number of bits to shift
+        :rtype None → None"""
+
+        return self._shift_reg8(RL, reg8)
+
+    def rl_regHLaddr(self):
+        self._shift_regHLaddr(RL)
+
+    def rlc_reg8(self, reg8):
+        """Returns a function that shifts :py:data:reg8 left 1, then
+        places the old bit 7 in the carry flag and bit 0.
+
+        :param reg8: number of bits to rotate
+        :rtype None → None"""
+
+        return self._shift_reg8(RLC, reg8)
+
+    def rlc_regHLaddr(self):
+        self._shift_regHLaddr(RLC)
+
+    def rr_reg8(self, reg8):
+        """Returns a function that shifts :py:data:reg8 right 1, places the old
+        bit 0 in the carry flag, and place old carry in bit 7.
+
+        :param reg8: the operand single register
+        :rtype: None → None"""
+
+        return self._shift_reg8(RR, reg8)
+
+    def rr_regHLaddr(self):
+        self._shift_regHLaddr(RR)
+
+    def rrc_reg8(self, reg8):
+        """0x0f, CB 0x08-0x0f
+        logical shift reg8 right 1, place old bit 0 in CF and bit 7."""
+
+        return self._shift_reg8(RRC, reg8)
+
+    def rrc_regHLaddr(self):
+        self._shift_regHLaddr(RRC)
+
+    def sla_reg8(self, reg8):
+        """CB 0x20-0x25, 0x27
+        Logical shift reg8 left 1 and place old bit 0 in CF."""
+
+        return self._shift_reg8(SLA, reg8)
+
+    def sla_regHLaddr(self):
+        """CB 0x20-0x25, 0x27
+        Logical shift (addr16) left 1 and place old bit 0 in CF."""
+
+        self._shift_regHLaddr(SLA)
+
+    def sra_reg8(self, reg8):
+        """CB 0x28-0x2d, 0x2f
+        Arithmetic shift reg8 right 1 and place old bit 7 in CF."""
+
+        return self._shift_reg8(SRA, reg8)
+
+    def sra_regHLaddr(self):
+        """CB 0x20-0x25, 0x27
+        Arithmetic shift (addr16) right 1 and place old bit 7 in CF."""
+
+        self._shift_regHLaddr(SRA)
+
+    def swap_reg8(self, reg8):
+        return self._shift_reg8(SWAP, reg8)
+
+    def swap_regHLaddr(self):
+        self._shift_regHLaddr(SWAP)
+
+    def srl_reg8(self, reg8):
+        """Logical shift reg8 right 1 and place old LSb in C"""
+
+        return self._shift_reg8(SRL, reg8)
+
+    def srl_regHLaddr(self):
+        """Logical shift reg8 right 1 and place old LSb in C"""
+
+        self._shift_regHLaddr(SRL)
+
+    def bit_reg8(self, i, reg8):
+        r = self.reg8_slot(reg8)
+        regs = self.regs
+        mask = BIT_MASKS[i]
+
+        def bit():
+            # Flags are those of and, but C is not affected
+            regs[REG_FLAGS] = (((regs[REG_FLAGS] or regs[REG_F]) & C_FLAG_MASK) |
+                               AND_FLAGS[regs[r] & mask])
+        return bit
+
+    def bit_regHLaddr(self, i):
+        regs = self.regs
+        mask = BIT_MASKS[i]
+
+        def bit():
+            d8 = self.mmu.get_addr((regs[REG_H] << 8) | regs[REG_L])
+            regs[REG_FLAGS] = (((regs[REG_FLAGS] or regs[REG_F]) & C_FLAG_MASK) |
+                               AND_FLAGS[d8 & mask])
+        return bit
+
+    def res_reg8(self, i, reg8):
+        r = self.reg8_slot(reg8)
+        regs = self.regs
+        mask = RES_MASKS[i]
+
+        def res():
+            regs[r] &= mask
+        return res
+
+    def res_regHLaddr(self, i):
+        regs = self.regs
+        mask = RES_MASKS[i]
+
+        def res():
+            addr = (regs[REG_H] << 8) | regs[REG_L]
+            self.mmu.set_addr(addr, self.mmu.get_addr(addr) & mask)
+        return res
+
+    def set__reg8(self, i, reg8):
+        r = self.reg8_slot(reg8)
+        regs = self.regs
+        mask = BIT_MASKS[i]
+
+        def set():
+            regs[r] |= mask
+        return set
+
+    def set_regHLaddr(self, i):
+        regs = self.regs
+        mask = BIT_MASKS[i]
+
+        def set():
+            addr = (regs[REG_H] << 8) | regs[REG_L]
+            self.mmu.set_addr(addr, self.mmu.get_addr(addr) | mask)
+        return set
+
+    def cpl(self):
+        """0x2f: ~A"""
+
+        self.regs[REG_A] ^= 0xff
+        self.set_halfcarry_flag()
+        self.set_sub_flag()
+
+    def daa(self):
+        """0x27: adjust regA following BCD addition, as in the table in The
+        Game Boy Programming Manual, p. 110.
+
+        :raises ValueError: if the manual doesn't cover A and the flags"""
+
+        regs = self.regs
+        f = regs[REG_FLAGS] or regs[REG_F]
+        v = DAA[(f & 0x70) << 4 | regs[REG_A]]
+        if not v:
+            raise ValueError('unrecognized condition')
+        regs[REG_A] = v >> 8
+        regs[REG_FLAGS] = v & 0xff
+
+    def scf(self):
+        """0x37: set carry flag"""
+
+        self.set_carry_flag()
+
+    def ccf(self):
+        """0x3f: clear carry flag"""
+
+        self.reset_carry_flag()
+
+    def _branch_condition(self, cond):
+        """Returns a function that is true when the branch condition
+        :py:data:cond holds. It tests the pending flags, if any, without
+        syncing F. Like the generated handlers, it charges the cycles of the
+        path taken to the opcode being run.
+
+        :param cond: one of Z, NZ, C, NC
+        :raises ValueError
+        :rtype: None → bool"""
+
+        regs = self.regs
+        cycles = self.cycles
+        cond = cond.lower()
+        if cond in ('z', 'nz'):
+            mask = Z_FLAG_MASK
+        elif cond in ('c', 'nc'):
+            mask = C_FLAG_MASK
+        else:
+            raise ValueError('cond must be one of Z, NZ, C, NC')
+        expected = mask if len(cond) == 1 else 0
+
+        def check_cond():
+            instruction = INSTRUCTIONS[self.opcode]
+            taken = (regs[REG_FLAGS] or regs[REG_F]) & mask == expected
+            if taken:
+                cycles[self.opcode] = instruction.cycles
+            else:
+                cycles[self.opcode] = instruction.cycles_not_taken
+            return taken
+        return check_cond
+
+    def jr_imm8(self, cond=None):
+        """Returns a function that takes a signed immediate and performs a
+        relative jump by this immediate if :py:data:cond is true.
+
+        :param cond: Z, NZ, C, NC
+        lrtype: int → None"""
+
+        if cond:
+            check_cond = self._branch_condition(cond)
+
+        if cond is None:
+            def jr():
+                imm8 = self.mmu.get_addr(self.pc)
+                self.pc += 1
+                # Skip incrementing PC because we'll set it anyway
+                if imm8 > 127: # negative
+                    imm8 |= 0xff00
+                target = add_s16(self.pc, imm8)
+                #self._branches[(self.pc, target)] += 1
+                self.pc = target
+        else:
+            def jr():
+                imm8 = self.mmu.get_addr(self.pc)
+                self.pc += 1
+                if check_cond():
+                    if imm8 > 127: # negative
+                        imm8 |= 0xff00
+                    target = add_s16(self.pc, imm8)
+                    #self._branches[(self.pc, target)] += 1
+                    self.pc = target
+
+        return jr
+
+    def jp_imm16addr(self, cond=None):
+        """Returns a function taking a 16-bit immediate that conditionally
+        performs an absolute jump to that immediate if :py:data:cond is met.
+
+        :param cond: Z, NZ, C, NC
+        :rtype: int → None"""
+
+        if cond:
+            check_cond = self._branch_condition(cond)
+
+        if cond is None:
+            def jp():
+                imm16 = self.fetch2()
+                #self._branches[(self.pc, imm16)] += 1
+                self.pc = imm16
+        else:
+            def jp():
+                imm16 = self.fetch2()
+                if check_cond():
+                    #self._branches[(self.pc, imm16)] += 1
+                    self.pc = imm16
+
+        return jp
+
+    def jp_reg16addr(self, reg16):
+        """Returns a function that performs an uncoditional jump to the address
+        in :py:data:reg16"""
+
+        get_reg16, _ = self._reg16_accessors(reg16)
+
+        def jp():
+            target = get_reg16()
+            #self._branches[(self.pc, target)] += 1
+            self.pc = target
+        return jp
+
+    def ret(self, cond=None):
+        """Returns a function that, based on cond, will get the return address
+        from the stack and return.
+
+        :param cond: one (or none) of Z, C, S, H
+        :rtype: None → None"""
+
+        if cond is None:
+            def retc():
+                sp = self.sp
+                self.pc = self.mmu.read16(sp)
+                self.sp = sp + 2
+        else:
+            check_cond = self._branch_condition(cond)
+
+            def retc():
+                if check_cond():
+                    sp = self.sp
+                    self.pc = self.mmu.read16(sp)
+                    self.sp = sp + 2
+
+        return retc
+
+    def reti(self):
+        """0xd9 -- reti"""
+
+        sp = self.sp
+        self.pc = self.mmu.read16(sp)
+        self.sp = sp + 2
+        self._in_interrupt = False
+
+    def call_imm16addr(self, cond: str=None):
+        """Returns a function that, based on :py:data:cond, pushes the current
+        address in the program counter and jumps to the 16-bit immediate
+        parameter of the function.
+
+        :param cond: one of Z, C, S, H
+        :rtype: int → None"""
+
+        if cond is None:
+            def call():
+                imm16 = self.fetch2()
+                #self._branches[(self.pc, imm16)] += 1
+                sp = (self.sp - 2) & 0xffff
+                self.mmu.write16(sp, self.pc)
+                self.pc = imm16
+                self.sp = sp
+        else:
+            check_cond = self._branch_condition(cond)
+
+            def call():
+                flag = check_cond()
+                imm16 = self.fetch2()
+                #self._branches[(self.pc, imm16)] += 1
+                if flag:
+                    sp = (self.sp - 2) & 0xffff
+                    self.mmu.write16(sp, self.pc)
+                    self.pc = imm16
+                    self.sp = sp
+        return call
+
+    def push_reg16(self, reg16):
+        """0xc5, 0xd5, 0xe5, 0xf5"""
+
+        get_reg16, _ = self._reg16_accessors(reg16)
+
+        def push():
+            sp = (self.sp - 2) & 0xffff
+            self.mmu.write16(sp, get_reg16())
+            self.sp = sp
+        return push
+
+    def pop_reg16(self, reg16):
+        """0xc1, 0xd1, 0xe1, 0xf1"""
+
+        _, set_reg16 = self._reg16_accessors(reg16)
+
+        def pop():
+            sp = self.sp
+            set_reg16(self.mmu.read16(sp))
+            self.sp = sp + 2
+        return pop
+
+    def rst(self, addr):
+        """0xc7, 0xd7, 0xe7, 0xf7, 0xcf, 0xdf, 0xef, 0xff -- rst xxH"""
+
+        def panic(msg):
+            self.logger.error('PANIC!')
+            self.logger.error(msg)
+            self.log_regs(self.logger.error)
+            self.dump_pc_trace(self.logger.error)
+            self.logger.error('')
+            raise RuntimeError()
+
+        def rst_addr():
+            #panic('in rst({:x})'.format(addr))
+            sp = (self.sp - 2) & 0xffff
+            self.mmu.write16(sp, self.pc)
+            self.sp = sp
+
+            self.pc = addr
+
+        return rst_addr
+
+    def di(self):
+        """0xf3 -- di
+        Disable interrupts."""
+
+        self.interrupt_controller.di()
+
+    def ei(self):
+        """0xfb -- ei
+        Enable interrupts."""
+
+        self.interrupt_controller.ei()
+
+
+
+def factory_opcode_maps(cpu):
+    """Returns opcode maps like :py:attr:slowboy.z80.Z80.opcode_map and
+    :py:attr:slowboy.z80.Z80.cb_opcode_map for :py:data:cpu, built from its
+    factory methods instead of the generated handlers.
+
+    :param cpu: the :py:class:FactoryZ80 the handlers act on
+    :rtype: (dict, dict)"""
+
+    opcode_map = {
+            0x00: Op(cpu.nop, 4, 'nop'),
+            0x10: Op(cpu.stop, 4, 'stop'),
+            0x76: Op(cpu.halt, 4, 'halt'),
+            0xf3: Op(cpu.di, 4, 'di'),
+            0xfb: Op(cpu.ei, 4, 'ei'),
+
+            0x40: Op(cpu.ld_reg8toreg8('b', 'b'), 4, 'ld b, b'),
+            0x41: Op(cpu.ld_reg8toreg8('c', 'b'), 4, 'ld b, c'),
+            0x42: Op(cpu.ld_reg8toreg8('d', 'b'), 4, 'ld b, d'),
+            0x43: Op(cpu.ld_reg8toreg8('e', 'b'), 4, 'ld b, e'),
+            0x44: Op(cpu.ld_reg8toreg8('h', 'b'), 4, 'ld b, h'),
+            0x45: Op(cpu.ld_reg8toreg8('l', 'b'), 4, 'ld b, l'),
+            0x46: Op(cpu.ld_reg16addrtoreg8('hl', 'b'), 8, 'ld b, (hl)'),
+            0x47: Op(cpu.ld_reg8toreg8('a', 'b'), 4, 'ld b, a'),
+            0x48: Op(cpu.ld_reg8toreg8('b', 'c'), 4, 'ld c, b'),
+            0x49: Op(cpu.ld_reg8toreg8('c', 'c'), 4, 'ld c, c'),
+            0x4a: Op(cpu.ld_reg8toreg8('d', 'c'), 4, 'ld c, d'),
+            0x4b: Op(cpu.ld_reg8toreg8('e', 'c'), 4, 'ld c, e'),
+            0x4c: Op(cpu.ld_reg8toreg8('h', 'c'), 4, 'ld c, h'),
+            0x4d: Op(cpu.ld_reg8toreg8('l', 'c'), 4, 'ld c, l'),
+            0x4e: Op(cpu.ld_reg16addrtoreg8('hl', 'c'), 8, 'ld c, (hl)'),
+            0x4f: Op(cpu.ld_reg8toreg8('a', 'c'), 4, 'ld c, a'),
+            0x50: Op(cpu.ld_reg8toreg8('b', 'd'), 4, 'ld d, b'),
+            0x51: Op(cpu.ld_reg8toreg8('c', 'd'), 4, 'ld d, c'),
+            0x52: Op(cpu.ld_reg8toreg8('d', 'd'), 4, 'ld d, d'),
+            0x53: Op(cpu.ld_reg8toreg8('e', 'd'), 4, 'ld d, e'),
+            0x54: Op(cpu.ld_reg8toreg8('h', 'd'), 4, 'ld d, h'),
+            0x55: Op(cpu.ld_reg8toreg8('l', 'd'), 4, 'ld d, l'),
+            0x56: Op(cpu.ld_reg16addrtoreg8('hl', 'd'), 8, 'ld d, (hl)'),
+            0x57: Op(cpu.ld_reg8toreg8('a', 'd'), 4, 'ld d, a'),
+            0x58: Op(cpu.ld_reg8toreg8('b', 'e'), 4, 'ld e, b'),
+            0x59: Op(cpu.ld_reg8toreg8('c', 'e'), 4, 'ld e, c'),
+            0x5a: Op(cpu.ld_reg8toreg8('d', 'e'), 4, 'ld e, d'),
+            0x5b: Op(cpu.ld_reg8toreg8('e', 'e'), 4, 'ld e, e'),
+            0x5c: Op(cpu.ld_reg8toreg8('h', 'e'), 4, 'ld e, h'),
+            0x5d: Op(cpu.ld_reg8toreg8('l', 'e'), 4, 'ld e, l'),
+            0x5e: Op(cpu.ld_reg16addrtoreg8('hl', 'e'), 8, 'ld e, (hl)'),
+            0x5f: Op(cpu.ld_reg8toreg8('a', 'e'), 4, 'ld e, a'),
+            0x60: Op(cpu.ld_reg8toreg8('b', 'h'), 4, 'ld h, b'),
+            0x61: Op(cpu.ld_reg8toreg8('c', 'h'), 4, 'ld h, c'),
+            0x62: Op(cpu.ld_reg8toreg8('d', 'h'), 4, 'ld h, d'),
+            0x63: Op(cpu.ld_reg8toreg8('e', 'h'), 4, 'ld h, e'),
+            0x64: Op(cpu.ld_reg8toreg8('h', 'h'), 4, 'ld h, h'),
+            0x65: Op(cpu.ld_reg8toreg8('l', 'h'), 4, 'ld h, l'),
+            0x66: Op(cpu.ld_reg16addrtoreg8('hl', 'h'), 8, 'ld h, (hl)'),
+            0x67: Op(cpu.ld_reg8toreg8('a', 'h'), 4, 'ld h, a'),
+            0x68: Op(cpu.ld_reg8toreg8('b', 'l'), 4, 'ld l, b'),
+            0x69: Op(cpu.ld_reg8toreg8('c', 'l'), 4, 'ld l, c'),
+            0x6a: Op(cpu.ld_reg8toreg8('d', 'l'), 4, 'ld l, d'),
+            0x6b: Op(cpu.ld_reg8toreg8('e', 'l'), 4, 'ld l, e'),
+            0x6c: Op(cpu.ld_reg8toreg8('h', 'l'), 4, 'ld l, h'),
+            0x6d: Op(cpu.ld_reg8toreg8('l', 'l'), 4, 'ld l, l'),
+            0x6e: Op(cpu.ld_reg16addrtoreg8('hl', 'l'), 8, 'ld l, (hl)'),
+            0x6f: Op(cpu.ld_reg8toreg8('a', 'l'), 4, 'ld l, a'),
+            0x70: Op(cpu.ld_reg8toreg16addr('b', 'hl'), 8, 'ld (hl), b'),
+            0x71: Op(cpu.ld_reg8toreg16addr('c', 'hl'), 8, 'ld (hl), c'),
+            0x72: Op(cpu.ld_reg8toreg16addr('d', 'hl'), 8, 'ld (hl), d'),
+            0x73: Op(cpu.ld_reg8toreg16addr('e', 'hl'), 8, 'ld (hl), e'),
+            0x74: Op(cpu.ld_reg8toreg16addr('h', 'hl'), 8, 'ld (hl), h'),
+            0x75: Op(cpu.ld_reg8toreg16addr('l', 'hl'), 8, 'ld (hl), l'),
+            0x77: Op(cpu.ld_reg8toreg16addr('a', 'hl'), 8, 'ld (hl), a'),
+            0x78: Op(cpu.ld_reg8toreg8('b', 'a'), 4, 'ld a, b'),
+            0x79: Op(cpu.ld_reg8toreg8('c', 'a'), 4, 'ld a, c'),
+            0x7a: Op(cpu.ld_reg8toreg8('d', 'a'), 4, 'ld a, d'),
+            0x7b: Op(cpu.ld_reg8toreg8('e', 'a'), 4, 'ld a, e'),
+            0x7c: Op(cpu.ld_reg8toreg8('h', 'a'), 4, 'ld a, h'),
+            0x7d: Op(cpu.ld_reg8toreg8('l', 'a'), 4, 'ld a, l'),
+            0x7e: Op(cpu.ld_reg16addrtoreg8('hl', 'a'), 8, 'ld a, (hl)'),
+            0x7f: Op(cpu.ld_reg8toreg8('a', 'a'), 4, 'ld a, a'),
+
+            0x02: Op(cpu.ld_reg8toreg16addr('a', 'bc'), 8, 'ld (bc), a'),
+            0x12: Op(cpu.ld_reg8toreg16addr('a', 'de'), 8, 'ld (de), a'),
+            0x22: Op(cpu.ld_reg8toreg16addr_inc('a', 'hl'), 8, 'ldi (hl), a'),
+            0x32: Op(cpu.ld_reg8toreg16addr_dec('a', 'hl'), 8, 'ldd (hl), a'),
+
+            0x06: Op(cpu.ld_imm8toreg8('b'), 8, 'ld b, d8'),
+            0x16: Op(cpu.ld_imm8toreg8('d'), 8, 'ld d, d8'),
+            0x26: Op(cpu.ld_imm8toreg8('h'), 8, 'ld h, d8'),
+            0x36: Op(cpu.ld_imm8toaddrHL, 12, 'ld (hl), d8'),
+
+            0x08: Op(cpu.ld_sptoimm16addr, 8, 'ld (a16), sp'),
+
+            0x0a: Op(cpu.ld_reg16addrtoreg8('bc', 'a'), 8, 'ld a, (bc)'),
+            0x1a: Op(cpu.ld_reg16addrtoreg8('de', 'a'), 8, 'ld a, (de)'),
+            0x2a: Op(cpu.ld_reg16addrtoreg8('hl', 'a', inc=True), 8, 'ldi a, (hl)'),
+            0x3a: Op(cpu.ld_reg16addrtoreg8('hl', 'a', dec=True), 8, 'ldd a, (hl)'),
+
+            0x0e: Op(cpu.ld_imm8toreg8('c'), 8, 'ld c, d8'),
+            0x1e: Op(cpu.ld_imm8toreg8('e'), 8, 'ld e, d8'),
+            0x2e: Op(cpu.ld_imm8toreg8('l'), 8, 'ld l, d8'),
+            0x3e: Op(cpu.ld_imm8toreg8('a'), 8, 'ld a, d8'),
+
+            0xe0: Op(cpu.ldh_regAtoaddr8, 12, 'ldh (d8), a'),
+            0xf0: Op(cpu.ldh_addr8toregA, 12, 'ldh a, (d8)'),
+            0xe2: Op(cpu.ldh_regAtoaddrC, 8, 'ldh (c), a'),
+            0xf2: Op(cpu.ldh_addrCtoregA, 8, 'ldh a, (c)'),
+
+            0xc1: Op(cpu.pop_reg16('bc'), 16, 'pop bc'),
+            0xd1: Op(cpu.pop_reg16('de'), 16, 'pop de'),
+            0xe1: Op(cpu.pop_reg16('hl'), 16, 'pop hl'),
+            0xf1: Op(cpu.pop_reg16('af'), 16, 'pop af'),
+
+            0xc5: Op(cpu.push_reg16('bc'), 16, 'push bc'),
+            0xd5: Op(cpu.push_reg16('de'), 16, 'push de'),
+            0xe5: Op(cpu.push_reg16('hl'), 16, 'push hl'),
+            0xf5: Op(cpu.push_reg16('af'), 16, 'push af'),
+
+            0xf8: Op(cpu.ld_spimm8toregHL, 12, 'ld hl, sp+d8'),
+
+            0xf9: Op(cpu.ld_reg16toreg16('hl', 'sp'), 8, 'ld sp, hl'),
+
+            0xea: Op(cpu.ld_reg8toimm16addr('a'), 16, 'ld (a16), a'),
+            0xfa: Op(cpu.ld_imm16addrtoreg8('a'), 16, 'ld a, (a16)'),
+
+            0x01: Op(cpu.ld_imm16toreg16('bc'), 12, 'ld bc, d16'),
+            0x11: Op(cpu.ld_imm16toreg16('de'), 12, 'ld de, d16'),
+            0x21: Op(cpu.ld_imm16toreg16('hl'), 12, 'ld hl, d16'),
+            0x31: Op(cpu.ld_imm16toreg16('sp'), 12, 'ld sp, d16'),
+
+            # arithmetic and logic
+
+            0x03: Op(cpu.inc_reg16('bc'), 8, 'inc bc'),
+            0x13: Op(cpu.inc_reg16('de'), 8, 'inc de'),
+            0x23: Op(cpu.inc_reg16('hl'), 8, 'inc hl'),
+            0x33: Op(cpu.inc_reg16('sp'), 8, 'inc sp'),
+            0x04: Op(cpu.inc_reg8('b'), 4, 'inc b'),
+            0x14: Op(cpu.inc_reg8('d'), 4, 'inc d'),
+            0x24: Op(cpu.inc_reg8('h'), 4, 'inc h'),
+            0x34: Op(cpu.inc_addrHL, 12, 'inc (hl)'),
+            0x0c: Op(cpu.inc_reg8('c'), 4, 'inc c'),
+            0x1c: Op(cpu.inc_reg8('e'), 4, 'inc e'),
+            0x2c: Op(cpu.inc_reg8('l'), 4, 'inc l'),
+            0x3c: Op(cpu.inc_reg8('a'), 4, 'inc a'),
+            0x05: Op(cpu.dec_reg8('b'), 4, 'dec b'),
+            0x15: Op(cpu.dec_reg8('d'), 4, 'dec d'),
+            0x25: Op(cpu.dec_reg8('h'), 4, 'dec h'),
+            0x35: Op(cpu.dec_addrHL, 12, 'dec (hl)'),
+            0x0d: Op(cpu.dec_reg8('c'), 4, 'dec c'),
+            0x1d: Op(cpu.dec_reg8('e'), 4, 'dec e'),
+            0x2d: Op(cpu.dec_reg8('l'), 4, 'dec l'),
+            0x3d: Op(cpu.dec_reg8('a'), 4, 'dec a'),
+            0x0b: Op(cpu.dec_reg16('bc'), 8, 'dec bc'),
+            0x1b: Op(cpu.dec_reg16('de'), 8, 'dec de'),
+            0x2b: Op(cpu.dec_reg16('hl'), 8, 'dec hl'),
+            0x3b: Op(cpu.dec_reg16('sp'), 8, 'dec sp'),
+
+            0x80: Op(cpu.add_reg8toreg8('b', 'a'), 4, 'add a, b'),
+            0x81: Op(cpu.add_reg8toreg8('c', 'a'), 4, 'add a, c'),
+            0x82: Op(cpu.add_reg8toreg8('d', 'a'), 4, 'add a, d'),
+            0x83: Op(cpu.add_reg8toreg8('e', 'a'), 4, 'add a, e'),
+            0x84: Op(cpu.add_reg8toreg8('h', 'a'), 4, 'add a, h'),
+            0x85: Op(cpu.add_reg8toreg8('l', 'a'), 4, 'add a, l'),
+            0x86: Op(cpu.add_reg16addrtoreg8('hl', 'a'), 8, 'add a, (hl)'),
+            0x87: Op(cpu.add_reg8toreg8('a', 'a'), 4, 'add a, a'),
+            0x88: Op(cpu.add_reg8toreg8('b', 'a', carry=True), 4, 'adc a, b'),
+            0x89: Op(cpu.add_reg8toreg8('c', 'a', carry=True), 4, 'adc a, c'),
+            0x8a: Op(cpu.add_reg8toreg8('d', 'a', carry=True), 4, 'adc a, d'),
+            0x8b: Op(cpu.add_reg8toreg8('e', 'a', carry=True), 4, 'adc a, e'),
+            0x8c: Op(cpu.add_reg8toreg8('h', 'a', carry=True), 4, 'adc a, h'),
+            0x8d: Op(cpu.add_reg8toreg8('l', 'a', carry=True), 4, 'adc a, l'),
+            0x8e: Op(cpu.add_reg16addrtoreg8('hl', 'a', carry=True), 8, 'adc a, (hl)'),
+            0x8f: Op(cpu.add_reg8toreg8('a', 'a', carry=True), 4, 'adc a, a'),
+            0x90: Op(cpu.sub_reg8fromreg8('b', 'a'), 4, 'sub a, b'),
+            0x91: Op(cpu.sub_reg8fromreg8('c', 'a'), 4, 'sub a, c'),
+            0x92: Op(cpu.sub_reg8fromreg8('d', 'a'), 4, 'sub a, d'),
+            0x93: Op(cpu.sub_reg8fromreg8('e', 'a'), 4, 'sub a, e'),
+            0x94: Op(cpu.sub_reg8fromreg8('h', 'a'), 4, 'sub a, h'),
+            0x95: Op(cpu.sub_reg8fromreg8('l', 'a'), 4, 'sub a, l'),
+            0x96: Op(cpu.sub_reg16addrfromreg8('hl', 'a'), 8, 'sub a, (hl)'),
+            0x97: Op(cpu.sub_reg8fromreg8('a', 'a'), 4, 'sub a, a'),
+            0x98: Op(cpu.sub_reg8fromreg8('b', 'a', carry=True), 4, 'sbc a, b'),
+            0x99: Op(cpu.sub_reg8fromreg8('c', 'a', carry=True), 4, 'sbc a, c'),
+            0x9a: Op(cpu.sub_reg8fromreg8('d', 'a', carry=True), 4, 'sbc a, d'),
+            0x9b: Op(cpu.sub_reg8fromreg8('e', 'a', carry=True), 4, 'sbc a, e'),
+            0x9c: Op(cpu.sub_reg8fromreg8('h', 'a', carry=True), 4, 'sbc a, h'),
+            0x9d: Op(cpu.sub_reg8fromreg8('l', 'a', carry=True), 4, 'sbc a, l'),
+            0x9e: Op(cpu.sub_reg16addrfromreg8('hl', 'a', carry=True), 8, 'sbc a, (hl)'),
+            0x9f: Op(cpu.sub_reg8fromreg8('a', 'a', carry=True), 4, 'sbc a, a'),
+            0xa0: Op(cpu.and_reg8('b'), 4, 'and b'),
+            0xa1: Op(cpu.and_reg8('c'), 4, 'and c'),
+            0xa2: Op(cpu.and_reg8('d'), 4, 'and d'),
+            0xa3: Op(cpu.and_reg8('e'), 4, 'and e'),
+            0xa4: Op(cpu.and_reg8('h'), 4, 'and h'),
+            0xa5: Op(cpu.and_reg8('l'), 4, 'and l'),
+            0xa6: Op(cpu.and_reg16addr('hl'), 8, 'and (hl)'),
+            0xa7: Op(cpu.and_reg8('a'), 4, 'and a'),
+            0xa8: Op(cpu.xor_reg8('b'), 4, 'xor b'),
+            0xa9: Op(cpu.xor_reg8('c'), 4, 'xor c'),
+            0xaa: Op(cpu.xor_reg8('d'), 4, 'xor d'),
+            0xab: Op(cpu.xor_reg8('e'), 4, 'xor e'),
+            0xac: Op(cpu.xor_reg8('h'), 4, 'xor h'),
+            0xad: Op(cpu.xor_reg8('l'), 4, 'xor l'),
+            0xae: Op(cpu.xor_reg16addr('hl'), 8, 'xor (hl)'),
+            0xaf: Op(cpu.xor_reg8('a'), 4, 'xor a'),
+            0xb0: Op(cpu.or_reg8('b'), 4, 'or b'),
+            0xb1: Op(cpu.or_reg8('c'), 4, 'or c'),
+            0xb2: Op(cpu.or_reg8('d'), 4, 'or d'),
+            0xb3: Op(cpu.or_reg8('e'), 4, 'or e'),
+            0xb4: Op(cpu.or_reg8('h'), 4, 'or h'),
+            0xb5: Op(cpu.or_reg8('l'), 4, 'or l'),
+            0xb6: Op(cpu.or_reg16addr('hl'), 8, 'or (hl)'),
+            0xb7: Op(cpu.or_reg8('a'), 4, 'or a'),
+            0xb8: Op(cpu.cp_reg8toreg8('a', 'b'), 4, 'cp b'),
+            0xb9: Op(cpu.cp_reg8toreg8('a', 'c'), 4, 'cp c'),
+            0xba: Op(cpu.cp_reg8toreg8('a', 'd'), 4, 'cp d'),
+            0xbb: Op(cpu.cp_reg8toreg8('a', 'e'), 4, 'cp e'),
+            0xbc: Op(cpu.cp_reg8toreg8('a', 'h'), 4, 'cp h'),
+            0xbd: Op(cpu.cp_reg8toreg8('a', 'l'), 4, 'cp l'),
+            0xbe: Op(cpu.cp_regAtoregHLaddr, 8, 'cp (hl)'),
+            0xbf: Op(cpu.cp_reg8toreg8('a', 'a'), 4, 'cp a'),
+            0xc6: Op(cpu.add_imm8toreg8('a'), 8, 'add a, d8'),
+            0xd6: Op(cpu.sub_imm8fromreg8('a'), 8, 'sub a, d8'),
+            0xe6: Op(cpu.and_imm8(), 8, 'and a, d8'),
+            0xf6: Op(cpu.or_imm8(), 8, 'or a, d8'),
+
+            0xce: Op(cpu.add_imm8toreg8('a', carry=True), 8, 'adc a, d8'),
+            0xde: Op(cpu.sub_imm8fromreg8('a', carry=True), 8, 'sbc a, d8'),
+            0xee: Op(cpu.xor_imm8(), 8, 'xor d8'),
+            0xfe: Op(cpu.cp_imm8toregA, 8, 'cp d8'),
+
+            0xe8: Op(cpu.add_imm8toregSP, 16, 'add sp, d8'),
+
+            0x09: Op(cpu.add_reg16toregHL('bc'), 8, 'add hl, bc'),
+            0x19: Op(cpu.add_reg16toregHL('de'), 8, 'add hl, de'),
+            0x29: Op(cpu.add_reg16toregHL('hl'), 8, 'add hl, hl'),
+            0x39: Op(cpu.add_reg16toregHL('sp'), 8, 'add hl, sp'),
+
+            0x07: Op(cpu.rlc_reg8('a'), 4, 'rlca'),
+            0x17: Op(cpu.rl_reg8('a'), 4, 'rla'),
+            0x27: Op(cpu.daa, 4, 'daa'),
+            0x37: Op(cpu.scf, 4, 'scf'),
+
+            0x0f: Op(cpu.rrc_reg8('a'), 4, 'rrca'),
+            0x1f: Op(cpu.rr_reg8('a'), 4, 'rra'),
+            0x2f: Op(cpu.cpl, 4, 'cpl'),
+            0x3f: Op(cpu.ccf, 4, 'ccf'),
+
+            0xc7: Op(cpu.rst(0x00), 4, 'rst 0x00'),
+            0xd7: Op(cpu.rst(0x10), 4, 'rst 0x10'),
+            0xe7: Op(cpu.rst(0x20), 4, 'rst 0x20'),
+            0xf7: Op(cpu.rst(0x30), 4, 'rst 0x30'),
+            0xcf: Op(cpu.rst(0x08), 4, 'rst 0x08'),
+            0xdf: Op(cpu.rst(0x18), 4, 'rst 0x18'),
+            0xef: Op(cpu.rst(0x28), 4, 'rst 0x28'),
+            0xff: Op(cpu.rst(0x38), 4, 'rst 0x38'),
+
+            # JP instructions take 16 cycles when taken, 12 when not taken
+            0xc3: Op(cpu.jp_imm16addr(), 16, 'jp a16'),
+            0xc2: Op(cpu.jp_imm16addr('nz'), 16, 'jp nz, a16'),
+            0xd2: Op(cpu.jp_imm16addr('nc'), 16, 'jp nc, a16'),
+            0xca: Op(cpu.jp_imm16addr('z'), 16, 'jp z, a16'),
+            0xda: Op(cpu.jp_imm16addr('c'), 16, 'jp c, a16'),
+            0xe9: Op(cpu.jp_reg16addr('hl'), 4, 'jp hl'),
+
+            # JR instructions take 12 cycles when taken, 8 when not taken
+            0x18: Op(cpu.jr_imm8(), 12, 'jr d8'),
+            0x20: Op(cpu.jr_imm8('nz'), 12, 'jr nz, d8'),
+            0x30: Op(cpu.jr_imm8('nc'), 12, 'jr nc, d8'),
+            0x28: Op(cpu.jr_imm8('z'), 12, 'jr z, d8'),
+            0x38: Op(cpu.jr_imm8('c'), 12, 'jr c, d8'),
+
+            # CALL takes 24 cycles when taken, 12 when not taken
+            0xcd: Op(cpu.call_imm16addr(), 24, 'call a16'),
+            0xc4: Op(cpu.call_imm16addr('nz'), 24, 'call nz, a16'),
+            0xd4: Op(cpu.call_imm16addr('nc'), 24, 'call nc, a16'),
+            0xcc: Op(cpu.call_imm16addr('z'), 24, 'call z, a16'),
+            0xdc: Op(cpu.call_imm16addr('c'), 24, 'call c, a16'),
+
+            # RET takes 20 cycles when taken, 8 when not taken
+            0xc9: Op(cpu.ret(), 20, 'ret'),
+            0xd9: Op(cpu.reti, 20, 'reti'),
+            0xc0: Op(cpu.ret('nz'), 20, 'ret nz'),
+            0xd0: Op(cpu.ret('nc'), 20, 'ret nc'),
+            0xc8: Op(cpu.ret('z'), 20, 'ret z'),
+            0xd8: Op(cpu.ret('c'), 20, 'ret c'),
+            }
+
+    cb_opcode_map = {
+        0x00: Op(cpu.rlc_reg8('b'), 8, 'rlc b'),
+        0x01: Op(cpu.rlc_reg8('c'), 8, 'rlc c'),
+        0x02: Op(cpu.rlc_reg8('d'), 8, 'rlc d'),
+        0x03: Op(cpu.rlc_reg8('e'), 8, 'rlc e'),
+        0x04: Op(cpu.rlc_reg8('h'), 8, 'rlc h'),
+        0x05: Op(cpu.rlc_reg8('l'), 8, 'rlc l'),
+        0x06: Op(cpu.rlc_regHLaddr, 16, 'rlc (hl)'),
+        0x07: Op(cpu.rlc_reg8('a'), 8, 'rlc a'),
+
+        0x08: Op(cpu.rrc_reg8('b'), 8, 'rrc b'),
+        0x09: Op(cpu.rrc_reg8('c'), 8, 'rrc c'),
+        0x0a: Op(cpu.rrc_reg8('d'), 8, 'rrc d'),
+        0x0b: Op(cpu.rrc_reg8('e'), 8, 'rrc e'),
+        0x0c: Op(cpu.rrc_reg8('h'), 8, 'rrc h'),
+        0x0d: Op(cpu.rrc_reg8('l'), 8, 'rrc l'),
+        0x0e: Op(cpu.rrc_regHLaddr, 16, 'rrc (hl)'),
+        0x0f: Op(cpu.rrc_reg8('a'), 8, 'rrc a'),
+
+        0x10: Op(cpu.rl_reg8('b'), 8, 'rl b'),
+        0x11: Op(cpu.rl_reg8('c'), 8, 'rl c'),
+        0x12: Op(cpu.rl_reg8('d'), 8, 'rl d'),
+        0x13: Op(cpu.rl_reg8('e'), 8, 'rl e'),
+        0x14: Op(cpu.rl_reg8('h'), 8, 'rl h'),
+        0x15: Op(cpu.rl_reg8('l'), 8, 'rl l'),
+        0x16: Op(cpu.rl_regHLaddr, 16, 'rl (hl)'),
+        0x17: Op(cpu.rl_reg8('a'), 8, 'rl a'),
+
+        0x18: Op(cpu.rr_reg8('b'), 8, 'rr b'),
+        0x19: Op(cpu.rr_reg8('c'), 8, 'rr c'),
+        0x1a: Op(cpu.rr_reg8('d'), 8, 'rr d'),
+        0x1b: Op(cpu.rr_reg8('e'), 8, 'rr e'),
+        0x1c: Op(cpu.rr_reg8('h'), 8, 'rr h'),
+        0x1d: Op(cpu.rr_reg8('l'), 8, 'rr l'),
+        0x1e: Op(cpu.rr_regHLaddr, 16, 'rr (hl)'),
+        0x1f: Op(cpu.rr_reg8('a'), 8, 'rr a'),
+
+        0x20: Op(cpu.sla_reg8('b'), 8, 'sla b'),
+        0x21: Op(cpu.sla_reg8('c'), 8, 'sla c'),
+        0x22: Op(cpu.sla_reg8('d'), 8, 'sla d'),
+        0x23: Op(cpu.sla_reg8('e'), 8, 'sla e'),
+        0x24: Op(cpu.sla_reg8('h'), 8, 'sla h'),
+        0x25: Op(cpu.sla_reg8('l'), 8, 'sla l'),
+        0x26: Op(cpu.sla_regHLaddr, 16, 'sla (hl)'),
+        0x27: Op(cpu.sla_reg8('a'), 8, 'sla a'),
+
+        0x28: Op(cpu.sra_reg8('b'), 8, 'sra b'),
+        0x29: Op(cpu.sra_reg8('c'), 8, 'sra c'),
+        0x2a: Op(cpu.sra_reg8('d'), 8, 'sra d'),
+        0x2b: Op(cpu.sra_reg8('e'), 8, 'sra e'),
+        0x2c: Op(cpu.sra_reg8('h'), 8, 'sra h'),
+        0x2d: Op(cpu.sra_reg8('l'), 8, 'sra l'),
+        0x2e: Op(cpu.sra_regHLaddr, 16, 'sra (hl)'),
+        0x2f: Op(cpu.sra_reg8('a'), 8, 'sra a'),
+
+        0x30: Op(cpu.swap_reg8('b'), 8, 'swap b'),
+        0x31: Op(cpu.swap_reg8('c'), 8, 'swap c'),
+        0x32: Op(cpu.swap_reg8('d'), 8, 'swap d'),
+        0x33: Op(cpu.swap_reg8('e'), 8, 'swap e'),
+        0x34: Op(cpu.swap_reg8('h'), 8, 'swap h'),
+        0x35: Op(cpu.swap_reg8('l'), 8, 'swap l'),
+        0x36: Op(cpu.swap_regHLaddr, 16, 'swap (hl)'),
+        0x37: Op(cpu.swap_reg8('a'), 8, 'swap a'),
+
+        0x38: Op(cpu.srl_reg8('b'), 8, 'srl b'),
+        0x39: Op(cpu.srl_reg8('c'), 8, 'srl c'),
+        0x3a: Op(cpu.srl_reg8('d'), 8, 'srl d'),
+        0x3b: Op(cpu.srl_reg8('e'), 8, 'srl e'),
+        0x3c: Op(cpu.srl_reg8('h'), 8, 'srl h'),
+        0x3d: Op(cpu.srl_reg8('l'), 8, 'srl l'),
+        0x3e: Op(cpu.srl_regHLaddr, 16, 'srl (hl)'),
+        0x3f: Op(cpu.srl_reg8('a'), 8, 'srl a'),
+
+        0x40: Op(cpu.bit_reg8(0, 'b'), 8, 'bit 0, b'),
+        0x41: Op(cpu.bit_reg8(0, 'c'), 8, 'bit 0, c'),
+        0x42: Op(cpu.bit_reg8(0, 'd'), 8, 'bit 0, d'),
+        0x43: Op(cpu.bit_reg8(0, 'e'), 8, 'bit 0, e'),
+        0x44: Op(cpu.bit_reg8(0, 'h'), 8, 'bit 0, h'),
+        0x45: Op(cpu.bit_reg8(0, 'l'), 8, 'bit 0, l'),
+        0x46: Op(cpu.bit_regHLaddr(0), 16, 'bit 0, (hl)'),
+        0x47: Op(cpu.bit_reg8(0, 'a'), 8, 'bit 0, a'),
+
+        0x48: Op(cpu.bit_reg8(1, 'b'), 8, 'bit 1, b'),
+        0x49: Op(cpu.bit_reg8(1, 'c'), 8, 'bit 1, c'),
+        0x4a: Op(cpu.bit_reg8(1, 'd'), 8, 'bit 1, d'),
+        0x4b: Op(cpu.bit_reg8(1, 'e'), 8, 'bit 1, e'),
+        0x4c: Op(cpu.bit_reg8(1, 'h'), 8, 'bit 1, h'),
+        0x4d: Op(cpu.bit_reg8(1, 'l'), 8, 'bit 1, l'),
+        0x4e: Op(cpu.bit_regHLaddr(1), 16, 'bit 1, (hl)'),
+        0x4f: Op(cpu.bit_reg8(1, 'a'), 8, 'bit 1, a'),
+
+        0x50: Op(cpu.bit_reg8(2, 'b'), 8, 'bit 2, b'),
+        0x51: Op(cpu.bit_reg8(2, 'c'), 8, 'bit 2, c'),
+        0x52: Op(cpu.bit_reg8(2, 'd'), 8, 'bit 2, d'),
+        0x53: Op(cpu.bit_reg8(2, 'e'), 8, 'bit 2, e'),
+        0x54: Op(cpu.bit_reg8(2, 'h'), 8, 'bit 2, h'),
+        0x55: Op(cpu.bit_reg8(2, 'l'), 8, 'bit 2, l'),
+        0x56: Op(cpu.bit_regHLaddr(2), 16, 'bit 2, (hl)'),
+        0x57: Op(cpu.bit_reg8(2, 'a'), 8, 'bit 2, a'),
+
+        0x58: Op(cpu.bit_reg8(3, 'b'), 8, 'bit 3, b'),
+        0x59: Op(cpu.bit_reg8(3, 'c'), 8, 'bit 3, c'),
+        0x5a: Op(cpu.bit_reg8(3, 'd'), 8, 'bit 3, d'),
+        0x5b: Op(cpu.bit_reg8(3, 'e'), 8, 'bit 3, e'),
+        0x5c: Op(cpu.bit_reg8(3, 'h'), 8, 'bit 3, h'),
+        0x5d: Op(cpu.bit_reg8(3, 'l'), 8, 'bit 3, l'),
+        0x5e: Op(cpu.bit_regHLaddr(3), 16, 'bit 3, (hl)'),
+        0x5f: Op(cpu.bit_reg8(3, 'a'), 8, 'bit 3, a'),
+
+        0x60: Op(cpu.bit_reg8(4, 'b'), 8, 'bit 4, b'),
+        0x61: Op(cpu.bit_reg8(4, 'c'), 8, 'bit 4, c'),
+        0x62: Op(cpu.bit_reg8(4, 'd'), 8, 'bit 4, d'),
+        0x63: Op(cpu.bit_reg8(4, 'e'), 8, 'bit 4, e'),
+        0x64: Op(cpu.bit_reg8(4, 'h'), 8, 'bit 4, h'),
+        0x65: Op(cpu.bit_reg8(4, 'l'), 8, 'bit 4, l'),
+        0x66: Op(cpu.bit_regHLaddr(4), 16, 'bit 4, (hl)'),
+        0x67: Op(cpu.bit_reg8(4, 'a'), 8, 'bit 4, a'),
+
+        0x68: Op(cpu.bit_reg8(5, 'b'), 8, 'bit 5, b'),
+        0x69: Op(cpu.bit_reg8(5, 'c'), 8, 'bit 5, c'),
+        0x6a: Op(cpu.bit_reg8(5, 'd'), 8, 'bit 5, d'),
+        0x6b: Op(cpu.bit_reg8(5, 'e'), 8, 'bit 5, e'),
+        0x6c: Op(cpu.bit_reg8(5, 'h'), 8, 'bit 5, h'),
+        0x6d: Op(cpu.bit_reg8(5, 'l'), 8, 'bit 5, l'),
+        0x6e: Op(cpu.bit_regHLaddr(5), 16, 'bit 5, (hl)'),
+        0x6f: Op(cpu.bit_reg8(5, 'a'), 8, 'bit 5, a'),
+
+        0x70: Op(cpu.bit_reg8(6, 'b'), 8, 'bit 6, b'),
+        0x71: Op(cpu.bit_reg8(6, 'c'), 8, 'bit 6, c'),
+        0x72: Op(cpu.bit_reg8(6, 'd'), 8, 'bit 6, d'),
+        0x73: Op(cpu.bit_reg8(6, 'e'), 8, 'bit 6, e'),
+        0x74: Op(cpu.bit_reg8(6, 'h'), 8, 'bit 6, h'),
+        0x75: Op(cpu.bit_reg8(6, 'l'), 8, 'bit 6, l'),
+        0x76: Op(cpu.bit_regHLaddr(6), 16, 'bit 6, (hl)'),
+        0x77: Op(cpu.bit_reg8(6, 'a'), 8, 'bit 6, a'),
+
+        0x78: Op(cpu.bit_reg8(7, 'b'), 8, 'bit 7, b'),
+        0x79: Op(cpu.bit_reg8(7, 'c'), 8, 'bit 7, c'),
+        0x7a: Op(cpu.bit_reg8(7, 'd'), 8, 'bit 7, d'),
+        0x7b: Op(cpu.bit_reg8(7, 'e'), 8, 'bit 7, e'),
+        0x7c: Op(cpu.bit_reg8(7, 'h'), 8, 'bit 7, h'),
+        0x7d: Op(cpu.bit_reg8(7, 'l'), 8, 'bit 7, l'),
+        0x7e: Op(cpu.bit_regHLaddr(7), 16, 'bit 7, (hl)'),
+        0x7f: Op(cpu.bit_reg8(7, 'a'), 8, 'bit 7, a'),
+
+        0x80: Op(cpu.res_reg8(0, 'b'), 8, 'res 0, b'),
+        0x81: Op(cpu.res_reg8(0, 'c'), 8, 'res 0, c'),
+        0x82: Op(cpu.res_reg8(0, 'd'), 8, 'res 0, d'),
+        0x83: Op(cpu.res_reg8(0, 'e'), 8, 'res 0, e'),
+        0x84: Op(cpu.res_reg8(0, 'h'), 8, 'res 0, h'),
+        0x85: Op(cpu.res_reg8(0, 'l'), 8, 'res 0, l'),
+        0x86: Op(cpu.res_regHLaddr(0), 16, 'res 0, (hl)'),
+        0x87: Op(cpu.res_reg8(0, 'a'), 8, 'res 0, a'),
+
+        0x88: Op(cpu.res_reg8(1, 'b'), 8, 'res 1, b'),
+        0x89: Op(cpu.res_reg8(1, 'c'), 8, 'res 1, c'),
+        0x8a: Op(cpu.res_reg8(1, 'd'), 8, 'res 1, d'),
+        0x8b: Op(cpu.res_reg8(1, 'e'), 8, 'res 1, e'),
+        0x8c: Op(cpu.res_reg8(1, 'h'), 8, 'res 1, h'),
+        0x8d: Op(cpu.res_reg8(1, 'l'), 8, 'res 1, l'),
+        0x8e: Op(cpu.res_regHLaddr(1), 16, 'res 1, (hl)'),
+        0x8f: Op(cpu.res_reg8(1, 'a'), 8, 'res 1, a'),
+
+        0x90: Op(cpu.res_reg8(2, 'b'), 8, 'res 2, b'),
+        0x91: Op(cpu.res_reg8(2, 'c'), 8, 'res 2, c'),
+        0x92: Op(cpu.res_reg8(2, 'd'), 8, 'res 2, d'),
+        0x93: Op(cpu.res_reg8(2, 'e'), 8, 'res 2, e'),
+        0x94: Op(cpu.res_reg8(2, 'h'), 8, 'res 2, h'),
+        0x95: Op(cpu.res_reg8(2, 'l'), 8, 'res 2, l'),
+        0x96: Op(cpu.res_regHLaddr(2), 16, 'res 2, (hl)'),
+        0x97: Op(cpu.res_reg8(2, 'a'), 8, 'res 2, a'),
+
+        0x98: Op(cpu.res_reg8(3, 'b'), 8, 'res 3, b'),
+        0x99: Op(cpu.res_reg8(3, 'c'), 8, 'res 3, c'),
+        0x9a: Op(cpu.res_reg8(3, 'd'), 8, 'res 3, d'),
+        0x9b: Op(cpu.res_reg8(3, 'e'), 8, 'res 3, e'),
+        0x9c: Op(cpu.res_reg8(3, 'h'), 8, 'res 3, h'),
+        0x9d: Op(cpu.res_reg8(3, 'l'), 8, 'res 3, l'),
+        0x9e: Op(cpu.res_regHLaddr(3), 16, 'res 3, (hl)'),
+        0x9f: Op(cpu.res_reg8(3, 'a'), 8, 'res 3, a'),
+
+        0xa0: Op(cpu.res_reg8(4, 'b'), 8, 'res 4, b'),
+        0xa1: Op(cpu.res_reg8(4, 'c'), 8, 'res 4, c'),
+        0xa2: Op(cpu.res_reg8(4, 'd'), 8, 'res 4, d'),
+        0xa3: Op(cpu.res_reg8(4, 'e'), 8, 'res 4, e'),
+        0xa4: Op(cpu.res_reg8(4, 'h'), 8, 'res 4, h'),
+        0xa5: Op(cpu.res_reg8(4, 'l'), 8, 'res 4, l'),
+        0xa6: Op(cpu.res_regHLaddr(4), 16, 'res 4, (hl)'),
+        0xa7: Op(cpu.res_reg8(4, 'a'), 8, 'res 4, a'),
+
+        0xa8: Op(cpu.res_reg8(5, 'b'), 8, 'res 5, b'),
+        0xa9: Op(cpu.res_reg8(5, 'c'), 8, 'res 5, c'),
+        0xaa: Op(cpu.res_reg8(5, 'd'), 8, 'res 5, d'),
+        0xab: Op(cpu.res_reg8(5, 'e'), 8, 'res 5, e'),
+        0xac: Op(cpu.res_reg8(5, 'h'), 8, 'res 5, h'),
+        0xad: Op(cpu.res_reg8(5, 'l'), 8, 'res 5, l'),
+        0xae: Op(cpu.res_regHLaddr(5), 16, 'res 5, (hl)'),
+        0xaf: Op(cpu.res_reg8(5, 'a'), 8, 'res 5, a'),
+
+        0xb0: Op(cpu.res_reg8(6, 'b'), 8, 'res 6, b'),
+        0xb1: Op(cpu.res_reg8(6, 'c'), 8, 'res 6, c'),
+        0xb2: Op(cpu.res_reg8(6, 'd'), 8, 'res 6, d'),
+        0xb3: Op(cpu.res_reg8(6, 'e'), 8, 'res 6, e'),
+        0xb4: Op(cpu.res_reg8(6, 'h'), 8, 'res 6, h'),
+        0xb5: Op(cpu.res_reg8(6, 'l'), 8, 'res 6, l'),
+        0xb6: Op(cpu.res_regHLaddr(6), 16, 'res 6, (hl)'),
+        0xb7: Op(cpu.res_reg8(6, 'a'), 8, 'res 6, a'),
+
+        0xb8: Op(cpu.res_reg8(7, 'b'), 8, 'res 7, b'),
+        0xb9: Op(cpu.res_reg8(7, 'c'), 8, 'res 7, c'),
+        0xba: Op(cpu.res_reg8(7, 'd'), 8, 'res 7, d'),
+        0xbb: Op(cpu.res_reg8(7, 'e'), 8, 'res 7, e'),
+        0xbc: Op(cpu.res_reg8(7, 'h'), 8, 'res 7, h'),
+        0xbd: Op(cpu.res_reg8(7, 'l'), 8, 'res 7, l'),
+        0xbe: Op(cpu.res_regHLaddr(7), 16, 'res 7, (hl)'),
+        0xbf: Op(cpu.res_reg8(7, 'a'), 8, 'res 7, a'),
+
+        0xc0: Op(cpu.set__reg8(0, 'b'), 8, 'set 0, b'),
+        0xc1: Op(cpu.set__reg8(0, 'c'), 8, 'set 0, c'),
+        0xc2: Op(cpu.set__reg8(0, 'd'), 8, 'set 0, d'),
+        0xc3: Op(cpu.set__reg8(0, 'e'), 8, 'set 0, e'),
+        0xc4: Op(cpu.set__reg8(0, 'h'), 8, 'set 0, h'),
+        0xc5: Op(cpu.set__reg8(0, 'l'), 8, 'set 0, l'),
+        0xc6: Op(cpu.set_regHLaddr(0), 16, 'set 0, (hl)'),
+        0xc7: Op(cpu.set__reg8(0, 'a'), 8, 'set 0, a'),
+
+        0xc8: Op(cpu.set__reg8(1, 'b'), 8, 'set 1, b'),
+        0xc9: Op(cpu.set__reg8(1, 'c'), 8, 'set 1, c'),
+        0xca: Op(cpu.set__reg8(1, 'd'), 8, 'set 1, d'),
+        0xcb: Op(cpu.set__reg8(1, 'e'), 8, 'set 1, e'),
+        0xcc: Op(cpu.set__reg8(1, 'h'), 8, 'set 1, h'),
+        0xcd: Op(cpu.set__reg8(1, 'l'), 8, 'set 1, l'),
+        0xce: Op(cpu.set_regHLaddr(1), 16, 'set 1, (hl)'),
+        0xcf: Op(cpu.set__reg8(1, 'a'), 8, 'set 1, a'),
+
+        0xd0: Op(cpu.set__reg8(2, 'b'), 8, 'set 2, b'),
+        0xd1: Op(cpu.set__reg8(2, 'c'), 8, 'set 2, c'),
+        0xd2: Op(cpu.set__reg8(2, 'd'), 8, 'set 2, d'),
+        0xd3: Op(cpu.set__reg8(2, 'e'), 8, 'set 2, e'),
+        0xd4: Op(cpu.set__reg8(2, 'h'), 8, 'set 2, h'),
+        0xd5: Op(cpu.set__reg8(2, 'l'), 8, 'set 2, l'),
+        0xd6: Op(cpu.set_regHLaddr(2), 16, 'set 2, (hl)'),
+        0xd7: Op(cpu.set__reg8(2, 'a'), 8, 'set 2, a'),
+
+        0xd8: Op(cpu.set__reg8(3, 'b'), 8, 'set 3, b'),
+        0xd9: Op(cpu.set__reg8(3, 'c'), 8, 'set 3, c'),
+        0xda: Op(cpu.set__reg8(3, 'd'), 8, 'set 3, d'),
+        0xdb: Op(cpu.set__reg8(3, 'e'), 8, 'set 3, e'),
+        0xdc: Op(cpu.set__reg8(3, 'h'), 8, 'set 3, h'),
+        0xdd: Op(cpu.set__reg8(3, 'l'), 8, 'set 3, l'),
+        0xde: Op(cpu.set_regHLaddr(3), 16, 'set 3, (hl)'),
+        0xdf: Op(cpu.set__reg8(3, 'a'), 8, 'set 3, a'),
+
+        0xe0: Op(cpu.set__reg8(4, 'b'), 8, 'set 4, b'),
+        0xe1: Op(cpu.set__reg8(4, 'c'), 8, 'set 4, c'),
+        0xe2: Op(cpu.set__reg8(4, 'd'), 8, 'set 4, d'),
+        0xe3: Op(cpu.set__reg8(4, 'e'), 8, 'set 4, e'),
+        0xe4: Op(cpu.set__reg8(4, 'h'), 8, 'set 4, h'),
+        0xe5: Op(cpu.set__reg8(4, 'l'), 8, 'set 4, l'),
+        0xe6: Op(cpu.set_regHLaddr(4), 16, 'set 4, (hl)'),
+        0xe7: Op(cpu.set__reg8(4, 'a'), 8, 'set 4, a'),
+
+        0xe8: Op(cpu.set__reg8(5, 'b'), 8, 'set 5, b'),
+        0xe9: Op(cpu.set__reg8(5, 'c'), 8, 'set 5, c'),
+        0xea: Op(cpu.set__reg8(5, 'd'), 8, 'set 5, d'),
+        0xeb: Op(cpu.set__reg8(5, 'e'), 8, 'set 5, e'),
+        0xec: Op(cpu.set__reg8(5, 'h'), 8, 'set 5, h'),
+        0xed: Op(cpu.set__reg8(5, 'l'), 8, 'set 5, l'),
+        0xee: Op(cpu.set_regHLaddr(5), 16, 'set 5, (hl)'),
+        0xef: Op(cpu.set__reg8(5, 'a'), 8, 'set 5, a'),
+
+        0xf0: Op(cpu.set__reg8(6, 'b'), 8, 'set 6, b'),
+        0xf1: Op(cpu.set__reg8(6, 'c'), 8, 'set 6, c'),
+        0xf2: Op(cpu.set__reg8(6, 'd'), 8, 'set 6, d'),
+        0xf3: Op(cpu.set__reg8(6, 'e'), 8, 'set 6, e'),
+        0xf4: Op(cpu.set__reg8(6, 'h'), 8, 'set 6, h'),
+        0xf5: Op(cpu.set__reg8(6, 'l'), 8, 'set 6, l'),
+        0xf6: Op(cpu.set_regHLaddr(6), 16, 'set 6, (hl)'),
+        0xf7: Op(cpu.set__reg8(6, 'a'), 8, 'set 6, a'),
+
+        0xf8: Op(cpu.set__reg8(7, 'b'), 8, 'set 7, b'),
+        0xf9: Op(cpu.set__reg8(7, 'c'), 8, 'set 7, c'),
+        0xfa: Op(cpu.set__reg8(7, 'd'), 8, 'set 7, d'),
+        0xfb: Op(cpu.set__reg8(7, 'e'), 8, 'set 7, e'),
+        0xfc: Op(cpu.set__reg8(7, 'h'), 8, 'set 7, h'),
+        0xfd: Op(cpu.set__reg8(7, 'l'), 8, 'set 7, l'),
+        0xfe: Op(cpu.set_regHLaddr(7), 16, 'set 7, (hl)'),
+        0xff: Op(cpu.set__reg8(7, 'a'), 8, 'set 7, a'),
+    }
+    return opcode_map, cb_opcode_map
@@ -1,10 +1,9 @@
-
-
 import slowboy.interrupts
 
 class MockInterruptController(slowboy.interrupts.InterruptListener):
     def __init__(self):
         self.ie = 0
+        self.if_ = 0
         self.last_interrupt = None
 
     def notify_interrupt(self, interrupt):
@@ -12,3 +11,6 @@ class MockInterruptController(slowboy.interrupts.InterruptListener):
 
     def acknowledge_interrupt(self, interrupt):
         pass
+
+    def io_hooks(self):
+        return {}
@@ -0,0 +1,95 @@
+import unittest
+
+from slowboy.alu import (ADD, SUB, AND_FLAGS, OR_FLAGS, INC_FLAGS, DEC_FLAGS,
+                         RL, RR, RLC, SWAP, DAA, BIT_MASKS, RES_MASKS,
+                         Z_FLAG, N_FLAG, H_FLAG, C_FLAG, PENDING)
+
+
+def entry(result, flags=0):
+    return result << 8 | flags | PENDING
+
+
+class TestALU(unittest.TestCase):
+    def test_add(self):
+        self.assertEqual(ADD[0x3a << 8 | 0xc6], entry(0x00, Z_FLAG | H_FLAG | C_FLAG))
+        self.assertEqual(ADD[0x3c << 8 | 0x12], entry(0x4e))
+        # adc: the carry in counts towards the half-carry
+        self.assertEqual(ADD[1 << 16 | 0x0f << 8 | 0x00], entry(0x10, H_FLAG))
+        self.assertEqual(ADD[1 << 16 | 0xe1 << 8 | 0x1e], entry(0x00, Z_FLAG | H_FLAG | C_FLAG))
+
+    def test_sub(self):
+        self.assertEqual(SUB[0x3e << 8 | 0x3e], entry(0x00, Z_FLAG | N_FLAG))
+        self.assertEqual(SUB[0x3e << 8 | 0x0f], entry(0x2f, N_FLAG | H_FLAG))
+        self.assertEqual(SUB[0x3e << 8 | 0x40], entry(0xfe, N_FLAG | C_FLAG))
+        self.assertEqual(SUB[0x3e << 8 | 0x00], entry(0x3e, N_FLAG))
+        # sbc
+        self.assertEqual(SUB[1 << 16 | 0x3b << 8 | 0x2a], entry(0x10, N_FLAG))
+        self.assertEqual(SUB[1 << 16 | 0x3b << 8 | 0x4f], entry(0xeb, N_FLAG | H_FLAG | C_FLAG))
+
+    def test_cp_matches_old(self):
+        """cp through the table sets Z, N and C as the old cp handlers did,
+        which computed A - operand and set Z if the result was 0 and C if it
+        was negative. Only H changed, see test_cp_halfcarry in test_z80."""
+
+        for a in range(0x100):
+            for b in range(0x100):
+                flags = SUB[a << 8 | b]
+                result = a - b
+                old = N_FLAG | (Z_FLAG if result & 0xff == 0 else 0) | \
+                    (C_FLAG if result < 0 else 0)
+                self.assertEqual(flags & (Z_FLAG | N_FLAG | C_FLAG), old, (a, b))
+                self.assertEqual(bool(flags & H_FLAG), a & 0x0f < b & 0x0f, (a, b))
+
+    def test_add_matches_old(self):
+        """add through the table sets the flags and result the old add
+        handlers did."""
+
+        for a in range(0x100):
+            for b in range(0x100):
+                result = a + b
+                old = (result & 0xff) << 8 | PENDING | \
+                    (Z_FLAG if result & 0xff == 0 else 0) | \
+                    (H_FLAG if (a & 0x0f) + (b & 0x0f) > 0x0f else 0) | \
+                    (C_FLAG if result > 0xff else 0)
+                self.assertEqual(ADD[a << 8 | b], old, (a, b))
+
+    def test_logic(self):
+        self.assertEqual(AND_FLAGS[0], Z_FLAG | H_FLAG | PENDING)
+        self.assertEqual(AND_FLAGS[0x10], H_FLAG | PENDING)
+        self.assertEqual(OR_FLAGS[0], Z_FLAG | PENDING)
+        self.assertEqual(OR_FLAGS[0xff], PENDING)
+
+    def test_inc_dec(self):
+        self.assertEqual(INC_FLAGS[0xff], Z_FLAG | H_FLAG | PENDING)
+        self.assertEqual(INC_FLAGS[0x50], PENDING)
+        self.assertEqual(DEC_FLAGS[0x01], Z_FLAG | N_FLAG | PENDING)
+        self.assertEqual(DEC_FLAGS[0x00], N_FLAG | H_FLAG | PENDING)
+
+    def test_rotate(self):
+        self.assertEqual(RL[0x80], entry(0x00, Z_FLAG | C_FLAG))
+        self.assertEqual(RL[1 << 8 | 0x11], entry(0x23))
+        self.assertEqual(RR[1 << 8 | 0x01], entry(0x80, C_FLAG))
+        self.assertEqual(RLC[1 << 8 | 0x85], entry(0x0b, C_FLAG))
+        self.assertEqual(SWAP[1 << 8 | 0xf0], entry(0x0f))
+
+    def test_daa(self):
+        # 0x45 + 0x38
+        self.assertEqual(DAA[0x7d], entry(0x83))
+        self.assertEqual(DAA[C_FLAG << 4 | 0x12], entry(0x72, C_FLAG))
+        self.assertEqual(DAA[(N_FLAG | H_FLAG) << 4 | 0x4b], entry(0x45, N_FLAG | H_FLAG))
+        self.assertEqual(DAA[(N_FLAG | C_FLAG) << 4 | 0xa0], entry(0x40, N_FLAG | C_FLAG))
+        self.assertEqual(DAA[0x9a], entry(0x00, Z_FLAG | C_FLAG))
+        # Not in the manual's table
+        self.assertEqual(DAA[(H_FLAG | C_FLAG) << 4 | 0x34], 0)
+
+    def test_masks(self):
+        self.assertEqual(BIT_MASKS[0], 0x01)
+        self.assertEqual(BIT_MASKS[7], 0x80)
+        self.assertEqual(RES_MASKS[3], 0xf7)
+
+    def test_pending(self):
+        # A flag byte is never 0, even when no flag is set
+        for table in (ADD, SUB, RL, SWAP):
+            self.assertTrue(all(v & 0xff for v in table))
+        for table in (AND_FLAGS, OR_FLAGS, INC_FLAGS, DEC_FLAGS):
+            self.assertTrue(all(table))
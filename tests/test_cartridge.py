@@ -0,0 +1,237 @@
+import os
+import tempfile
+import unittest
+
+import slowboy.mmu
+import slowboy.z80
+import slowboy.cartridge
+from slowboy.cartridge import ROM_BANK_SIZE, RAM_BANK_SIZE
+
+
+def make_rom(cart_type, banks, ram_code=0):
+    """Returns a ROM image whose banks are filled with their bank number."""
+
+    rom = bytearray(banks * ROM_BANK_SIZE)
+    for bank in range(banks):
+        start = bank * ROM_BANK_SIZE
+        rom[start:start+ROM_BANK_SIZE] = bytes([bank & 0xff]) * ROM_BANK_SIZE
+    rom[0x147] = cart_type
+    rom[0x149] = ram_code
+    return bytes(rom)
+
+
+class TestLoadCartridge(unittest.TestCase):
+    def test_types(self):
+        for cart_type, cls in [(0x00, slowboy.cartridge.NoMBC),
+                               (0x03, slowboy.cartridge.MBC1),
+                               (0x13, slowboy.cartridge.MBC3),
+                               (0x1b, slowboy.cartridge.MBC5),
+                               (0xfc, slowboy.cartridge.NoMBC)]:
+            cart = slowboy.cartridge.load_cartridge(make_rom(cart_type, 2))
+            self.assertIsInstance(cart, cls)
+
+    def test_ram_size(self):
+        cart = slowboy.cartridge.load_cartridge(make_rom(0x03, 4, 0x03))
+        self.assertEqual(len(cart.ram), 32*1024)
+        self.assertEqual(cart.ram_banks, 4)
+        cart = slowboy.cartridge.load_cartridge(make_rom(0x01, 4, 0x00))
+        self.assertEqual(len(cart.ram), 0)
+
+    def test_no_rom(self):
+        cart = slowboy.cartridge.load_cartridge(None)
+        self.assertIsInstance(cart, slowboy.cartridge.NoMBC)
+        self.assertEqual(len(cart.ram), RAM_BANK_SIZE)
+
+    def test_pages_share_rom(self):
+        rom = bytearray(make_rom(0x01, 4))
+        cart = slowboy.cartridge.load_cartridge(rom)
+        pages = cart.rom_pages(2)
+        self.assertEqual(len(pages), 0x40)
+        rom[2*ROM_BANK_SIZE] = 0x55
+        self.assertEqual(pages[0][0], 0x55)
+        self.assertIs(cart.rom_pages(2), pages)
+
+
+class TestMBC(unittest.TestCase):
+    def make_mmu(self, cart_type, banks, ram_code=0):
+        return slowboy.mmu.MMU(make_rom(cart_type, banks, ram_code))
+
+    def test_no_mbc(self):
+        mmu = self.make_mmu(0x00, 2)
+        mmu.set_addr(0x2000, 0x01)
+        self.assertEqual(mmu.get_addr(0x4000), 1)
+        mmu.set_addr(0xa000, 0x12)
+        self.assertEqual(mmu.get_addr(0xa000), 0x12)
+
+    def test_mbc1_rom_bank(self):
+        mmu = self.make_mmu(0x01, 0x40)
+        self.assertEqual(mmu.get_addr(0x4000), 1)
+        mmu.set_addr(0x2000, 0x05)
+        self.assertEqual(mmu.get_addr(0x4000), 5)
+        self.assertEqual(mmu.rom_bank, 5)
+        # Bank 0 selects bank 1
+        mmu.set_addr(0x2000, 0x00)
+        self.assertEqual(mmu.get_addr(0x4000), 1)
+        # Upper bits
+        mmu.set_addr(0x2000, 0x02)
+        mmu.set_addr(0x4000, 0x01)
+        self.assertEqual(mmu.get_addr(0x7fff), 0x22)
+        self.assertEqual(mmu.get_addr(0x0000), 0)
+        # Mode 1 also switches the bank at 0x0000-0x3fff
+        mmu.set_addr(0x6000, 0x01)
+        self.assertEqual(mmu.get_addr(0x0000), 0x20)
+
+    def test_mbc1_ram(self):
+        mmu = self.make_mmu(0x03, 4, 0x03)
+        self.assertEqual(mmu.get_addr(0xa000), 0xff)
+        mmu.set_addr(0xa000, 0x12)
+        mmu.set_addr(0x0000, 0x0a)
+        self.assertEqual(mmu.get_addr(0xa000), 0x00)
+        mmu.set_addr(0xa000, 0x12)
+        self.assertEqual(mmu.get_addr(0xa000), 0x12)
+        mmu.set_addr(0x6000, 0x01)
+        mmu.set_addr(0x4000, 0x02)
+        self.assertEqual(mmu.get_addr(0xa000), 0x00)
+        mmu.set_addr(0xbfff, 0x34)
+        self.assertEqual(mmu.cartridge_ram[2*RAM_BANK_SIZE + 0x1fff], 0x34)
+        mmu.set_addr(0x0000, 0x00)
+        self.assertEqual(mmu.get_addr(0xbfff), 0xff)
+
+    def test_mbc3(self):
+        mmu = self.make_mmu(0x10, 0x80, 0x03)
+        mmu.set_addr(0x2000, 0x7f)
+        self.assertEqual(mmu.get_addr(0x4000), 0x7f)
+        mmu.set_addr(0x0000, 0x0a)
+        mmu.set_addr(0x4000, 0x03)
+        mmu.set_addr(0xa000, 0x56)
+        self.assertEqual(mmu.cartridge_ram[3*RAM_BANK_SIZE], 0x56)
+        # RTC seconds
+        mmu.set_addr(0x4000, 0x08)
+        mmu.set_addr(0xa000, 0x3b)
+        self.assertEqual(mmu.get_addr(0xa123), 0x3b)
+        self.assertEqual(mmu.cartridge.rtc[0], 0x3b)
+        mmu.set_addr(0x4000, 0x03)
+        self.assertEqual(mmu.get_addr(0xa000), 0x56)
+
+    def test_mbc5(self):
+        mmu = self.make_mmu(0x19, 0x200)
+        mmu.set_addr(0x2000, 0x00)
+        self.assertEqual(mmu.get_addr(0x4000), 0)
+        mmu.set_addr(0x2000, 0x23)
+        mmu.set_addr(0x3000, 0x01)
+        self.assertEqual(mmu.rom_bank, 0x123)
+        self.assertEqual(mmu.get_addr(0x4000), 0x23)
+
+    def test_remap_changed_windows(self):
+        """Writes to the MBC registers only map the windows whose bank
+        changed again."""
+
+        mmu = self.make_mmu(0x03, 0x40, 0x03)
+        mapped = []
+        map_read_pages = mmu._map_read_pages
+        def count_map(first_page, bufs):
+            mapped.append(first_page)
+            map_read_pages(first_page, bufs)
+        mmu._map_read_pages = count_map
+
+        mmu.set_addr(0x2000, 0x01)
+        mmu.set_addr(0x0000, 0x00)
+        self.assertEqual(mapped, [])
+        mmu.set_addr(0x2000, 0x05)
+        self.assertEqual(mapped, [0x40])
+        mmu.set_addr(0x2000, 0x05)
+        mmu.set_addr(0x0000, 0x0a)
+        self.assertEqual(mapped, [0x40, 0xa0])
+        mmu.set_addr(0x0000, 0x0a)
+        self.assertEqual(mapped, [0x40, 0xa0])
+        # Mode 1 maps the upper bits at 0x0000-0x3fff and the RAM bank
+        mmu.set_addr(0x4000, 0x01)
+        self.assertEqual(mapped, [0x40, 0xa0, 0x40])
+        mmu.set_addr(0x6000, 0x01)
+        self.assertEqual(mapped, [0x40, 0xa0, 0x40, 0x00, 0xa0])
+        self.assertEqual(mmu.get_addr(0x0000), 0x20)
+        self.assertEqual(mmu.get_addr(0x4000), 0x25)
+        self.assertEqual(mmu.rom0_bank, 0x20)
+
+    def test_fetch_bank_switch(self):
+        cpu = slowboy.z80.Z80(rom=make_rom(0x01, 8))
+        cpu.pc = 0x4000
+        self.assertEqual(cpu.fetch(), 1)
+        cpu.mmu.set_addr(0x2000, 0x03)
+        self.assertEqual(cpu.fetch(), 3)
+        cpu.pc = 0x40ff
+        self.assertEqual(cpu.fetch2(), 0x0303)
+        self.assertEqual(cpu.pc, 0x4101)
+
+
+class TestSave(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.sav')
+        os.close(fd)
+        os.remove(self.path)
+        # MBC1+RAM+BATTERY, 32 KB of RAM
+        self.mmu = slowboy.mmu.MMU(make_rom(0x03, 4, 0x03))
+        self.mmu.set_addr(0x0000, 0x0a)
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_battery(self):
+        self.assertTrue(self.mmu.cartridge.battery)
+        cart = slowboy.cartridge.load_cartridge(make_rom(0x02, 4, 0x03))
+        self.assertFalse(cart.battery)
+
+    def test_create(self):
+        self.assertTrue(self.mmu.load_save(self.path))
+        self.assertEqual(os.path.getsize(self.path), 32*1024)
+        self.assertEqual(self.mmu.get_addr(0xa000), 0)
+
+    def test_load(self):
+        data = bytearray(32*1024)
+        data[0x0010] = 0x12
+        data[3*RAM_BANK_SIZE + 0x100] = 0x34
+        with open(self.path, 'wb') as f:
+            f.write(data)
+        self.mmu.load_save(self.path)
+        self.assertEqual(self.mmu.get_addr(0xa010), 0x12)
+        self.mmu.set_addr(0x6000, 0x01)
+        self.mmu.set_addr(0x4000, 0x03)
+        self.assertEqual(self.mmu.get_addr(0xa100), 0x34)
+
+    def test_dirty_pages(self):
+        mmu = self.mmu
+        mmu.load_save(self.path)
+        cart = mmu.cartridge
+        # Clean pages are not mapped for writing
+        self.assertIsNone(mmu._write_pages[0xa1])
+        mmu.set_addr(0xa123, 0x56)
+        self.assertEqual(cart.dirty, {0x01})
+        self.assertIsNotNone(mmu._write_pages[0xa1])
+        mmu.set_addr(0xa124, 0x57)
+        self.assertIsNone(mmu._write_pages[0xa2])
+
+        mmu.flush_save()
+        self.assertEqual(cart.dirty, set())
+        self.assertIsNone(mmu._write_pages[0xa1])
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        self.assertEqual(data[0x123:0x125], b'\x56\x57')
+
+    def test_write_through(self):
+        mmu = self.mmu
+        mmu.load_save(self.path, write_through=True)
+        mmu.set_addr(0xa123, 0x56)
+        self.assertIsNone(mmu._write_pages[0xa1])
+        self.assertEqual(mmu.cartridge.dirty, set())
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read()[0x123], 0x56)
+
+    def test_scheduled_flush(self):
+        cpu = slowboy.z80.Z80(mmu=self.mmu)
+        self.mmu.load_save(self.path)
+        self.mmu.set_addr(0xa000, 0x01)
+        self.assertEqual(cpu.scheduler.deadline(self.mmu),
+                         slowboy.mmu.SAVE_FLUSH_INTERVAL)
+        cpu.scheduler.run(slowboy.mmu.SAVE_FLUSH_INTERVAL)
+        self.assertEqual(self.mmu.cartridge.dirty, set())
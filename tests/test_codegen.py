@@ -0,0 +1,178 @@
+import os
+import random
+import tempfile
+import unittest
+
+import slowboy.z80
+import slowboy.codegen
+from slowboy.opcodes import INSTRUCTIONS, CB_INSTRUCTIONS
+from slowboy.translator import instruction_length
+
+from tests.factory_opcodes import FactoryZ80, factory_opcode_maps
+
+
+FLAG_BITS = (0x80, 0x40, 0x20, 0x10)
+
+
+def make_rom(code, start=0x100):
+    rom = bytearray(0x8000)
+    rom[start:start+len(code)] = code
+    return bytes(rom)
+
+
+def randomize(rng, cpus, code):
+    """Loads :py:data:code at 0x100 and gives every CPU in :py:data:cpus the
+    same random registers, with pointers into WRAM and some flags pending."""
+
+    rom = make_rom(code)
+    values = {reg: rng.randrange(0x100) for reg in 'abcdef'}
+    pointers = {reg: rng.randrange(0xc000, 0xdf00) for reg in ('bc', 'de', 'hl', 'sp')}
+    pending = rng.choice([0, rng.randrange(0x100) | 0x01])
+    for cpu in cpus:
+        cpu.mmu.rom = rom
+        for reg, value in values.items():
+            cpu.set_reg8(reg, value)
+        for reg, value in pointers.items():
+            cpu.set_reg16(reg, value)
+        cpu.regs[cpu.flags_slot] = pending
+        cpu.mmu.wram[:] = bytes(range(0x100)) * 0x20
+        cpu.pc = 0x100
+
+
+def random_code(rng, opcode, cb=False):
+    if cb:
+        return (0xcb, opcode)
+    code = (opcode,) + tuple(rng.randrange(0x100)
+                             for _ in range(instruction_length(opcode) - 1))
+    if opcode in (0xea, 0xfa, 0x08):
+        # Keep absolute addresses in WRAM
+        code = code[:1] + (rng.randrange(0x100), rng.randrange(0xc0, 0xdf))
+    return code
+
+
+class TestCodegen(unittest.TestCase):
+    def setUp(self):
+        self.cpu = slowboy.z80.Z80()
+
+    def run_instruction(self, cpu, handler, cb):
+        cpu.opcode = cpu.fetch()
+        if cb:
+            cpu.cb_opcode = cpu.fetch()
+        handler()
+
+    def test_matches_factory(self):
+        """Every generated handler must have the same effect as the handler
+        built by the factory methods."""
+
+        rng = random.Random(0)
+        cpu = self.cpu
+        ref = FactoryZ80()
+        opcode_map, cb_opcode_map = factory_opcode_maps(ref)
+
+        for cb, ops, ref_ops in ((False, cpu.opcode_map, opcode_map),
+                                 (True, cpu.cb_opcode_map, cb_opcode_map)):
+            self.assertEqual(set(ops), set(ref_ops))
+            for opcode in ops:
+                for _ in range(16):
+                    code = random_code(rng, opcode, cb)
+                    randomize(rng, (cpu, ref), code)
+                    desc = ' '.join('{:02x}'.format(b) for b in code)
+                    try:
+                        self.run_instruction(ref, ref_ops[opcode].function, cb)
+                    except ValueError:
+                        # daa rejects some inputs
+                        with self.assertRaises(ValueError, msg=desc):
+                            self.run_instruction(cpu, ops[opcode].function, cb)
+                        continue
+                    self.run_instruction(cpu, ops[opcode].function, cb)
+
+                    self.assertEqual(cpu.get_registers(), ref.get_registers(), desc)
+                    self.assertEqual(cpu.sp, ref.sp, desc)
+                    self.assertEqual(cpu.pc, ref.pc, desc)
+                    self.assertEqual(cpu.state, ref.state, desc)
+                    self.assertEqual(cpu._in_interrupt, ref._in_interrupt, desc)
+                    self.assertEqual(cpu.mmu.wram, ref.mmu.wram, desc)
+                    if not cb:
+                        self.assertEqual(cpu.cycles[opcode], ref.cycles[opcode], desc)
+
+    def test_flags(self):
+        """Instructions leave the flags marked - alone, and reset or set
+        those marked 0 or 1."""
+
+        rng = random.Random(1)
+        cpu = self.cpu
+        for cb, instructions, ops in ((False, INSTRUCTIONS, cpu.opcode_map),
+                                      (True, CB_INSTRUCTIONS, cpu.cb_opcode_map)):
+            for opcode, instruction in instructions.items():
+                for _ in range(16):
+                    randomize(rng, (cpu,), random_code(rng, opcode, cb))
+                    before = cpu.get_reg8('f')
+                    try:
+                        self.run_instruction(cpu, ops[opcode].function, cb)
+                    except ValueError:
+                        continue
+                    after = cpu.get_reg8('f')
+                    for flag, bit in zip(instruction.flags, FLAG_BITS):
+                        if flag == '-':
+                            self.assertEqual(after & bit, before & bit,
+                                             instruction.description)
+                        elif flag == '0':
+                            self.assertEqual(after & bit, 0, instruction.description)
+                        elif flag == '1':
+                            self.assertEqual(after & bit, bit, instruction.description)
+
+    def test_branch_cycles(self):
+        """Conditional branches charge the cycles of the path taken."""
+
+        cpu = self.cpu
+        conditions = {'nz': 0x00, 'z': 0x80, 'nc': 0x00, 'c': 0x10}
+        for opcode, instruction in INSTRUCTIONS.items():
+            if instruction.cycles_not_taken is None:
+                continue
+            flags = conditions[instruction.operands[0]]
+            for f, cycles in ((flags | 0x01, instruction.cycles),
+                              ((flags ^ 0x90) | 0x01, instruction.cycles_not_taken)):
+                randomize(random.Random(opcode), (cpu,), (opcode, 0, 0xc0))
+                cpu.regs[cpu.flags_slot] = f
+                self.run_instruction(cpu, cpu.opcode_map[opcode].function, False)
+                self.assertEqual(cpu.cycles[opcode], cycles, instruction.description)
+
+    def test_table(self):
+        self.assertNotIn(0xcb, INSTRUCTIONS)
+        self.assertEqual(len(CB_INSTRUCTIONS), 0x100)
+        self.assertEqual(INSTRUCTIONS[0x20].description, 'jr nz, r8')
+        self.assertEqual(INSTRUCTIONS[0x20].cycles_not_taken, 8)
+        self.assertIsNone(INSTRUCTIONS[0x18].cycles_not_taken)
+        self.assertEqual(CB_INSTRUCTIONS[0x7e].description, 'bit 7, (hl)')
+        self.assertEqual(CB_INSTRUCTIONS[0x7e].cycles, 16)
+        for opcode, instruction in INSTRUCTIONS.items():
+            self.assertEqual(self.cpu.cycles[opcode], instruction.cycles)
+
+
+class TestHandlerCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, '_handlers.py')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_regenerate(self):
+        with open(self.path, 'w') as f:
+            f.write(slowboy.codegen.HEADER + 'stale\nHANDLERS = {}\n')
+
+        module = slowboy.codegen.load_handlers(self.path)
+        digest = slowboy.codegen.source_hash()
+        self.assertEqual(module.SOURCE_HASH, digest)
+        self.assertEqual(set(module.HANDLERS), set(INSTRUCTIONS))
+        self.assertEqual(set(module.CB_HANDLERS), set(CB_INSTRUCTIONS))
+        with open(self.path) as f:
+            self.assertEqual(f.readline().strip(),
+                             slowboy.codegen.HEADER + digest)
+        self.assertIs(slowboy.codegen.load_handlers(self.path), module)
+
+    def test_unwritable(self):
+        path = os.path.join(self.dir.name, 'missing', '_handlers.py')
+        module = slowboy.codegen.load_handlers(path)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(set(module.HANDLERS), set(INSTRUCTIONS))
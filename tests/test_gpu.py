@@ -3,6 +3,8 @@ import unittest
 
 import slowboy.gpu
 import slowboy.interrupts
+import slowboy.render
+from slowboy.scheduler import Scheduler
 
 from tests.mock_interrupt_controller import MockInterruptController
 
@@ -12,6 +14,27 @@ STAT_IE_ALL_MASK = (slowboy.gpu.STAT_LYC_IE_MASK |
                     slowboy.gpu.STAT_HBLANK_IE_MASK |
                     slowboy.gpu.STAT_VBLANK_IE_MASK)
 
+class RecordingRenderer(slowboy.render.Renderer):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def register_changed(self, name):
+        self.calls.append(name)
+
+    def vram_changed(self, addr, value):
+        self.calls.append((addr, value))
+
+    def oam_changed(self):
+        self.calls.append('oam')
+
+    def vblank(self):
+        self.calls.append('vblank')
+
+    def refresh(self):
+        self.calls.append('refresh')
+
+
 class TestGPU(unittest.TestCase):
     def setUp(self):
         self.gpu = slowboy.gpu.GPU()
@@ -38,6 +61,52 @@ class TestGPU(unittest.TestCase):
         self.assertEqual(self.gpu.mode, slowboy.gpu.Mode.OAM_READ)
         self.assertEqual(self.gpu.mode_clock, 0)
 
+    def test_renderer(self):
+        """The GPU tells its renderer about the changes that affect the
+        picture."""
+
+        renderer = RecordingRenderer()
+        gpu = slowboy.gpu.GPU(renderer=renderer)
+        self.assertIs(renderer.gpu, gpu)
+        # The registers' initial values
+        self.assertIn('lcdc', renderer.calls)
+        self.assertIn('bgp', renderer.calls)
+
+        renderer.calls.clear()
+        gpu.scx = 0x12
+        gpu.set_vram(0x10, 0xff)
+        gpu.set_oam(0, 0x20)
+        gpu.set_oam(0, 0x20)
+        gpu.set_oam_block(bytes(0xa0))
+        self.assertEqual(renderer.calls, ['scx', (0x10, 0xff), 'oam', 'oam'])
+
+        renderer.calls.clear()
+        gpu.notify(0, 144 * 456)
+        self.assertEqual(renderer.calls, ['vblank'])
+        gpu.notify(0, 10 * 456)
+        self.assertEqual(renderer.calls, ['vblank'])
+
+    def test_scanline(self):
+        """Each visible line is reported at the end of its mode 3."""
+
+        renderer = RecordingRenderer()
+        lines = []
+        renderer.scanline = lines.append
+        gpu = slowboy.gpu.GPU(renderer=renderer)
+        gpu.notify(0, 80 + 171)
+        self.assertEqual(lines, [])
+        gpu.notify(0, 1)
+        self.assertEqual(lines, [0])
+        gpu.notify(0, 154 * 456)
+        self.assertEqual(lines, list(range(144)) + [0])
+
+    def test_load_renderer(self):
+        self.assertIsInstance(self.gpu.renderer, slowboy.render.NullRenderer)
+        renderer = RecordingRenderer()
+        self.gpu.load_renderer(renderer)
+        self.assertIs(renderer.gpu, self.gpu)
+        self.assertEqual(renderer.calls, ['refresh'])
+
     def test_mode(self):
         # Force ClockListener.notify and verify mode state transitions
         for i in range(144):
@@ -69,6 +138,40 @@ class TestGPU(unittest.TestCase):
                          slowboy.gpu.Mode.V_BLANK.value)
         self.assertEqual(self.gpu.mode_clock, 0)
 
+    def test_vblank(self):
+        # Run to the start of VBLANK in one call
+        self.gpu.notify(0, 144 * 456)
+        self.assertEqual(self.gpu.mode, slowboy.gpu.Mode.V_BLANK)
+        self.assertEqual(self.gpu.ly, 144)
+
+        # LY is incremented once per line
+        for ly in range(145, 154):
+            self.gpu.notify(0, 455)
+            self.assertEqual(self.gpu.ly, ly - 1)
+            self.gpu.notify(0, 1)
+            self.assertEqual(self.gpu.ly, ly)
+            self.assertEqual(self.gpu.mode, slowboy.gpu.Mode.V_BLANK)
+
+        self.gpu.notify(0, 456)
+        self.assertEqual(self.gpu.mode, slowboy.gpu.Mode.OAM_READ)
+        self.assertEqual(self.gpu.ly, 0)
+        self.assertEqual(self.gpu.mode_clock, 0)
+
+    def test_schedule(self):
+        scheduler = Scheduler()
+        self.gpu.load_scheduler(scheduler)
+        self.assertEqual(scheduler.next_deadline, 80)
+
+        scheduler.run(100)
+        self.assertEqual(self.gpu.mode, slowboy.gpu.Mode.OAM_VRAM_READ)
+        self.assertEqual(self.gpu.mode_clock, 20)
+        self.assertEqual(scheduler.next_deadline, 80 + 172)
+
+        self.gpu.sync(456)
+        self.assertEqual(self.gpu.mode, slowboy.gpu.Mode.OAM_READ)
+        self.assertEqual(self.gpu.ly, 1)
+        self.assertEqual(scheduler.next_deadline, 456 + 80)
+
     def test_stat_mode(self):
         # Initial mode is OAM_READ
         self.assertEqual(self.gpu.stat & slowboy.gpu.STAT_MODE_MASK,
@@ -0,0 +1,115 @@
+import unittest
+
+import slowboy.z80
+from slowboy.idle import Loop
+
+
+def make_rom(code, start=0x100):
+    rom = bytearray(0x8000)
+    rom[start:start+len(code)] = code
+    return bytes(rom)
+
+
+# wait: ldh a, (0x44); cp 0x90; jr nz, wait; stop
+WAIT_VBLANK = [0xf0, 0x44, 0xfe, 0x90, 0x20, 0xfa, 0x10]
+
+
+class TestIdleLoopDetector(unittest.TestCase):
+    def setUp(self):
+        self.cpu = slowboy.z80.Z80(rom=make_rom(WAIT_VBLANK))
+        self.detector = self.cpu.idle_loops
+
+    def test_analyze(self):
+        self.assertEqual(self.detector.analyze(0x100), Loop(0x100, 0x104, 12 + 8 + 12))
+
+    def test_analyze_write(self):
+        # wait: ldh a, (0x44); ld (hl), a; cp 0x90; jr nz, wait
+        self.cpu.mmu.rom = make_rom([0xf0, 0x44, 0x77, 0xfe, 0x90, 0x20, 0xf9])
+        self.assertIsNone(self.detector.analyze(0x100))
+
+    def test_analyze_memory(self):
+        # wait: ld a, (0xc000); cp 0x90; jr nz, wait
+        self.cpu.mmu.rom = make_rom([0xfa, 0x00, 0xc0, 0xfe, 0x90, 0x20, 0xf9])
+        self.assertIsNone(self.detector.analyze(0x100))
+        # wait: ldh a, (0x04); cp 0x90; jr nz, wait
+        self.cpu.mmu.rom = make_rom([0xf0, 0x04, 0xfe, 0x90, 0x20, 0xfa])
+        self.assertIsNone(self.detector.analyze(0x100))
+
+    def test_analyze_exit(self):
+        # wait: ldh a, (0x41); bit 1, a; jr z, done; jp wait; done: stop
+        self.cpu.mmu.rom = make_rom([0xf0, 0x41, 0xcb, 0x4f, 0x28, 0x03,
+                                     0xc3, 0x00, 0x01, 0x10])
+        # The exit isn't taken while the loop runs
+        self.assertEqual(self.detector.analyze(0x100),
+                         Loop(0x100, 0x106, 12 + 8 + 8 + 16))
+
+    def test_lookup(self):
+        loop = self.detector.lookup(0x100)
+        self.assertIs(self.detector.lookup(0x100), loop)
+        self.assertIn(0x100, self.detector.loops)
+
+        # Code in RAM is not cached
+        for i, b in enumerate(WAIT_VBLANK):
+            self.cpu.mmu.set_addr(0xc000 + i, b)
+        self.assertEqual(self.detector.lookup(0xc000), Loop(0xc000, 0xc004, 32))
+        self.assertNotIn(0xc000, self.detector.loops)
+
+    def test_loop_key(self):
+        self.assertEqual(self.detector.loop_key(0x100), 0x100)
+        self.cpu.mmu.rom0_bank = 0x20
+        self.assertEqual(self.detector.loop_key(0x100), 0x200100)
+        self.assertEqual(self.detector.loop_key(0x4100), 0x14100)
+        self.assertIsNone(self.detector.loop_key(0xc000))
+
+    def test_go(self):
+        """Skipping an idle loop ends in the same state as running it."""
+
+        cpus = [slowboy.z80.Z80(rom=make_rom(WAIT_VBLANK), skip_idle_loops=skip)
+                for skip in (False, True)]
+        for cpu in cpus:
+            cpu.go()
+
+        ran, skipped = cpus
+        self.assertEqual(skipped.clock, ran.clock)
+        self.assertEqual(skipped.get_registers(), ran.get_registers())
+        self.assertEqual(skipped.pc, ran.pc)
+        self.assertEqual(skipped.gpu.ly, 0x90)
+        self.assertGreater(skipped.idle_loops.skipped_cycles, 0)
+        self.assertGreater(skipped.idle_loops.skips, 0)
+
+    def test_go_translate(self):
+        cpus = [slowboy.z80.Z80(rom=make_rom(WAIT_VBLANK), translate=True,
+                                skip_idle_loops=skip)
+                for skip in (False, True)]
+        for cpu in cpus:
+            cpu.go()
+
+        ran, skipped = cpus
+        self.assertEqual(skipped.clock, ran.clock)
+        self.assertGreater(skipped.idle_loops.skipped_cycles, 0)
+
+    def test_counter_loop(self):
+        # ld b, 0; loop: ldh a, (0x44); inc b; jr nz, loop; stop
+        self.cpu = slowboy.z80.Z80(rom=make_rom([0x06, 0x00, 0xf0, 0x44,
+                                                  0x04, 0x20, 0xfb, 0x10]))
+        self.cpu.go()
+        self.assertEqual(self.cpu.idle_loops.skipped_cycles, 0)
+        # The last jr nz isn't taken
+        self.assertEqual(self.cpu.clock, 8 + 256 * (12 + 4 + 12) - 4 + 4)
+
+    def test_branch_keeps_pending_flags(self):
+        """Branches are checked without merging the pending flags."""
+
+        # ld b, 0; loop: inc b; jr nz, loop; stop
+        cpu = slowboy.z80.Z80(rom=make_rom([0x06, 0x00, 0x04, 0x20, 0xfd, 0x10]))
+        merges = []
+        cpu._sync_flags = lambda: merges.append(cpu.clock)
+        lookups = []
+        lookup = cpu.idle_loops.lookup
+        cpu.idle_loops.lookup = lambda head: lookups.append(head) or lookup(head)
+        cpu.go()
+
+        self.assertEqual(merges, [])
+        self.assertEqual(lookups, [0x102])
+        self.assertEqual(cpu.idle_loops.skipped_cycles, 0)
+        self.assertEqual(cpu.get_registers()['b'], 0)
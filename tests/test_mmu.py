@@ -125,8 +125,35 @@ class TestMMU(unittest.TestCase):
             self.assertEqual(self.mmu.get_addr(x), 0)
 
     def test_set_addr_io(self):
-        # TODO
-        self.fail('not implemented: memory-mapped IO tests')
+        # Registers without hooks are plain storage
+        for addr in (0xff01, 0xff02, 0xff10, 0xff3f, 0xff7f):
+            self.mmu.set_addr(addr, addr & 0xff)
+            self.assertEqual(self.mmu.get_addr(addr), addr & 0xff)
+            self.assertEqual(self.mmu.io[addr - 0xff00], addr & 0xff)
+
+        # Registers with hooks belong to their device
+        self.mmu.set_addr(0xff42, 0x12)
+        self.assertEqual(self.mmu.gpu.scy, 0x12)
+        self.assertEqual(self.mmu.io[0x42], 0)
+        self.mmu.gpu.scx = 0x34
+        self.assertEqual(self.mmu.get_addr(0xff43), 0x34)
+
+    def test_io_hooks(self):
+        written = []
+        self.mmu.add_io_hooks({0xff50: (lambda: 0x56, written.append)})
+        self.assertEqual(self.mmu.get_addr(0xff50), 0x56)
+        self.mmu.set_addr(0xff50, 0x78)
+        self.assertEqual(written, [0x78])
+
+        self.mmu.remove_io_hooks([0xff50])
+        self.assertEqual(self.mmu.get_addr(0xff50), 0)
+
+        gpu = self.mmu.gpu
+        self.mmu.unload_gpu()
+        self.mmu.set_addr(0xff42, 0x12)
+        self.assertEqual(self.mmu.io[0x42], 0x12)
+        self.mmu.load_gpu(gpu)
+        self.assertEqual(self.mmu.get_addr(0xff42), gpu.scy)
 
     def test_set_addr_hram(self):
         for x in range(0xff80, 0xffff):
@@ -145,6 +172,64 @@ class TestMMU(unittest.TestCase):
                          self.mmu.interrupt_controller.ie)
         self.assertEqual(self.mmu.get_addr(0xffff), 255)
 
+class TestPageTable(unittest.TestCase):
+    def setUp(self):
+        self.mmu = slowboy.mmu.MMU(gpu=slowboy.gpu.GPU())
+
+    def test_rom(self):
+        rom = bytes(i & 0xff for i in range(0x8000))
+        self.mmu.rom = rom
+        self.assertEqual(self.mmu.get_addr(0x1234), 0x34)
+        self.assertEqual(self.mmu.get_addr(0x7fff), 0xff)
+
+        # Replacing the ROM remaps it
+        self.mmu.rom = bytes(0x8000)
+        self.assertEqual(self.mmu.get_addr(0x1234), 0)
+
+        # Pages past the end of a short ROM are still readable as far as
+        # the ROM goes
+        self.mmu.rom = bytes(range(0x80))
+        self.assertEqual(self.mmu.get_addr(0x7f), 0x7f)
+        with self.assertRaises(IndexError):
+            self.mmu.get_addr(0x80)
+
+    def test_echo_ram(self):
+        self.mmu.set_addr(0xfdff, 0x12)
+        self.assertEqual(self.mmu.wram[0x1dff], 0x12)
+        self.mmu.set_addr(0xc000, 0x34)
+        self.assertEqual(self.mmu.get_addr(0xe000), 0x34)
+
+    def test_invalid(self):
+        for addr in (-1, -0x100, 0x10000, 0x1ffff):
+            with self.assertRaises(ValueError):
+                self.mmu.get_addr(addr)
+
+    def test_code_page(self):
+        invalidated = []
+
+        class MockTranslator():
+            def invalidate_addr(self, addr):
+                invalidated.append(addr)
+
+        self.mmu.load_translator(MockTranslator())
+        self.mmu.mark_code_page(0xc1)
+        self.mmu.mark_code_page(0xff)
+
+        self.mmu.set_addr(0xc0ff, 1)
+        self.mmu.set_addr(0xc100, 2)
+        self.mmu.set_addr(0xe101, 3)
+        self.mmu.set_addr(0xff80, 4)
+        self.assertEqual(invalidated, [0xc100, 0xc101, 0xff80])
+        self.assertEqual(self.mmu.get_addr(0xc101), 3)
+
+        self.mmu.clear_code_pages()
+        self.mmu.set_addr(0xc100, 5)
+        self.mmu.set_addr(0xff80, 6)
+        self.assertEqual(self.mmu.code_pages, bytearray(0x100))
+        self.assertEqual(invalidated, [0xc100, 0xc101, 0xff80])
+        self.assertEqual(self.mmu.get_addr(0xc100), 5)
+
+
 class TestDMA(unittest.TestCase):
     def setUp(self):
         self.mmu = slowboy.mmu.MMU(gpu=slowboy.gpu.GPU())
@@ -166,4 +251,175 @@ class TestDMA(unittest.TestCase):
         self.mmu.dma = 0x02
         self.assertEqual(self.mmu.dma, 0x02)
         for i in range(0xa0):
-            self.assertEqual(self.mmu.get_addr(0xfe00+i), ((0x200+i) * 2) & 0xff)
\ No newline at end of file
+            self.assertEqual(self.mmu.get_addr(0xfe00+i), ((0x200+i) * 2) & 0xff)
+    def test_dma_wram(self):
+        self.mmu.wram[0x100:0x1a0] = bytes(range(0xa0))
+        self.mmu.dma = 0xc1
+        self.assertEqual(self.mmu.gpu.oam[:0xa0], bytes(range(0xa0)))
+
+    def test_dma_vram(self):
+        # Pages without a buffer are copied through get_addr
+        self.mmu.gpu.vram[0x100:0x1a0] = bytes(range(0xa0))
+        self.mmu.dma = 0x81
+        self.assertEqual(self.mmu.gpu.oam[:0xa0], bytes(range(0xa0)))
+
+    def test_dma_sprite_refresh(self):
+        gpu = self.mmu.gpu
+        changes = []
+        gpu.renderer.oam_changed = lambda: changes.append(True)
+
+        self.mmu.dma = 0x02
+        self.assertEqual(changes, [True])
+
+        # Copying the same data again changes nothing
+        self.mmu.dma = 0x02
+        self.assertEqual(changes, [True])
+
+    def test_dma_sdl_sprite_refresh(self):
+        """A DMA transfer marks the SDL renderer's sprites stale rather than
+        redrawing them, and the same data again doesn't."""
+
+        from slowboy.render.sdl import SDLRenderer
+        renderer = SDLRenderer()
+        self.mmu.gpu.load_renderer(renderer)
+        refreshes = []
+        update_sprite_surface = renderer._update_sprite_surface
+        def count_refresh():
+            refreshes.append(True)
+            update_sprite_surface()
+        renderer._update_sprite_surface = count_refresh
+
+        self.mmu.dma = 0x02
+        self.assertTrue(renderer._stale_sprites)
+        self.assertEqual(refreshes, [])
+
+        # Copying the same data again changes nothing
+        renderer._update_sprite_surface()
+        self.mmu.dma = 0x02
+        self.assertFalse(renderer._stale_sprites)
+        self.assertEqual(len(refreshes), 1)
+
+
+class TestWatchpoints(unittest.TestCase):
+    def setUp(self):
+        self.mmu = slowboy.mmu.MMU(gpu=slowboy.gpu.GPU())
+        self.hits = []
+
+    def hit(self, addr, value, read):
+        self.hits.append((addr, value, read))
+
+    def test_write(self):
+        mmu = self.mmu
+        mmu.add_watchpoint(0xc010, False, self.hit)
+        mmu.set_addr(0xc00f, 0x01)
+        mmu.set_addr(0xc010, 0x02)
+        self.assertEqual(mmu.get_addr(0xc010), 0x02)
+        self.assertEqual(self.hits, [(0xc010, 0x02, False)])
+        # Reads and the rest of the page are not watched
+        self.assertIsNotNone(mmu._read_pages[0xc0])
+        self.assertIsNone(mmu._write_pages[0xc0])
+        self.assertIsNotNone(mmu._write_pages[0xc1])
+
+    def test_read(self):
+        mmu = self.mmu
+        mmu.set_addr(0xc123, 0x45)
+        mmu.add_watchpoint(0xc123, True, self.hit)
+        self.assertEqual(mmu.get_addr(0xc123), 0x45)
+        self.assertEqual(mmu.get_addr(0xc124), 0x00)
+        self.assertEqual(self.hits, [(0xc123, 0x45, True)])
+
+    def test_range(self):
+        mmu = self.mmu
+        mmu.add_watchpoint(0xc0f0, False, self.hit, end=0xc20f)
+        for addr in (0xc0ef, 0xc0f0, 0xc100, 0xc20f, 0xc210):
+            mmu.set_addr(addr, 0x11)
+        self.assertEqual([hit[0] for hit in self.hits],
+                         [0xc0f0, 0xc100, 0xc20f])
+
+    def test_remove(self):
+        mmu = self.mmu
+        wp1 = mmu.add_watchpoint(0xc000, True, self.hit)
+        wp2 = mmu.add_watchpoint(0xc080, False, self.hit)
+        self.assertEqual(mmu.watchpoints, [wp1, wp2])
+        mmu.remove_watchpoint(wp1)
+        # Reads are unwatched, writes still watched for wp2
+        self.assertIsNotNone(mmu._read_pages[0xc0])
+        self.assertIsNone(mmu._write_pages[0xc0])
+        mmu.remove_watchpoint(wp2)
+        self.assertIs(mmu._write_pages[0xc0], mmu._read_pages[0xc0])
+        mmu.set_addr(0xc000, 0x01)
+        self.assertEqual(self.hits, [])
+
+    def test_remap(self):
+        """Watched pages stay watched when the page table is remapped."""
+
+        mmu = self.mmu
+        mmu.add_watchpoint(0xa000, True, self.hit)
+        mmu.set_addr(0xa000, 0x12)
+        mmu.unload_rom()
+        self.assertEqual(mmu.get_addr(0xa000), 0x00)
+        self.assertEqual(self.hits, [(0xa000, 0x12, False),
+                                     (0xa000, 0x00, True)])
+
+    def test_code_page(self):
+        mmu = self.mmu
+        mmu.add_watchpoint(0xc000, False, self.hit)
+        mmu.mark_code_page(0xc0)
+        mmu.unmark_code_page(0xc0)
+        self.assertIsNone(mmu._write_pages[0xc0])
+        mmu.set_addr(0xc000, 0x01)
+        self.assertEqual(self.hits, [(0xc000, 0x01, False)])
+        self.assertEqual(mmu.wram[0], 0x01)
+
+
+class TestWordBlockAccess(unittest.TestCase):
+    def setUp(self):
+        self.mmu = slowboy.mmu.MMU(gpu=slowboy.gpu.GPU())
+
+    def test_read16_write16(self):
+        mmu = self.mmu
+        mmu.write16(0xc010, 0x1234)
+        self.assertEqual(mmu.get_addr(0xc010), 0x34)
+        self.assertEqual(mmu.get_addr(0xc011), 0x12)
+        self.assertEqual(mmu.read16(0xc010), 0x1234)
+        # Across a page boundary
+        mmu.write16(0xc0ff, 0xabcd)
+        self.assertEqual(mmu.get_addr(0xc0ff), 0xcd)
+        self.assertEqual(mmu.get_addr(0xc100), 0xab)
+        self.assertEqual(mmu.read16(0xc0ff), 0xabcd)
+        # Through handlers
+        mmu.write16(0xff80, 0x5678)
+        self.assertEqual(mmu.read16(0xff80), 0x5678)
+
+    def test_wrap(self):
+        mmu = self.mmu
+        mmu.load_interrupt_controller(slowboy.interrupts.InterruptController())
+        mmu.load_rom(bytes(0x8000))
+        mmu.write16(0xffff, 0x0102)
+        self.assertEqual(mmu.get_addr(0xffff), 0x02)
+        self.assertEqual(mmu.read16(0xffff), 0x0002)
+
+    def test_read_block(self):
+        mmu = self.mmu
+        for i in range(0x300):
+            mmu.set_addr(0xc000 + i, i & 0xff)
+        block = mmu.read_block(0xc010, 0x20)
+        self.assertIsInstance(block, memoryview)
+        self.assertTrue(block.readonly)
+        self.assertEqual(bytes(block), bytes(range(0x10, 0x30)))
+        block = mmu.read_block(0xc0f0, 0x120)
+        self.assertEqual(bytes(block),
+                         bytes(i & 0xff for i in range(0xf0, 0x210)))
+        # Through handlers
+        mmu.set_addr(0xff81, 0x99)
+        self.assertEqual(bytes(mmu.read_block(0xff80, 2)), b'\x00\x99')
+        with self.assertRaises(ValueError):
+            mmu.read_block(0xfff0, 0x20)
+
+    def test_write_block(self):
+        mmu = self.mmu
+        data = bytes(i & 0xff for i in range(0x180))
+        mmu.write_block(0xc0c0, data)
+        self.assertEqual(bytes(mmu.wram[0xc0:0x240]), data)
+        mmu.write_block(0xff80, b'\x01\x02')
+        self.assertEqual(mmu.hram[0:2], b'\x01\x02')
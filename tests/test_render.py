@@ -0,0 +1,306 @@
+import subprocess
+import sys
+import unittest
+
+import slowboy.gpu
+import slowboy.render
+
+try:
+    import numpy as np
+    from slowboy.render.framebuffer import FramebufferRenderer, decode_tiles
+except ImportError:
+    np = None
+
+
+WHITE = 0xff
+BLACK = 0x00
+
+
+def encode_tile(rows):
+    """Encodes 8 rows of 8 color numbers as 16 bytes of tile data."""
+
+    data = bytearray()
+    for row in rows:
+        lo = hi = 0
+        for c in row:
+            lo = (lo << 1) | (c & 1)
+            hi = (hi << 1) | (c >> 1)
+        data += bytes((lo, hi))
+    return data
+
+
+SOLID = encode_tile([[3] * 8] * 8)
+# Color 0 in the left half and 3 in the right half
+HALF = encode_tile([[0] * 4 + [3] * 4] * 8)
+
+
+class TestRenderer(unittest.TestCase):
+    def test_headless_imports(self):
+        """The GPU and the headless UI don't need SDL."""
+
+        code = ('import sys\n'
+                'import slowboy.headless\n'
+                'slowboy.gpu.GPU()\n'
+                'assert "sdl2" not in sys.modules, "imported SDL"\n')
+        subprocess.run([sys.executable, '-c', code], check=True)
+
+    def test_null_renderer(self):
+        gpu = slowboy.gpu.GPU()
+        self.assertIsInstance(gpu.renderer, slowboy.render.NullRenderer)
+        self.assertFalse(gpu.renderer.draw(None))
+
+
+@unittest.skipIf(np is None, 'requires NumPy')
+class TestFramebufferRenderer(unittest.TestCase):
+    def setUp(self):
+        self.renderer = FramebufferRenderer()
+        self.gpu = slowboy.gpu.GPU(renderer=self.renderer)
+        # Color n is shade n, from white to black
+        self.gpu.bgp = 0xe4
+        self.gpu.obp0 = 0xe4
+        self.gpu.obp1 = 0x1b
+
+    def set_tile(self, tileid, data):
+        for i, b in enumerate(data):
+            self.gpu.set_vram(tileid * 16 + i, b)
+
+    def draw(self):
+        self.gpu.notify(0, self.gpu.cycles_to_vblank())
+        return self.renderer.frame
+
+    def test_decode_tiles(self):
+        vram = bytearray(0x2000)
+        vram[16:32] = encode_tile([[0, 1, 2, 3, 0, 0, 0, 0]] * 8)
+        tiles = decode_tiles(vram)
+        self.assertEqual(tiles.shape, (384, 8, 8))
+        self.assertEqual(tiles[1, 0].tolist(), [0, 1, 2, 3, 0, 0, 0, 0])
+        self.assertFalse(tiles[0].any())
+
+    def test_background(self):
+        self.set_tile(1, SOLID)
+        # Top left of the map at 0x9800
+        self.gpu.set_vram(0x1800, 1)
+
+        frame = self.draw()
+        self.assertEqual(frame.shape, (144, 160))
+        self.assertEqual(self.renderer.frames, 1)
+        self.assertTrue((frame[:8, :8] == BLACK).all())
+        self.assertTrue((frame[8:, :] == WHITE).all())
+        self.assertTrue((frame[:, 8:] == WHITE).all())
+
+        # Scrolling wraps around the 256x256 background
+        self.gpu.scx = 4
+        self.gpu.scy = 0xfc
+        frame = self.draw()
+        self.assertTrue((frame[4:12, :4] == BLACK).all())
+        self.assertTrue((frame[:4, :] == WHITE).all())
+        self.assertTrue((frame[:, 4:] == WHITE).all())
+
+    def test_signed_tile_numbers(self):
+        # With LCDC bit 4 reset, tile numbers are signed and relative to 0x9000
+        self.gpu.lcdc = 0x81
+        self.set_tile(0xff, SOLID)
+        self.gpu.set_vram(0x1800, 0xff)
+
+        frame = self.draw()
+        self.assertTrue((frame[:8, :8] == BLACK).all())
+        self.assertTrue((frame[8:, :] == WHITE).all())
+
+    def test_window(self):
+        self.set_tile(1, SOLID)
+        # Window map at 0x9c00
+        self.gpu.lcdc = 0x91 | 0x40 | 0x20
+        self.gpu.set_vram(0x1c00, 1)
+        self.gpu.wy = 100
+        self.gpu.wx = 80 + 7
+
+        frame = self.draw()
+        self.assertTrue((frame[100:108, 80:88] == BLACK).all())
+        self.assertEqual(int((frame == BLACK).sum()), 64)
+
+    def test_sprites(self):
+        self.set_tile(2, HALF)
+        self.gpu.lcdc = 0x91 | 0x02
+        # Sprite 0 at the top left, sprite 1 flipped and with palette 1
+        self.gpu.set_oam_block(bytes((16, 8, 2, 0x00, 32, 16, 2, 0x30)) +
+                               bytes(0xa0 - 8))
+
+        frame = self.draw()
+        # Color 0 is transparent
+        self.assertTrue((frame[:8, :4] == WHITE).all())
+        self.assertTrue((frame[:8, 4:8] == BLACK).all())
+        # Color 3 in palette 1 is white
+        self.assertTrue((frame[16:24, :] == WHITE).all())
+        self.assertEqual(int((frame == BLACK).sum()), 32)
+
+    def test_sprite_priority(self):
+        self.set_tile(1, HALF)
+        self.set_tile(2, SOLID)
+        self.gpu.set_vram(0x1800, 1)
+        self.gpu.lcdc = 0x91 | 0x02
+        self.gpu.obp0 = 0x54
+        # Behind background colors 1-3
+        self.gpu.set_oam_block(bytes((16, 8, 2, 0x80)) + bytes(0xa0 - 4))
+
+        frame = self.draw()
+        self.assertTrue((frame[:8, :4] == 0xaa).all())
+        self.assertTrue((frame[:8, 4:8] == BLACK).all())
+
+    def test_mid_frame_changes(self):
+        """Lines are drawn with the registers as they are at the end of their
+        mode 3."""
+
+        self.set_tile(1, SOLID)
+        for i in range(32):
+            self.gpu.set_vram(0x1800 + i * 32, 1)
+
+        # Run to the middle of line 72, then scroll and change the palette
+        self.gpu.notify(0, 72 * 456 + 100)
+        self.gpu.scx = 0xfc
+        self.gpu.bgp = 0x1b
+        frame = self.draw()
+        self.assertTrue((frame[:72, :8] == BLACK).all())
+        self.assertTrue((frame[:72, 8:] == WHITE).all())
+        # The line that was being drawn already has the new values
+        self.assertTrue((frame[72:, :4] == BLACK).all())
+        self.assertTrue((frame[72:, 4:12] == WHITE).all())
+        self.assertTrue((frame[72:, 12:] == BLACK).all())
+
+    def test_indexed(self):
+        self.set_tile(1, encode_tile([[0, 1, 2, 3, 0, 1, 2, 3]] * 8))
+        self.gpu.set_vram(0x1800, 1)
+        self.gpu.lcdc = 0x91 | 0x02
+        self.gpu.set_oam_block(bytes((24, 8, 1, 0x00, 24, 16, 1, 0x10)) +
+                               bytes(0xa0 - 8))
+
+        self.draw()
+        indexed = self.renderer.indexed
+        self.assertEqual(indexed.shape, (144, 160))
+        self.assertEqual(indexed.dtype, np.uint8)
+        self.assertEqual(indexed[0, :8].tolist(), [0, 1, 2, 3, 0, 1, 2, 3])
+        # Sprites' colors are offset by their palette
+        self.assertEqual(indexed[8, :16].tolist(),
+                         [0, 5, 6, 7, 0, 5, 6, 7, 0, 9, 10, 11, 0, 9, 10, 11])
+        self.assertEqual(self.renderer.palettes[8].tolist(),
+                         [0xff, 0xaa, 0x55, 0x00, 0xff, 0xaa, 0x55, 0x00,
+                          0x00, 0x55, 0xaa, 0xff])
+
+    def test_sprites_per_line(self):
+        self.set_tile(1, SOLID)
+        self.gpu.lcdc = 0x91 | 0x02
+        # 12 sprites side by side on the first line
+        oam = bytearray(0xa0)
+        for i in range(12):
+            oam[i*4:i*4+4] = (16, 8 + i * 8, 1, 0x00)
+        self.gpu.set_oam_block(oam)
+
+        frame = self.draw()
+        self.assertTrue((frame[:8, :80] == BLACK).all())
+        self.assertTrue((frame[:, 80:] == WHITE).all())
+
+    def test_sprite_order(self):
+        # Where sprites overlap, the one further left is drawn over the other
+        self.set_tile(1, SOLID)
+        self.gpu.lcdc = 0x91 | 0x02
+        self.gpu.set_oam_block(bytes((16, 12, 1, 0x00, 16, 8, 1, 0x10)) +
+                               bytes(0xa0 - 8))
+
+        self.draw()
+        self.assertEqual(self.renderer.indexed[0, :12].tolist(),
+                         [11] * 8 + [7] * 4)
+
+    def test_window_line(self):
+        # The window's lines only advance on lines where it is shown
+        self.set_tile(1, SOLID)
+        self.gpu.set_vram(0x1c00, 1)
+        self.gpu.wy = 10
+        self.gpu.wx = 7
+        self.gpu.notify(0, 12 * 456)
+        self.gpu.lcdc = 0x91 | 0x40 | 0x20
+        frame = self.draw()
+        self.assertTrue((frame[:12] == WHITE).all())
+        self.assertTrue((frame[12:20, :8] == BLACK).all())
+        self.assertTrue((frame[20:] == WHITE).all())
+
+    def test_window_position(self):
+        # The window's X position is written even when it equals WY
+        self.set_tile(1, SOLID)
+        self.gpu.lcdc = 0x91 | 0x40 | 0x20
+        self.gpu.set_vram(0x1c00, 1)
+        self.gpu.wy = 33
+        self.gpu.wx = 33 + 7
+        self.assertEqual(self.gpu.wx, 33)
+
+        frame = self.draw()
+        self.assertTrue((frame[33:41, 33:41] == BLACK).all())
+        self.assertEqual(int((frame == BLACK).sum()), 64)
+
+        # Window X below 7 scrolls the window off the left edge
+        self.gpu.wx = 3
+        frame = self.draw()
+        self.assertTrue((frame[33:41, :4] == BLACK).all())
+        self.assertEqual(int((frame == BLACK).sum()), 32)
+
+    def test_display_disabled(self):
+        self.set_tile(0, SOLID)
+        self.gpu.lcdc = 0x11
+        self.assertTrue((self.draw() == WHITE).all())
+
+
+class TestSDLRenderer(unittest.TestCase):
+    def setUp(self):
+        from slowboy.render.sdl import SDLRenderer
+        self.renderer = SDLRenderer()
+        self.gpu = slowboy.gpu.GPU(renderer=self.renderer)
+
+    def test_lazy_surfaces(self):
+        """The SDL surfaces are created by the first draw, from the state of
+        the GPU then."""
+
+        renderer = self.renderer
+        self.assertIsNone(renderer._tileset)
+        self.gpu.set_vram(0, 0xff)
+        self.gpu.bgp = 0xe4
+        self.assertIsNone(renderer._tileset)
+
+        renderer._init_surfaces()
+        self.assertIsNotNone(renderer._tileset)
+        self.assertIsNotNone(renderer._bgsurface)
+        self.assertTrue(renderer._stale_sprites)
+
+    def test_surfaces_created_by_draw(self):
+        import sdl2
+        self.assertIsNone(self.renderer._tileset)
+        self.assertIsNone(self.renderer._spritesurface)
+        surface = sdl2.SDL_CreateRGBSurfaceWithFormat(
+            0, slowboy.gpu.SCREEN_WIDTH, slowboy.gpu.SCREEN_HEIGHT, 32,
+            sdl2.SDL_PIXELFORMAT_RGBA32)
+        try:
+            self.gpu.notify(0, 144 * 456)
+            self.assertIsNone(self.renderer._tileset)
+            self.renderer.draw(surface)
+        finally:
+            sdl2.SDL_FreeSurface(surface)
+        self.assertIsNotNone(self.renderer._tileset)
+        self.assertIsNotNone(self.renderer._fgsurface)
+        self.assertIsNotNone(self.renderer._spritesurface)
+
+    def test_draw(self):
+        import sdl2
+        surface = sdl2.SDL_CreateRGBSurfaceWithFormat(
+            0, slowboy.gpu.SCREEN_WIDTH, slowboy.gpu.SCREEN_HEIGHT, 32,
+            sdl2.SDL_PIXELFORMAT_RGBA32)
+        try:
+            self.assertFalse(self.renderer.draw(surface))
+            self.gpu.notify(0, 144 * 456)
+            self.assertTrue(self.renderer.draw(surface))
+            self.assertFalse(self.renderer.draw(surface))
+        finally:
+            sdl2.SDL_FreeSurface(surface)
+
+    def test_oam_changed(self):
+        self.renderer._init_surfaces()
+        self.renderer._update_sprite_surface()
+        self.assertFalse(self.renderer._stale_sprites)
+        self.gpu.set_oam(0, 0x10)
+        self.assertTrue(self.renderer._stale_sprites)
@@ -0,0 +1,70 @@
+import gc
+import os
+import tempfile
+import unittest
+import uuid
+
+import slowboy.mmu
+import slowboy.rom
+
+
+class TestOpenROM(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.gb')
+        data = bytearray(0x8000)
+        data[0x4001] = 0x01
+        data[0x7fff] = 0xff
+        self.data = bytes(data)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(self.data)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_open_rom(self):
+        rom = slowboy.rom.open_rom(self.path)
+        self.assertTrue(rom.readonly)
+        self.assertEqual(rom.tobytes(), self.data)
+        with self.assertRaises(TypeError):
+            rom[0] = 0
+
+    def test_shared_mapping(self):
+        rom1 = slowboy.rom.open_rom(self.path)
+        rom2 = slowboy.rom.open_rom(self.path)
+        self.assertIs(rom1.obj, rom2.obj)
+
+    def test_mmu(self):
+        mmu1 = slowboy.mmu.MMU()
+        mmu1.load_rom_from_file(self.path)
+        mmu2 = slowboy.mmu.MMU()
+        mmu2.load_rom_from_file(self.path)
+        self.assertIs(mmu1.rom.obj, mmu2.rom.obj)
+        self.assertEqual(mmu1.get_addr(0x4001), 1)
+        self.assertEqual(mmu2.get_addr(0x7fff), 0xff)
+
+    def test_empty(self):
+        with open(self.path, 'wb'):
+            pass
+        self.assertEqual(len(slowboy.rom.open_rom(self.path)), 0)
+
+
+class TestSharedROM(unittest.TestCase):
+    def test_share_attach(self):
+        data = bytearray(0x8000)
+        data[0x1234] = 0x34
+        data = bytes(data)
+        name = 'slowboy-test-' + uuid.uuid4().hex[:8]
+        shm = slowboy.rom.share_rom(data, name=name)
+        try:
+            rom = slowboy.rom.attach_rom(name, size=len(data))
+            self.assertTrue(rom.readonly)
+            self.assertEqual(rom.tobytes(), data)
+            mmu = slowboy.mmu.MMU(rom)
+            self.assertEqual(mmu.get_addr(0x1234), 0x34)
+            del mmu, rom
+            # The MMU's handler tables refer back to it
+            gc.collect()
+            slowboy.rom.detach_rom(name)
+        finally:
+            shm.close()
+            shm.unlink()
@@ -0,0 +1,65 @@
+
+import unittest
+
+from slowboy.scheduler import Scheduler, Device, NEVER
+
+
+class MockDevice(Device):
+    def __init__(self):
+        self.synced = []
+
+    def sync(self, clock=None):
+        self.synced.append(clock)
+
+
+class TestScheduler(unittest.TestCase):
+    def setUp(self):
+        self.clock = 0
+        self.scheduler = Scheduler(now=lambda: self.clock)
+        self.a = MockDevice()
+        self.b = MockDevice()
+        self.scheduler.add_device(self.a)
+        self.scheduler.add_device(self.b)
+
+    def test_add_device(self):
+        self.assertEqual(self.scheduler.devices, [self.a, self.b])
+        self.assertEqual(self.scheduler.deadline(self.a), NEVER)
+        self.assertEqual(self.scheduler.next_deadline, NEVER)
+
+    def test_next_deadline(self):
+        self.scheduler.schedule(self.a, 100)
+        self.assertEqual(self.scheduler.next_deadline, 100)
+        self.scheduler.schedule(self.b, 50)
+        self.assertEqual(self.scheduler.next_deadline, 50)
+        self.scheduler.schedule(self.b, NEVER)
+        self.assertEqual(self.scheduler.next_deadline, 100)
+
+    def test_run(self):
+        self.scheduler.schedule(self.a, 100)
+        self.scheduler.schedule(self.b, 200)
+
+        self.scheduler.run(99)
+        self.assertEqual(self.a.synced, [])
+
+        self.scheduler.run(150)
+        self.assertEqual(self.a.synced, [150])
+        self.assertEqual(self.b.synced, [])
+        self.assertEqual(self.scheduler.deadline(self.a), NEVER)
+        self.assertEqual(self.scheduler.next_deadline, 200)
+
+    def test_run_stale(self):
+        self.scheduler.schedule(self.a, 100)
+        self.scheduler.schedule(self.a, 300)
+
+        self.scheduler.run(200)
+        self.assertEqual(self.a.synced, [])
+        self.assertEqual(self.scheduler.next_deadline, 300)
+
+        self.scheduler.run(300)
+        self.assertEqual(self.a.synced, [300])
+
+    def test_sync(self):
+        self.scheduler.schedule(self.a, 100)
+        self.scheduler.sync(10)
+        self.assertEqual(self.a.synced, [10])
+        self.assertEqual(self.b.synced, [10])
@@ -4,6 +4,7 @@ import unittest
 
 import slowboy.timer
 import slowboy.interrupts
+from slowboy.scheduler import Scheduler, NEVER
 
 from tests.mock_interrupt_controller import MockInterruptController
 
@@ -31,6 +32,13 @@ class TimerTest(unittest.TestCase):
         self.assertEqual(self.timer._div_cycles, 2)
         self.assertEqual(self.timer.div, 1)
 
+    def test_div_disabled(self):
+        """DIV counts whether or not TIMA is enabled."""
+
+        self.timer.notify(0, 490)
+        self.assertEqual(self.timer.div, 1)
+        self.assertEqual(self.timer.tima, 0)
+
     def test_tima_0(self):
         # enable timer at 4096 Hz
         self.timer.tac |= 0x4
@@ -38,8 +46,8 @@ class TimerTest(unittest.TestCase):
         self.timer.notify(0, 1955)
         self.assertEqual(self.timer.tima, 1)
         self.assertEqual(self.timer._cycles, 2)
-        self.assertEqual(self.interrupt_listener.last_interrupt,
-                         slowboy.interrupts.InterruptType.timer)
+        # Only overflows request an interrupt
+        self.assertIsNone(self.interrupt_listener.last_interrupt)
 
     def test_tima_1(self):
         # enable timer at 16384 Hz
@@ -48,8 +56,8 @@ class TimerTest(unittest.TestCase):
         self.timer.notify(0, 490)
         self.assertEqual(self.timer.tima, 1)
         self.assertEqual(self.timer._cycles, 2)
-        self.assertEqual(self.interrupt_listener.last_interrupt,
-                         slowboy.interrupts.InterruptType.timer)
+        # Only overflows request an interrupt
+        self.assertIsNone(self.interrupt_listener.last_interrupt)
 
     def test_tima_2(self):
         # enable timer at 65536 Hz
@@ -58,8 +66,8 @@ class TimerTest(unittest.TestCase):
         self.timer.notify(0, 130)
         self.assertEqual(self.timer.tima, 1)
         self.assertEqual(self.timer._cycles, 8)
-        self.assertEqual(self.interrupt_listener.last_interrupt,
-                         slowboy.interrupts.InterruptType.timer)
+        # Only overflows request an interrupt
+        self.assertIsNone(self.interrupt_listener.last_interrupt)
 
     def test_tima_3(self):
         # enable timer at 262144 Hz
@@ -68,5 +76,101 @@ class TimerTest(unittest.TestCase):
         self.timer.notify(0, 31)
         self.assertEqual(self.timer.tima, 1)
         self.assertEqual(self.timer._cycles, 1)
+        # Only overflows request an interrupt
+        self.assertIsNone(self.interrupt_listener.last_interrupt)
+
+    def test_schedule(self):
+        scheduler = Scheduler()
+        self.timer.load_scheduler(scheduler)
+        self.assertEqual(scheduler.deadline(self.timer), NEVER)
+
+        # enable timer at 4096 Hz
+        self.timer.tac |= 0x4
+        # The deadline is the overflow, not the next increment
+        self.assertEqual(scheduler.next_deadline, 0x100 * 1953)
+
+        scheduler.run(0x100 * 1953)
+        self.assertEqual(self.timer.tima, 0)
+        self.assertEqual(self.interrupt_listener.last_interrupt,
+                         slowboy.interrupts.InterruptType.timer)
+        self.assertEqual(scheduler.next_deadline, 2 * 0x100 * 1953)
+
+    def test_sync(self):
+        clock = 0
+        scheduler = Scheduler(now=lambda: clock)
+        self.timer.load_scheduler(scheduler)
+        # enable timer at 262144 Hz
+        self.timer.tac = 0x5
+
+        clock = 488 * 3 + 10
+        self.timer.sync()
+        self.assertEqual(self.timer.div, 3)
+        self.assertEqual(self.timer.tima, 49)
+        self.assertEqual(self.timer._cycles, 4)
+        self.assertEqual(scheduler.next_deadline, clock - 4 + (0x100 - 49) * 30)
+
+    def test_tac_sync(self):
+        """Cycles before a TAC write count at the old rate."""
+
+        clock = 0
+        scheduler = Scheduler(now=lambda: clock)
+        self.timer.load_scheduler(scheduler)
+        # enable timer at 262144 Hz
+        self.timer.tac = 0x5
+
+        clock = 8 * 30
+        # switch to 4096 Hz
+        self.timer.tac = 0x4
+        self.assertEqual(self.timer.tima, 8)
+        self.assertEqual(scheduler.next_deadline, clock + (0x100 - 8) * 1953)
+
+    def test_overflow(self):
+        # enable timer at 262144 Hz
+        self.timer.tac = 0x5
+        self.timer.tma = 0xf0
+        self.timer.tima = 0xfe
+
+        self.timer.notify(0, 30)
+        self.assertEqual(self.timer.tima, 0xff)
+        self.assertIsNone(self.interrupt_listener.last_interrupt)
+
+        # Overflow, reload, then 3 more increments
+        self.timer.notify(0, 4 * 30 + 5)
+        self.assertEqual(self.timer.tima, 0xf3)
+        self.assertEqual(self.timer._cycles, 5)
+        self.assertEqual(self.interrupt_listener.last_interrupt,
+                         slowboy.interrupts.InterruptType.timer)
+
+    def test_overflow_twice(self):
+        interrupts = []
+        self.interrupt_listener.notify_interrupt = interrupts.append
+        # enable timer at 262144 Hz
+        self.timer.tac = 0x5
+        self.timer.tma = 0xfc
+        self.timer.tima = 0xff
+
+        # Overflow to 0xfc, count to 0xff, overflow again and count once more
+        self.timer.notify(0, 6 * 30)
+        self.assertEqual(self.timer.tima, 0xfd)
+        self.assertEqual(interrupts, [slowboy.interrupts.InterruptType.timer])
+
+    def test_overflow_schedule(self):
+        clock = 0
+        scheduler = Scheduler(now=lambda: clock)
+        self.timer.load_scheduler(scheduler)
+        # enable timer at 262144 Hz
+        self.timer.tac = 0x5
+        self.timer.tma = 0x80
+
+        clock = 10
+        self.timer.sync()
+        self.timer.tima = 0xf0
+        # Writing TIMA moves the overflow
+        self.assertEqual(scheduler.next_deadline, 0x10 * 30)
+
+        clock = 0x10 * 30
+        scheduler.run(clock)
+        self.assertEqual(self.timer.tima, 0x80)
         self.assertEqual(self.interrupt_listener.last_interrupt,
                          slowboy.interrupts.InterruptType.timer)
+        self.assertEqual(scheduler.next_deadline, clock + 0x80 * 30)
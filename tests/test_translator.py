@@ -0,0 +1,299 @@
+import random
+import unittest
+
+import slowboy.z80
+from slowboy.translator import instruction_length, MAX_BLOCK_LENGTH
+
+
+def make_rom(code, start=0x100):
+    rom = bytearray(0x8000)
+    rom[start:start+len(code)] = code
+    return bytes(rom)
+
+
+class TestBlockTranslator(unittest.TestCase):
+    def setUp(self):
+        self.cpu = slowboy.z80.Z80(translate=True)
+
+    def test_instruction_length(self):
+        self.assertEqual(instruction_length(0x00), 1)
+        self.assertEqual(instruction_length(0x06), 2)
+        self.assertEqual(instruction_length(0xcb), 2)
+        self.assertEqual(instruction_length(0xc3), 3)
+
+    def test_block_key(self):
+        translator = self.cpu.translator
+        self.assertEqual(translator.block_key(0x150), 0x150)
+        self.assertEqual(translator.block_key(0x4150), 0x14150)
+        # MBC1 can map another bank at 0x0000-0x3fff
+        self.cpu.mmu.rom0_bank = 0x20
+        self.assertEqual(translator.block_key(0x150), 0x200150)
+        self.cpu.mmu.rom_bank = 2
+        self.assertEqual(translator.block_key(0x4150), 0x24150)
+        self.assertEqual(translator.block_key(0xc000), 0xc000)
+        self.assertEqual(translator.block_key(0xff80), 0xff80)
+        self.assertIsNone(translator.block_key(0x8000))
+        self.assertIsNone(translator.block_key(0xa000))
+        self.assertIsNone(translator.block_key(0xe000))
+        self.assertIsNone(translator.block_key(0xff00))
+
+    def test_translate(self):
+        # ld b, 0x12; inc b; ld a, b; jr -5
+        self.cpu.mmu.rom = make_rom([0x06, 0x12, 0x04, 0x78, 0x18, 0xfb])
+        block = self.cpu.translator.lookup(0x100)
+
+        self.assertEqual(block.cycles, 8 + 4 + 4 + 12)
+        self.assertIs(self.cpu.translator.lookup(0x100), block)
+
+        block.function()
+
+        self.assertEqual(self.cpu.get_reg8('b'), 0x13)
+        self.assertEqual(self.cpu.get_reg8('a'), 0x13)
+        self.assertEqual(self.cpu.pc, 0x101)
+
+    def test_translate_interpreted(self):
+        # halt
+        self.cpu.mmu.rom = make_rom([0x76])
+        self.assertIsNone(self.cpu.translator.lookup(0x100))
+
+        # ld b, 0x12; ldh (0x40), a
+        self.cpu.mmu.rom = make_rom([0x06, 0x12, 0xe0, 0x40])
+        self.cpu.translator.invalidate()
+        block = self.cpu.translator.lookup(0x100)
+        block.function()
+
+        self.assertEqual(block.cycles, 8)
+        self.assertEqual(self.cpu.pc, 0x102)
+
+    def test_translate_io(self):
+        # ld hl, 0xff44; inc b; ld a, (hl); inc b
+        self.cpu.mmu.rom = make_rom([0x21, 0x44, 0xff, 0x04, 0x7e, 0x04])
+        self.cpu.gpu.ly = 0x12
+        self.cpu.set_reg8('a', 0)
+        self.cpu.set_reg8('b', 0)
+        block = self.cpu.translator.lookup(0x100)
+
+        # The block stops before reading LY
+        self.assertEqual(block.function(), (12 + 4, 2))
+        self.assertEqual(self.cpu.pc, 0x104)
+        self.assertEqual(self.cpu.get_reg8('a'), 0)
+
+        # A block that starts with the read stops right after it
+        block = self.cpu.translator.lookup(0x104)
+        self.assertEqual(block.function(), (8, 1))
+        self.assertEqual(self.cpu.pc, 0x105)
+        self.assertEqual(self.cpu.get_reg8('a'), 0x12)
+        self.assertEqual(self.cpu.get_reg8('b'), 1)
+
+        # Other addresses don't stop the block
+        self.cpu.set_reg16('hl', 0xc000)
+        self.assertIsNone(self.cpu.translator.lookup(0x104).function())
+        self.assertEqual(self.cpu.get_reg8('b'), 2)
+
+    def test_translate_max_length(self):
+        self.cpu.mmu.rom = make_rom([])
+        block = self.cpu.translator.lookup(0x100)
+        block.function()
+
+        self.assertEqual(block.cycles, 4 * MAX_BLOCK_LENGTH)
+        self.assertEqual(self.cpu.pc, 0x100 + MAX_BLOCK_LENGTH)
+
+    def test_invalidate(self):
+        self.cpu.mmu.rom = make_rom([0x04])
+        block = self.cpu.translator.lookup(0x100)
+        self.cpu.translator.invalidate()
+
+        self.assertIsNot(self.cpu.translator.lookup(0x100), block)
+
+    def write(self, addr, code):
+        for i, b in enumerate(code):
+            self.cpu.mmu.set_addr(addr + i, b)
+
+    def test_ram_code(self):
+        mmu = self.cpu.mmu
+        # inc b; inc b; jp 0x0150
+        self.write(0xc0fe, [0x04, 0x04, 0xc3, 0x50, 0x01])
+        block = self.cpu.translator.lookup(0xc0fe)
+
+        self.assertEqual(block.cycles, 4 + 4 + 16)
+        self.assertEqual(mmu.code_pages[0xc0], 1)
+        self.assertEqual(mmu.code_pages[0xc1], 1)
+        self.assertEqual(mmu.code_pages[0xc2], 0)
+
+        # Writes outside the block leave it alone
+        mmu.set_addr(0xc0fd, 0x00)
+        mmu.set_addr(0xc103, 0x00)
+        mmu.set_addr(0xc200, 0x00)
+        self.assertIs(self.cpu.translator.lookup(0xc0fe), block)
+
+        # Overwrite the jump target: dec b; inc b; jp 0x0250
+        mmu.set_addr(0xc102, 0x02)
+        self.assertEqual(mmu.code_pages[0xc0], 0)
+        self.assertEqual(mmu.code_pages[0xc1], 0)
+        mmu.set_addr(0xc0fe, 0x05)
+
+        self.cpu.set_reg8('b', 0)
+        self.cpu.translator.lookup(0xc0fe).function()
+        self.assertEqual(self.cpu.get_reg8('b'), 0)
+        self.assertEqual(self.cpu.pc, 0x0250)
+
+    def test_ram_code_interpreted(self):
+        # halt
+        self.write(0xff80, [0x76])
+        self.assertIsNone(self.cpu.translator.lookup(0xff80))
+        self.assertEqual(self.cpu.mmu.code_pages[0xff], 1)
+
+        # inc b
+        self.write(0xff80, [0x04])
+        block = self.cpu.translator.lookup(0xff80)
+        self.assertEqual(block.cycles, 4 + 4 * (MAX_BLOCK_LENGTH - 1))
+
+    def test_invalidate_ram_code(self):
+        self.write(0xd000, [0x04, 0xc9])
+        self.cpu.translator.lookup(0xd000)
+        self.cpu.translator.invalidate()
+
+        self.assertEqual(self.cpu.mmu.code_pages, bytearray(0x100))
+        self.assertEqual(self.cpu.translator.page_blocks, {})
+
+    def test_matches_interpreter(self):
+        """Every translated instruction must have the same effect as its
+        interpreted handler."""
+
+        rng = random.Random(0)
+        cpu = self.cpu
+        ref = slowboy.z80.Z80()
+
+        opcodes = [(op,) for op in cpu.opcode_map]
+        opcodes += [(0xcb, op) for op in cpu.cb_opcode_map]
+        for prefix in opcodes:
+            length = instruction_length(prefix[0])
+            for _ in range(8):
+                code = prefix + tuple(rng.randrange(0x100)
+                                      for _ in range(length - len(prefix)))
+                if code[0] in (0xea, 0xfa, 0x08):
+                    # Keep absolute addresses in WRAM
+                    code = code[:1] + (rng.randrange(0x100), rng.randrange(0xc0, 0xdf))
+                # Trap after the instruction, so blocks are one instruction long
+                rom = make_rom(list(code) + [0xd3])
+                cpu.mmu.rom = rom
+                ref.mmu.rom = rom
+                cpu.translator.invalidate()
+
+                for reg in 'abcdef':
+                    value = rng.randrange(0x100)
+                    cpu.set_reg8(reg, value)
+                    ref.set_reg8(reg, value)
+                for reg in 'hl', 'sp':
+                    value = rng.randrange(0xc000, 0xdf00)
+                    cpu.set_reg16(reg, value)
+                    ref.set_reg16(reg, value)
+                for c in (cpu, ref):
+                    for reg16 in 'bc', 'de':
+                        if c.get_reg16(reg16) < 0xc000 or c.get_reg16(reg16) >= 0xe000:
+                            c.set_reg16(reg16, 0xc000 | c.get_reg16(reg16) & 0x1fff)
+                    c.mmu.wram[:] = bytes(range(0x100)) * 0x20
+                    c.pc = 0x100
+
+                block = cpu.translator.lookup(0x100)
+                if block is None:
+                    continue
+                ref.opcode = ref.mmu.get_addr(ref.pc)
+                ref.pc += 1
+                try:
+                    stopped = block.function()
+                except ValueError:
+                    # daa rejects some inputs
+                    with self.assertRaises(ValueError):
+                        ref.handlers[ref.opcode]()
+                    continue
+                ref.handlers[ref.opcode]()
+
+                desc = ' '.join('{:02x}'.format(b) for b in code)
+                self.assertEqual(cpu.get_registers(), ref.get_registers(), desc)
+                self.assertEqual(cpu.sp, ref.sp, desc)
+                self.assertEqual(cpu.pc, ref.pc, desc)
+                self.assertEqual(cpu.mmu.wram, ref.mmu.wram, desc)
+                cycles = block.cycles if stopped is None else stopped[0]
+                if code[0] == 0xcb:
+                    self.assertEqual(cycles, ref.cb_cycles[code[1]], desc)
+                else:
+                    # Conditional branches store the cycles of the path taken
+                    self.assertEqual(cycles, ref.cycles[code[0]], desc)
+
+
+class TestZ80Translate(unittest.TestCase):
+    def test_go(self):
+        """A translated run and an interpreted run end in the same state."""
+
+        # ld a, 0; ld b, 0x10; loop: inc a; dec b; jr nz, loop; stop
+        rom = make_rom([0x3e, 0x00, 0x06, 0x10, 0x3c, 0x05, 0x20, 0xfc, 0x10])
+        cpus = [slowboy.z80.Z80(rom=rom, translate=translate)
+                for translate in (False, True)]
+        for cpu in cpus:
+            cpu.go()
+
+        interpreted, translated = cpus
+        self.assertEqual(translated.get_registers(), interpreted.get_registers())
+        self.assertEqual(translated.pc, interpreted.pc)
+        self.assertEqual(translated.clock, interpreted.clock)
+        self.assertEqual(translated.get_reg8('a'), 0x10)
+
+    def test_go_io(self):
+        """Reads of IO registers through HL see the clock of the read."""
+
+        # ld hl, 0xff04; 120 x nop; ld a, (hl); stop
+        rom = make_rom([0x21, 0x04, 0xff] + [0x00] * 120 + [0x7e, 0x10])
+        cpus = [slowboy.z80.Z80(rom=rom, translate=translate)
+                for translate in (False, True)]
+        for cpu in cpus:
+            cpu.go()
+
+        interpreted, translated = cpus
+        self.assertEqual(translated.get_registers(), interpreted.get_registers())
+        self.assertEqual(translated.clock, interpreted.clock)
+        # DIV was read at cycle 12 + 4 * 120
+        self.assertEqual(translated.get_reg8('a'), 1)
+
+    def test_go_self_modifying(self):
+        """A block that overwrites its own code stops after the write."""
+
+        # jp 0xc000
+        rom = make_rom([0xc3, 0x00, 0xc0])
+        # ld a, 0x04; ld (0xc005), a; nop; stop. The store turns the nop into
+        # inc b.
+        code = [0x3e, 0x04, 0xea, 0x05, 0xc0, 0x00, 0x10]
+        cpus = [slowboy.z80.Z80(rom=rom, translate=translate)
+                for translate in (False, True)]
+        for cpu in cpus:
+            for i, b in enumerate(code):
+                cpu.mmu.set_addr(0xc000 + i, b)
+            cpu.go()
+
+        interpreted, translated = cpus
+        self.assertEqual(translated.get_registers(), interpreted.get_registers())
+        self.assertEqual(translated.clock, interpreted.clock)
+        self.assertEqual(translated.get_reg8('b'), 1)
+
+    def test_go_timer_interrupt(self):
+        """Blocks stop at the next device event, so a timer interrupt is
+        taken after the same instruction as in the interpreter."""
+
+        # ld a, 0x05; ldh (0x07), a; ld a, 0xfe; ldh (0x05), a; ld a, 0x04;
+        # ldh (0xff), a; ei; 40 x inc b; stop
+        code = ([0x3e, 0x05, 0xe0, 0x07, 0x3e, 0xfe, 0xe0, 0x05,
+                 0x3e, 0x04, 0xe0, 0xff, 0xfb] + [0x04] * 40 + [0x10])
+        rom = bytearray(make_rom(code))
+        # timer interrupt handler: stop
+        rom[0x50] = 0x10
+        cpus = [slowboy.z80.Z80(rom=bytes(rom), translate=translate)
+                for translate in (False, True)]
+        for cpu in cpus:
+            cpu.go()
+
+        interpreted, translated = cpus
+        self.assertEqual(translated.get_registers(), interpreted.get_registers())
+        self.assertEqual(translated.pc, interpreted.pc)
+        self.assertEqual(translated.clock, interpreted.clock)
+        self.assertEqual(translated.pc, 0x51)
+        self.assertLess(translated.get_reg8('b'), 40)
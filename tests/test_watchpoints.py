@@ -0,0 +1,32 @@
+import unittest
+
+from slowboy.watchpoints import Watchpoint, WatchpointIndex
+
+
+class TestWatchpointIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = WatchpointIndex()
+        self.wide = Watchpoint(0x1000, 0x1fff, False, True, None)
+        self.narrow = Watchpoint(0x1800, 0x1800, True, True, None)
+        self.other = Watchpoint(0x3000, 0x3003, False, True, None)
+        for watchpoint in (self.other, self.wide, self.narrow):
+            self.index.add(watchpoint)
+
+    def test_find(self):
+        self.assertEqual(self.index.find(0x0fff), [])
+        self.assertEqual(self.index.find(0x1000), [self.wide])
+        self.assertCountEqual(self.index.find(0x1800), [self.wide, self.narrow])
+        self.assertEqual(self.index.find(0x2000), [])
+        self.assertEqual(self.index.find(0x3003), [self.other])
+
+    def test_overlapping(self):
+        self.assertCountEqual(self.index.overlapping(0x1f00, 0x30ff),
+                              [self.wide, self.other])
+
+    def test_remove(self):
+        self.index.remove(self.wide)
+        self.assertEqual(len(self.index), 2)
+        self.assertEqual(self.index.find(0x1000), [])
+        self.assertEqual(self.index.find(0x1800), [self.narrow])
+        with self.assertRaises(ValueError):
+            self.index.remove(self.wide)
@@ -1,6 +1,12 @@
+import gc
+import logging
 import unittest
 
 import slowboy.z80
+import slowboy.gpu
+import slowboy.timer
+import slowboy.interrupts
+import slowboy.idle
 
 
 class TestZ80(unittest.TestCase):
@@ -160,8 +166,8 @@ class TestZ80(unittest.TestCase):
         regH = self.cpu.get_reg8('H')
         regL = self.cpu.get_reg8('L')
 
-        self.cpu.nop()
-        self.cpu.nop()
+        self.cpu.handlers[0x00]()
+        self.cpu.handlers[0x00]()
 
         self.assertEqual(self.cpu.get_reg8('A'), regA)
         self.assertEqual(self.cpu.get_reg8('B'), regB)
@@ -171,6 +177,99 @@ class TestZ80(unittest.TestCase):
         self.assertEqual(self.cpu.get_reg8('H'), regH)
         self.assertEqual(self.cpu.get_reg8('L'), regL)
 
+    def test_dispatch_tables(self):
+        self.assertEqual(len(self.cpu.handlers), 0x100)
+        self.assertEqual(len(self.cpu.cycles), 0x100)
+        self.assertEqual(len(self.cpu.cb_handlers), 0x100)
+        self.assertEqual(len(self.cpu.cb_cycles), 0x100)
+        for opcode, op in self.cpu.opcode_map.items():
+            self.assertEqual(self.cpu.cycles[opcode], op.cycles)
+        self.assertEqual(self.cpu.handlers[0xcb], self.cpu.cb_prefix)
+        self.assertEqual(self.cpu.handlers[0xd3], self.cpu.trap)
+
+    def test_cb_prefix(self):
+        self.cpu.mmu.rom = bytes([0x00, 0x37, 0x46])
+        self.cpu.pc = 1
+        self.cpu.set_reg8('a', 0x12)
+        self.cpu.cb_prefix()
+
+        self.assertEqual(self.cpu.get_reg8('a'), 0x21)
+        self.assertEqual(self.cpu.pc, 2)
+        self.assertEqual(self.cpu.cycles[0xcb], 8)
+
+        self.cpu.set_reg16('hl', 0xc000)
+        self.cpu.cb_prefix()
+
+        self.assertEqual(self.cpu.pc, 3)
+        self.assertEqual(self.cpu.cycles[0xcb], 16)
+
+    def test_trap(self):
+        self.cpu.mmu.rom = bytes([0xd3])
+        self.cpu.pc = 0
+        self.cpu.opcode = 0xd3
+        with self.assertRaises(slowboy.z80.Z80Error):
+            self.cpu.handlers[0xd3]()
+
+    def test_shared_opcode_tables(self):
+        other = slowboy.z80.Z80()
+        tables = self.cpu.opcode_tables()
+        self.assertIs(other.opcode_tables(), tables)
+        self.assertIsNot(other.handlers, self.cpu.handlers)
+        self.assertIs(self.cpu.handlers[0x00].__self__, self.cpu)
+        self.assertIs(self.cpu.handlers[0x00].__func__, tables.handlers[0x00])
+        self.assertIs(self.cpu.opcode_map[0x00].function.__self__, self.cpu)
+        self.assertIs(other.cb_opcode_map[0x37].function.__self__, other)
+        # cb_prefix changes the cycles of 0xcb, which mustn't be shared
+        self.assertIsNot(other.cycles, self.cpu.cycles)
+
+    def test_construction(self):
+        """Handlers are bound and the idle loop detector built only when the
+        CPU first runs, and echo RAM shares the page views of WRAM."""
+
+        # stop
+        rom = bytearray(0x8000)
+        rom[0x100] = 0x10
+        cpu = slowboy.z80.Z80(rom=bytes(rom))
+        for name in ('handlers', 'cb_handlers', 'idle_loops'):
+            self.assertNotIn(name, vars(cpu))
+        self.assertIs(cpu.mmu.read_pages[0xe0], cpu.mmu.read_pages[0xc0])
+
+        cpu.go()
+        self.assertIn('handlers', vars(cpu))
+        self.assertIsInstance(cpu.idle_loops, slowboy.idle.IdleLoopDetector)
+        self.assertIsNone(slowboy.z80.Z80(skip_idle_loops=False).idle_loops)
+
+    def test_construction_objects(self):
+        """Constructing a CPU allocates a few hundred objects, not one per
+        handler and page."""
+
+        slowboy.z80.Z80()
+        gc.collect()
+        before = len(gc.get_objects())
+        cpus = [slowboy.z80.Z80() for _ in range(10)]
+        gc.collect()
+        self.assertLess((len(gc.get_objects()) - before) / len(cpus), 400)
+
+    def test_devices(self):
+        gpu = slowboy.gpu.GPU()
+        timer = slowboy.timer.Timer()
+        interrupt_controller = slowboy.interrupts.InterruptController()
+        cpu = slowboy.z80.Z80(gpu=gpu, timer=timer,
+                              interrupt_controller=interrupt_controller)
+        self.assertIs(cpu.gpu, gpu)
+        self.assertIs(cpu.timer, timer)
+        self.assertIs(cpu.interrupt_controller, interrupt_controller)
+        self.assertIs(cpu.mmu.interrupt_controller, interrupt_controller)
+        self.assertIs(gpu.interrupt_controller, interrupt_controller)
+
+    def test_logger(self):
+        """CPUs don't leave anything behind on the shared logger."""
+
+        logger = logging.getLogger('slowboy.z80')
+        filters = list(logger.filters)
+        slowboy.z80.Z80()
+        self.assertEqual(logger.filters, filters)
+
 class TestZ80LoadStore(unittest.TestCase):
     def setUp(self):
         self.cpu = slowboy.z80.Z80()
@@ -178,13 +277,13 @@ class TestZ80LoadStore(unittest.TestCase):
 
     def test_ld_imm8toreg8(self):
         self.cpu.mmu.rom = bytes([0, 1, 2, 3, 4, 5, 6])
-        self.cpu.ld_imm8toreg8('B')()
-        self.cpu.ld_imm8toreg8('C')()
-        self.cpu.ld_imm8toreg8('D')()
-        self.cpu.ld_imm8toreg8('E')()
-        self.cpu.ld_imm8toreg8('H')()
-        self.cpu.ld_imm8toreg8('L')()
-        self.cpu.ld_imm8toreg8('A')()
+        self.cpu.handlers[0x06]()
+        self.cpu.handlers[0x0e]()
+        self.cpu.handlers[0x16]()
+        self.cpu.handlers[0x1e]()
+        self.cpu.handlers[0x26]()
+        self.cpu.handlers[0x2e]()
+        self.cpu.handlers[0x3e]()
 
         self.assertEqual(self.cpu.get_reg8('B'), 0)
         self.assertEqual(self.cpu.get_reg8('C'), 1)
@@ -194,11 +293,6 @@ class TestZ80LoadStore(unittest.TestCase):
         self.assertEqual(self.cpu.get_reg8('L'), 5)
         self.assertEqual(self.cpu.get_reg8('A'), 6)
 
-    def test_ld_imm8toreg8_invalid_register(self):
-        self.cpu.mmu.rom = bytes([0, 1, 2, 3, 4, 5, 6])
-        with self.assertRaises(KeyError) as cm:
-            self.cpu.ld_imm8toreg8('BC')()
-
     def test_ld_reg8toreg8(self):
         self.cpu.set_reg8('B', 0x00)
         self.cpu.set_reg8('C', 0x11)
@@ -208,108 +302,95 @@ class TestZ80LoadStore(unittest.TestCase):
         self.cpu.set_reg8('L', 0x55)
         self.cpu.set_reg8('A', 0x66)
 
-        self.cpu.ld_reg8toreg8('B', 'B')()
+        self.cpu.handlers[0x40]()
         self.assertEqual(self.cpu.get_reg8('B'), 0x00)
-        self.cpu.ld_reg8toreg8('C', 'B')()
+        self.cpu.handlers[0x41]()
         self.assertEqual(self.cpu.get_reg8('B'), 0x11)
-        self.cpu.ld_reg8toreg8('D', 'B')()
+        self.cpu.handlers[0x42]()
         self.assertEqual(self.cpu.get_reg8('B'), 0x22)
-        self.cpu.ld_reg8toreg8('E', 'B')()
+        self.cpu.handlers[0x43]()
         self.assertEqual(self.cpu.get_reg8('B'), 0x33)
-        self.cpu.ld_reg8toreg8('H', 'B')()
+        self.cpu.handlers[0x44]()
         self.assertEqual(self.cpu.get_reg8('B'), 0x44)
-        self.cpu.ld_reg8toreg8('L', 'B')()
+        self.cpu.handlers[0x45]()
         self.assertEqual(self.cpu.get_reg8('B'), 0x55)
-        self.cpu.ld_reg8toreg8('A', 'B')()
+        self.cpu.handlers[0x47]()
         self.assertEqual(self.cpu.get_reg8('B'), 0x66)
 
-    def test_ld_reg8toreg8_invalid_register(self):
-        with self.assertRaises(KeyError) as cm:
-            self.cpu.ld_reg8toreg8('C', 'BC')()
-
-        with self.assertRaises(KeyError) as cm:
-            self.cpu.ld_reg8toreg8('BC', 'C')()
-
     def test_ld_reg8toreg16addr(self):
         for x in range(256):
             self.cpu.set_reg8('a', x)
             self.cpu.set_reg16('bc', 0xc000 + x)
-            self.cpu.ld_reg8toreg16addr('a', 'bc')()
+            self.cpu.handlers[0x02]()
             self.assertEqual(self.cpu.mmu.get_addr(0xc000 + x), x)
             self.assertEqual(self.cpu.get_reg16('bc'), 0xc000 + x)
 
     def test_ld_reg8toreg16addr_inc(self):
-        self.cpu.set_reg8('b', 0xfd)
-        self.cpu.set_reg16('de', 0xcfff)
-        self.cpu.ld_reg8toreg16addr_inc('b', 'de')()
+        self.cpu.set_reg8('a', 0xfd)
+        self.cpu.set_reg16('hl', 0xcfff)
+        self.cpu.handlers[0x22]()
         self.assertEqual(self.cpu.mmu.get_addr(0xcfff), 0xfd)
-        self.assertEqual(self.cpu.get_reg8('b'), 0xfd)
-        self.assertEqual(self.cpu.get_reg16('de'), 0xd000)
+        self.assertEqual(self.cpu.get_reg8('a'), 0xfd)
+        self.assertEqual(self.cpu.get_reg16('hl'), 0xd000)
 
     def test_ld_reg8toreg16addr_dec(self):
-        self.cpu.set_reg8('b', 0xfd)
-        self.cpu.set_reg16('de', 0xcfff)
-        self.cpu.ld_reg8toreg16addr_dec('b', 'de')()
+        self.cpu.set_reg8('a', 0xfd)
+        self.cpu.set_reg16('hl', 0xcfff)
+        self.cpu.handlers[0x32]()
         self.assertEqual(self.cpu.mmu.get_addr(0xcfff), 0xfd)
-        self.assertEqual(self.cpu.get_reg8('b'), 0xfd)
-        self.assertEqual(self.cpu.get_reg16('de'), 0xcffe)
+        self.assertEqual(self.cpu.get_reg8('a'), 0xfd)
+        self.assertEqual(self.cpu.get_reg16('hl'), 0xcffe)
 
     def test_ld_reg8toreg16addr_2(self):
-        self.cpu.set_reg16('bc', 0xc000)
+        self.cpu.set_reg16('hl', 0xc000)
         for x in range(256):
             self.cpu.set_reg8('a', x)
-            self.cpu.ld_reg8toreg16addr_inc('a', 'bc')()
+            self.cpu.handlers[0x22]()
             self.assertEqual(self.cpu.mmu.get_addr(0xc000 + x), x)
 
     def test_ld_reg8toreg16addr_3(self):
-        self.cpu.set_reg16('bc', 0xc0ff)
+        self.cpu.set_reg16('hl', 0xc0ff)
         for x in range(256):
             self.cpu.set_reg8('a', x)
-            self.cpu.ld_reg8toreg16addr_dec('a', 'bc')()
+            self.cpu.handlers[0x32]()
             self.assertEqual(self.cpu.mmu.get_addr(0xc0ff - x), x)
 
     def test_ld_reg8toimm16addr(self):
         self.cpu.set_reg8('a', 0xab)
         self.cpu.mmu.rom = bytes([0x00, 0xc0])
-        self.cpu.ld_reg8toimm16addr('a')()
+        self.cpu.handlers[0xea]()
         self.assertEqual(self.cpu.mmu.get_addr(0xc000), 0xab)
 
     def test_ld_imm16addrtoreg8(self):
         self.cpu.mmu.set_addr(0xd000, 0xab)
         self.cpu.mmu.rom = bytes([0x00, 0xd0])
-        self.cpu.ld_imm16addrtoreg8('c')()
-        self.assertEqual(self.cpu.get_reg8('c'), 0xab)
+        self.cpu.handlers[0xfa]()
+        self.assertEqual(self.cpu.get_reg8('a'), 0xab)
 
     def test_ld_reg16addrtoreg8(self):
         self.cpu.set_reg16('hl', 0xd000)
         for x in range(256):
             self.cpu.mmu.set_addr(0xd000 + x, x)
-            self.cpu.ld_reg16addrtoreg8('hl', 'c', inc=True)()
-            self.assertEqual(self.cpu.get_reg8('c'), x)
+            self.cpu.handlers[0x2a]()
+            self.assertEqual(self.cpu.get_reg8('a'), x)
 
     def test_ld_reg16addrtoreg8_2(self):
         self.cpu.set_reg16('hl', 0xd0ff)
         for x in range(256):
             self.cpu.mmu.set_addr(0xd0ff - x, x)
-            self.cpu.ld_reg16addrtoreg8('hl', 'c', dec=True)()
-            self.assertEqual(self.cpu.get_reg8('c'), x)
-
-    def test_ld_reg16addrtoreg8_3(self):
-        with self.assertRaises(ValueError) as cm:
-            self.cpu.set_reg16('hl', 0xd000)
-            self.cpu.mmu.set_addr(0xd000, 3)
-            self.cpu.ld_reg16addrtoreg8('hl', 'c', inc=True, dec=True)()
+            self.cpu.handlers[0x3a]()
+            self.assertEqual(self.cpu.get_reg8('a'), x)
 
     def test_ld_reg16addrtoreg8_4(self):
         self.cpu.set_reg16('hl', 0xd000)
         self.cpu.mmu.set_addr(0xd000, 0x53)
-        self.cpu.ld_reg16addrtoreg8('hl', 'c')()
+        self.cpu.handlers[0x4e]()
         self.assertEqual(self.cpu.get_reg8('c'), 0x53)
 
     def test_ld_reg16toreg16(self):
         self.cpu.set_reg16('hl', 0x7654)
 
-        self.cpu.ld_reg16toreg16('hl', 'sp')()
+        self.cpu.handlers[0xf9]()
 
         self.assertEqual(self.cpu.sp, 0x7654)
 
@@ -318,7 +399,7 @@ class TestZ80LoadStore(unittest.TestCase):
         self.cpu.pc = 0
         self.cpu.mmu.rom = bytes([0x80])
 
-        self.cpu.ld_spimm8toregHL()
+        self.cpu.handlers[0xf8]()
 
         self.assertEqual(self.cpu.get_reg16('hl'), 0x7080)
         self.assertEqual(self.cpu.get_carry_flag(), 0)
@@ -332,7 +413,7 @@ class TestZ80LoadStore(unittest.TestCase):
         self.cpu.pc = 0
         self.cpu.mmu.rom = bytes([0xff])
 
-        self.cpu.ld_spimm8toregHL()
+        self.cpu.handlers[0xf8]()
 
         self.assertEqual(self.cpu.get_reg16('hl'), 0x7100)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
@@ -340,7 +421,6 @@ class TestZ80LoadStore(unittest.TestCase):
         self.assertEqual(self.cpu.get_zero_flag(), 0)
         self.assertEqual(self.cpu.get_sub_flag(), 0)
 
-
     def test_ld_sptoimm16addr(self):
         self.cpu.sp = 0x1234
         self.cpu.mmu.rom = bytes([0x00, 0xd0])
@@ -353,33 +433,21 @@ class TestZ80LoadStore(unittest.TestCase):
         self.assertEqual(self.cpu.mmu.get_addr(0xd000), 0x12)
         self.assertEqual(self.cpu.mmu.get_addr(0xd001), 0x34)
 
-    def test_ld_sptoaddr16_2(self):
-        for x in range(2**10):
-            self.cpu.sp = x
-            self.cpu.set_reg16('bc', 0xd000 + 2*x)
-            self.cpu.ld_sptoreg16addr('bc')()
-            self.assertEqual(self.cpu.mmu.get_addr(0xd000 + 2*x),
-                    self.cpu.sp >> 8)
-            self.assertEqual(self.cpu.mmu.get_addr(0xd000 + 2*x + 1),
-                    self.cpu.sp & 0xff)
-            self.assertEqual(self.cpu.mmu.get_addr(0xd000 + 2*x), x >> 8)
-            self.assertEqual(self.cpu.mmu.get_addr(0xd000 + 2*x + 1), x & 0xff)
-
     def test_ld_imm8toaddrHL(self):
         self.cpu.mmu.rom = bytes([0, 255, 127])
         self.cpu.set_reg16('hl', 0xcfff)
-        self.cpu.ld_imm8toaddrHL()
+        self.cpu.handlers[0x36]()
         self.assertEqual(self.cpu.mmu.get_addr(0xcfff), 0)
-        self.cpu.ld_imm8toaddrHL()
+        self.cpu.handlers[0x36]()
         self.assertEqual(self.cpu.mmu.get_addr(0xcfff), 255)
-        self.cpu.ld_imm8toaddrHL()
+        self.cpu.handlers[0x36]()
         self.assertEqual(self.cpu.mmu.get_addr(0xcfff), 127)
 
     def test_ld_imm16toreg16(self):
         self.cpu.mmu.rom = bytes([0x01, 0x23, 0x45, 0x67, 0x89, 0xab])
-        self.cpu.ld_imm16toreg16('BC')()
-        self.cpu.ld_imm16toreg16('DE')()
-        self.cpu.ld_imm16toreg16('HL')()
+        self.cpu.handlers[0x01]()
+        self.cpu.handlers[0x11]()
+        self.cpu.handlers[0x21]()
 
         self.assertEqual(self.cpu.get_reg16('BC'), 0x2301)
         self.assertEqual(self.cpu.get_reg16('DE'), 0x6745)
@@ -389,7 +457,7 @@ class TestZ80LoadStore(unittest.TestCase):
         self.cpu.set_reg16('sp', 0xc002)
         self.cpu.set_reg16('bc', 0x1234)
 
-        self.cpu.push_reg16('bc')()
+        self.cpu.handlers[0xc5]()
 
         self.assertEqual(self.cpu.sp, 0xc000)
         self.assertEqual(self.cpu.mmu.get_addr(0xc001), 0x12)
@@ -400,18 +468,28 @@ class TestZ80LoadStore(unittest.TestCase):
         self.cpu.mmu.set_addr(0xc000, 0x34)
         self.cpu.mmu.set_addr(0xc001, 0x12)
 
-        self.cpu.pop_reg16('bc')()
+        self.cpu.handlers[0xc1]()
 
         self.assertEqual(self.cpu.sp, 0xc002)
         self.assertEqual(self.cpu.get_reg16('bc'), 0x1234)
 
+    def test_push_pop_wrap(self):
+        # The low byte goes to IE, the high byte to the cartridge
+        self.cpu.set_reg16('sp', 0x0001)
+        self.cpu.set_reg16('bc', 0x1214)
+
+        self.cpu.handlers[0xc5]()
+
+        self.assertEqual(self.cpu.sp, 0xffff)
+        self.assertEqual(self.cpu.mmu.get_addr(0xffff), 0x14)
+
     def test_ldh_regAtoaddr8(self):
         # JOYP register---bits 4 and 5 are writable
         self.cpu.pc = 0xc000
         self.cpu.mmu.set_addr(0xc000, 0x00)
         self.cpu.set_reg8('a', 0x30)
 
-        self.cpu.ldh_regAtoaddr8()
+        self.cpu.handlers[0xe0]()
 
         # Bits 0-3 indicate pressed buttons (active low)
         self.assertEqual(self.cpu.mmu.get_addr(0xff00), 0x30 | 0x0f)
@@ -422,7 +500,7 @@ class TestZ80LoadStore(unittest.TestCase):
         # JOYP register---bits 4 and 5 are writable
         self.cpu.mmu.set_addr(0xff00, 0x30)
 
-        self.cpu.ldh_addr8toregA()
+        self.cpu.handlers[0xf0]()
 
         # Bits 0-3 indicate pressed buttons (active low)
         self.assertEqual(self.cpu.get_reg8('a'), 0x30 | 0x0f)
@@ -432,7 +510,7 @@ class TestZ80LoadStore(unittest.TestCase):
         self.cpu.set_reg8('a', 0x30)
         self.cpu.set_reg8('c', 0x00)
 
-        self.cpu.ldh_regAtoaddrC()
+        self.cpu.handlers[0xe2]()
 
         # Bits 0-3 indicate pressed buttons (active low)
         self.assertEqual(self.cpu.mmu.get_addr(0xff00), 0x30 | 0x0f)
@@ -442,7 +520,7 @@ class TestZ80LoadStore(unittest.TestCase):
         self.cpu.mmu.set_addr(0xff00, 0x30)
         self.cpu.set_reg8('c', 0x00)
 
-        self.cpu.ldh_addrCtoregA()
+        self.cpu.handlers[0xf2]()
 
         # Bits 0-3 indicate pressed buttons (active low)
         self.assertEqual(self.cpu.get_reg8('a'), 0x30 | 0x0f)
@@ -455,7 +533,7 @@ class TestZ80ALU(unittest.TestCase):
 
     def test_inc_reg8(self):
         self.cpu.set_reg8('b', 0x04)
-        self.cpu.inc_reg8('b')()
+        self.cpu.handlers[0x04]()
 
         self.assertEqual(self.cpu.get_reg8('b'), 0x05)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -464,7 +542,7 @@ class TestZ80ALU(unittest.TestCase):
 
     def test_inc_reg8_2(self):
         self.cpu.set_reg8('b', 0x0f)
-        self.cpu.inc_reg8('b')()
+        self.cpu.handlers[0x04]()
 
         self.assertEqual(self.cpu.get_reg8('b'), 0x10)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -473,7 +551,7 @@ class TestZ80ALU(unittest.TestCase):
 
     def test_inc_reg8_3(self):
         self.cpu.set_reg8('b', 0xff)
-        self.cpu.inc_reg8('b')()
+        self.cpu.handlers[0x04]()
 
         self.assertEqual(self.cpu.get_reg8('b'), 0x00)
         self.assertEqual(self.cpu.get_zero_flag(), 1)
@@ -482,7 +560,7 @@ class TestZ80ALU(unittest.TestCase):
 
     def test_inc_reg16(self):
         self.cpu.set_reg16('bc', 0xeeff)
-        self.cpu.inc_reg16('bc')()
+        self.cpu.handlers[0x03]()
 
         c = self.cpu.get_carry_flag()
         h = self.cpu.get_halfcarry_flag()
@@ -499,7 +577,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg16('hl', 0xc000)
         self.cpu.mmu.set_addr(0xc000, 0x50)
 
-        self.cpu.inc_addrHL()
+        self.cpu.handlers[0x34]()
 
         self.assertEqual(self.cpu.mmu.get_addr(0xc000), 0x51)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -511,7 +589,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg16('hl', 0xc000)
         self.cpu.mmu.set_addr(0xc000, 0xff)
 
-        self.cpu.inc_addrHL()
+        self.cpu.handlers[0x34]()
 
         self.assertEqual(self.cpu.mmu.get_addr(0xc000), 0x00)
         self.assertEqual(self.cpu.get_zero_flag(), 1)
@@ -520,7 +598,7 @@ class TestZ80ALU(unittest.TestCase):
 
     def test_dec_reg8(self):
         self.cpu.set_reg8('b', 0x04)
-        self.cpu.dec_reg8('b')()
+        self.cpu.handlers[0x05]()
 
         self.assertEqual(self.cpu.get_reg8('b'), 0x03)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -529,7 +607,7 @@ class TestZ80ALU(unittest.TestCase):
 
     def test_dec_reg8_2(self):
         self.cpu.set_reg8('b', 0x10)
-        self.cpu.dec_reg8('b')()
+        self.cpu.handlers[0x05]()
 
         self.assertEqual(self.cpu.get_reg8('b'), 0x0f)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -540,7 +618,7 @@ class TestZ80ALU(unittest.TestCase):
         # Make sure zero flag gets set
         self.cpu.set_reg8('b', 0x01)
 
-        self.cpu.dec_reg8('b')()
+        self.cpu.handlers[0x05]()
 
         self.assertEqual(self.cpu.get_reg8('b'), 0x00)
         self.assertEqual(self.cpu.get_zero_flag(), 1)
@@ -549,7 +627,7 @@ class TestZ80ALU(unittest.TestCase):
 
     def test_dec_reg8_4(self):
         self.cpu.set_reg8('b', 0x00)
-        self.cpu.dec_reg8('b')()
+        self.cpu.handlers[0x05]()
 
         self.assertEqual(self.cpu.get_reg8('b'), 0xff)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -558,7 +636,7 @@ class TestZ80ALU(unittest.TestCase):
 
     def test_dec_reg16(self):
         self.cpu.set_reg16('bc', 0xee)
-        self.cpu.dec_reg16('bc')()
+        self.cpu.handlers[0x0b]()
         self.assertEqual(self.cpu.get_reg16('bc'), 0xed)
 
     def test_dec_addrHL(self):
@@ -566,7 +644,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg16('hl', 0xc000)
         self.cpu.mmu.set_addr(0xc000, 0x00)
 
-        self.cpu.dec_addrHL()
+        self.cpu.handlers[0x35]()
 
         self.assertEqual(self.cpu.get_zero_flag(), 0)
         self.assertEqual(self.cpu.get_halfcarry_flag(), 1)
@@ -578,20 +656,19 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg16('hl', 0xc000)
         self.cpu.mmu.set_addr(0xc000, 0x01)
 
-        self.cpu.dec_addrHL()
+        self.cpu.handlers[0x35]()
 
         self.assertEqual(self.cpu.get_zero_flag(), 1)
         self.assertEqual(self.cpu.get_halfcarry_flag(), 0)
         self.assertEqual(self.cpu.get_sub_flag(), 1)
         self.assertEqual(self.cpu.mmu.get_addr(0xc000), 0x00)
 
-
     def test_add_imm8toreg8(self):
         self.cpu.set_reg8('a', 0xaf)
         self.cpu.pc = 0
         self.cpu.mmu.rom = bytes([0x11])
 
-        self.cpu.add_imm8toreg8('a')()
+        self.cpu.handlers[0xc6]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0xc0)
         self.assertEqual(self.cpu.get_carry_flag(), 0)
@@ -604,7 +681,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.pc = 0
         self.cpu.mmu.rom = bytes([0x01])
 
-        self.cpu.add_imm8toreg8('a')()
+        self.cpu.handlers[0xc6]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x00)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
@@ -617,7 +694,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.pc = 0
         self.cpu.mmu.rom = bytes([0x10])
 
-        self.cpu.add_imm8toreg8('a')()
+        self.cpu.handlers[0xc6]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x00)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
@@ -632,7 +709,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.mmu.rom = bytes([0x10])
         self.cpu.set_carry_flag()
 
-        self.cpu.add_imm8toreg8('a', carry=True)()
+        self.cpu.handlers[0xce]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x01)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
@@ -644,7 +721,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.sp = 0x7000
         self.cpu.mmu.rom = bytes([0xfe])
 
-        self.cpu.add_imm8toregSP()
+        self.cpu.handlers[0xe8]()
 
         # Signed add
         self.assertEqual(self.cpu.sp, 0x6ffe)
@@ -658,7 +735,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.mmu.set_addr(0xc000, 0x11)
         self.cpu.set_reg8('a', 0x3f)
 
-        self.cpu.add_reg16addrtoreg8('hl', 'a')()
+        self.cpu.handlers[0x86]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x50)
         self.assertEqual(self.cpu.get_carry_flag(), 0)
@@ -672,7 +749,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.mmu.set_addr(0xc000, 0xd0)
         self.cpu.set_reg8('a', 0x3f)
 
-        self.cpu.add_reg16addrtoreg8('hl', 'a')()
+        self.cpu.handlers[0x86]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x0f)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
@@ -686,7 +763,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.mmu.set_addr(0xc000, 0xc1)
         self.cpu.set_reg8('a', 0x3f)
 
-        self.cpu.add_reg16addrtoreg8('hl', 'a')()
+        self.cpu.handlers[0x86]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x00)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
@@ -699,7 +776,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.mmu.set_addr(0xc000, 0xc0)
         self.cpu.set_reg8('a', 0x3f)
 
-        self.cpu.add_reg16addrtoreg8('hl', 'a', carry=True)()
+        self.cpu.handlers[0x8e]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x00)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
@@ -710,7 +787,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.sp = 0x70fe
         self.cpu.mmu.rom = bytes([0x02])
 
-        self.cpu.add_imm8toregSP()
+        self.cpu.handlers[0xe8]()
 
         self.assertEqual(self.cpu.sp, 0x7100)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
@@ -721,7 +798,7 @@ class TestZ80ALU(unittest.TestCase):
     def test_add_reg16toregHL(self):
         self.cpu.set_reg16('bc', 0xffff)
         self.cpu.set_reg16('hl', 0x0001)
-        self.cpu.add_reg16toregHL('bc')()
+        self.cpu.handlers[0x09]()
         self.assertEqual(self.cpu.get_reg16('hl'), 0x0000)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
         self.assertEqual(self.cpu.get_halfcarry_flag(), 1)
@@ -731,17 +808,17 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg16('bc', 0xffee)
         self.cpu.set_reg16('hl', 0x0011)
 
-        self.cpu.add_reg16toregHL('bc')()
+        self.cpu.handlers[0x09]()
 
         self.assertEqual(self.cpu.get_reg16('hl'), 0xffff)
         self.assertEqual(self.cpu.get_carry_flag(), 0)
         self.assertEqual(self.cpu.get_halfcarry_flag(), 0)
 
     def test_add_reg8toreg8(self):
-        self.cpu.set_reg8('b', 0xfe)
+        self.cpu.set_reg8('a', 0xfe)
         self.cpu.set_reg8('c', 0x01)
-        self.cpu.add_reg8toreg8('c', 'b')()
-        self.assertEqual(self.cpu.get_reg8('b'), 0xff)
+        self.cpu.handlers[0x81]()
+        self.assertEqual(self.cpu.get_reg8('a'), 0xff)
         self.assertEqual(self.cpu.get_reg8('c'), 0x01)
         self.assertEqual(self.cpu.get_carry_flag(), 0)
 
@@ -750,7 +827,7 @@ class TestZ80ALU(unittest.TestCase):
 
         self.cpu.set_reg8('a', 0x3a)
         self.cpu.set_reg8('b', 0xc6)
-        self.cpu.add_reg8toreg8('b', 'a')()
+        self.cpu.handlers[0x80]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0)
         self.assertEqual(self.cpu.get_zero_flag(), 1)
@@ -766,7 +843,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg8('a', 0xe1)
         self.cpu.set_reg8('e', 0x0f)
         self.cpu.set_carry_flag()
-        self.cpu.add_reg8toreg8('e', 'a', carry=True)()
+        self.cpu.handlers[0x8b]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0xf1)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -775,19 +852,19 @@ class TestZ80ALU(unittest.TestCase):
         self.assertEqual(self.cpu.get_carry_flag(), 0)
 
     def test_sub_reg8fromreg8(self):
-        self.cpu.set_reg8('b', 0xff)
+        self.cpu.set_reg8('a', 0xff)
         self.cpu.set_reg8('c', 0x11)
-        self.cpu.sub_reg8fromreg8('c', 'b')()
+        self.cpu.handlers[0x91]()
         self.assertEqual(self.cpu.get_reg8('c'), 0x11)
-        self.assertEqual(self.cpu.get_reg8('b'), 0xee)
+        self.assertEqual(self.cpu.get_reg8('a'), 0xee)
         self.assertEqual(self.cpu.get_carry_flag(), 0)
         self.assertEqual(self.cpu.get_sub_flag(), 1)
 
-        self.cpu.set_reg8('b', 0x00)
+        self.cpu.set_reg8('a', 0x00)
         self.cpu.set_reg8('c', 0x01)
-        self.cpu.sub_reg8fromreg8('c', 'b')()
+        self.cpu.handlers[0x91]()
         self.assertEqual(self.cpu.get_reg8('c'), 0x01)
-        self.assertEqual(self.cpu.get_reg8('b'), 0xff)
+        self.assertEqual(self.cpu.get_reg8('a'), 0xff)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
         self.assertEqual(self.cpu.get_sub_flag(), 1)
 
@@ -797,7 +874,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg8('a', 0x3e)
         self.cpu.set_reg8('e', 0x3e)
 
-        self.cpu.sub_reg8fromreg8('e', 'a')()
+        self.cpu.handlers[0x93]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x00)
         self.assertEqual(self.cpu.get_zero_flag(), 1)
@@ -811,7 +888,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg8('a', 0x3b)
         self.cpu.set_reg8('h', 0x2a)
 
-        self.cpu.sub_reg8fromreg8('h', 'a', carry=True)()
+        self.cpu.handlers[0x9c]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x10)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -825,7 +902,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg8('a', 0x3e)
         self.cpu.mmu.rom = bytes([0x0f])
 
-        self.cpu.sub_imm8fromreg8('a')()
+        self.cpu.handlers[0xd6]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x2f)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -838,7 +915,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg8('a', 0x3e)
         self.cpu.mmu.rom = bytes([0x3e])
 
-        self.cpu.sub_imm8fromreg8('a')()
+        self.cpu.handlers[0xd6]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x00)
         self.assertEqual(self.cpu.get_zero_flag(), 1)
@@ -851,7 +928,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg8('a', 0x00)
         self.cpu.mmu.rom = bytes([0x3e])
 
-        self.cpu.sub_imm8fromreg8('a')()
+        self.cpu.handlers[0xd6]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0xc2)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -864,7 +941,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.mmu.rom = bytes([0x3e])
         self.cpu.set_carry_flag()
 
-        self.cpu.sub_imm8fromreg8('a', carry=True)()
+        self.cpu.handlers[0xde]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0xc1)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -872,66 +949,8 @@ class TestZ80ALU(unittest.TestCase):
         self.assertEqual(self.cpu.get_sub_flag(), 1)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
 
-    def test_sub_imm16addrfromreg8(self):
-        """Example from the Gameboy Programming Manual"""
 
-        u8 = self.cpu.get_reg8('a')
-        self.cpu.mmu.rom = bytes([0x00, 0xc0])
 
-        self.cpu.set_reg8('a', 0x3e)
-        self.cpu.mmu.set_addr(0xc000, 0x40)
-        self.cpu.sub_imm16addrfromreg8('a')()
-
-        self.assertEqual(self.cpu.get_reg8('a'), 0xfe)
-        self.assertEqual(self.cpu.get_zero_flag(), 0)
-        self.assertEqual(self.cpu.get_halfcarry_flag(), 0)
-        self.assertEqual(self.cpu.get_sub_flag(), 1)
-        self.assertEqual(self.cpu.get_carry_flag(), 1)
-
-    def test_sub_imm16addrfromreg8_2(self):
-        # Make sure the zero flag gets set
-        u8 = self.cpu.get_reg8('a')
-        self.cpu.mmu.rom = bytes([0x00, 0xc0])
-
-        self.cpu.set_reg8('a', 0x3e)
-        self.cpu.mmu.set_addr(0xc000, 0x3e)
-        self.cpu.sub_imm16addrfromreg8('a')()
-
-        self.assertEqual(self.cpu.get_reg8('a'), 0x00)
-        self.assertEqual(self.cpu.get_zero_flag(), 1)
-        self.assertEqual(self.cpu.get_halfcarry_flag(), 0)
-        self.assertEqual(self.cpu.get_sub_flag(), 1)
-        self.assertEqual(self.cpu.get_carry_flag(), 0)
-
-    def test_sub_imm16addrfromreg8_3(self):
-        # Make sure the half-carry flag gets set
-        self.cpu.mmu.rom = bytes([0x00, 0xc0])
-
-        self.cpu.set_reg8('a', 0x3e)
-        self.cpu.mmu.set_addr(0xc000, 0x3f)
-        self.cpu.sub_imm16addrfromreg8('a')()
-
-        self.assertEqual(self.cpu.get_reg8('a'), 0xff)
-        self.assertEqual(self.cpu.get_zero_flag(), 0)
-        self.assertEqual(self.cpu.get_halfcarry_flag(), 1)
-        self.assertEqual(self.cpu.get_sub_flag(), 1)
-        self.assertEqual(self.cpu.get_carry_flag(), 1)
-
-    def test_sub_imm16addrfromreg8_4(self):
-        # Make sure the half-carry flag gets set
-        u8 = self.cpu.get_reg8('a')
-        self.cpu.mmu.rom = bytes([0x00, 0xc0])
-        self.cpu.set_carry_flag()
-
-        self.cpu.set_reg8('a', 0x3e)
-        self.cpu.mmu.set_addr(0xc000, 0x3e)
-        self.cpu.sub_imm16addrfromreg8('a', carry=True)()
-
-        self.assertEqual(self.cpu.get_reg8('a'), 0xff)
-        self.assertEqual(self.cpu.get_zero_flag(), 0)
-        self.assertEqual(self.cpu.get_halfcarry_flag(), 1)
-        self.assertEqual(self.cpu.get_sub_flag(), 1)
-        self.assertEqual(self.cpu.get_carry_flag(), 1)
 
     def test_sub_reg16addrfromreg8(self):
         """Example from the Gameboy Programming Manual"""
@@ -941,7 +960,7 @@ class TestZ80ALU(unittest.TestCase):
 
         self.cpu.set_reg8('a', 0x3e)
         self.cpu.mmu.set_addr(addr16, 0x40)
-        self.cpu.sub_reg16addrfromreg8('hl', 'a')()
+        self.cpu.handlers[0x96]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0xfe)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -956,7 +975,7 @@ class TestZ80ALU(unittest.TestCase):
 
         self.cpu.set_reg8('a', 0x3e)
         self.cpu.mmu.set_addr(addr16, 0x3e)
-        self.cpu.sub_reg16addrfromreg8('hl', 'a')()
+        self.cpu.handlers[0x96]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x00)
         self.assertEqual(self.cpu.get_zero_flag(), 1)
@@ -971,7 +990,7 @@ class TestZ80ALU(unittest.TestCase):
 
         self.cpu.set_reg8('a', 0x3e)
         self.cpu.mmu.set_addr(addr16, 0x3f)
-        self.cpu.sub_reg16addrfromreg8('hl', 'a')()
+        self.cpu.handlers[0x96]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0xff)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -985,7 +1004,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg8('a', 0x3e)
         self.cpu.mmu.set_addr(addr16, 0x3e)
 
-        self.cpu.sub_reg16addrfromreg8('hl', 'a', carry=True)()
+        self.cpu.handlers[0x9e]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0xff)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -996,7 +1015,7 @@ class TestZ80ALU(unittest.TestCase):
     def test_and_reg8(self):
         self.cpu.set_reg8('a', 0xaa)
         self.cpu.set_reg8('b', 0x55)
-        self.cpu.and_reg8('b')()
+        self.cpu.handlers[0xa0]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x00)
         self.assertEqual(self.cpu.get_zero_flag(), 1)
@@ -1007,7 +1026,7 @@ class TestZ80ALU(unittest.TestCase):
     def test_and_reg8_2(self):
         self.cpu.set_reg8('a', 0xff)
         self.cpu.set_reg8('l', 0x55)
-        self.cpu.and_reg8('l')()
+        self.cpu.handlers[0xa5]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x55)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -1018,7 +1037,7 @@ class TestZ80ALU(unittest.TestCase):
     def test_and_imm8(self):
         self.cpu.set_reg8('a', 0xaa)
         self.cpu.mmu.rom = bytes([0x55])
-        self.cpu.and_imm8()()
+        self.cpu.handlers[0xe6]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x00)
         self.assertEqual(self.cpu.get_zero_flag(), 1)
@@ -1029,7 +1048,7 @@ class TestZ80ALU(unittest.TestCase):
     def test_and_imm8_2(self):
         self.cpu.set_reg8('a', 0xff)
         self.cpu.mmu.rom = bytes([0x55])
-        self.cpu.and_imm8()()
+        self.cpu.handlers[0xe6]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x55)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -1042,8 +1061,8 @@ class TestZ80ALU(unittest.TestCase):
 
         self.cpu.set_reg8('a', 0xaa)
         self.cpu.mmu.set_addr(addr16, 0x55)
-        self.cpu.set_reg16('bc', addr16)
-        self.cpu.and_reg16addr('bc')()
+        self.cpu.set_reg16('hl', addr16)
+        self.cpu.handlers[0xa6]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x00)
         self.assertEqual(self.cpu.get_zero_flag(), 1)
@@ -1057,8 +1076,8 @@ class TestZ80ALU(unittest.TestCase):
 
         self.cpu.set_reg8('a', 0xa1)
         self.cpu.mmu.set_addr(addr16, 0x55)
-        self.cpu.set_reg16('bc', addr16)
-        self.cpu.and_reg16addr('bc')()
+        self.cpu.set_reg16('hl', addr16)
+        self.cpu.handlers[0xa6]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x1)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -1069,7 +1088,7 @@ class TestZ80ALU(unittest.TestCase):
     def test_or_reg8(self):
         self.cpu.set_reg8('a', 0xaa)
         self.cpu.set_reg8('b', 0x55)
-        self.cpu.or_reg8('b')()
+        self.cpu.handlers[0xb0]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0xff)
         self.assertEqual(self.cpu.get_reg8('b'), 0x55)
@@ -1080,7 +1099,7 @@ class TestZ80ALU(unittest.TestCase):
     def test_or_reg8_2(self):
         self.cpu.set_reg8('a', 0xff)
         self.cpu.set_reg8('b', 0x55)
-        self.cpu.or_reg8('b')()
+        self.cpu.handlers[0xb0]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0xff)
         self.assertEqual(self.cpu.get_reg8('b'), 0x55)
@@ -1091,7 +1110,7 @@ class TestZ80ALU(unittest.TestCase):
     def test_or_reg8_3(self):
         self.cpu.set_reg8('a', 0x00)
         self.cpu.set_reg8('b', 0x00)
-        self.cpu.or_reg8('b')()
+        self.cpu.handlers[0xb0]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x00)
         self.assertEqual(self.cpu.get_zero_flag(), 1)
@@ -1101,7 +1120,7 @@ class TestZ80ALU(unittest.TestCase):
     def test_or_imm8(self):
         self.cpu.set_reg8('a', 0xaa)
         self.cpu.mmu.rom = bytes([0x50])
-        self.cpu.or_imm8()()
+        self.cpu.handlers[0xf6]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0xfa)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -1111,36 +1130,13 @@ class TestZ80ALU(unittest.TestCase):
     def test_or_imm8_2(self):
         self.cpu.set_reg8('a', 0x00)
         self.cpu.mmu.rom = bytes([0x00])
-        self.cpu.or_imm8()()
+        self.cpu.handlers[0xf6]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x00)
         self.assertEqual(self.cpu.get_zero_flag(), 1)
         self.assertEqual(self.cpu.get_sub_flag(), 0)
         self.assertEqual(self.cpu.get_halfcarry_flag(), 0)
 
-    def test_or_imm16addr(self):
-        self.cpu.mmu.rom = bytes([0x00, 0xc0])
-
-        self.cpu.set_reg8('a', 0xaa)
-        self.cpu.mmu.set_addr(0xc000, 0x55)
-        self.cpu.or_imm16addr()()
-
-        self.assertEqual(self.cpu.get_reg8('a'), 0xff)
-        self.assertEqual(self.cpu.get_zero_flag(), 0)
-        self.assertEqual(self.cpu.get_sub_flag(), 0)
-        self.assertEqual(self.cpu.get_halfcarry_flag(), 0)
-
-    def test_or_imm16addr_2(self):
-        self.cpu.mmu.rom = bytes([0x00, 0xc0])
-
-        self.cpu.set_reg8('a', 0x00)
-        self.cpu.mmu.set_addr(0xc000, 0x00)
-        self.cpu.or_imm16addr()()
-
-        self.assertEqual(self.cpu.get_reg8('a'), 0x00)
-        self.assertEqual(self.cpu.get_zero_flag(), 1)
-        self.assertEqual(self.cpu.get_sub_flag(), 0)
-        self.assertEqual(self.cpu.get_halfcarry_flag(), 0)
 
     def test_or_reg16addr(self):
         addr16 = 0xc000
@@ -1148,7 +1144,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg8('a', 0xaa)
         self.cpu.mmu.set_addr(addr16, 0x55)
         self.cpu.set_reg16('hl', addr16)
-        self.cpu.or_reg16addr('hl')()
+        self.cpu.handlers[0xb6]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0xff)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -1161,7 +1157,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg8('a', 0x00)
         self.cpu.mmu.set_addr(addr16, 0x00)
         self.cpu.set_reg16('hl', addr16)
-        self.cpu.or_reg16addr('hl')()
+        self.cpu.handlers[0xb6]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x00)
         self.assertEqual(self.cpu.get_zero_flag(), 1)
@@ -1171,7 +1167,7 @@ class TestZ80ALU(unittest.TestCase):
     def test_xor_reg8(self):
         self.cpu.set_reg8('a', 0xaa)
         self.cpu.set_reg8('h', 0x55)
-        self.cpu.xor_reg8('h')()
+        self.cpu.handlers[0xac]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0xff)
         self.assertEqual(self.cpu.get_reg8('h'), 0x55)
@@ -1181,7 +1177,7 @@ class TestZ80ALU(unittest.TestCase):
     def test_xor_reg8_2(self):
         self.cpu.set_reg8('a', 0xaa)
         self.cpu.set_reg8('b', 0xaa)
-        self.cpu.xor_reg8('b')()
+        self.cpu.handlers[0xa8]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x00)
         self.assertEqual(self.cpu.get_reg8('b'), 0xaa)
@@ -1191,7 +1187,7 @@ class TestZ80ALU(unittest.TestCase):
     def test_xor_imm8(self):
         self.cpu.set_reg8('a', 0x55)
         self.cpu.mmu.rom = bytes([0xaa])
-        self.cpu.xor_imm8()()
+        self.cpu.handlers[0xee]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0xff)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -1200,7 +1196,7 @@ class TestZ80ALU(unittest.TestCase):
     def test_xor_imm8_2(self):
         self.cpu.set_reg8('a', 0x55)
         self.cpu.mmu.rom = bytes([0x55])
-        self.cpu.xor_imm8()()
+        self.cpu.handlers[0xee]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x00)
         self.assertEqual(self.cpu.get_zero_flag(), 1)
@@ -1210,7 +1206,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg8('a', 0xaa)
         self.cpu.mmu.set_addr(0xc000, 0x55)
         self.cpu.set_reg16('hl', 0xc000)
-        self.cpu.xor_reg16addr('hl')()
+        self.cpu.handlers[0xae]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0xff)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -1220,21 +1216,21 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg8('a', 0xaa)
         self.cpu.mmu.set_addr(0xc000, 0xaa)
         self.cpu.set_reg16('hl', 0xc000)
-        self.cpu.xor_reg16addr('hl')()
+        self.cpu.handlers[0xae]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x00)
         self.assertEqual(self.cpu.get_zero_flag(), 1)
         self.assertEqual(self.cpu.get_sub_flag(), 0)
 
     def test_cp_reg8toreg8(self):
-        self.cpu.set_reg8('b', 0x5d)
+        self.cpu.set_reg8('a', 0x5d)
         self.cpu.set_reg8('d', 0x4d)
-        self.cpu.cp_reg8toreg8('b', 'd')()
+        self.cpu.handlers[0xba]()
 
-        self.assertEqual(self.cpu.get_reg8('b'), 0x5d)
+        self.assertEqual(self.cpu.get_reg8('a'), 0x5d)
         self.assertEqual(self.cpu.get_reg8('d'), 0x4d)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
-        self.assertEqual(self.cpu.get_halfcarry_flag(), 1)
+        self.assertEqual(self.cpu.get_halfcarry_flag(), 0)
         self.assertEqual(self.cpu.get_sub_flag(), 1)
         self.assertEqual(self.cpu.get_carry_flag(), 0)
 
@@ -1243,7 +1239,7 @@ class TestZ80ALU(unittest.TestCase):
 
         self.cpu.set_reg8('a', 0x3c)
         self.cpu.set_reg8('b', 0x2f)
-        self.cpu.cp_reg8toreg8('a', 'b')()
+        self.cpu.handlers[0xb8]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x3c)
         self.assertEqual(self.cpu.get_reg8('b'), 0x2f)
@@ -1252,10 +1248,12 @@ class TestZ80ALU(unittest.TestCase):
         self.assertEqual(self.cpu.get_sub_flag(), 1)
         self.assertEqual(self.cpu.get_carry_flag(), 0)
 
-        self.cpu.cp_reg8toreg8('b', 'a')()
+        self.cpu.set_reg8('a', 0x2f)
+        self.cpu.set_reg8('b', 0x3c)
+        self.cpu.handlers[0xb8]()
 
-        self.assertEqual(self.cpu.get_reg8('a'), 0x3c)
-        self.assertEqual(self.cpu.get_reg8('b'), 0x2f)
+        self.assertEqual(self.cpu.get_reg8('a'), 0x2f)
+        self.assertEqual(self.cpu.get_reg8('b'), 0x3c)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
         self.assertEqual(self.cpu.get_halfcarry_flag(), 0)
         self.assertEqual(self.cpu.get_sub_flag(), 1)
@@ -1264,7 +1262,7 @@ class TestZ80ALU(unittest.TestCase):
     def test_cp_reg8toreg8_3(self):
         self.cpu.set_reg8('a', 0x3c)
         self.cpu.set_reg8('b', 0x3c)
-        self.cpu.cp_reg8toreg8('a', 'b')()
+        self.cpu.handlers[0xb8]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x3c)
         self.assertEqual(self.cpu.get_reg8('b'), 0x3c)
@@ -1281,7 +1279,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg8('a', 0x3c)
         self.cpu.mmu.set_addr(addr16, 0x40)
         self.cpu.set_reg16('hl', addr16)
-        self.cpu.cp_regAtoregHLaddr()
+        self.cpu.handlers[0xbe]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x3c)
         self.assertEqual(self.cpu.mmu.get_addr(addr16), 0x40)
@@ -1296,7 +1294,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.mmu.set_addr(addr16, 0x3c)
         self.cpu.set_reg16('hl', addr16)
 
-        self.cpu.cp_regAtoregHLaddr()
+        self.cpu.handlers[0xbe]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x3c)
         self.assertEqual(self.cpu.mmu.get_addr(addr16), 0x3c)
@@ -1311,15 +1309,29 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.mmu.set_addr(addr16, 0x2c)
         self.cpu.set_reg16('hl', addr16)
 
-        self.cpu.cp_regAtoregHLaddr()
+        self.cpu.handlers[0xbe]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x3c)
         self.assertEqual(self.cpu.mmu.get_addr(addr16), 0x2c)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
-        self.assertEqual(self.cpu.get_halfcarry_flag(), 1)
+        self.assertEqual(self.cpu.get_halfcarry_flag(), 0)
         self.assertEqual(self.cpu.get_sub_flag(), 1)
         self.assertEqual(self.cpu.get_carry_flag(), 0)
 
+    def test_cp_halfcarry(self):
+        # cp is a sub that doesn't store the result, so H is the borrow from
+        # bit 4, as it is for sub. It used to be set whenever A > operand.
+        for a, b, halfcarry in ((0x10, 0x01, 1), (0x1f, 0x01, 0),
+                                (0x01, 0x02, 1), (0x01, 0x10, 0)):
+            self.cpu.set_reg8('a', a)
+            self.cpu.set_reg8('b', b)
+            self.cpu.handlers[0xb8]()
+            self.assertEqual(self.cpu.get_halfcarry_flag(), halfcarry, (a, b))
+            cp_flags = self.cpu.get_reg8('f')
+
+            self.cpu.handlers[0x90]()
+            self.assertEqual(self.cpu.get_reg8('f'), cp_flags, (a, b))
+
     def test_cp_imm8toregA(self):
         # When the immediate is the same as the contents of register A, the
         # zero flag is set
@@ -1328,7 +1340,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.pc = 0
         self.cpu.mmu.rom = bytes([0xfe])
 
-        self.cpu.cp_imm8toregA()
+        self.cpu.handlers[0xfe]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0xfe)
         self.assertEqual(self.cpu.get_zero_flag(), 1)
@@ -1338,33 +1350,34 @@ class TestZ80ALU(unittest.TestCase):
 
     def test_cp_imm8toregA_2(self):
         # When the immediate is greater than the contents of register A, the
-        # carry flag is set
+        # carry flag is set. The low nibble borrows, so half-carry is too.
 
         self.cpu.set_reg8('a', 0xfe)
         self.cpu.pc = 0
         self.cpu.mmu.rom = bytes([0xff])
 
-        self.cpu.cp_imm8toregA()
+        self.cpu.handlers[0xfe]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0xfe)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
-        self.assertEqual(self.cpu.get_halfcarry_flag(), 0)
+        self.assertEqual(self.cpu.get_halfcarry_flag(), 1)
         self.assertEqual(self.cpu.get_sub_flag(), 1)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
 
     def test_cp_imm8toregA_3(self):
         # When the immediate is less than the contents of register A, the
-        # half-carry flag is set
+        # carry flag is reset. The low nibble doesn't borrow, so half-carry is
+        # reset too.
 
         self.cpu.set_reg8('a', 0xfe)
         self.cpu.pc = 0
         self.cpu.mmu.rom = bytes([0xfc])
 
-        self.cpu.cp_imm8toregA()
+        self.cpu.handlers[0xfe]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0xfe)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
-        self.assertEqual(self.cpu.get_halfcarry_flag(), 1)
+        self.assertEqual(self.cpu.get_halfcarry_flag(), 0)
         self.assertEqual(self.cpu.get_sub_flag(), 1)
         self.assertEqual(self.cpu.get_carry_flag(), 0)
 
@@ -1373,7 +1386,7 @@ class TestZ80ALU(unittest.TestCase):
 
         self.cpu.set_reg8('a', 0x95)
         self.cpu.set_carry_flag()
-        self.cpu.rl_reg8('a')()
+        self.cpu.cb_handlers[0x17]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x2b)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -1384,7 +1397,7 @@ class TestZ80ALU(unittest.TestCase):
     def test_rl_reg8_2(self):
         self.cpu.set_reg8('b', 0xa5)
         self.cpu.reset_carry_flag()
-        self.cpu.rl_reg8('b')()
+        self.cpu.cb_handlers[0x10]()
 
         self.assertEqual(self.cpu.get_reg8('b'), 0x4a)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
@@ -1392,7 +1405,7 @@ class TestZ80ALU(unittest.TestCase):
     def test_rl_reg8_3(self):
         self.cpu.set_reg8('b', 0xa5)
         self.cpu.set_carry_flag()
-        self.cpu.rl_reg8('b')()
+        self.cpu.cb_handlers[0x10]()
 
         self.assertEqual(self.cpu.get_reg8('b'), 0x4b)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
@@ -1401,7 +1414,7 @@ class TestZ80ALU(unittest.TestCase):
         # Make sure the zero flag is set
         self.cpu.set_reg8('b', 0x00)
         self.cpu.reset_carry_flag()
-        self.cpu.rl_reg8('b')()
+        self.cpu.cb_handlers[0x10]()
 
         self.assertEqual(self.cpu.get_reg8('b'), 0x00)
         self.assertEqual(self.cpu.get_carry_flag(), 0)
@@ -1415,7 +1428,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.mmu.set_addr(0xc000, 0x80)
         self.cpu.reset_carry_flag()
 
-        self.cpu.rl_regHLaddr()
+        self.cpu.cb_handlers[0x16]()
 
         self.assertEqual(self.cpu.mmu.get_addr(0xc000), 0x00)
         self.assertEqual(self.cpu.get_zero_flag(), 1)
@@ -1429,7 +1442,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.mmu.set_addr(0xc000, 0x08)
         self.cpu.set_carry_flag()
 
-        self.cpu.rl_regHLaddr()
+        self.cpu.cb_handlers[0x16]()
 
         self.assertEqual(self.cpu.mmu.get_addr(0xc000), 0x11)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -1443,7 +1456,7 @@ class TestZ80ALU(unittest.TestCase):
 
         self.cpu.set_reg8('a', 0x85)
         self.cpu.reset_carry_flag()
-        self.cpu.rlc_reg8('a')()
+        self.cpu.cb_handlers[0x07]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x0b)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -1454,7 +1467,7 @@ class TestZ80ALU(unittest.TestCase):
     def test_rlc_reg8_2(self):
         self.cpu.set_reg8('b', 0xa5)
         self.cpu.reset_carry_flag()
-        self.cpu.rlc_reg8('b')()
+        self.cpu.cb_handlers[0x00]()
 
         self.assertEqual(self.cpu.get_reg8('b'), 0x4b)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
@@ -1464,7 +1477,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg8('b', 0x00)
         self.cpu.set_zero_flag()
 
-        self.cpu.rlc_reg8('b')()
+        self.cpu.cb_handlers[0x00]()
 
         self.assertEqual(self.cpu.get_reg8('b'), 0x00)
         self.assertEqual(self.cpu.get_carry_flag(), 0)
@@ -1475,7 +1488,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg8('b', 0x0a)
         self.cpu.set_carry_flag()
 
-        self.cpu.rlc_reg8('b')()
+        self.cpu.cb_handlers[0x00]()
 
         self.assertEqual(self.cpu.get_reg8('b'), 0x14)
         self.assertEqual(self.cpu.get_carry_flag(), 0)
@@ -1486,7 +1499,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg16('hl', 0xc000)
         self.cpu.mmu.set_addr(0xc000, 0x00)
 
-        self.cpu.rlc_regHLaddr()
+        self.cpu.cb_handlers[0x06]()
 
         self.assertEqual(self.cpu.mmu.get_addr(0xc000), 0x00)
         self.assertEqual(self.cpu.get_zero_flag(), 1)
@@ -1499,7 +1512,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg16('hl', 0xc000)
         self.cpu.mmu.set_addr(0xc000, 0x88)
 
-        self.cpu.rlc_regHLaddr()
+        self.cpu.cb_handlers[0x06]()
 
         self.assertEqual(self.cpu.mmu.get_addr(0xc000), 0x11)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -1512,7 +1525,7 @@ class TestZ80ALU(unittest.TestCase):
 
         self.cpu.set_reg8('a', 0x81)
         self.cpu.reset_carry_flag()
-        self.cpu.rr_reg8('a')()
+        self.cpu.cb_handlers[0x1f]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x40)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -1523,7 +1536,7 @@ class TestZ80ALU(unittest.TestCase):
     def test_rr_reg8_2(self):
         self.cpu.set_reg8('b', 0xa5)
         self.cpu.reset_carry_flag()
-        self.cpu.rr_reg8('b')()
+        self.cpu.cb_handlers[0x18]()
 
         self.assertEqual(self.cpu.get_reg8('b'), 0x52)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
@@ -1531,7 +1544,7 @@ class TestZ80ALU(unittest.TestCase):
     def test_rr_reg8_3(self):
         self.cpu.set_reg8('b', 0xa5)
         self.cpu.set_carry_flag()
-        self.cpu.rr_reg8('b')()
+        self.cpu.cb_handlers[0x18]()
 
         self.assertEqual(self.cpu.get_reg8('b'), 0xd2)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
@@ -1542,7 +1555,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_zero_flag()
         self.cpu.reset_carry_flag()
 
-        self.cpu.rr_reg8('b')()
+        self.cpu.cb_handlers[0x18]()
 
         self.assertEqual(self.cpu.get_reg8('b'), 0x00)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
@@ -1554,7 +1567,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_zero_flag()
         self.cpu.reset_carry_flag()
 
-        self.cpu.rr_reg8('b')()
+        self.cpu.cb_handlers[0x18]()
 
         self.assertEqual(self.cpu.get_reg8('b'), 0x08)
         self.assertEqual(self.cpu.get_carry_flag(), 0)
@@ -1566,7 +1579,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.mmu.set_addr(0xc000, 0x01)
         self.cpu.reset_carry_flag()
 
-        self.cpu.rr_regHLaddr()
+        self.cpu.cb_handlers[0x1e]()
 
         self.assertEqual(self.cpu.mmu.get_addr(0xc000), 0x00)
         self.assertEqual(self.cpu.get_zero_flag(), 1)
@@ -1580,7 +1593,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.mmu.set_addr(0xc000, 0x10)
         self.cpu.reset_carry_flag()
 
-        self.cpu.rr_regHLaddr()
+        self.cpu.cb_handlers[0x1e]()
 
         self.assertEqual(self.cpu.mmu.get_addr(0xc000), 0x08)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -1593,7 +1606,7 @@ class TestZ80ALU(unittest.TestCase):
 
         self.cpu.set_reg8('a', 0x3b)
         self.cpu.reset_carry_flag()
-        self.cpu.rrc_reg8('a')()
+        self.cpu.cb_handlers[0x0f]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x9d)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -1603,7 +1616,7 @@ class TestZ80ALU(unittest.TestCase):
 
     def test_rrc_reg8_2(self):
         self.cpu.set_reg8('b', 0xa5)
-        self.cpu.rrc_reg8('b')()
+        self.cpu.cb_handlers[0x08]()
 
         self.assertEqual(self.cpu.get_reg8('b'), 0xd2)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
@@ -1613,7 +1626,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg8('b', 0x00)
         self.cpu.set_carry_flag()
 
-        self.cpu.rrc_reg8('b')()
+        self.cpu.cb_handlers[0x08]()
 
         self.assertEqual(self.cpu.get_reg8('b'), 0x00)
         self.assertEqual(self.cpu.get_carry_flag(), 0)
@@ -1626,7 +1639,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg16('hl', 0xc000)
         self.cpu.mmu.set_addr(0xc000, 0x00)
 
-        self.cpu.rrc_regHLaddr()
+        self.cpu.cb_handlers[0x0e]()
 
         self.assertEqual(self.cpu.mmu.get_addr(0xc000), 0x00)
         self.assertEqual(self.cpu.get_zero_flag(), 1)
@@ -1639,7 +1652,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg16('hl', 0xc000)
         self.cpu.mmu.set_addr(0xc000, 0x01)
 
-        self.cpu.rrc_regHLaddr()
+        self.cpu.cb_handlers[0x0e]()
 
         self.assertEqual(self.cpu.mmu.get_addr(0xc000), 0x80)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -1649,14 +1662,14 @@ class TestZ80ALU(unittest.TestCase):
 
     def test_sla_reg8_1(self):
         self.cpu.set_reg8('b', 0xa5)
-        self.cpu.sla_reg8('b')()
+        self.cpu.cb_handlers[0x20]()
 
         self.assertEqual(self.cpu.get_reg8('b'), 0x4a)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
 
     def test_sla_reg8_2(self):
         self.cpu.set_reg8('b', 0x25)
-        self.cpu.sla_reg8('b')()
+        self.cpu.cb_handlers[0x20]()
 
         self.assertEqual(self.cpu.get_reg8('b'), 0x4a)
         self.assertEqual(self.cpu.get_carry_flag(), 0)
@@ -1665,7 +1678,7 @@ class TestZ80ALU(unittest.TestCase):
         # Make sure the zero flag gets set
         self.cpu.set_reg8('b', 0x80)
 
-        self.cpu.sla_reg8('b')()
+        self.cpu.cb_handlers[0x20]()
 
         self.assertEqual(self.cpu.get_reg8('b'), 0x00)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
@@ -1675,7 +1688,7 @@ class TestZ80ALU(unittest.TestCase):
         addr = 0xc000
         self.cpu.mmu.set_addr(addr, 0xa5)
         self.cpu.set_reg16('hl', addr)
-        self.cpu.sla_regHLaddr()
+        self.cpu.cb_handlers[0x26]()
 
         self.assertEqual(self.cpu.mmu.get_addr(self.cpu.get_reg16('hl')), 0x4a)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
@@ -1684,7 +1697,7 @@ class TestZ80ALU(unittest.TestCase):
         addr = 0xc000
         self.cpu.mmu.set_addr(addr, 0x25)
         self.cpu.set_reg16('hl', addr)
-        self.cpu.sla_regHLaddr()
+        self.cpu.cb_handlers[0x26]()
 
         self.assertEqual(self.cpu.mmu.get_addr(self.cpu.get_reg16('hl')), 0x4a)
         self.assertEqual(self.cpu.get_carry_flag(), 0)
@@ -1695,7 +1708,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.mmu.set_addr(addr, 0x80)
         self.cpu.set_reg16('hl', addr)
 
-        self.cpu.sla_regHLaddr()
+        self.cpu.cb_handlers[0x26]()
 
         self.assertEqual(self.cpu.mmu.get_addr(self.cpu.get_reg16('hl')), 0x00)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
@@ -1703,14 +1716,14 @@ class TestZ80ALU(unittest.TestCase):
 
     def test_sra_reg8_1(self):
         self.cpu.set_reg8('b', 0xa5)
-        self.cpu.sra_reg8('b')()
+        self.cpu.cb_handlers[0x28]()
 
         self.assertEqual(self.cpu.get_reg8('b'), 0xd2)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
 
     def test_sra_reg8_2(self):
         self.cpu.set_reg8('b', 0xa4)
-        self.cpu.sra_reg8('b')()
+        self.cpu.cb_handlers[0x28]()
 
         self.assertEqual(self.cpu.get_reg8('b'), 0xd2)
         self.assertEqual(self.cpu.get_carry_flag(), 0)
@@ -1719,7 +1732,7 @@ class TestZ80ALU(unittest.TestCase):
         # Make sure the zero flag gets set
         self.cpu.set_reg8('b', 0x01)
 
-        self.cpu.sra_reg8('b')()
+        self.cpu.cb_handlers[0x28]()
 
         self.assertEqual(self.cpu.get_reg8('b'), 0x00)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
@@ -1729,7 +1742,7 @@ class TestZ80ALU(unittest.TestCase):
         addr = 0xc000
         self.cpu.mmu.set_addr(addr, 0xa5)
         self.cpu.set_reg16('hl', addr)
-        self.cpu.sra_regHLaddr()
+        self.cpu.cb_handlers[0x2e]()
 
         self.assertEqual(self.cpu.mmu.get_addr(self.cpu.get_reg16('hl')), 0xd2)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
@@ -1738,7 +1751,7 @@ class TestZ80ALU(unittest.TestCase):
         addr = 0xc000
         self.cpu.mmu.set_addr(addr, 0xa4)
         self.cpu.set_reg16('hl', addr)
-        self.cpu.sra_regHLaddr()
+        self.cpu.cb_handlers[0x2e]()
 
         self.assertEqual(self.cpu.mmu.get_addr(self.cpu.get_reg16('hl')), 0xd2)
         self.assertEqual(self.cpu.get_carry_flag(), 0)
@@ -1747,7 +1760,7 @@ class TestZ80ALU(unittest.TestCase):
         addr = 0xc000
         self.cpu.mmu.set_addr(addr, 0x01)
         self.cpu.set_reg16('hl', addr)
-        self.cpu.sra_regHLaddr()
+        self.cpu.cb_handlers[0x2e]()
 
         self.assertEqual(self.cpu.mmu.get_addr(self.cpu.get_reg16('hl')), 0x00)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
@@ -1755,14 +1768,14 @@ class TestZ80ALU(unittest.TestCase):
 
     def test_srl_reg8_1(self):
         self.cpu.set_reg8('b', 0xa5)
-        self.cpu.srl_reg8('b')()
+        self.cpu.cb_handlers[0x38]()
 
         self.assertEqual(self.cpu.get_reg8('b'), 0x52)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
 
     def test_srl_reg8_2(self):
         self.cpu.set_reg8('b', 0xa4)
-        self.cpu.srl_reg8('b')()
+        self.cpu.cb_handlers[0x38]()
 
         self.assertEqual(self.cpu.get_reg8('b'), 0x52)
         self.assertEqual(self.cpu.get_carry_flag(), 0)
@@ -1771,7 +1784,7 @@ class TestZ80ALU(unittest.TestCase):
         # Make sure the zero flag gets set
         self.cpu.set_reg8('b', 0x01)
 
-        self.cpu.srl_reg8('b')()
+        self.cpu.cb_handlers[0x38]()
 
         self.assertEqual(self.cpu.get_reg8('b'), 0x00)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
@@ -1783,7 +1796,7 @@ class TestZ80ALU(unittest.TestCase):
         addr = 0xc000
         self.cpu.set_reg16('hl', addr)
         self.cpu.mmu.set_addr(addr, 0xa5)
-        self.cpu.srl_regHLaddr()
+        self.cpu.cb_handlers[0x3e]()
 
         self.assertEqual(self.cpu.mmu.get_addr(self.cpu.get_reg16('hl')), 0x52)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
@@ -1792,7 +1805,7 @@ class TestZ80ALU(unittest.TestCase):
         addr = 0xc000
         self.cpu.set_reg16('hl', addr)
         self.cpu.mmu.set_addr(addr, 0xa4)
-        self.cpu.srl_regHLaddr()
+        self.cpu.cb_handlers[0x3e]()
 
         self.assertEqual(self.cpu.mmu.get_addr(self.cpu.get_reg16('hl')), 0x52)
         self.assertEqual(self.cpu.get_carry_flag(), 0)
@@ -1802,7 +1815,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg16('hl', 0xc000)
         self.cpu.mmu.set_addr(0xc000, 0x01)
 
-        self.cpu.srl_regHLaddr()
+        self.cpu.cb_handlers[0x3e]()
 
         self.assertEqual(self.cpu.mmu.get_addr(0xc000), 0x00)
         self.assertEqual(self.cpu.get_carry_flag(), 1)
@@ -1815,7 +1828,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg8('c', 0x10)
         self.cpu.set_zero_flag()
 
-        self.cpu.bit_reg8(4, 'c')()
+        self.cpu.cb_handlers[0x61]()
 
         self.assertEqual(self.cpu.get_zero_flag(), 0)
         self.assertEqual(self.cpu.get_sub_flag(), 0)
@@ -1826,7 +1839,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg8('c', 0x10)
         self.cpu.reset_zero_flag()
 
-        self.cpu.bit_reg8(5, 'c')()
+        self.cpu.cb_handlers[0x69]()
 
         self.assertEqual(self.cpu.get_zero_flag(), 1)
         self.assertEqual(self.cpu.get_sub_flag(), 0)
@@ -1838,7 +1851,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.mmu.set_addr(0xc000, 0x10)
         self.cpu.set_zero_flag()
 
-        self.cpu.bit_regHLaddr(4)()
+        self.cpu.cb_handlers[0x66]()
 
         self.assertEqual(self.cpu.get_zero_flag(), 0)
         self.assertEqual(self.cpu.get_sub_flag(), 0)
@@ -1850,7 +1863,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.mmu.set_addr(0xc000, 0x10)
         self.cpu.reset_zero_flag()
 
-        self.cpu.bit_regHLaddr(5)()
+        self.cpu.cb_handlers[0x6e]()
 
         self.assertEqual(self.cpu.get_zero_flag(), 1)
         self.assertEqual(self.cpu.get_sub_flag(), 0)
@@ -1859,14 +1872,14 @@ class TestZ80ALU(unittest.TestCase):
     def test_res_reg8_1(self):
         self.cpu.set_reg8('d', 0x10)
 
-        self.cpu.res_reg8(4, 'd')()
+        self.cpu.cb_handlers[0xa2]()
 
         self.assertEqual(self.cpu.get_reg8('d'), 0x00)
 
     def test_res_reg8_2(self):
         self.cpu.set_reg8('d', 0x00)
 
-        self.cpu.res_reg8(4, 'd')()
+        self.cpu.cb_handlers[0xa2]()
 
         self.assertEqual(self.cpu.get_reg8('d'), 0x00)
 
@@ -1874,21 +1887,21 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg16('hl', 0xc000)
         self.cpu.mmu.set_addr(0xc000, 0x10)
 
-        self.cpu.res_regHLaddr(4)()
+        self.cpu.cb_handlers[0xa6]()
 
         self.assertEqual(self.cpu.mmu.get_addr(0xc000), 0x00)
 
     def test_set__reg8_1(self):
         self.cpu.set_reg8('d', 0x00)
 
-        self.cpu.set__reg8(4, 'd')()
+        self.cpu.cb_handlers[0xe2]()
 
         self.assertEqual(self.cpu.get_reg8('d'), 0x10)
 
     def test_set_reg8_2(self):
         self.cpu.set_reg8('d', 0x10)
 
-        self.cpu.set__reg8(4, 'd')()
+        self.cpu.cb_handlers[0xe2]()
 
         self.assertEqual(self.cpu.get_reg8('d'), 0x10)
 
@@ -1896,7 +1909,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg16('hl', 0xc000)
         self.cpu.mmu.set_addr(0xc000, 0x00)
 
-        self.cpu.set_regHLaddr(4)()
+        self.cpu.cb_handlers[0xe6]()
 
         self.assertEqual(self.cpu.mmu.get_addr(0xc000), 0x10)
 
@@ -1905,7 +1918,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg8('c', 0xb4)
         self.cpu.set_zero_flag()
 
-        self.cpu.swap_reg8('c')()
+        self.cpu.cb_handlers[0x31]()
 
         self.assertEqual(self.cpu.get_reg8('c'), 0x4b)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -1918,7 +1931,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_reg8('c', 0x00)
         self.cpu.reset_zero_flag()
 
-        self.cpu.swap_reg8('c')()
+        self.cpu.cb_handlers[0x31]()
 
         self.assertEqual(self.cpu.get_reg8('c'), 0x00)
         self.assertEqual(self.cpu.get_zero_flag(), 1)
@@ -1932,7 +1945,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.mmu.set_addr(0xc000, 0xb4)
         self.cpu.set_zero_flag()
 
-        self.cpu.swap_regHLaddr()
+        self.cpu.cb_handlers[0x36]()
 
         self.assertEqual(self.cpu.mmu.get_addr(0xc000), 0x4b)
         self.assertEqual(self.cpu.get_zero_flag(), 0)
@@ -1946,7 +1959,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.mmu.set_addr(0xc000, 0x00)
         self.cpu.reset_zero_flag()
 
-        self.cpu.swap_regHLaddr()
+        self.cpu.cb_handlers[0x36]()
 
         self.assertEqual(self.cpu.mmu.get_addr(0xc000), 0x00)
         self.assertEqual(self.cpu.get_zero_flag(), 1)
@@ -1957,7 +1970,7 @@ class TestZ80ALU(unittest.TestCase):
     def test_cpl(self):
         self.cpu.set_reg8('a', 0x55)
 
-        self.cpu.cpl()
+        self.cpu.handlers[0x2f]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0xaa)
 
@@ -1967,7 +1980,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.reset_halfcarry_flag()
         self.cpu.set_reg8('a', 0x88)
 
-        self.cpu.daa()
+        self.cpu.handlers[0x27]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 0x88)
         self.assertEqual(self.cpu.get_carry_flag(), 0)
@@ -1978,7 +1991,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.reset_carry_flag()
         self.cpu.reset_halfcarry_flag()
         self.cpu.reset_sub_flag()
-        self.cpu.daa()
+        self.cpu.handlers[0x27]()
 
         self.assertEqual(self.cpu.get_reg8('a'), 34)
         self.assertEqual(self.cpu.get_carry_flag(), 0)
@@ -1989,7 +2002,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_halfcarry_flag()
         self.cpu.set_reg8('a', 0x82)
 
-        self.cpu.daa()
+        self.cpu.handlers[0x27]()
 
         # add 0x06
         self.assertEqual(self.cpu.get_reg8('a'), 0x88)
@@ -2001,7 +2014,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.reset_halfcarry_flag()
         self.cpu.set_reg8('a', 0xa8)
 
-        self.cpu.daa()
+        self.cpu.handlers[0x27]()
 
         # add 0x60
         self.assertEqual(self.cpu.get_reg8('a'), 0x08)
@@ -2013,7 +2026,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.reset_halfcarry_flag()
         self.cpu.set_reg8('a', 0x9a)
 
-        self.cpu.daa()
+        self.cpu.handlers[0x27]()
 
         # add 0x66
         self.assertEqual(self.cpu.get_reg8('a'), 0x00)
@@ -2025,7 +2038,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_halfcarry_flag()
         self.cpu.set_reg8('a', 0xa3)
 
-        self.cpu.daa()
+        self.cpu.handlers[0x27]()
 
         # add 0x66
         self.assertEqual(self.cpu.get_reg8('a'), 0x09)
@@ -2037,7 +2050,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.reset_halfcarry_flag()
         self.cpu.set_reg8('a', 0x18)
 
-        self.cpu.daa()
+        self.cpu.handlers[0x27]()
 
         # add 0x60
         self.assertEqual(self.cpu.get_reg8('a'), 0x78)
@@ -2049,7 +2062,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.reset_halfcarry_flag()
         self.cpu.set_reg8('a', 0x1a)
 
-        self.cpu.daa()
+        self.cpu.handlers[0x27]()
 
         # add 0x66
         self.assertEqual(self.cpu.get_reg8('a'), 0x80)
@@ -2061,7 +2074,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_halfcarry_flag()
         self.cpu.set_reg8('a', 0x33)
 
-        self.cpu.daa()
+        self.cpu.handlers[0x27]()
 
         # add 0x66
         self.assertEqual(self.cpu.get_reg8('a'), 0x99)
@@ -2073,7 +2086,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.reset_halfcarry_flag()
         self.cpu.set_reg8('a', 0x99)
 
-        self.cpu.daa()
+        self.cpu.handlers[0x27]()
 
         # add 0x00
         self.assertEqual(self.cpu.get_reg8('a'), 0x99)
@@ -2085,7 +2098,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_halfcarry_flag()
         self.cpu.set_reg8('a', 0x88)
 
-        self.cpu.daa()
+        self.cpu.handlers[0x27]()
 
         # add 0xfa
         self.assertEqual(self.cpu.get_reg8('a'), 0x82)
@@ -2097,7 +2110,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.reset_halfcarry_flag()
         self.cpu.set_reg8('a', 0x77)
 
-        self.cpu.daa()
+        self.cpu.handlers[0x27]()
 
         # add 0xa0
         self.assertEqual(self.cpu.get_reg8('a'), 0x17)
@@ -2109,7 +2122,7 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.set_halfcarry_flag()
         self.cpu.set_reg8('a', 0x77)
 
-        self.cpu.daa()
+        self.cpu.handlers[0x27]()
 
         # add 0x9a
         self.assertEqual(self.cpu.get_reg8('a'), 0x11)
@@ -2122,7 +2135,7 @@ class TestZ80ALU(unittest.TestCase):
             self.cpu.set_halfcarry_flag()
             self.cpu.set_reg8('a', 0x34)
 
-            self.cpu.daa()
+            self.cpu.handlers[0x27]()
 
     def test_daa_15(self):
         with self.assertRaises(ValueError) as cm:
@@ -2131,7 +2144,7 @@ class TestZ80ALU(unittest.TestCase):
             self.cpu.set_halfcarry_flag()
             self.cpu.set_reg8('a', 0x56)
 
-            self.cpu.daa()
+            self.cpu.handlers[0x27]()
 
     def test_daa_16(self):
         # Example from the Gameboy Programming Manual
@@ -2139,32 +2152,58 @@ class TestZ80ALU(unittest.TestCase):
         self.cpu.reset_carry_flag()
         self.cpu.set_reg8('a', 0x45)
         self.cpu.set_reg8('b', 0x38)
-        self.cpu.add_reg8toreg8('b', 'a')() # 0x7d, c=0, h=0
-        self.cpu.daa()
+        self.cpu.handlers[0x80]() # 0x7d, c=0, h=0
+        self.cpu.handlers[0x27]()
         self.assertEqual(self.cpu.get_reg8('a'), 0x83)
         self.assertEqual(self.cpu.get_carry_flag(), 0)
 
-        self.cpu.sub_reg8fromreg8('b', 'a')()
-        self.cpu.daa()
+        self.cpu.handlers[0x90]()
+        self.cpu.handlers[0x27]()
         self.assertEqual(self.cpu.get_reg8('a'), 0x45)
         self.assertEqual(self.cpu.get_carry_flag(), 0)
 
     def test_scf(self):
         self.cpu.reset_carry_flag()
-        self.cpu.scf()
+        self.cpu.handlers[0x37]()
 
         self.assertEqual(self.cpu.get_carry_flag(), 1)
 
-        self.cpu.scf()
+        self.cpu.handlers[0x37]()
 
         self.assertEqual(self.cpu.get_carry_flag(), 1)
 
     def test_ccf(self):
         self.cpu.set_carry_flag()
-        self.cpu.ccf()
+        self.cpu.handlers[0x3f]()
 
         self.assertEqual(self.cpu.get_carry_flag(), 0)
 
+    def test_pending_flags(self):
+        # The low nibble of F is kept under the flags of an ALU operation
+        self.cpu.set_reg8('f', 0x1f)
+        self.cpu.set_reg8('a', 0x3c)
+        self.cpu.set_reg8('b', 0x3c)
+        self.cpu.handlers[0xb8]()
+        self.assertEqual(self.cpu.get_zero_flag(), 1)
+        self.assertEqual(self.cpu.get_carry_flag(), 0)
+        self.assertEqual(self.cpu.get_reg16('af'), 0x3ccf)
+
+        # inc keeps the pending carry
+        self.cpu.set_reg8('b', 0x40)
+        self.cpu.handlers[0x98]()
+        self.cpu.handlers[0x04]()
+        self.assertEqual(self.cpu.get_reg8('f'), 0x1f)
+
+        # Partial writes apply on top of the pending flags
+        self.cpu.handlers[0x80]()
+        self.cpu.set_zero_flag()
+        self.assertEqual(self.cpu.get_reg8('f'), 0x9f)
+
+        self.cpu.handlers[0xaf]()
+        self.cpu.set_reg8('f', 0x00)
+        self.assertEqual(self.cpu.get_zero_flag(), 0)
+        self.assertEqual(self.cpu.get_registers()['f'], 0x00)
+
 
 class TestZ80Control(unittest.TestCase):
     def setUp(self):
@@ -2176,7 +2215,7 @@ class TestZ80Control(unittest.TestCase):
         rom[0x1000] = 0x20
         self.cpu.mmu.rom = bytes(rom)
 
-        self.cpu.jr_imm8()()
+        self.cpu.handlers[0x18]()
 
         self.assertEqual(self.cpu.get_pc(), 0x1021)
 
@@ -2186,7 +2225,7 @@ class TestZ80Control(unittest.TestCase):
         rom[0x1000] = 0xe0
         self.cpu.mmu.rom = bytes(rom)
 
-        self.cpu.jr_imm8()()
+        self.cpu.handlers[0x18]()
 
         self.assertEqual(self.cpu.get_pc(), 0x0fe1)
 
@@ -2194,7 +2233,7 @@ class TestZ80Control(unittest.TestCase):
         self.cpu.pc = 0x1000
         self.cpu.mmu.rom = bytes(0x20 for _ in range(0x1001))
         self.cpu.reset_zero_flag()
-        self.cpu.jr_imm8('NZ')()
+        self.cpu.handlers[0x20]()
 
         self.assertEqual(self.cpu.get_pc(), 0x1021)
 
@@ -2202,7 +2241,7 @@ class TestZ80Control(unittest.TestCase):
         self.cpu.pc = 0x1000
         self.cpu.mmu.rom = bytes(0x20 for _ in range(0x1001))
         self.cpu.set_zero_flag()
-        self.cpu.jr_imm8('Z')()
+        self.cpu.handlers[0x28]()
 
         self.assertEqual(self.cpu.get_pc(), 0x1021)
 
@@ -2210,7 +2249,7 @@ class TestZ80Control(unittest.TestCase):
         self.cpu.pc = 0x1000
         self.cpu.mmu.rom = bytes(0x20 for _ in range(0x1001))
         self.cpu.reset_carry_flag()
-        self.cpu.jr_imm8('NC')()
+        self.cpu.handlers[0x30]()
 
         self.assertEqual(self.cpu.get_pc(), 0x1021)
 
@@ -2218,7 +2257,7 @@ class TestZ80Control(unittest.TestCase):
         self.cpu.pc = 0x1000
         self.cpu.mmu.rom = bytes(0x20 for _ in range(0x1001))
         self.cpu.set_carry_flag()
-        self.cpu.jr_imm8('C')()
+        self.cpu.handlers[0x38]()
 
         self.assertEqual(self.cpu.get_pc(), 0x1021)
 
@@ -2227,26 +2266,22 @@ class TestZ80Control(unittest.TestCase):
         # two's compl of 0x20 is 0xe0
         self.cpu.mmu.rom = bytes(0xe0 for _ in range(0x1001))
         self.cpu.set_carry_flag()
-        self.cpu.jr_imm8('C')()
+        self.cpu.handlers[0x38]()
 
         # 0x1001 - 0x20 = 0x0fe1
         self.assertEqual(self.cpu.get_pc(), 0x0fe1)
 
-    def test_jr_imm8_badcond(self):
-        with self.assertRaises(ValueError) as cm:
-            self.cpu.jr_imm8('A')()
-
     def test_jp_imm16addr(self):
         self.cpu.pc = 0
         self.cpu.mmu.rom = bytes([0x00, 0xd0])
-        self.cpu.jp_imm16addr()()
+        self.cpu.handlers[0xc3]()
 
         self.assertEqual(self.cpu.get_pc(), 0xd000)
 
     def test_jp_reg16addr(self):
         self.cpu.pc = 0xc000
         self.cpu.set_reg16('hl', 0xd000)
-        self.cpu.jp_reg16addr('hl')()
+        self.cpu.handlers[0xe9]()
 
         self.assertEqual(self.cpu.get_pc(), 0xd000)
 
@@ -2256,7 +2291,7 @@ class TestZ80Control(unittest.TestCase):
         self.cpu.mmu.rom = bytes([0x00, 0x20])
         self.cpu.reset_zero_flag()
 
-        self.cpu.jp_imm16addr('NZ')()
+        self.cpu.handlers[0xc2]()
 
         self.assertEqual(self.cpu.pc, 0x2000)
 
@@ -2265,7 +2300,7 @@ class TestZ80Control(unittest.TestCase):
         self.cpu.mmu.rom = bytes([0x00, 0x20])
         self.cpu.set_zero_flag()
 
-        self.cpu.jp_imm16addr('Z')()
+        self.cpu.handlers[0xca]()
 
         self.assertEqual(self.cpu.pc, 0x2000)
 
@@ -2274,7 +2309,7 @@ class TestZ80Control(unittest.TestCase):
         self.cpu.mmu.rom = bytes([0x00, 0x20])
         self.cpu.reset_carry_flag()
 
-        self.cpu.jp_imm16addr('NC')()
+        self.cpu.handlers[0xd2]()
 
         self.assertEqual(self.cpu.pc, 0x2000)
 
@@ -2283,25 +2318,17 @@ class TestZ80Control(unittest.TestCase):
         self.cpu.mmu.rom = bytes([0x00, 0x20])
         self.cpu.set_carry_flag()
 
-        self.cpu.jp_imm16addr('C')()
+        self.cpu.handlers[0xda]()
 
         self.assertEqual(self.cpu.pc, 0x2000)
 
-    def test_jp_imm16addr_badcond(self):
-        self.pc = 0
-        with self.assertRaises(ValueError) as cm:
-            self.cpu.mmu.rom = bytes([0x00, 0x20])
-            self.cpu.set_carry_flag()
-
-            self.cpu.jp_imm16addr('B')()
-
     def test_ret(self):
         self.cpu.pc = 0x1234
         self.cpu.sp = 0xd000
         self.cpu.mmu.set_addr(0xd000, 0x00)
         self.cpu.mmu.set_addr(0xd001, 0xc0)
 
-        self.cpu.ret()()
+        self.cpu.handlers[0xc9]()
 
         self.assertEqual(self.cpu.get_pc(), 0xc000)
         self.assertEqual(self.cpu.sp, 0xd002)
@@ -2313,13 +2340,13 @@ class TestZ80Control(unittest.TestCase):
         self.cpu.mmu.set_addr(0xd001, 0xc0)
 
         self.cpu.reset_zero_flag()
-        self.cpu.ret(cond='z')()
+        self.cpu.handlers[0xc8]()
 
         self.assertEqual(self.cpu.get_pc(), 0x1234)
         self.assertEqual(self.cpu.sp, 0xd000)
 
         self.cpu.set_zero_flag()
-        self.cpu.ret(cond='z')()
+        self.cpu.handlers[0xc8]()
 
         self.assertEqual(self.cpu.get_pc(), 0xc000)
         self.assertEqual(self.cpu.sp, 0xd002)
@@ -2331,13 +2358,13 @@ class TestZ80Control(unittest.TestCase):
         self.cpu.mmu.set_addr(0xd001, 0xc0)
 
         self.cpu.set_zero_flag()
-        self.cpu.ret(cond='nz')()
+        self.cpu.handlers[0xc0]()
 
         self.assertEqual(self.cpu.get_pc(), 0x1234)
         self.assertEqual(self.cpu.sp, 0xd000)
 
         self.cpu.reset_zero_flag()
-        self.cpu.ret(cond='nz')()
+        self.cpu.handlers[0xc0]()
 
         self.assertEqual(self.cpu.get_pc(), 0xc000)
         self.assertEqual(self.cpu.sp, 0xd002)
@@ -2349,13 +2376,13 @@ class TestZ80Control(unittest.TestCase):
         self.cpu.mmu.set_addr(0xd001, 0xc0)
 
         self.cpu.reset_carry_flag()
-        self.cpu.ret(cond='c')()
+        self.cpu.handlers[0xd8]()
 
         self.assertEqual(self.cpu.get_pc(), 0x1234)
         self.assertEqual(self.cpu.sp, 0xd000)
 
         self.cpu.set_carry_flag()
-        self.cpu.ret(cond='c')()
+        self.cpu.handlers[0xd8]()
 
         self.assertEqual(self.cpu.get_pc(), 0xc000)
         self.assertEqual(self.cpu.sp, 0xd002)
@@ -2367,20 +2394,18 @@ class TestZ80Control(unittest.TestCase):
         self.cpu.mmu.set_addr(0xd001, 0xc0)
 
         self.cpu.set_carry_flag()
-        self.cpu.ret(cond='nc')()
+        self.cpu.handlers[0xd0]()
 
         self.assertEqual(self.cpu.get_pc(), 0x1234)
         self.assertEqual(self.cpu.sp, 0xd000)
+        self.assertEqual(self.cpu.cycles[0xd0], 8)
 
         self.cpu.reset_carry_flag()
-        self.cpu.ret(cond='nc')()
+        self.cpu.handlers[0xd0]()
 
         self.assertEqual(self.cpu.get_pc(), 0xc000)
         self.assertEqual(self.cpu.sp, 0xd002)
-
-    def test_ret_cond_2_badcond(self):
-        with self.assertRaises(ValueError) as cm:
-            self.cpu.ret(cond='aa')()
+        self.assertEqual(self.cpu.cycles[0xd0], 20)
 
     def test_reti(self):
         self.cpu.pc = 0x1234
@@ -2388,7 +2413,7 @@ class TestZ80Control(unittest.TestCase):
         self.cpu.mmu.set_addr(0xd000, 0x00)
         self.cpu.mmu.set_addr(0xd001, 0xc0)
 
-        self.cpu.reti()
+        self.cpu.handlers[0xd9]()
 
         self.assertEqual(self.cpu.get_pc(), 0xc000)
         self.assertEqual(self.cpu.sp, 0xd002)
@@ -2401,7 +2426,7 @@ class TestZ80Control(unittest.TestCase):
         rom[0x1235] = 0x20
         self.cpu.mmu.rom = bytes(rom)
 
-        self.cpu.call_imm16addr()()
+        self.cpu.handlers[0xcd]()
 
         self.assertEqual(self.cpu.get_pc(), 0x2000)
         self.assertEqual(self.cpu.sp, 0xcffe)
@@ -2419,7 +2444,7 @@ class TestZ80Control(unittest.TestCase):
         self.cpu.mmu.rom = bytes(rom)
 
         self.cpu.reset_zero_flag()
-        self.cpu.call_imm16addr('z')()
+        self.cpu.handlers[0xcc]()
 
         self.assertEqual(self.cpu.get_pc(), 0x1236)
         self.assertEqual(self.cpu.sp, 0xd000)
@@ -2427,7 +2452,7 @@ class TestZ80Control(unittest.TestCase):
         self.assertEqual(self.cpu.mmu.get_addr(self.cpu.sp), 0x00)
 
         self.cpu.set_zero_flag()
-        self.cpu.call_imm16addr('z')()
+        self.cpu.handlers[0xcc]()
 
         self.assertEqual(self.cpu.get_pc(), 0x2000)
         self.assertEqual(self.cpu.sp, 0xcffe)
@@ -2445,7 +2470,7 @@ class TestZ80Control(unittest.TestCase):
         self.cpu.mmu.rom = bytes(rom)
 
         self.cpu.set_zero_flag()
-        self.cpu.call_imm16addr('nz')()
+        self.cpu.handlers[0xc4]()
 
         self.assertEqual(self.cpu.get_pc(), 0x1236)
         self.assertEqual(self.cpu.sp, 0xd000)
@@ -2453,7 +2478,7 @@ class TestZ80Control(unittest.TestCase):
         self.assertEqual(self.cpu.mmu.get_addr(self.cpu.sp), 0x00)
 
         self.cpu.reset_zero_flag()
-        self.cpu.call_imm16addr('nz')()
+        self.cpu.handlers[0xc4]()
 
         self.assertEqual(self.cpu.get_pc(), 0x2000)
         self.assertEqual(self.cpu.sp, 0xcffe)
@@ -2471,7 +2496,7 @@ class TestZ80Control(unittest.TestCase):
         self.cpu.mmu.rom = bytes(rom)
 
         self.cpu.reset_carry_flag()
-        self.cpu.call_imm16addr('c')()
+        self.cpu.handlers[0xdc]()
 
         self.assertEqual(self.cpu.get_pc(), 0x1236)
         self.assertEqual(self.cpu.sp, 0xd000)
@@ -2479,7 +2504,7 @@ class TestZ80Control(unittest.TestCase):
         self.assertEqual(self.cpu.mmu.get_addr(self.cpu.sp), 0x00)
 
         self.cpu.set_carry_flag()
-        self.cpu.call_imm16addr('c')()
+        self.cpu.handlers[0xdc]()
 
         self.assertEqual(self.cpu.get_pc(), 0x2000)
         self.assertEqual(self.cpu.sp, 0xcffe)
@@ -2497,7 +2522,7 @@ class TestZ80Control(unittest.TestCase):
         self.cpu.mmu.rom = bytes(rom)
 
         self.cpu.set_carry_flag()
-        self.cpu.call_imm16addr('nc')()
+        self.cpu.handlers[0xd4]()
 
         self.assertEqual(self.cpu.get_pc(), 0x1236)
         self.assertEqual(self.cpu.sp, 0xd000)
@@ -2505,7 +2530,7 @@ class TestZ80Control(unittest.TestCase):
         self.assertEqual(self.cpu.mmu.get_addr(self.cpu.sp), 0x00)
 
         self.cpu.reset_carry_flag()
-        self.cpu.call_imm16addr('nc')()
+        self.cpu.handlers[0xd4]()
 
         self.assertEqual(self.cpu.get_pc(), 0x2000)
         self.assertEqual(self.cpu.sp, 0xcffe)
@@ -2517,17 +2542,13 @@ class TestZ80Control(unittest.TestCase):
             self.cpu.pc = 0x1234
             self.cpu.sp = 0xd000
 
-            self.cpu.rst(addr)()
+            self.cpu.handlers[0xc7 | addr]()
 
             self.assertEqual(self.cpu.pc, addr)
             self.assertEqual(self.cpu.sp, 0xcffe)
             self.assertEqual(self.cpu.mmu.get_addr(0xcfff), 0x12)
             self.assertEqual(self.cpu.mmu.get_addr(0xcffe), 0x34)
 
-    def test_call_imm16addr_badcond(self):
-        with self.assertRaises(ValueError) as cm:
-            self.cpu.call_imm16addr('aa')()
-
     def test_stop(self):
         # TODO
         # for now, just make sure no exceptions are raised. later, we want to
@@ -2543,3 +2564,130 @@ class TestZ80Control(unittest.TestCase):
         self.cpu.halt()
 
 
+    def run_halt(self, code):
+        rom = bytearray(0x8000)
+        # vblank handler: stop
+        rom[0x40] = 0x10
+        rom[0x100:0x100+len(code)] = code
+        cpu = slowboy.z80.Z80(rom=bytes(rom))
+        cpu.go()
+        return cpu
+
+    def test_halt_vblank(self):
+        # ld a, 1; ldh (0xff), a; ei; halt; stop
+        cpu = self.run_halt([0x3e, 0x01, 0xe0, 0xff, 0xfb, 0x76, 0x10])
+
+        # The clock jumps to the start of VBLANK, then the interrupt runs
+        self.assertEqual(cpu.clock, 144 * 456 + 4)
+        self.assertEqual(cpu.gpu.ly, 144)
+        self.assertEqual(cpu.pc, 0x41)
+
+    def test_halt_di(self):
+        # ld a, 1; ldh (0xff), a; di; halt; stop
+        cpu = self.run_halt([0x3e, 0x01, 0xe0, 0xff, 0xf3, 0x76, 0x10])
+
+        # HALT ends without the interrupt being serviced
+        self.assertEqual(cpu.clock, 144 * 456 + 4)
+        self.assertEqual(cpu.pc, 0x107)
+
+    def test_skip_to_next_event(self):
+        deadline = self.cpu.scheduler.next_deadline
+        clock = self.cpu.clock
+
+        self.assertEqual(self.cpu.skip_to_next_event(), deadline - clock)
+        self.assertEqual(self.cpu.clock, deadline)
+        self.assertGreater(self.cpu.scheduler.next_deadline, deadline)
+
+
+class TestZ80Run(unittest.TestCase):
+    def make_cpu(self, code, **kwargs):
+        rom = bytearray(0x8000)
+        rom[0x100:0x100+len(code)] = code
+        cpu = slowboy.z80.Z80(rom=bytes(rom), **kwargs)
+        cpu.set_reg8('a', 0)
+        return cpu
+
+    def test_run_cycles(self):
+        # loop: inc a; jr loop
+        cpu = self.make_cpu([0x3c, 0x18, 0xfd], skip_idle_loops=False)
+
+        result = cpu.run_cycles(100)
+        # Stops at the first instruction boundary at or after 100 cycles
+        self.assertEqual(result, slowboy.z80.RunResult(13, 100))
+        self.assertEqual(cpu.clock, 100)
+        self.assertEqual(cpu.get_reg8('a'), 7)
+
+        result = cpu.run_cycles(10)
+        self.assertEqual(result, slowboy.z80.RunResult(1, 12))
+
+        result = cpu.run_cycles(16)
+        self.assertEqual(result, slowboy.z80.RunResult(2, 16))
+
+    def test_run_cycles_translate(self):
+        # loop: inc a; jr loop
+        cpu = self.make_cpu([0x3c, 0x18, 0xfd], translate=True,
+                            skip_idle_loops=False)
+
+        # A block is not run if it would go past the end
+        result = cpu.run_cycles(100)
+        self.assertEqual(result, slowboy.z80.RunResult(13, 100))
+        self.assertEqual(cpu.get_reg8('a'), 7)
+
+    def test_pc_trace(self):
+        # loop: inc a; jr loop
+        cpu = self.make_cpu([0x3c, 0x18, 0xfd], skip_idle_loops=False)
+
+        cpu.run_cycles(16)
+        self.assertIsNone(cpu.pc_trace)
+        self.assertEqual(cpu.pc_trace_history(), [])
+
+        cpu.start_pc_trace(size=3)
+        cpu.run_cycles(16)
+        self.assertEqual(cpu.pc_trace_history(), [0x100, 0x101])
+        cpu.run_cycles(32)
+        self.assertEqual(cpu.pc_trace_history(), [0x101, 0x100, 0x101])
+
+        cpu.stop_pc_trace()
+        cpu.run_cycles(16)
+        self.assertEqual(cpu.pc_trace_history(), [])
+
+    def test_run_cycles_halt(self):
+        # di; halt
+        cpu = self.make_cpu([0xf3, 0x76])
+
+        result = cpu.run_cycles(1000)
+        self.assertEqual(result, slowboy.z80.RunResult(2, 1000))
+        self.assertEqual(cpu.state, slowboy.z80.State.HALT)
+
+    def test_run_cycles_stop(self):
+        # nop; stop
+        cpu = self.make_cpu([0x00, 0x10])
+
+        result = cpu.run_cycles(1000)
+        self.assertEqual(result, slowboy.z80.RunResult(2, 8))
+        self.assertEqual(cpu.state, slowboy.z80.State.STOP)
+
+    def test_run_frame(self):
+        # loop: jr loop
+        cpu = self.make_cpu([0x18, 0xfe])
+
+        result = cpu.run_frame()
+        self.assertEqual(cpu.gpu.mode, slowboy.gpu.Mode.V_BLANK)
+        self.assertEqual(cpu.gpu.ly, 144)
+        self.assertEqual(result.cycles, 144 * 456)
+
+        result = cpu.run_frame()
+        self.assertEqual(cpu.gpu.ly, 144)
+        self.assertEqual(result.cycles, 154 * 456)
+
+    def test_run_until(self):
+        # inc a; inc a; inc a; loop: jr loop
+        cpu = self.make_cpu([0x3c, 0x3c, 0x3c, 0x18, 0xfe], translate=True)
+
+        result = cpu.run_until(0x102)
+        self.assertEqual(result, slowboy.z80.RunResult(2, 8))
+        self.assertEqual(cpu.pc, 0x102)
+
+        result = cpu.run_until(0x2000, max_cycles=120)
+        self.assertEqual(result.cycles, 4 + 10 * 12)
+        self.assertEqual(cpu.get_reg8('a'), 3)